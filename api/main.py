@@ -47,17 +47,21 @@ from fastapi.staticfiles import StaticFiles
 
 # Import our router modules — each one handles a group of related endpoints
 from api.routers import protocols, sessions, pump, documentation, analysis
+from api.responses import FastJSONResponse
 
 # Initialize the database on startup
 from robotaste.data.database import init_database
 
+# Shared GP worker pool (load metrics below)
+from robotaste.core.bo_scheduler import get_bo_scheduler
+
 
 # ─── LOGGING SETUP ──────────────────────────────────────────────────────────
 # Use the centralized logging_manager for consistent log format, daily rotation,
-# and pump-module DEBUG tracing.
+# and pump-module DEBUG tracing. Configured in on_startup (not at import) so
+# importing the app, e.g. from tests, does not write log files.
 from robotaste.utils.logging_manager import setup_logging
 
-setup_logging(component="api")
 logger = logging.getLogger("robotaste.api")
 
 
@@ -68,6 +72,7 @@ app = FastAPI(
     title="RoboTaste API",                          # Name shown in auto-generated docs
     description="REST API for the RoboTaste experiment platform",
     version="1.0.0",
+    default_response_class=FastJSONResponse,        # orjson-backed JSON rendering
 )
 
 
@@ -124,10 +129,12 @@ async def log_requests(request: Request, call_next):
 
 # ─── STARTUP EVENT ──────────────────────────────────────────────────────────
 # This function runs once when the server starts up.
-# We use it to initialize the database (create tables if they don't exist).
+# We use it to set up logging and initialize the database (create tables if
+# they don't exist).
 @app.on_event("startup")
 def on_startup():
-    """Initialize database tables on server startup."""
+    """Configure logging and initialize database tables on server startup."""
+    setup_logging(component="api")
     init_database()
 
 
@@ -140,6 +147,15 @@ def health_check():
     return {"status": "ok", "service": "robotaste-api"}
 
 
+# ─── BO SCHEDULER METRICS ───────────────────────────────────────────────────
+# Queue depth and latencies of the shared GP worker pool, to check that
+# subject requests stay fast while several sessions run BO.
+@app.get("/api/bo-scheduler")
+def bo_scheduler_metrics():
+    """Return BO scheduler load and recent wait/run latencies per priority."""
+    return get_bo_scheduler().metrics()
+
+
 # ─── SERVER INFO ────────────────────────────────────────────────────────────
 # Returns the server's LAN/Tailscale IP and connection URLs so the moderator UI
 # can display QR codes / links for subject tablets to connect.
@@ -0,0 +1,84 @@
+"""
+Response classes shared by the API routers.
+
+FastJSONResponse is the app's default response class (see api/main.py).
+It renders through robotaste.utils.json_codec, so NumPy arrays in the
+content are serialized straight from their buffers. Endpoints that return
+arrays (e.g. the 25×25 BO surfaces) return a FastJSONResponse directly:
+FastAPI's jsonable_encoder, which runs on plain return values, does not
+accept arrays and walks every nested list element in Python.
+
+GP surface endpoints can also send their float arrays as base64-encoded
+little-endian float32 buffers (see grid_response), which clients wrap in a
+Float32Array instead of parsing number lists.
+"""
+
+import base64
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from robotaste.utils import json_codec
+
+# Opt in with ?grid_format=float32 or this media type in the Accept header
+FLOAT32_GRID_FORMAT = "float32"
+FLOAT32_GRIDS_MEDIA_TYPE = "application/vnd.robotaste.float32-grids+json"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the project JSON codec."""
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps_bytes(content)
+
+
+def wants_float32_grids(request: Request, grid_format: Optional[str] = None) -> bool:
+    """Whether the client asked for float32-encoded grids."""
+    if grid_format is not None:
+        return grid_format == FLOAT32_GRID_FORMAT
+    return FLOAT32_GRIDS_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def encode_float32_grid(values: Any) -> dict:
+    """
+    Encode an array as a float32 grid object.
+
+    Returns:
+        {"dtype": "float32", "shape": [...], "data": base64 of the
+        little-endian, row-major buffer}
+    """
+    array = np.ascontiguousarray(values, dtype="<f4")
+    return {
+        "dtype": "float32",
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def _encode_arrays(content: Any) -> Any:
+    if isinstance(content, np.ndarray) and content.dtype.kind in "fiu":
+        return encode_float32_grid(content)
+    if isinstance(content, dict):
+        return {key: _encode_arrays(value) for key, value in content.items()}
+    if isinstance(content, list):
+        return [_encode_arrays(value) for value in content]
+    return content
+
+
+def grid_response(content: dict, float32_grids: bool = False) -> FastJSONResponse:
+    """
+    Response for content holding NumPy grids.
+
+    Args:
+        content: Response dict; its numeric NumPy arrays are the grids
+        float32_grids: Encode the arrays with encode_float32_grid and set
+            content["grid_encoding"] = "float32"
+
+    Returns:
+        FastJSONResponse (number lists unless float32_grids)
+    """
+    if float32_grids:
+        content = {**_encode_arrays(content), "grid_encoding": FLOAT32_GRID_FORMAT}
+    return FastJSONResponse(content)
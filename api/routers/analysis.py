@@ -13,10 +13,11 @@ from typing import Optional
 
 import numpy as np
 import pandas as pd
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from robotaste.data.database import get_database_connection, get_session
+from api.responses import grid_response, wants_float32_grids
+from robotaste.data.database import get_database_connection, get_protocol_snapshot, get_session
 from robotaste.core.bo_surface import compute_bo_surface_2d, compute_bo_calibration
 
 logger = logging.getLogger("robotaste.api.analysis")
@@ -245,6 +246,7 @@ def list_bo_sessions():
                     ses.session_code,
                     ses.protocol_id,
                     ses.experiment_config,
+                    ses.config_snapshot_hash,
                     u.name AS subject_name,
                     pl.name AS protocol_name,
                     COUNT(s.sample_id) AS sample_count
@@ -263,7 +265,10 @@ def list_bo_sessions():
         results = []
         for row in rows:
             try:
-                config = json.loads(row["experiment_config"]) if row["experiment_config"] else {}
+                if row["config_snapshot_hash"]:
+                    config = get_protocol_snapshot(row["config_snapshot_hash"])
+                else:
+                    config = json.loads(row["experiment_config"]) if row["experiment_config"] else {}
             except (TypeError, json.JSONDecodeError):
                 continue
             ingredients = config.get("ingredients", [])
@@ -293,9 +298,13 @@ def list_bo_sessions():
 @router.get("/bo-surface/{session_id}")
 def get_bo_surface(
     session_id: str,
+    request: Request,
     up_to_cycle: Optional[int] = Query(
         None, ge=3, description="Train only on the first N chronological samples (post-hoc replay)."
     ),
+    grid_format: Optional[str] = Query(
+        None, description="'float32' returns grids as base64 little-endian float32 buffers."
+    ),
 ):
     """
     Compute a post-hoc 2D GP response surface for one session.
@@ -303,6 +312,8 @@ def get_bo_surface(
     Pass `up_to_cycle` to get the surface as it existed after only the first
     N samples — this is what powers the sample-by-sample replay slider.
     Omit it for the full-session surface (used by Compare and Mean).
+    Pass `grid_format=float32` (or Accept the float32-grids media type) for
+    grids encoded by api.responses.encode_float32_grid.
     """
     session = get_session(session_id)
     if not session:
@@ -323,14 +334,18 @@ def get_bo_surface(
             "message": "Need a 2-ingredient BO session with >=3 samples.",
         }
 
-    return {"status": "ready", **surface}
+    return grid_response({"status": "ready", **surface}, wants_float32_grids(request, grid_format))
 
 
 @router.get("/bo-surface-mean")
 def get_bo_surface_mean(
+    request: Request,
     session_ids: str = Query(
         ..., description="Comma-separated session IDs to average (must share one protocol)."
     ),
+    grid_format: Optional[str] = Query(
+        None, description="'float32' returns grids as base64 little-endian float32 buffers."
+    ),
 ):
     """
     Compute a mean GP response surface across two or more participants who
@@ -386,13 +401,13 @@ def get_bo_surface_mean(
     grid_mean = mean_grids.mean(axis=0)
     grid_between_subject_std = mean_grids.std(axis=0)
 
-    return {
+    return grid_response({
         "status": "ready",
         "predictions": {
             "x": first_x,
             "y": first_y,
-            "mean": grid_mean.tolist(),
-            "between_subject_std": grid_between_subject_std.tolist(),
+            "mean": grid_mean,
+            "between_subject_std": grid_between_subject_std,
         },
         "sessions": [
             {
@@ -404,7 +419,7 @@ def get_bo_surface_mean(
             for sid, session, surface in entries
         ],
         "ingredient_names": entries[0][2]["ingredient_names"],
-    }
+    }, wants_float32_grids(request, grid_format))
 
 
 @router.get("/bo-calibration/{session_id}")
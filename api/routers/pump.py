@@ -16,15 +16,26 @@ If pumps are not configured, they return empty/default data gracefully.
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from datetime import datetime
+from collections import OrderedDict
 from typing import Optional
 import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 # ─── CREATE ROUTER ──────────────────────────────────────────────────────────
 router = APIRouter()
 
+# Maximum number of operations whose predicted duration is kept in memory
+MAX_PREDICTED_DURATIONS = 256
+
+# operation_id -> predicted duration in seconds; avoids reloading the protocol
+# on every progress poll of the same operation
+_predicted_durations: "OrderedDict[int, Optional[float]]" = OrderedDict()
+_predicted_durations_lock = threading.Lock()
+
 
 class RefillWithdrawRequest(BaseModel):
     """Start the refill withdraw step."""
@@ -87,7 +98,10 @@ def get_pump_operation(session_id: str):
 
     Returns:
         status: "pending" | "in_progress" | "completed" | "failed" | "none"
-        progress: 0 (pending), 50 (in_progress), 100 (completed/failed)
+        progress: 0 (pending), elapsed share of the predicted duration
+            (in_progress, capped at 99), 100 (completed/failed)
+        expected_duration_s: Predicted dispense duration from history (or null)
+        eta_s: Predicted seconds until completion while in progress (or null)
         recipe: Dict of ingredient volumes (µL)
         error: Error message if failed
         started_at / completed_at: Timestamps
@@ -132,9 +146,25 @@ def get_pump_operation(session_id: str):
             except (json.JSONDecodeError, TypeError):
                 pass
 
+        # Real progress/ETA from the dispense timing model
+        expected_s = None
+        eta_s = None
+        if status in ("pending", "in_progress"):
+            expected_s = _predict_operation_duration(session_id, op["id"], recipe, DB_PATH)
+
+        if status == "in_progress" and expected_s and op.get("started_at"):
+            try:
+                elapsed = (datetime.now() - datetime.fromisoformat(op["started_at"])).total_seconds()
+                eta_s = round(max(expected_s - elapsed, 0.0), 1)
+                progress = min(99, max(0, int(elapsed / expected_s * 100)))
+            except (TypeError, ValueError):
+                pass
+
         result = {
             "status": status,
             "progress": progress,
+            "expected_duration_s": round(expected_s, 1) if expected_s else None,
+            "eta_s": eta_s,
             "cycle_number": op.get("cycle_number"),
             "recipe": recipe,
             "started_at": op.get("started_at"),
@@ -166,12 +196,15 @@ def get_global_pump_status(protocol_id: str):
 
     Used by ModeratorSetupPage to show pump volumes before starting a session.
     Volumes persist across sessions and are decremented after each dispense.
+    "forecast" predicts, per ingredient, the cycle of an active session at
+    which the pump runs dry and how many further full sessions it can serve.
     """
     try:
         from robotaste.core.pump_volume_manager import (
             get_global_volume_status,
             get_or_create_global_state,
         )
+        from robotaste.core.refill_forecast import forecast_refills
         from robotaste.data.protocol_repo import get_protocol_by_id
         from robotaste.data.database import DB_PATH
 
@@ -190,6 +223,7 @@ def get_global_pump_status(protocol_id: str):
             "pump_enabled": True,
             "protocol_id": protocol_id,
             "ingredients": status,
+            "forecast": forecast_refills(DB_PATH, protocol_id, protocol, status),
         }
 
     except HTTPException:
@@ -409,3 +443,35 @@ def _find_pump_config(pump_config: dict, pump_address: int) -> Optional[dict]:
         if cfg.get("address") == pump_address:
             return cfg
     return None
+
+
+def _predict_operation_duration(
+    session_id: str,
+    operation_id: int,
+    recipe: dict,
+    db_path: str
+) -> Optional[float]:
+    """Predicted duration of an operation from the dispense timing model (cached per operation)."""
+    with _predicted_durations_lock:
+        if operation_id in _predicted_durations:
+            _predicted_durations.move_to_end(operation_id)
+            return _predicted_durations[operation_id]
+
+    expected_s = None
+    try:
+        from robotaste.core.pump_timing import get_timing_model
+        from robotaste.data.database import get_session_protocol
+
+        protocol = get_session_protocol(session_id)
+        pump_config = (protocol or {}).get("pump_config", {})
+        if pump_config.get("enabled", False):
+            expected_s, _ = get_timing_model(str(db_path)).predict(recipe, pump_config)
+            expected_s = expected_s or None
+    except Exception as e:
+        logger.warning(f"Could not predict pump duration for session {session_id}: {e}")
+
+    with _predicted_durations_lock:
+        _predicted_durations[operation_id] = expected_s
+        while len(_predicted_durations) > MAX_PREDICTED_DURATIONS:
+            _predicted_durations.popitem(last=False)
+    return expected_s
@@ -29,9 +29,11 @@ Provides endpoints for the moderator and subject to:
 
 import uuid
 import logging
-import numpy as np
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+
+# Render NumPy grids without .tolist() (optionally as float32 buffers)
+from api.responses import grid_response, wants_float32_grids
 
 # Pydantic is FastAPI's data validation library.
 # BaseModel: Define a class that describes what JSON data looks like.
@@ -56,18 +58,25 @@ from robotaste.data.database import (
     save_sample_cycle,       # Saves a sample (concentrations + responses)
     increment_cycle,         # Advances the cycle counter
     get_available_sessions,  # Lists all active/available sessions
-    get_training_data,       # Gets BO training data as DataFrame
-    get_bo_config,           # Gets BO config for a session
+    save_pending_selection,  # Stores the selection of the current cycle
+    get_pending_selection,   # Gets the stored selection of a cycle
     get_session_by_code,     # Gets session by 6-char code
+    get_target_questionnaire_config,  # Resolves the BO target questionnaire
 )
 from robotaste.data.session_repo import get_session_info
 from robotaste.data.protocol_repo import get_protocol_by_id
 from robotaste.core.moderator_metrics import get_current_mode_info
 from robotaste.config.bo_config import get_default_bo_config
-from robotaste.core.bo_integration import get_bo_suggestion_for_session, get_ingredient_range
-from robotaste.core.bo_engine import train_bo_model
+from robotaste.config.questionnaire import extract_target_variable
+from robotaste.core.bo_integration import (
+    MIN_SAMPLES_FOR_MODEL,
+    get_bo_artifact,
+    get_bo_suggestion_for_session,
+    get_bo_surface,
+)
+from robotaste.core.bo_scheduler import PRIORITY_MODERATOR
 from robotaste.core.trials import prepare_cycle_sample
-from robotaste.core.phase_engine import PhaseEngine
+from robotaste.core.phase_engine import get_phase_engine
 
 import json
 
@@ -76,7 +85,7 @@ def _get_next_phase_via_engine(session: dict, current_phase: str, current_cycle:
     config = session.get("experiment_config", {})
     session_id = session.get("session_id", "unknown")
     try:
-        engine = PhaseEngine(config, session_id)
+        engine = get_phase_engine(config, session_id)
         return engine.get_next_phase(current_phase, current_cycle=current_cycle)
     except Exception as e:
         logger.warning(f"PhaseEngine fallback ({e}), returning 'complete'")
@@ -227,6 +236,9 @@ def start_session(session_id: str, request: StartSessionRequest):
     2. Builds the experiment_config from the protocol
     3. Saves it to the session
     4. Transitions the phase from WAITING to the first active phase
+
+    The response includes pump_warnings: syringe capacity and refill
+    warnings from planning the session's pump recipes (empty if none).
     """
     # Step 1: Load the protocol
     protocol = get_protocol_by_id(request.protocol_id)
@@ -279,7 +291,8 @@ def start_session(session_id: str, request: StartSessionRequest):
     # Step 4: Save config to session
     # update_session_with_config() requires these individual positional args
     # (it stores ingredients and BO config in separate DB tables alongside
-    # the main experiment_config JSON blob)
+    # the experiment_config, whose protocol-derived part is shared with other
+    # sessions of the protocol through protocol_snapshots)
     try:
         ingredients = experiment_config.get("ingredients", [])
         bo_config = experiment_config.get("bayesian_optimization", get_default_bo_config())
@@ -298,15 +311,12 @@ def start_session(session_id: str, request: StartSessionRequest):
             experiment_config=experiment_config,
         )
 
-        # Set protocol_id column directly (update_session_with_config doesn't do this,
-        # but pump_integration.create_pump_operation_for_cycle queries it)
-        from robotaste.data.database import get_database_connection
-        with get_database_connection() as conn:
-            conn.execute(
-                "UPDATE sessions SET protocol_id = ? WHERE session_id = ?",
-                (request.protocol_id, session_id),
-            )
-            conn.commit()
+        # Set protocol_id column (update_session_with_config doesn't do this,
+        # but pump_integration.create_pump_operation_for_cycle queries it) and
+        # take this session's number for Latin-square counterbalancing
+        from robotaste.data.database import assign_session_protocol
+        if assign_session_protocol(session_id, request.protocol_id) is None:
+            raise RuntimeError("could not link session to protocol")
     except Exception as e:
         logger.error(f"Failed to save config for session {session_id}: {e}")
         raise HTTPException(
@@ -314,6 +324,36 @@ def start_session(session_id: str, request: StartSessionRequest):
             detail="Failed to save session configuration"
         )
 
+    # Step 4.5: Materialize sample-bank sequences (non-fatal: banks fall back
+    # to lazy per-cycle generation)
+    try:
+        from robotaste.core.sample_bank import materialize_session_samples
+        materialized = materialize_session_samples(session_id, experiment_config)
+        if materialized:
+            logger.info(f"Materialized {materialized} sample-bank cycles for session {session_id}")
+    except Exception as e:
+        logger.warning(f"Sample-bank materialization failed for session {session_id}: {e}")
+
+    # Step 4.6: Plan pump recipes of all known cycles and check pump volumes
+    # before the participant starts (non-fatal: cycles without a planned
+    # recipe are computed when dispensed). Capacity and refill warnings are
+    # returned so the moderator sees them before the participant starts.
+    pump_warnings = []
+    if pump_config.get("enabled", False):
+        try:
+            from robotaste.core.pump_volume_manager import get_global_volume_status
+            from robotaste.core.recipe_planner import plan_session_recipes
+            from robotaste.data.database import DB_PATH
+
+            plan = plan_session_recipes(
+                session_id, protocol,
+                global_state=get_global_volume_status(DB_PATH, request.protocol_id),
+            )
+            pump_warnings = plan["warnings"]
+            logger.info(f"Planned pump recipes for {len(plan['cycles'])} cycles of session {session_id}")
+        except Exception as e:
+            logger.warning(f"Recipe planning failed for session {session_id}: {e}")
+
     # Step 5: Transition to first active phase from protocol
     try:
         # Determine first phase from protocol's phase_sequence
@@ -342,6 +382,7 @@ def start_session(session_id: str, request: StartSessionRequest):
         "session_id": session_id,
         "protocol_name": protocol.get("name", "Unknown"),
         "current_phase": first_phase,
+        "pump_warnings": pump_warnings,
     }
 
 
@@ -584,22 +625,14 @@ def submit_selection(session_id: str, request: SelectionRequest):
                     detail="Manual BO override is disabled for this cycle"
                 )
 
-    # Persist concentrations in experiment_config for response-time retrieval
+    # Persist the selection for response-time retrieval
+    if not save_pending_selection(
+        session_id, cycle_number, request.concentrations,
+        request.selection_mode, request.selection_data,
+    ):
+        raise HTTPException(status_code=500, detail="Failed to save selection")
+
     config = session.get("experiment_config", {})
-    if "_pending_concentrations" not in config:
-        config["_pending_concentrations"] = {}
-    config["_pending_concentrations"][str(cycle_number)] = {
-        "concentrations": request.concentrations,
-        "selection_mode": request.selection_mode,
-        "selection_data": request.selection_data,
-    }
-    from robotaste.data.database import get_database_connection
-    with get_database_connection() as conn:
-        conn.execute(
-            "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
-            (json.dumps(config), session_id),
-        )
-        conn.commit()
 
     # Advance phase: selection → cup_ready (pump) or loading (no pump)
     pump_config = config.get("pump_config", {})
@@ -641,8 +674,7 @@ def confirm_cup_ready(session_id: str):
     cycle_number = get_current_cycle(session_id)
 
     # Retrieve persisted concentrations
-    config = session.get("experiment_config", {})
-    pending = config.get("_pending_concentrations", {}).get(str(cycle_number))
+    pending = get_pending_selection(session_id, cycle_number)
     if not pending:
         raise HTTPException(
             status_code=400,
@@ -696,8 +728,8 @@ def get_bo_status_endpoint(session_id: str):
     """
     Get Bayesian Optimization progress/convergence metrics for the moderator
     monitoring view: per-cycle acquisition values, predicted values,
-    uncertainties, and best-observed-so-far, computed from persisted
-    samples.selection_data (see get_convergence_metrics).
+    uncertainties, and best-observed-so-far, read from the session's
+    convergence accumulator (see get_convergence_metrics).
     """
     session = get_session(session_id)
     if not session:
@@ -705,7 +737,7 @@ def get_bo_status_endpoint(session_id: str):
 
     from robotaste.core.bo_utils import get_convergence_metrics
 
-    return get_convergence_metrics(session_id)
+    return get_convergence_metrics(session_id, session.get("experiment_config", {}))
 
 
 # ─── SUBMIT RESPONSE ───────────────────────────────────────────────────────
@@ -735,11 +767,11 @@ def submit_response(session_id: str, request: ResponseRequest):
             )
             sample_temperature_c = None
 
-    pending = config.get("_pending_concentrations", {}).get(str(cycle_number))
+    pending = get_pending_selection(session_id, cycle_number)
     if pending:
         concentrations = pending["concentrations"]
-        selection_mode = pending.get("selection_mode", "user_selected")
-        selection_data = pending.get("selection_data")
+        selection_mode = pending["selection_mode"]
+        selection_data = pending["selection_data"]
     else:
         try:
             cycle_info = prepare_cycle_sample(session_id, cycle_number)
@@ -763,6 +795,10 @@ def submit_response(session_id: str, request: ResponseRequest):
         except Exception as e:
             logger.warning(f"Could not re-derive BO selection_data: {e}")
 
+    # BO target of this answer, for the convergence accumulator
+    _, questionnaire_config = get_target_questionnaire_config(session)
+    target_value = extract_target_variable(request.answers, questionnaire_config)
+
     save_sample_cycle(
         session_id,
         cycle_number,
@@ -772,6 +808,7 @@ def submit_response(session_id: str, request: ResponseRequest):
         request.is_final,
         selection_mode,
         sample_temperature_c=sample_temperature_c,
+        target_value=target_value,
     )
     increment_cycle(session_id)
 
@@ -798,148 +835,90 @@ def submit_response(session_id: str, request: ResponseRequest):
 
 
 # ─── GET BO MODEL ──────────────────────────────────────────────────────────
-GP_GRID_SIZE = 25  # points per dimension for the visualization grid (2D → 625 candidates)
-GP_GRID_1D_SIZE = GP_GRID_SIZE * GP_GRID_SIZE  # finer line for the 1D case
-
-
 @router.get("/{session_id}/bo-model")
-def get_bo_model(session_id: str):
+def get_bo_model(
+    session_id: str,
+    request: Request,
+    grid_format: Optional[str] = Query(
+        None, description="'float32' returns grids as base64 little-endian float32 buffers."
+    ),
+):
     """
     Get GP model predictions for the BO response-surface visualization
     (BOVisualization1D / BOVisualization2D on the frontend).
 
-    Trains the same GP used for suggestions, then samples it over a grid
-    spanning each ingredient's concentration range to produce the
-    mean/uncertainty/acquisition surfaces those components render, in the
+    Reads the session's BO artifact (see get_bo_artifact), so the surface is
+    sampled from the same fitted GP that produced the suggestion and no GP is
+    trained when the training data hasn't changed. The mean/uncertainty/
+    acquisition surfaces span each ingredient's concentration range, in the
     shape defined by BOModel / BOModel2D (frontend/src/types/index.ts).
+    With `grid_format=float32` (or the float32-grids Accept type) the arrays
+    are encoded by api.responses.encode_float32_grid.
     """
     session = get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    float32_grids = wants_float32_grids(request, grid_format)
 
     try:
-        experiment_config = session.get("experiment_config", {})
-        training_data = get_training_data(session_id)
+        # Moderator visualization: queued behind subjects' /cycle-info fits
+        artifact = get_bo_artifact(session_id, PRIORITY_MODERATOR)
 
-        if training_data is None or len(training_data) < 3:
+        if artifact is None or artifact.n_samples < MIN_SAMPLES_FOR_MODEL:
             return {
                 "status": "insufficient_data",
                 "observations": [],
                 "predictions": [],
-                "message": "Need at least 3 samples for BO model",
+                "message": f"Need at least {MIN_SAMPLES_FOR_MODEL} samples for BO model",
             }
 
-        ingredients = experiment_config.get("ingredients", [])
-        ingredient_names = [ing.get("name", "") for ing in ingredients]
-        # Target column is whatever get_training_data actually produced (last
-        # column, matching the protocol's inline questionnaire bayesian_target)
-        # rather than a hardcoded name — inline questionnaires can target any
-        # variable (e.g. "sweetness"), not just "overall_liking".
-        target_column = training_data.columns[-1]
-
-        bo_config = get_bo_config(session_id)
-
-        model = train_bo_model(
-            training_data, ingredient_names, target_column, bo_config=bo_config
-        )
-        if model is None:
+        surface = get_bo_surface(artifact, PRIORITY_MODERATOR)
+        if surface is None:
             return {
                 "status": "training_failed",
                 "observations": [],
                 "predictions": [],
             }
 
-        acquisition_fn_name = bo_config.get("acquisition_function", "ei")
-
-        def acquisition(candidates: np.ndarray) -> np.ndarray:
-            if acquisition_fn_name == "ucb":
-                return model.upper_confidence_bound(candidates)
-            return model.expected_improvement(candidates)
-
-        user_id = session.get("user_id", "")
-        suggestion = get_bo_suggestion_for_session(session_id, user_id or "")
+        ingredient_names = artifact.model.ingredient_names
+        suggestion = artifact.suggestion
+        sconc = (suggestion or {}).get("concentrations")
 
         if len(ingredient_names) == 2:
-            name_x, name_y = ingredient_names[0], ingredient_names[1]
-            range_x = get_ingredient_range(ingredients[0])
-            range_y = get_ingredient_range(ingredients[1])
-
-            x_vals = np.linspace(range_x[0], range_x[1], GP_GRID_SIZE)
-            # y descending so row 0 of the grid is the top of the rendered
-            # heatmap (max y), matching HeatmapPanel's row-major rendering.
-            y_vals = np.linspace(range_y[1], range_y[0], GP_GRID_SIZE)
-            xv, yv = np.meshgrid(x_vals, y_vals)
-            candidates = np.column_stack([xv.ravel(), yv.ravel()])
-
-            mu, sigma = model.predict(candidates, return_std=True)
-            acq = acquisition(candidates)
-
-            predictions = {
-                "x": x_vals.tolist(),
-                "y": y_vals.tolist(),
-                "mean": mu.reshape(GP_GRID_SIZE, GP_GRID_SIZE).tolist(),
-                "std": sigma.reshape(GP_GRID_SIZE, GP_GRID_SIZE).tolist(),
-                "acquisition": acq.reshape(GP_GRID_SIZE, GP_GRID_SIZE).tolist(),
-            }
-            observations = {
-                "x": training_data[name_x].tolist(),
-                "y": training_data[name_y].tolist(),
-                "z": training_data[target_column].tolist(),
-            }
+            name_x, name_y = ingredient_names
             suggestion_out = None
-            if suggestion and suggestion.get("concentrations"):
-                sconc = suggestion["concentrations"]
+            if sconc:
                 suggestion_out = {
                     "x": sconc.get(name_x),
                     "y": sconc.get(name_y),
                     "predicted_value": suggestion.get("predicted_value"),
                 }
 
-            return {
+            return grid_response({
                 "status": "ready",
-                "predictions": predictions,
-                "observations": observations,
+                **surface,
                 "suggestion": suggestion_out,
                 "ingredient_names": [name_x, name_y],
-                "target_column": target_column,
-            }
+                "target_column": artifact.target_column,
+            }, float32_grids)
 
         else:
             name_x = ingredient_names[0]
-            range_x = get_ingredient_range(ingredients[0])
-            x_vals = np.linspace(range_x[0], range_x[1], GP_GRID_1D_SIZE)
-            candidates = x_vals.reshape(-1, 1)
-
-            mu, sigma = model.predict(candidates, return_std=True)
-            acq = acquisition(candidates)
-
-            predictions = {
-                "x": x_vals.tolist(),
-                "mean": mu.tolist(),
-                "std": sigma.tolist(),
-                "acquisition": acq.tolist(),
-            }
-            observations = {
-                "x": training_data[name_x].tolist(),
-                "y": training_data[target_column].tolist(),
-            }
             suggestion_out = None
-            if suggestion and suggestion.get("concentrations"):
-                sconc = suggestion["concentrations"]
+            if sconc:
                 suggestion_out = {
                     "x": sconc.get(name_x),
                     "predicted_value": suggestion.get("predicted_value"),
                     "uncertainty": suggestion.get("uncertainty"),
                 }
 
-            return {
+            return grid_response({
                 "status": "ready",
-                "predictions": predictions,
-                "observations": observations,
+                **surface,
                 "suggestion": suggestion_out,
                 "ingredient_name": name_x,
-                "target_column": target_column,
-            }
+                "target_column": artifact.target_column,
+            }, float32_grids)
 
     except Exception as e:
         logger.error(f"Error building BO model for session {session_id}: {e}", exc_info=True)
@@ -993,6 +972,7 @@ def _build_experiment_config(protocol: dict, pump_volumes: Optional[Dict[str, fl
     # Build the config
     config = {
         "protocol_id": protocol.get("protocol_id"),
+        "protocol_hash": protocol.get("protocol_hash"),
         "protocol_name": protocol.get("name"),
         "num_ingredients": len(experiment_ingredients),
         "ingredients": experiment_ingredients,
@@ -1,5 +1,6 @@
 import { useEffect, useState, useCallback } from 'react';
 import { api } from '../api/client';
+import { decodeFloat32Grids, FLOAT32_GRID_PARAMS } from '../utils/grids';
 import type { BOModel, Sample } from '../types';
 
 interface BOVisualization1DProps {
@@ -64,10 +65,10 @@ export default function BOVisualization1D({ sessionId }: BOVisualization1DProps)
   const fetchData = useCallback(async () => {
     try {
       const [modelRes, samplesRes] = await Promise.all([
-        api.get(`/sessions/${sessionId}/bo-model`),
+        api.get(`/sessions/${sessionId}/bo-model`, { params: FLOAT32_GRID_PARAMS }),
         api.get(`/sessions/${sessionId}/samples`),
       ]);
-      setModel(modelRes.data);
+      setModel(decodeFloat32Grids(modelRes.data));
       setSamples(samplesRes.data.samples || []);
       setError(null);
     } catch (err) {
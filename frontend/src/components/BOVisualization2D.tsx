@@ -1,6 +1,7 @@
 import { useEffect, useState, useCallback } from 'react';
 import Plot from 'react-plotly.js';
 import { api } from '../api/client';
+import { decodeFloat32Grids, FLOAT32_GRID_PARAMS } from '../utils/grids';
 import type { BOModel2D, Sample } from '../types';
 
 interface BOVisualization2DProps {
@@ -257,10 +258,10 @@ export default function BOVisualization2D({ sessionId }: BOVisualization2DProps)
   const fetchData = useCallback(async () => {
     try {
       const [modelRes, samplesRes] = await Promise.all([
-        api.get(`/sessions/${sessionId}/bo-model`),
+        api.get(`/sessions/${sessionId}/bo-model`, { params: FLOAT32_GRID_PARAMS }),
         api.get(`/sessions/${sessionId}/samples`),
       ]);
-      setModel(modelRes.data);
+      setModel(decodeFloat32Grids(modelRes.data));
       setSamples(samplesRes.data.samples || []);
       setError(null);
     } catch {
@@ -218,11 +218,18 @@ export default function ModeratorSetupPage() {
       const pumpVols = selectedProtocol.pump_config?.enabled && !hasGlobalState
         ? pumpVolumes
         : undefined;
-      await api.post(`/sessions/${newSessionId}/start`, {
+      const startRes = await api.post(`/sessions/${newSessionId}/start`, {
         protocol_id: selectedProtocol.protocol_id,
         pump_volumes: pumpVols,
       });
 
+      // Syringe capacity / refill warnings from planning the pump recipes,
+      // shown before the participant starts
+      const pumpWarnings: string[] = startRes.data.pump_warnings ?? [];
+      if (pumpWarnings.length > 0) {
+        window.alert(`Pump warnings:\n\n${pumpWarnings.join('\n')}`);
+      }
+
       // Step 3: Navigate to the monitoring page
       // The session ID is passed as a URL query parameter so the monitoring
       // page knows which session to display.
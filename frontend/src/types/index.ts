@@ -567,6 +567,7 @@ export interface BayesianOptimizationConfig {
   kernel_nu?: 0.5 | 1.5 | 2.5;  // Matern kernel smoothness
   alpha?: number;                // Noise parameter (0, 1]
   n_restarts_optimizer?: number;
+  gp_backend?: 'sklearn' | 'numpy';          // GP implementation (see bo_engine.GP_BACKENDS)
   length_scale_initial?: number;             // GP kernel initial length scale
   length_scale_bounds?: [number, number];    // GP kernel length-scale bounds [min, max]
   constant_kernel_bounds?: [number, number]; // ConstantKernel bounds [min, max]
@@ -0,0 +1,53 @@
+/**
+ * Decoding of float32-encoded GP grids.
+ *
+ * The BO surface endpoints accept `grid_format=float32` and then send every
+ * numeric array as {dtype: 'float32', shape, data} where `data` is the
+ * base64 little-endian, row-major buffer (see api/responses.py). The
+ * decoded buffer is wrapped in a Float32Array and split into rows, so
+ * components keep receiving the number[] / number[][] shapes in types/.
+ */
+
+export const FLOAT32_GRID_PARAMS = { grid_format: 'float32' };
+
+interface Float32Grid {
+  dtype: 'float32';
+  shape: number[];
+  data: string;
+}
+
+function isFloat32Grid(value: unknown): value is Float32Grid {
+  return (
+    typeof value === 'object' &&
+    value !== null &&
+    (value as Float32Grid).dtype === 'float32' &&
+    typeof (value as Float32Grid).data === 'string'
+  );
+}
+
+function decodeGrid({ shape, data }: Float32Grid): number[] | number[][] {
+  const binary = atob(data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  const values = new Float32Array(bytes.buffer);
+
+  if (shape.length < 2) return Array.from(values);
+  const [rows, cols] = shape;
+  return Array.from({ length: rows }, (_, r) => Array.from(values.subarray(r * cols, (r + 1) * cols)));
+}
+
+function decodeValue(value: unknown): unknown {
+  if (isFloat32Grid(value)) return decodeGrid(value);
+  if (Array.isArray(value)) return value.map(decodeValue);
+  if (typeof value === 'object' && value !== null) {
+    return Object.fromEntries(Object.entries(value).map(([k, v]) => [k, decodeValue(v)]));
+  }
+  return value;
+}
+
+/** Decode a response body; bodies without grid_encoding pass through. */
+export function decodeFloat32Grids<T>(body: T): T {
+  if (typeof body !== 'object' || body === null) return body;
+  if ((body as { grid_encoding?: string }).grid_encoding !== 'float32') return body;
+  return decodeValue(body) as T;
+}
@@ -9,23 +9,33 @@ This script runs independently on the moderator's computer (where pumps
 are physically connected) and coordinates with the Streamlit server through
 the shared SQLite database.
 
+Each serial port is served by its own worker thread: operations are routed
+to the worker owning their port, so independent rigs dispense and refill
+concurrently while commands on a shared RS-232 line stay serialized.
+
 Usage:
-    python pump_control_service.py [--db-path PATH] [--poll-interval SECONDS]
+    python pump_control_service.py [--db-path PATH] [--poll-interval SECONDS] [--log-commands]
 
     --db-path: Path to robotaste.db (default: robotaste/data/robotaste.db)
     --poll-interval: Time between database polls in seconds (default: 0.5)
+    --log-commands: Record every pump command in pump_logs (buffered, batched writes)
     --log-level: Logging level (DEBUG, INFO, WARNING, ERROR) (default: INFO)
 """
 
 import argparse
 import json
 import logging
+import os
+import queue
 import signal
+import socket
 import sys
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Set, Tuple
 
 # Add robotaste package to path
 sys.path.insert(0, str(Path(__file__).parent))
@@ -39,22 +49,56 @@ from robotaste.hardware.pump_controller import (
     PumpBurstConfig
 )
 from robotaste.utils.pump_db import (
-    get_pending_operations,
+    DEFAULT_LEASE_SECONDS,
+    claim_next_operation,
+    claim_next_refill_operation,
+    renew_leases,
+    release_operation,
+    recover_expired_leases,
     get_operation_by_id,
     mark_operation_in_progress,
     mark_operation_completed,
     mark_operation_failed,
-    get_pending_refill_operations,
     update_refill_operation_status,
+    get_pump_device_state,
+    save_pump_device_state,
+    clear_pump_device_state,
+    PumpLogSink,
 )
 from robotaste.data.protocol_repo import get_protocol_by_id
 from robotaste.data.database import get_database_connection
+from robotaste.core.pump_timing import dispense_mode, get_timing_model
 # Global state
-pumps: Dict[int, NE4000Pump] = {}  # address -> pump instance
-burst_init_sessions: Dict[str, bool] = {}  # session_id -> True if DIA/RAT/DIR/VOL-unit set
+pumps: Dict[Tuple[str, int], NE4000Pump] = {}  # (serial_port, address) -> pump instance
+pumps_lock = threading.Lock()  # Guards the pumps / pump_locks registries
+pump_locks: Dict[Tuple[str, int], threading.Lock] = {}  # Per-pump mutual exclusion
+port_workers: Dict[str, "PortWorker"] = {}  # serial_port -> worker thread
+inflight: Set[Tuple[str, int]] = set()  # ("dispense" | "refill", op id) queued or running
+inflight_lock = threading.Lock()
 running = True
 logger = logging.getLogger(__name__)
 
+# Shadow pump state (pump_device_state table) is re-read from the hardware
+# once it is older than this, so manual front-panel changes are picked up.
+STATE_VERIFY_INTERVAL_S = 600.0
+last_state_sweep: Dict[str, float] = {}  # serial_port -> time.monotonic() of last idle sweep
+
+# Command-level audit log (pump_logs); only enabled with --log-commands
+command_log: Optional[PumpLogSink] = None
+job_context = threading.local()  # operation_id of the dispense job running on this thread
+
+# Maximum number of pending operations of each kind claimed per poll
+DISPATCH_BATCH_SIZE = 10
+
+# Seconds between status polls while waiting for a dispense to finish
+PUMP_POLL_INTERVAL_S = 0.25
+
+# Identifies this service instance on claimed operations (pump_operations.claimed_by)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Leases are renewed well before they expire; expired leases of crashed
+# instances are recovered on the same schedule.
+LEASE_RENEW_INTERVAL_S = DEFAULT_LEASE_SECONDS / 3
+
 
 def setup_logging(log_level: str = "INFO"):
     """Configure logging for the service."""
@@ -69,6 +113,20 @@ def signal_handler(signum, frame):
     running = False
 
 
+def _record_pump_command(
+    address: int,
+    command: str,
+    response: Optional[str],
+    success: bool,
+    error_message: Optional[str]
+) -> None:
+    """NE4000Pump.command_logger hook: queue the command under the current operation."""
+    operation_id = getattr(job_context, 'operation_id', None)
+    if command_log is None or operation_id is None:
+        return
+    command_log.log(operation_id, address, command, response, success, error_message)
+
+
 def get_protocol_for_session(session_id: str, db_path: str) -> Optional[Dict]:
     """
     Get protocol configuration for a session.
@@ -103,6 +161,227 @@ def get_protocol_for_session(session_id: str, db_path: str) -> Optional[Dict]:
         return None
 
 
+# ─── SHADOW PUMP STATE ──────────────────────────────────────────────────────
+
+
+def _rate_to_ul_min(rate: Optional[float], unit: Optional[str]) -> Optional[float]:
+    """Convert a pump-reported rate to µL/min (None if unknown)."""
+    factors = {"UM": 1.0, "MM": 1000.0, "UH": 1 / 60, "MH": 1000 / 60}
+    if rate is None or unit not in factors:
+        return None
+    return rate * factors[unit]
+
+
+def _parameter_differs(field: str, known: Any, desired: Any) -> bool:
+    """Compare a tracked parameter using the same tolerances as pump verification."""
+    if known is None:
+        return True
+    if field == 'diameter_mm':
+        return abs(known - desired) >= 0.01
+    if field == 'rate_ul_min':
+        return abs(known - desired) >= max(desired * 0.01, 1.0)
+    return known != desired
+
+
+def _state_is_stale(state: Optional[Dict[str, Any]]) -> bool:
+    """True if shadow state was never verified or is older than the verify interval."""
+    verified_at = state.get('last_verified_at') if state else None
+    if not verified_at:
+        return True
+    try:
+        age = (datetime.now() - datetime.fromisoformat(verified_at)).total_seconds()
+    except ValueError:
+        return True
+    return age > STATE_VERIFY_INTERVAL_S
+
+
+def verify_pump_state(pump: NE4000Pump, db_path: str) -> Dict[str, Any]:
+    """
+    Read DIA/RAT/DIR back from the pump and store them as its shadow state.
+
+    The volume unit cannot be queried on the NE-4000, so the tracked value is kept.
+
+    Returns:
+        Updated shadow state
+    """
+    rate, unit = pump.get_rate()
+    observed = {
+        'diameter_mm': pump.get_diameter(),
+        'rate_ul_min': _rate_to_ul_min(rate, unit),
+        'direction': pump.get_direction(),
+    }
+    save_pump_device_state(pump.port, pump.address, observed, db_path=db_path)
+    logger.debug(f"Verified pump {pump.address} state: {observed}")
+
+    state = get_pump_device_state(pump.port, pump.address, db_path) or {}
+    return {**state, **observed}
+
+
+def sync_pump_parameters(
+    pump: NE4000Pump,
+    db_path: str,
+    diameter_mm: Optional[float] = None,
+    rate_ul_min: Optional[float] = None,
+    volume_unit: Optional[str] = None,
+    direction: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Program only the parameters that differ from the pump's shadow state.
+
+    Parameters left as None are not managed by this call. Stale state is
+    re-verified against the hardware before diffing.
+
+    Returns:
+        Dict of parameters actually sent to the pump
+    """
+    desired = {
+        'diameter_mm': diameter_mm,
+        'rate_ul_min': rate_ul_min,
+        'volume_unit': volume_unit,
+        'direction': direction,
+    }
+    desired = {k: v for k, v in desired.items() if v is not None}
+
+    state = get_pump_device_state(pump.port, pump.address, db_path)
+    if state and _state_is_stale(state):
+        state = verify_pump_state(pump, db_path)
+    state = state or {}
+
+    changes = {
+        field: value for field, value in desired.items()
+        if _parameter_differs(field, state.get(field), value)
+    }
+    if not changes:
+        logger.debug(f"Pump {pump.address} parameters already up to date")
+        return {}
+
+    setters = {
+        'diameter_mm': pump.set_diameter,
+        'rate_ul_min': lambda v: pump.set_rate(v, NE4000Pump.UNIT_UL_MIN),
+        'volume_unit': pump.set_volume_unit,
+        'direction': pump.set_direction,
+    }
+
+    sent: Dict[str, Any] = {}
+    try:
+        for field, value in changes.items():
+            setters[field](value)
+            sent[field] = value
+    except Exception:
+        # Parameters that failed mid-way are in an unknown state on the pump
+        unknown = {field: None for field in changes if field not in sent}
+        save_pump_device_state(pump.port, pump.address, {**sent, **unknown}, db_path=db_path)
+        raise
+
+    save_pump_device_state(pump.port, pump.address, sent, db_path=db_path)
+    logger.debug(f"Pump {pump.address} parameters updated: {sent}")
+    return sent
+
+
+def verify_idle_pump_states(db_path: str, serial_port: str) -> None:
+    """Periodic sweep: re-verify shadow state of connected pumps on a port while idle."""
+    now = time.monotonic()
+    if now - last_state_sweep.get(serial_port, 0.0) < STATE_VERIFY_INTERVAL_S:
+        return
+    last_state_sweep[serial_port] = now
+
+    for (port, address), pump in list(pumps.items()):
+        if port != serial_port:
+            continue
+        try:
+            with hold_pumps(serial_port, [address]):
+                if pump.is_connected():
+                    verify_pump_state(pump, db_path)
+        except Exception as e:
+            logger.warning(f"State verification failed for pump {address} on {port}: {e}")
+
+
+# ─── PUMP REGISTRY & LOCKING ────────────────────────────────────────────────
+
+
+@contextmanager
+def hold_pumps(serial_port: str, addresses: Iterable[int]) -> Iterator[None]:
+    """
+    Hold the mutual-exclusion guard of every listed pump for the block.
+
+    Locks are taken in sorted order so overlapping jobs cannot deadlock.
+    """
+    keys = sorted({(serial_port, address) for address in addresses})
+    with pumps_lock:
+        locks = [pump_locks.setdefault(key, threading.Lock()) for key in keys]
+
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def get_port_pump(serial_port: str) -> Optional[NE4000Pump]:
+    """Get any connected pump on a serial port (used to send burst commands)."""
+    for (port, _), pump in list(pumps.items()):
+        if port == serial_port and pump.is_connected():
+            return pump
+    return None
+
+
+def _pump_stopped(pump: NE4000Pump) -> bool:
+    try:
+        return pump.get_status()["status"] == "stopped"
+    except Exception as e:
+        logger.debug(f"Status poll failed for pump {pump.address}: {e}")
+        return False
+
+
+def wait_for_pumps(
+    pump_list: List[NE4000Pump],
+    nominal_s: float,
+    wait_s: float,
+    poll_interval: float = PUMP_POLL_INTERVAL_S,
+) -> Optional[float]:
+    """
+    Wait for started pumps to finish: the nominal time, then status polls.
+
+    Args:
+        pump_list: Pumps that were just started
+        nominal_s: Nominal (volume / rate) run time of the longest pump
+        wait_s: Longest time to wait before the caller stops the pumps
+        poll_interval: Seconds between status polls
+
+    Returns:
+        Seconds until every pump reported stopped (the measured run time the
+        timing model learns from), or None if wait_s ran out first
+    """
+    started = time.monotonic()
+    deadline = started + wait_s
+    time.sleep(max(0.0, min(nominal_s, wait_s)))
+
+    remaining = list(pump_list)
+    while True:
+        remaining = [pump for pump in remaining if not _pump_stopped(pump)]
+        now = time.monotonic()
+        if not remaining:
+            return now - started
+        if now >= deadline:
+            return None
+        time.sleep(min(poll_interval, deadline - now))
+
+
+def pumps_ready(pump_config: Dict) -> bool:
+    """True if every pump in the configuration is registered and connected."""
+    serial_port = pump_config.get('serial_port')
+    pump_configs = pump_config.get('pumps', [])
+    if not serial_port or not pump_configs:
+        return False
+    for pump_cfg in pump_configs:
+        pump = pumps.get((serial_port, pump_cfg.get('address', 0)))
+        if not pump or not pump.is_connected():
+            return False
+    return True
+
+
 def initialize_pumps(pump_config: Dict, db_path: str) -> bool:
     """
     Initialize pump connections based on protocol configuration.
@@ -114,8 +393,6 @@ def initialize_pumps(pump_config: Dict, db_path: str) -> bool:
     Returns:
         True if all pumps initialized successfully
     """
-    global pumps
-
     if not pump_config.get('enabled', False):
         logger.warning("Pump control is disabled in protocol configuration")
         return False
@@ -144,15 +421,24 @@ def initialize_pumps(pump_config: Dict, db_path: str) -> bool:
     # serial connection. On Windows, COM ports have exclusive access — opening the
     # same port twice in separate serial.Serial() objects raises PermissionError(13).
     first_pump_by_port: dict = {}
+    existing = get_port_pump(serial_port)
+    if existing:
+        first_pump_by_port[serial_port] = existing
 
     for pump_cfg in pump_configs:
         address = pump_cfg.get('address', 0)
         ingredient = pump_cfg.get('ingredient', f'Pump{address}')
 
         # Skip if already connected
-        if address in pumps and pumps[address].is_connected():
+        current = pumps.get((serial_port, address))
+        if current and current.is_connected():
             logger.debug(f"Pump {address} ({ingredient}) already connected")
             continue
+        if current is not None:
+            # Lost its connection since it was registered: it may have been
+            # power-cycled or set from the front panel in the meantime, so
+            # its shadow state is re-sent rather than trusted
+            clear_pump_device_state(serial_port, address, db_path=db_path)
 
         try:
             pump = NE4000Pump(
@@ -161,6 +447,7 @@ def initialize_pumps(pump_config: Dict, db_path: str) -> bool:
                 baud=baud_rate,
                 timeout=5.0
             )
+            pump.command_logger = _record_pump_command
 
             if serial_port in first_pump_by_port:
                 # Share the already-open serial connection to avoid Windows
@@ -170,11 +457,12 @@ def initialize_pumps(pump_config: Dict, db_path: str) -> bool:
                 pump.connect()
                 first_pump_by_port[serial_port] = pump
 
-            # Configure syringe diameter
+            # Configure syringe diameter (skipped if the pump already holds it)
             diameter = pump_cfg.get('syringe_diameter_mm', 14.567)
-            pump.set_diameter(diameter)
+            sync_pump_parameters(pump, db_path, diameter_mm=diameter)
 
-            pumps[address] = pump
+            with pumps_lock:
+                pumps[(serial_port, address)] = pump
 
             logger.debug(f"Initialized pump {address} ({ingredient}) - diameter: {diameter}mm")
 
@@ -197,11 +485,12 @@ def get_pump_for_ingredient(ingredient: str, pump_config: Dict) -> Optional[NE40
         Pump instance or None
     """
     pump_configs = pump_config.get('pumps', [])
+    serial_port = pump_config.get('serial_port')
 
     for pump_cfg in pump_configs:
         if pump_cfg.get('ingredient') == ingredient:
             address = pump_cfg.get('address')
-            return pumps.get(address)
+            return pumps.get((serial_port, address))
 
     return None
 
@@ -237,21 +526,18 @@ def _build_burst_configs(
     return configs
 
 
-def _burst_init_pumps(session_id: str, pump_config: Dict, command_delay: float = 0.3) -> None:
+def _burst_init_pumps(pump_config: Dict, db_path: str, command_delay: float = 0.3) -> None:
     """
-    One-time burst init: set DIA, RAT, VOL unit, DIR for all pumps.
-    Called once per session on the first burst dispensing cycle.
-    """
-    if burst_init_sessions.get(session_id, False):
-        logger.debug(f"Burst parameters already initialized for session {session_id}")
-        return
-
-    logger.info(f"⚡ Initializing burst parameters for session {session_id}...")
+    Burst init: set DIA, RAT, VOL unit, DIR for all pumps.
 
-    # Build configs with volume=0 (just need address/diameter/rate/unit/dir)
+    Only parameters that differ from each pump's shadow state are sent, so
+    after the first cycle (and across service restarts) this is usually a no-op.
+    Stale state is treated as unknown and re-sent.
+    """
     pump_configs = pump_config.get('pumps', [])
     dispensing_rate = pump_config.get('dispensing_rate_ul_min', 2000)
 
+    # Build configs with volume=0 (just need address/diameter/rate/unit/dir)
     configs = []
     for pump_cfg in pump_configs:
         address = pump_cfg.get('address')
@@ -269,34 +555,45 @@ def _burst_init_pumps(session_id: str, pump_config: Dict, command_delay: float =
     if not configs:
         raise ValueError("No pump configurations found for burst init")
 
-    any_pump = next(iter(pumps.values()))
+    any_pump = get_port_pump(pump_config.get('serial_port'))
+    if not any_pump:
+        raise PumpConnectionError("No connected pump available for burst init")
     builder = SeparatedBurstCommandBuilder
 
-    # 1. Diameters
-    logger.info(f"  📏 Setting diameters for {len(configs)} pumps...")
-    cmd = builder.build_diameter_command(configs)
-    any_pump._send_burst_command(cmd)
-    time.sleep(command_delay)
-
-    # 2. Rates
-    logger.info(f"  ⚡ Setting rates...")
-    cmd = builder.build_rate_command(configs)
-    any_pump._send_burst_command(cmd)
-    time.sleep(command_delay)
-
-    # 3. Volume units
-    logger.info(f"  📐 Setting volume units...")
-    cmd = builder.build_volume_unit_command(configs)
-    any_pump._send_burst_command(cmd)
-    time.sleep(command_delay)
-
-    # 4. Directions
-    logger.info(f"  ➡️ Setting directions...")
-    cmd = builder.build_direction_command(configs)
-    any_pump._send_burst_command(cmd)
-    time.sleep(command_delay)
+    states = {}
+    for c in configs:
+        state = get_pump_device_state(any_pump.port, c.address, db_path)
+        states[c.address] = {} if _state_is_stale(state) else state
+
+    def needs(field: str, value: Any) -> List[PumpBurstConfig]:
+        return [
+            c for c in configs
+            if _parameter_differs(field, states[c.address].get(field), value(c))
+        ]
+
+    steps = [
+        ('diameter_mm', lambda c: c.diameter_mm, builder.build_diameter_command, "📏 Setting diameters"),
+        ('rate_ul_min', lambda c: c.rate_ul_min, builder.build_rate_command, "⚡ Setting rates"),
+        ('volume_unit', lambda c: c.volume_unit, builder.build_volume_unit_command, "📐 Setting volume units"),
+        ('direction', lambda c: c.direction, builder.build_direction_command, "➡️ Setting directions"),
+    ]
+
+    sent: Dict[int, Dict[str, Any]] = {}
+    for field, value, build, label in steps:
+        targets = needs(field, value)
+        if not targets:
+            continue
+        logger.info(f"  {label} for {len(targets)} pump(s)...")
+        any_pump._send_burst_command(build(targets))
+        time.sleep(command_delay)
+        for c in targets:
+            sent.setdefault(c.address, {})[field] = value(c)
+
+    if not sent:
+        logger.debug("Burst parameters already up to date")
+        return
 
-    # 5. Verify
+    # Verify
     logger.info(f"  🔍 Verifying burst parameters...")
     verify_cmd = builder.build_verification_command(configs, "DIA")
     any_pump._send_burst_command(verify_cmd)
@@ -304,8 +601,9 @@ def _burst_init_pumps(session_id: str, pump_config: Dict, command_delay: float =
     verify_cmd = builder.build_verification_command(configs, "RAT")
     any_pump._send_burst_command(verify_cmd)
 
-    burst_init_sessions[session_id] = True
-    logger.info(f"✅ Burst parameters initialized for session {session_id}")
+    for address, values in sent.items():
+        save_pump_device_state(any_pump.port, address, values, db_path=db_path)
+    logger.info(f"✅ Burst parameters initialized for pumps {sorted(sent)}")
 
 
 def dispense_burst_mode(
@@ -314,30 +612,34 @@ def dispense_burst_mode(
     pump_config: Dict,
     db_path: str,
     command_delay: float = 0.2
-) -> Dict[str, float]:
+) -> Tuple[Dict[str, float], Optional[float]]:
     """
     Execute dispensing using burst mode (separated commands).
 
     Sends multi-pump burst commands: VOL values → verify → RUN.
-    DIA/RAT/DIR/VOL-unit are set once per session via _burst_init_pumps().
+    DIA/RAT/DIR/VOL-unit are only sent when they differ from the shadow
+    state via _burst_init_pumps().
 
     Returns:
-        Dict of actual dispensed volumes {ingredient: volume_ul}
+        (actual dispensed volumes {ingredient: volume_ul}, measured run time
+        in seconds or None, see wait_for_pumps)
     """
-    session_id = operation['session_id']
     dispensing_rate = pump_config.get('dispensing_rate_ul_min', 2000)
 
-    # One-time init if needed
-    _burst_init_pumps(session_id, pump_config)
+    # Bring parameters in line with the shadow state (usually a no-op)
+    _burst_init_pumps(pump_config, db_path)
 
     # Build per-cycle configs with actual volumes
     configs = _build_burst_configs(recipe, pump_config)
 
     if not configs:
         logger.warning("⚠️ All pump volumes are ~0, skipping burst dispensing")
-        return {}
+        return {}, None
 
-    any_pump = next(iter(pumps.values()))
+    serial_port = pump_config.get('serial_port')
+    any_pump = get_port_pump(serial_port)
+    if not any_pump:
+        raise PumpConnectionError(f"No connected pump on {serial_port}")
     builder = SeparatedBurstCommandBuilder
 
     logger.info(f"⚡ Burst dispensing {len(configs)} pumps...")
@@ -359,15 +661,20 @@ def dispense_burst_mode(
     logger.info(f"  🚀 Starting all pumps: {run_cmd}")
     any_pump._send_burst_command(run_cmd)
 
-    # 4. Wait for longest pump to finish
-    max_time = max((c.volume_ul / dispensing_rate) * 60 * 1.1 for c in configs)
-    logger.info(f"⏳ Dispensing in progress... ({max_time:.1f}s)")
-    time.sleep(max_time)
+    # 4. Wait for longest pump to finish (sized from dispense history)
+    timing = get_timing_model(db_path)
+    nominal = {c.address: (c.volume_ul / dispensing_rate) * 60 for c in configs}
+    max_time = max(timing.pump_wait('burst', a, t) for a, t in nominal.items())
+    logger.info(f"⏳ Dispensing in progress... (up to {max_time:.1f}s)")
+    running_pumps = [
+        pumps[(serial_port, c.address)] for c in configs if (serial_port, c.address) in pumps
+    ]
+    run_s = wait_for_pumps(running_pumps, max(nominal.values()), max_time)
 
     # 5. Stop all pumps (individual commands for safety)
     actual_volumes = {}
     for c in configs:
-        pump = pumps.get(c.address)
+        pump = pumps.get((serial_port, c.address))
         if pump:
             pump.stop()
             # Map address back to ingredient name
@@ -381,7 +688,7 @@ def dispense_burst_mode(
                     break
 
     logger.info(f"✅ Burst dispensing complete: {actual_volumes}")
-    return actual_volumes
+    return actual_volumes, run_s
 
 
 def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
@@ -422,7 +729,7 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
         raise ValueError("Protocol does not have pump configuration")
 
     # Ensure pumps are initialized
-    if not pumps:
+    if not pumps_ready(pump_config):
         success = initialize_pumps(pump_config, db_path)
         if not success:
             raise PumpConnectionError("Failed to initialize pumps")
@@ -436,23 +743,26 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
     use_burst_mode = pump_config.get('use_burst_mode', False)
     pump_addresses = [cfg.get('address', 0) for cfg in pump_configs]
     burst_compatible = all(addr <= 9 for addr in pump_addresses)
+    mode = dispense_mode(pump_config)
+    timing = get_timing_model(db_path)
 
-    # Track actual dispensed volumes
+    # Track actual dispensed volumes and the measured pump run time
     actual_volumes = {}
     errors = []
+    run_s: Optional[float] = None
 
     logger.info(f"Dispensing mode: burst={use_burst_mode}, simultaneous={simultaneous}, burst_compatible={burst_compatible}")
 
-    if use_burst_mode and burst_compatible and simultaneous:
+    if mode == 'burst':
         # Burst mode - send multi-pump commands via network burst protocol
         try:
-            actual_volumes = dispense_burst_mode(operation, recipe, pump_config, db_path)
+            actual_volumes, run_s = dispense_burst_mode(operation, recipe, pump_config, db_path)
         except Exception as e:
             error_msg = f"Burst dispensing failed: {e}"
             logger.error(error_msg)
             errors.append(error_msg)
 
-    elif simultaneous:
+    elif mode == 'simultaneous':
         # Individual simultaneous dispensing - start all pumps, then wait
         if use_burst_mode and not burst_compatible:
             logger.warning(f"⚠️ Burst mode requires addresses 0-9, got {pump_addresses}. Falling back to simultaneous.")
@@ -498,11 +808,18 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
                 is_dual = pump_config_by_ingredient.get(ingredient, {}).get('dual_syringe', False)
                 commanded_volume = volume_ul / 2 if is_dual else volume_ul
 
+                sync_pump_parameters(
+                    pump, db_path,
+                    rate_ul_min=dispensing_rate,
+                    volume_unit=volume_unit,
+                    direction='INF',
+                )
                 pump.dispense_volume(
                     volume_ul=commanded_volume,
                     rate_ul_min=dispensing_rate,
                     wait=False,  # Don't wait, start next pump
                     volume_unit=volume_unit,
+                    configure=False,
                 )
                 logger.debug(f"Started pump {pump.address} ({ingredient}): {volume_ul:.3f}µL"
                              f"{' (dual syringe, commanded ' + f'{commanded_volume:.3f}µL)' if is_dual else ''}")
@@ -524,14 +841,16 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
 
         # Calculate max wait time (use commanded volume for time estimate)
         max_time = 0
+        max_nominal = 0
         for ingredient, pump, volume_ul in pump_info:
             is_dual = pump_config_by_ingredient.get(ingredient, {}).get('dual_syringe', False)
             commanded_volume = volume_ul / 2 if is_dual else volume_ul
-            time_needed = (commanded_volume / dispensing_rate) * 60 * 1.1  # 10% buffer
-            max_time = max(max_time, time_needed)
+            nominal_s = (commanded_volume / dispensing_rate) * 60
+            max_time = max(max_time, timing.pump_wait(mode, pump.address, nominal_s))
+            max_nominal = max(max_nominal, nominal_s)
 
-        logger.info(f"Waiting {max_time:.2f}s for all pumps to complete")
-        time.sleep(max_time)
+        logger.info(f"Waiting up to {max_time:.2f}s for all pumps to complete")
+        run_s = wait_for_pumps([pump for _, pump, _ in pump_info], max_nominal, max_time)
 
         # Stop all pumps and record volumes
         for ingredient, pump, volume_ul in pump_info:
@@ -549,6 +868,8 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
         # Sequential dispensing - one ingredient at a time
         logger.info(f"Starting sequential dispensing of {len(recipe)} ingredients")
 
+        # Sum of measured runs; None once any pump's wait ran out
+        run_s = 0.0
         for ingredient, volume_ul in recipe.items():
             logger.debug(f"Dispensing {volume_ul:.3f} µL of {ingredient}")
 
@@ -580,13 +901,27 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
                 is_dual = pump_config_by_ingredient.get(ingredient, {}).get('dual_syringe', False)
                 commanded_volume = volume_ul / 2 if is_dual else volume_ul
 
-                # Dispense volume (this will block until complete)
+                sync_pump_parameters(
+                    pump, db_path,
+                    rate_ul_min=dispensing_rate,
+                    volume_unit=volume_unit,
+                    direction='INF',
+                )
+
+                # Start, wait until the pump stops (or its wait runs out), stop
+                nominal_s = (commanded_volume / dispensing_rate) * 60
                 pump.dispense_volume(
                     volume_ul=commanded_volume,
                     rate_ul_min=dispensing_rate,
-                    wait=True,
+                    wait=False,
                     volume_unit=volume_unit,
+                    configure=False,
                 )
+                pump_run_s = wait_for_pumps(
+                    [pump], nominal_s, timing.pump_wait(mode, pump.address, nominal_s)
+                )
+                pump.stop()
+                run_s = None if run_s is None or pump_run_s is None else run_s + pump_run_s
 
                 # Record actual volume (assuming successful dispense = requested volume)
                 actual_volumes[ingredient] = volume_ul
@@ -610,68 +945,58 @@ def dispense_sample(operation: Dict, protocol: Dict, db_path: str) -> None:
         mark_operation_failed(operation_id, error_summary, db_path)
         raise Exception(f"Dispensing failed: {error_summary}")
     else:
-        mark_operation_completed(operation_id, actual_volumes, db_path)
+        # Complete the operation and decrement global (cross-session) volumes
+        # in one transaction, using the protocol already loaded for dispensing
+        from robotaste.core.pump_volume_manager import complete_dispense_operation
+
+        if not complete_dispense_operation(
+            db_path, operation_id, operation['session_id'], actual_volumes, pump_config,
+            pump_run_s=run_s,
+        ):
+            logger.warning(
+                f"Global volume tracking update failed for operation {operation_id} (non-fatal)"
+            )
+            mark_operation_completed(operation_id, actual_volumes, db_path, pump_run_s=run_s)
         logger.info(f"Operation {operation_id} completed successfully")
 
-        # Update global (cross-session) volume tracking
-        try:
-            from robotaste.core.pump_volume_manager import update_global_volume_after_dispense
-
-            session_id = operation['session_id']
-            protocol_obj = get_protocol_for_session(session_id, db_path)
-            if protocol_obj:
-                proto_id = None
-                with get_database_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "SELECT protocol_id FROM sessions WHERE session_id = ?",
-                        (session_id,)
-                    )
-                    row = cursor.fetchone()
-                    if row:
-                        proto_id = row[0]
-
-                if proto_id:
-                    pc = protocol_obj.get('pump_config', {})
-                    for pcfg in pc.get('pumps', []):
-                        ing = pcfg.get('ingredient')
-                        addr = pcfg.get('address')
-                        if ing and addr is not None and ing in actual_volumes:
-                            update_global_volume_after_dispense(
-                                db_path=db_path,
-                                protocol_id=proto_id,
-                                pump_address=addr,
-                                volume_dispensed_ul=actual_volumes[ing],
-                                session_id=session_id,
-                            )
-        except Exception as e:
-            logger.warning(f"Global volume tracking update failed (non-fatal): {e}")
-
 
 def cleanup_pumps():
-    """Disconnect all pumps gracefully."""
-    global pumps
+    """Disconnect all pumps gracefully and write out buffered command logs."""
+    global command_log
 
     logger.info("Cleaning up pump connections...")
 
-    for address, pump in pumps.items():
+    with pumps_lock:
+        registered = list(pumps.items())
+        pumps.clear()
+
+    # Disconnect serial owners last so pumps sharing their connection stop first
+    registered.sort(key=lambda item: item[1]._owns_serial)
+    for (port, address), pump in registered:
         try:
             if pump.is_connected():
                 pump.disconnect()
-                logger.info(f"Disconnected pump {address}")
+                logger.info(f"Disconnected pump {address} on {port}")
         except Exception as e:
-            logger.error(f"Error disconnecting pump {address}: {e}")
+            logger.error(f"Error disconnecting pump {address} on {port}: {e}")
 
-    pumps.clear()
+    if command_log is not None:
+        command_log.close()
+        command_log = None
 
 
-def execute_refill_operation(operation: Dict, db_path: str) -> None:
+def execute_refill_operation(
+    operation: Dict,
+    db_path: str,
+    protocol: Optional[Dict] = None
+) -> None:
     """
     Execute a refill operation (withdraw or purge) for a single pump.
 
     Args:
         operation: Refill operation dict from pump_refill_operations table
         db_path: Database path
+        protocol: Already-loaded protocol (optional, loaded by protocol_id if None)
 
     Raises:
         Exception on any error
@@ -697,7 +1022,8 @@ def execute_refill_operation(operation: Dict, db_path: str) -> None:
     )
 
     # Load protocol to get pump config
-    protocol = get_protocol_by_id(protocol_id)
+    if protocol is None:
+        protocol = get_protocol_by_id(protocol_id)
     if not protocol:
         raise ValueError(f"Could not load protocol {protocol_id}")
 
@@ -706,14 +1032,11 @@ def execute_refill_operation(operation: Dict, db_path: str) -> None:
         raise ValueError("Pump config not enabled in protocol")
 
     # Ensure pumps are initialized
-    if not pumps:
-        initialize_pumps(pump_config, db_path)
-
-    pump = pumps.get(pump_address)
-    if not pump:
-        # Try to initialize just this pump
+    serial_port = pump_config.get('serial_port')
+    pump = pumps.get((serial_port, pump_address))
+    if not pump or not pump.is_connected():
         initialize_pumps(pump_config, db_path)
-        pump = pumps.get(pump_address)
+        pump = pumps.get((serial_port, pump_address))
 
     if not pump or not pump.is_connected():
         raise PumpConnectionError(
@@ -734,33 +1057,30 @@ def execute_refill_operation(operation: Dict, db_path: str) -> None:
     volume_unit = pump_cfg.get('volume_unit', 'ML')
     diameter = pump_cfg.get('syringe_diameter_mm', 26.7)
 
-    # Set diameter and rate (may have changed since last use)
-    pump.set_diameter(diameter)
+    pump_direction = 'WDR' if direction == 'WDR' else 'INF'
 
-    # Convert volume for pump command
-    if volume_unit == 'ML':
-        volume_for_pump = volume_ul / 1000.0
-    else:
-        volume_for_pump = volume_ul
+    # Send only the parameters that changed since last use
+    sync_pump_parameters(
+        pump, db_path,
+        diameter_mm=diameter,
+        rate_ul_min=dispensing_rate,
+        volume_unit=volume_unit,
+        direction=pump_direction,
+    )
 
     # Execute the operation
-    if direction == 'WDR':
+    if pump_direction == 'WDR':
         logger.info(f"  ⬅️ Withdrawing {volume_ul:.1f}µL from {ingredient}...")
-        pump.dispense_volume(
-            volume_ul=volume_ul,
-            rate_ul_min=dispensing_rate,
-            wait=True,
-            volume_unit=volume_unit,
-            direction='WDR'
-        )
     else:
         logger.info(f"  ➡️ Purging {volume_ul:.1f}µL through {ingredient}...")
-        pump.dispense_volume(
-            volume_ul=volume_ul,
-            rate_ul_min=dispensing_rate,
-            wait=True,
-            volume_unit=volume_unit,
-        )
+    pump.dispense_volume(
+        volume_ul=volume_ul,
+        rate_ul_min=dispensing_rate,
+        wait=True,
+        volume_unit=volume_unit,
+        direction=pump_direction,
+        configure=False,
+    )
 
     pump.stop()
 
@@ -773,10 +1093,152 @@ def execute_refill_operation(operation: Dict, db_path: str) -> None:
     logger.info(f"✅ Refill {op_type} completed for {ingredient}")
 
 
+# ─── PER-PORT WORKERS ───────────────────────────────────────────────────────
+
+
+class PortWorker(threading.Thread):
+    """
+    Executes pump jobs for one serial port, one at a time.
+
+    Jobs on the same port are serialized because they share one RS-232 line;
+    jobs on different ports run concurrently on their own workers, so a long
+    withdraw on one rig never blocks dispensing on another.
+    """
+
+    def __init__(self, serial_port: str, db_path: str, poll_interval: float):
+        super().__init__(name=f"pump-port-{serial_port}", daemon=True)
+        self.serial_port = serial_port
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.jobs: "queue.Queue[Tuple[Tuple[str, int], Callable[[], None]]]" = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def submit(self, job_key: Tuple[str, int], job: Callable[[], None]) -> None:
+        """Queue a job; job_key is released from the in-flight set when it finishes."""
+        self.jobs.put((job_key, job))
+
+    def stop(self) -> None:
+        """Ask the worker to exit after its current job (queued jobs stay pending in DB)."""
+        self._stop_event.set()
+
+    def run(self) -> None:
+        logger.info(f"Worker started for port {self.serial_port}")
+
+        while not self._stop_event.is_set():
+            try:
+                job_key, job = self.jobs.get(timeout=self.poll_interval)
+            except queue.Empty:
+                verify_idle_pump_states(self.db_path, self.serial_port)
+                continue
+
+            try:
+                job()
+            except Exception as e:
+                logger.error(f"Unexpected error in {job_key[0]} job {job_key[1]}: {e}", exc_info=True)
+            finally:
+                with inflight_lock:
+                    inflight.discard(job_key)
+
+        # Release jobs that never started so a restarted service picks them up
+        while True:
+            try:
+                job_key, _ = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            with inflight_lock:
+                inflight.discard(job_key)
+            try:
+                release_operation(
+                    job_key[1], WORKER_ID,
+                    refill=(job_key[0] == 'refill'),
+                    db_path=self.db_path
+                )
+            except Exception as e:
+                logger.warning(f"Failed to release {job_key[0]} operation {job_key[1]}: {e}")
+
+        logger.info(f"Worker stopped for port {self.serial_port}")
+
+
+def dispatch_job(
+    serial_port: str,
+    job_key: Tuple[str, int],
+    job: Callable[[], None],
+    db_path: str,
+    poll_interval: float
+) -> None:
+    """Route a job to the worker owning serial_port, starting the worker if needed."""
+    with inflight_lock:
+        inflight.add(job_key)
+
+    worker = port_workers.get(serial_port)
+    if worker is None or not worker.is_alive():
+        worker = PortWorker(serial_port, db_path, poll_interval)
+        port_workers[serial_port] = worker
+        worker.start()
+
+    worker.submit(job_key, job)
+
+
+def stop_port_workers(timeout: Optional[float] = None) -> None:
+    """Stop all port workers, waiting for in-progress jobs to finish."""
+    for worker in port_workers.values():
+        worker.stop()
+    for worker in port_workers.values():
+        worker.join(timeout)
+    port_workers.clear()
+
+
+def _is_inflight(job_key: Tuple[str, int]) -> bool:
+    with inflight_lock:
+        return job_key in inflight
+
+
+def run_dispense_job(operation: Dict, protocol: Dict, db_path: str) -> None:
+    """Worker job: dispense one sample while holding its pumps."""
+    operation_id = operation['id']
+    pump_config = protocol.get('pump_config', {})
+    addresses = [cfg.get('address', 0) for cfg in pump_config.get('pumps', [])]
+
+    job_context.operation_id = operation_id
+    try:
+        with hold_pumps(pump_config.get('serial_port'), addresses):
+            dispense_sample(operation, protocol, db_path)
+    except Exception as e:
+        error_msg = f"Dispensing failed: {str(e)}"
+        logger.error(error_msg)
+        mark_operation_failed(operation_id, error_msg, db_path)
+    finally:
+        job_context.operation_id = None
+        if command_log is not None:
+            command_log.flush()
+
+
+def run_refill_job(operation: Dict, protocol: Dict, db_path: str) -> None:
+    """Worker job: withdraw or purge one pump while holding it."""
+    serial_port = protocol.get('pump_config', {}).get('serial_port')
+
+    try:
+        with hold_pumps(serial_port, [operation['pump_address']]):
+            execute_refill_operation(operation, db_path, protocol=protocol)
+    except Exception as e:
+        error_msg = f"Refill operation failed: {str(e)}"
+        logger.error(error_msg)
+        update_refill_operation_status(
+            operation['id'], 'failed',
+            completed_at=datetime.now().isoformat(),
+            error_message=error_msg,
+            db_path=db_path
+        )
+
+
 def main_loop(db_path: str, poll_interval: float):
     """
     Main service loop.
 
+    Atomically claims pending operations and routes each one to the worker
+    that owns its serial port. Claims are leased to WORKER_ID and renewed
+    periodically; leases abandoned by a crashed instance are recovered.
+
     Args:
         db_path: Path to database
         poll_interval: Time between polls in seconds
@@ -786,18 +1248,32 @@ def main_loop(db_path: str, poll_interval: float):
     logger.info("Pump control service started")
     logger.info(f"Database: {db_path}")
     logger.info(f"Poll interval: {poll_interval}s")
+    logger.info(f"Worker ID: {WORKER_ID}")
+
+    last_lease_check = 0.0
 
     while running:
         try:
-            # Poll for pending dispense operations
-            pending = get_pending_operations(limit=1, db_path=db_path)
+            # Keep our claims alive and fail claims of crashed instances
+            now = time.monotonic()
+            if now - last_lease_check >= LEASE_RENEW_INTERVAL_S:
+                renew_leases(WORKER_ID, DEFAULT_LEASE_SECONDS, db_path)
+                recovered = recover_expired_leases(db_path=db_path)
+                if recovered:
+                    logger.warning(f"Recovered {recovered} operation(s) with expired leases")
+                last_lease_check = now
+
+            # Claim pending dispense operations
+            for _ in range(DISPATCH_BATCH_SIZE):
+                operation = claim_next_operation(WORKER_ID, DEFAULT_LEASE_SECONDS, db_path)
+                if not operation:
+                    break
 
-            if pending:
-                operation = pending[0]
                 operation_id = operation['id']
                 session_id = operation['session_id']
+                job_key = ('dispense', operation_id)
 
-                logger.info(f"Found pending operation {operation_id} for session {session_id}")
+                logger.info(f"Claimed operation {operation_id} for session {session_id}")
 
                 # Load protocol
                 protocol = get_protocol_for_session(session_id, db_path)
@@ -808,30 +1284,37 @@ def main_loop(db_path: str, poll_interval: float):
                     mark_operation_failed(operation_id, error_msg, db_path)
                     continue
 
-                # Execute dispensing
-                try:
-                    dispense_sample(operation, protocol, db_path)
-                except Exception as e:
-                    error_msg = f"Dispensing failed: {str(e)}"
+                serial_port = protocol.get('pump_config', {}).get('serial_port')
+                if not serial_port:
+                    error_msg = f"No serial port configured for session {session_id}"
                     logger.error(error_msg)
                     mark_operation_failed(operation_id, error_msg, db_path)
+                    continue
+
+                dispatch_job(
+                    serial_port, job_key,
+                    lambda op=operation, proto=protocol: run_dispense_job(op, proto, db_path),
+                    db_path, poll_interval
+                )
 
-            # Poll for pending refill operations (withdraw/purge)
-            pending_refills = get_pending_refill_operations(limit=1, db_path=db_path)
+            # Claim pending refill operations (withdraw/purge)
+            for _ in range(DISPATCH_BATCH_SIZE):
+                refill_op = claim_next_refill_operation(WORKER_ID, DEFAULT_LEASE_SECONDS, db_path)
+                if not refill_op:
+                    break
 
-            if pending_refills:
-                refill_op = pending_refills[0]
                 refill_id = refill_op['id']
+                job_key = ('refill', refill_id)
 
                 logger.info(
-                    f"Found pending refill operation {refill_id}: "
+                    f"Claimed refill operation {refill_id}: "
                     f"{refill_op['operation_type']} for {refill_op['ingredient_name']}"
                 )
 
-                try:
-                    execute_refill_operation(refill_op, db_path)
-                except Exception as e:
-                    error_msg = f"Refill operation failed: {str(e)}"
+                protocol = get_protocol_by_id(refill_op['protocol_id'])
+                serial_port = (protocol or {}).get('pump_config', {}).get('serial_port')
+                if not serial_port:
+                    error_msg = f"Refill operation failed: no serial port for protocol {refill_op['protocol_id']}"
                     logger.error(error_msg)
                     update_refill_operation_status(
                         refill_id, 'failed',
@@ -839,6 +1322,13 @@ def main_loop(db_path: str, poll_interval: float):
                         error_message=error_msg,
                         db_path=db_path
                     )
+                    continue
+
+                dispatch_job(
+                    serial_port, job_key,
+                    lambda op=refill_op, proto=protocol: run_refill_job(op, proto, db_path),
+                    db_path, poll_interval
+                )
 
             # Sleep before next poll
             time.sleep(poll_interval)
@@ -852,13 +1342,16 @@ def main_loop(db_path: str, poll_interval: float):
             logger.error(f"Unexpected error in main loop: {e}", exc_info=True)
             time.sleep(poll_interval)
 
-    # Cleanup
+    # Cleanup: let running jobs finish before closing serial ports
+    stop_port_workers()
     cleanup_pumps()
     logger.info("Pump control service stopped")
 
 
 def main():
     """Entry point for the service."""
+    global command_log
+
     parser = argparse.ArgumentParser(description="RoboTaste Pump Control Service")
 
     parser.add_argument(
@@ -875,6 +1368,12 @@ def main():
         help='Time between database polls in seconds (default: 0.5)'
     )
 
+    parser.add_argument(
+        '--log-commands',
+        action='store_true',
+        help='Record every pump command in the pump_logs table'
+    )
+
     parser.add_argument(
         '--log-level',
         type=str,
@@ -895,6 +1394,10 @@ def main():
         logger.error("Please specify correct path with --db-path")
         sys.exit(1)
 
+    if args.log_commands:
+        command_log = PumpLogSink(str(db_path))
+        logger.info("Command-level audit logging enabled")
+
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     if sys.platform != "win32":  # SIGTERM not available on Windows
@@ -905,6 +1408,7 @@ def main():
         main_loop(str(db_path), args.poll_interval)
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
+        stop_port_workers(timeout=5.0)
         cleanup_pumps()
         sys.exit(1)
 
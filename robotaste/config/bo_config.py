@@ -65,6 +65,9 @@ DEFAULT_BO_CONFIG = {
     "n_restarts_optimizer": 10,
     "normalize_y": True,
     "random_state": 42,
+    # GP implementation: "sklearn" (GaussianProcessRegressor) or "numpy"
+    # (bo_engine.NumpyGP, same model with less per-fit overhead)
+    "gp_backend": "sklearn",
     # Advanced parameters
     "only_final_responses": True,  # Use only final responses for training
     "candidate_sampling_method": "auto",  # "grid", "lhs", or "auto"
@@ -158,6 +161,10 @@ def validate_bo_config(config: Dict[str, Any]) -> Dict[str, Any]:
         logger.warning(f"alpha out of range (0, 1], clamping to {clamped}")
         validated["alpha"] = float(clamped)
 
+    if validated.get("gp_backend", "sklearn") not in ["sklearn", "numpy"]:
+        logger.warning(f"Invalid gp_backend: {validated.get('gp_backend')}, using 'sklearn'")
+        validated["gp_backend"] = "sklearn"
+
     if validated.get("n_restarts_optimizer", 0) < 1:
         validated["n_restarts_optimizer"] = 1
 
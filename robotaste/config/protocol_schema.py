@@ -9,11 +9,14 @@ Version: 1.0
 Created: 2026-01-01
 """
 
-from typing import Dict, List, Any, Optional, Literal
+from typing import Dict, List, Any, Optional, Literal, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
+from bisect import bisect_right
 import json
 
+from robotaste.utils import json_codec
+
 
 # =============================================================================
 # Type Definitions
@@ -297,6 +300,7 @@ PROTOCOL_JSON_SCHEMA = {
                 "kernel_nu": {"type": "number", "enum": [0.5, 1.5, 2.5, float("inf")]},
                 "alpha": {"type": "number", "minimum": 0, "maximum": 1},
                 "n_restarts_optimizer": {"type": "integer", "minimum": 1},
+                "gp_backend": {"type": "string", "enum": ["sklearn", "numpy"]},
                 "length_scale_initial": {"type": "number", "minimum": 0},
                 "length_scale_bounds": {
                     "type": "array",
@@ -832,7 +836,7 @@ def protocol_from_json(json_str: str) -> Dict[str, Any]:
     Raises:
         json.JSONDecodeError: If JSON is invalid
     """
-    return json.loads(json_str)
+    return json_codec.loads(json_str)
 
 
 # =============================================================================
@@ -916,3 +920,87 @@ def normalize_selection_mode(mode: str) -> SelectionMode:
     if mode == "predetermined":
         return "predetermined_absolute"
     return mode
+
+
+# =============================================================================
+# Schedule Interval Index
+# =============================================================================
+
+class ScheduleIndex:
+    """
+    Sorted, non-overlapping cycle intervals of a sample_selection_schedule.
+
+    Answers "which schedule entry covers cycle N" with a bisect over interval
+    starts. Where ranges overlap the earlier entry wins, as in a linear scan
+    of the schedule; overlaps and gaps are recorded once when the index is
+    built so the validator can report them.
+
+    Built once per compiled protocol (CompiledProtocol.schedule_intervals),
+    whose hash identifies the schedule's content; the standalone helpers
+    above scan the schedule they are given.
+
+    Attributes:
+        schedule: The indexed schedule list
+        intervals: (start, end, entry_index) tuples sorted by start
+        overlaps: (entry_index, cycle) for cycles already claimed by an
+            earlier entry
+        gaps: (start, end) cycle ranges between 1 and the last scheduled
+            cycle that no entry covers
+    """
+
+    def __init__(self, schedule: List[Dict[str, Any]]):
+        self.schedule = schedule
+        self.intervals: List[Tuple[int, int, int]] = []
+        self.overlaps: List[Tuple[int, int]] = []
+
+        claimed: List[Tuple[int, int]] = []
+        for idx, entry in enumerate(schedule):
+            cycle_range = entry.get("cycle_range", {})
+            start, end = cycle_range.get("start", 0), cycle_range.get("end", 0)
+            if not isinstance(start, int) or not isinstance(end, int) or end < start:
+                continue
+
+            pieces = [(start, end)]
+            for claimed_start, claimed_end in claimed:
+                remaining = []
+                for piece_start, piece_end in pieces:
+                    if piece_end < claimed_start or piece_start > claimed_end:
+                        remaining.append((piece_start, piece_end))
+                        continue
+                    self.overlaps.extend(
+                        (idx, cycle)
+                        for cycle in range(max(piece_start, claimed_start),
+                                           min(piece_end, claimed_end) + 1)
+                    )
+                    if piece_start < claimed_start:
+                        remaining.append((piece_start, claimed_start - 1))
+                    if piece_end > claimed_end:
+                        remaining.append((claimed_end + 1, piece_end))
+                pieces = remaining
+
+            self.intervals.extend((piece_start, piece_end, idx) for piece_start, piece_end in pieces)
+            claimed.append((start, end))
+
+        self.intervals.sort()
+        self._starts = [start for start, _, _ in self.intervals]
+
+        self.gaps: List[Tuple[int, int]] = []
+        next_cycle = 1
+        for start, end, _ in self.intervals:
+            if start > next_cycle:
+                self.gaps.append((next_cycle, start - 1))
+            next_cycle = max(next_cycle, end + 1)
+
+    def lookup(self, cycle_number: int) -> int:
+        """Index of the schedule entry covering a cycle, or -1."""
+        pos = bisect_right(self._starts, cycle_number) - 1
+        if pos >= 0:
+            _, end, idx = self.intervals[pos]
+            if cycle_number <= end:
+                return idx
+        return -1
+
+    def entry(self, cycle_number: int) -> Optional[Dict[str, Any]]:
+        """Schedule entry covering a cycle, or None."""
+        idx = self.lookup(cycle_number)
+        return self.schedule[idx] if idx >= 0 else None
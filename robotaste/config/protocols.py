@@ -17,16 +17,20 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timezone
 import uuid
 
+import numpy as np
+
 from robotaste.config.protocol_schema import (
     PROTOCOL_JSON_SCHEMA,
     VALIDATION_RULES,
     EXAMPLE_PROTOCOL_MIXED_MODE,
+    ScheduleIndex,
     get_empty_protocol_template,
     get_selection_mode_for_cycle,
     get_predetermined_sample,
     protocol_to_json,
     protocol_from_json,
 )
+from robotaste.core.calculations import calculate_stock_volumes_batch
 
 logger = logging.getLogger(__name__)
 
@@ -274,9 +278,6 @@ def _validate_sample_selection_schedule(protocol: Dict[str, Any]) -> List[str]:
         errors.append("Sample selection schedule cannot be empty")
         return errors
 
-    # Track cycle coverage to detect gaps/overlaps
-    covered_cycles = set()
-
     for i, entry in enumerate(schedule):
         # Validate required fields
         if "cycle_range" not in entry:
@@ -312,14 +313,6 @@ def _validate_sample_selection_schedule(protocol: Dict[str, Any]) -> List[str]:
         if end < start:
             errors.append(f"Schedule entry {i+1}: cycle end ({end}) < start ({start})")
 
-        # Check for overlaps
-        for cycle in range(start, end + 1):
-            if cycle in covered_cycles:
-                errors.append(
-                    f"Schedule entry {i+1}: cycle {cycle} already covered by another entry"
-                )
-            covered_cycles.add(cycle)
-
         # Validate mode
         if mode not in VALIDATION_RULES["valid_modes"]:
             errors.append(f"Schedule entry {i+1}: invalid mode '{mode}'")
@@ -407,15 +400,23 @@ def _validate_sample_selection_schedule(protocol: Dict[str, Any]) -> List[str]:
                             f"is smaller than cycle count ({cycle_count}); samples will repeat"
                         )
 
-    # Check for gaps in cycle coverage (warn only)
-    if covered_cycles:
-        max_cycle = max(covered_cycles)
-        all_cycles = set(range(1, max_cycle + 1))
-        gaps = all_cycles - covered_cycles
-        if gaps:
-            logger.warning(
-                f"Cycle coverage has gaps: {sorted(gaps)} (will default to user_selected)"
-            )
+    # Check for overlaps and gaps once, on the same interval index used for lookups
+    index = ScheduleIndex(schedule)
+
+    overlapping: Dict[int, List[int]] = {}
+    for entry_index, cycle in index.overlaps:
+        overlapping.setdefault(entry_index, []).append(cycle)
+    for entry_index, cycles in sorted(overlapping.items()):
+        errors.append(
+            f"Schedule entry {entry_index+1}: cycles {cycles} already covered by another entry"
+        )
+
+    # Gaps are allowed (warn only)
+    if index.gaps:
+        gaps = [cycle for start, end in index.gaps for cycle in range(start, end + 1)]
+        logger.warning(
+            f"Cycle coverage has gaps: {gaps} (will default to user_selected)"
+        )
 
     return errors
 
@@ -1010,6 +1011,77 @@ def _validate_pump_config(protocol: Dict[str, Any]) -> List[str]:
                 "Burst mode only works with simultaneous dispensing."
             )
 
+    # Validate that every fixed sample can be mixed from the loaded stocks
+    errors.extend(_validate_sample_volumes(protocol))
+
+    return errors
+
+
+def _validate_sample_volumes(protocol: Dict[str, Any]) -> List[str]:
+    """
+    Check that predetermined and sample-bank samples can be dispensed.
+
+    All fixed samples are checked in one batch: every requested ingredient
+    needs a stock concentration, and the stock volumes must fit in
+    total_volume_ml.
+
+    Args:
+        protocol: Protocol dictionary (pumps enabled)
+
+    Returns:
+        List of error messages (empty if valid)
+    """
+    pump_config = protocol.get("pump_config", {})
+    total_volume_ml = pump_config.get("total_volume_ml", 10.0)
+    if not isinstance(total_volume_ml, (int, float)) or total_volume_ml <= 0:
+        return []  # Reported by _validate_pump_config
+
+    # (schedule entry, label, concentrations) of every fixed sample
+    samples = []
+    for i, entry in enumerate(protocol.get("sample_selection_schedule", [])):
+        for sample in entry.get("predetermined_samples", []):
+            samples.append((i + 1, f"cycle {sample.get('cycle')}", sample.get("concentrations") or {}))
+        for sample in (entry.get("sample_bank") or {}).get("samples", []):
+            samples.append((i + 1, f"sample '{sample.get('id')}'", sample.get("concentrations") or {}))
+
+    if not samples:
+        return []
+
+    stock = {ing.get("name"): ing.get("stock_concentration_mM") for ing in protocol.get("ingredients", [])}
+    for pump in pump_config.get("pumps", []):
+        if pump.get("ingredient") in stock and pump.get("stock_concentration_mM") is not None:
+            stock[pump["ingredient"]] = pump["stock_concentration_mM"]
+
+    names = sorted({name for _, _, conc in samples for name in conc})
+    column = {name: idx for idx, name in enumerate(names)}
+    matrix = np.full((len(samples), len(names)), np.nan)
+    for row, (_, _, conc) in enumerate(samples):
+        for name, value in conc.items():
+            if isinstance(value, (int, float)):
+                matrix[row, column[name]] = value
+    stock_vector = np.array(
+        [stock.get(name) if isinstance(stock.get(name), (int, float)) else np.nan for name in names],
+        dtype=float
+    )
+
+    result = calculate_stock_volumes_batch(matrix, stock_vector, total_volume_ml)
+
+    errors = []
+    for row in np.flatnonzero(~result["feasible"]):
+        entry_num, label, _ = samples[row]
+        missing = [names[col] for col in np.flatnonzero(np.isnan(result["stock_volumes"][row]))]
+        if missing:
+            errors.append(
+                f"Schedule entry {entry_num}: {label} needs {', '.join(missing)} "
+                f"but no stock concentration is configured"
+            )
+        else:
+            errors.append(
+                f"Schedule entry {entry_num}: {label} needs "
+                f"{np.nansum(result['stock_volumes'][row]):.1f} µL of stock, more than "
+                f"total_volume_ml ({total_volume_ml} mL)"
+            )
+
     return errors
 
 
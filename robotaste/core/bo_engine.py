@@ -6,6 +6,7 @@ NO external dependencies (no Streamlit, no SQL).
 
 Features:
 - Matern kernel with configurable smoothness
+- Pluggable GP backend: sklearn (default) or the NumPy implementation
 - Expected Improvement (EI) and Upper Confidence Bound (UCB) acquisition
 - Adaptive acquisition parameters (exploration → exploitation schedule)
 - Support for 2-6 ingredient dimensions
@@ -15,9 +16,14 @@ Author: RoboTaste Team
 Version: 3.0 (Refactored Architecture - SQL-free)
 """
 
+import math
+import threading
 import warnings
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
+from scipy.linalg import cho_solve, solve_triangular
+from scipy.optimize import minimize
 from scipy.stats import norm
 from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import Matern, ConstantKernel as C
@@ -130,6 +136,403 @@ def get_adaptive_kappa(
     return kappa
 
 
+# ============================================================================
+# GAUSSIAN PROCESS BACKENDS
+# ============================================================================
+#
+# RoboTasteBO delegates the GP to a backend selected by bo_config["gp_backend"].
+# A backend follows sklearn's GaussianProcessRegressor interface:
+#   fit(X, y)                                  -> self
+#   predict(X, return_std=False, return_cov=False)
+#   kernel_                                    (fitted kernel, for logging)
+# and is built from the merged BO config by the factory in GP_BACKENDS.
+
+
+def _make_sklearn_gp(config: Dict[str, Any]) -> GaussianProcessRegressor:
+    """sklearn GaussianProcessRegressor with a Constant × Matern kernel."""
+    kernel = C(1.0, tuple(config["constant_kernel_bounds"])) * Matern(
+        length_scale=config["length_scale_initial"],
+        length_scale_bounds=tuple(config["length_scale_bounds"]),
+        nu=config["kernel_nu"],
+    )
+    return GaussianProcessRegressor(
+        kernel=kernel,
+        alpha=config["alpha"],  # Noise regularization
+        n_restarts_optimizer=config["n_restarts_optimizer"],
+        normalize_y=config["normalize_y"],
+        random_state=config["random_state"],
+    )
+
+
+def _matern(d: np.ndarray, nu: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unit-variance Matern correlation and its derivative w.r.t. log length scale.
+
+    Args:
+        d: Distances already divided by the length scale
+        nu: Smoothness (0.5, 1.5, 2.5, or inf for the RBF limit)
+
+    Returns:
+        (k, dk/dlog(length_scale)), same shape as d
+    """
+    if nu == 0.5:
+        k = np.exp(-d)
+        return k, k * d
+    if nu == 1.5:
+        s = math.sqrt(3.0) * d
+        e = np.exp(-s)
+        return (1.0 + s) * e, s * s * e
+    if nu == 2.5:
+        s = math.sqrt(5.0) * d
+        e = np.exp(-s)
+        return (1.0 + s + s * s / 3.0) * e, s * s * (1.0 + s) * e / 3.0
+    # nu = inf: squared exponential
+    d2 = d * d
+    k = np.exp(-0.5 * d2)
+    return k, k * d2
+
+
+def _matern_second(d: np.ndarray, nu: float) -> np.ndarray:
+    """Second derivative of _matern's k w.r.t. log length scale."""
+    if nu == 0.5:
+        return (d * d - d) * np.exp(-d)
+    if nu == 1.5:
+        s = math.sqrt(3.0) * d
+        return (s - 2.0) * s * s * np.exp(-s)
+    if nu == 2.5:
+        s = math.sqrt(5.0) * d
+        return (s * s - 2.0 * s - 2.0) * s * s * np.exp(-s) / 3.0
+    d2 = d * d
+    return (d2 - 2.0) * d2 * np.exp(-0.5 * d2)
+
+
+class NumpyGP:
+    """
+    GP regressor for Constant × Matern kernels in NumPy/SciPy.
+
+    Same model as _make_sklearn_gp (isotropic length scale, alpha added to
+    the diagonal, optional y normalization, the log marginal likelihood
+    maximized from the initial hyperparameters plus n_restarts random
+    starts drawn like sklearn's), without sklearn's per-call validation and
+    kernel object cloning. The log marginal likelihood gradient is analytic,
+    and the Cholesky factor of the training covariance is kept for predict().
+
+    Restarts are optimized as a batch (see _batched_ascent): all of them
+    take Newton steps in lockstep, restarts that reach the same optimum are
+    merged, and only the distinct optima are polished with L-BFGS-B.
+
+    Sized for RoboTaste's problems (n ≤ ~50 samples, 1-6 dimensions).
+    """
+
+    def __init__(
+        self,
+        nu: float = 2.5,
+        length_scale: float = 1.0,
+        length_scale_bounds: Tuple[float, float] = (1e-5, 1e5),
+        constant_value: float = 1.0,
+        constant_bounds: Tuple[float, float] = (1e-5, 1e5),
+        alpha: float = 1e-10,
+        n_restarts_optimizer: int = 0,
+        normalize_y: bool = False,
+        random_state: Optional[int] = None,
+    ):
+        self.nu = nu
+        self.alpha = alpha
+        self.n_restarts_optimizer = n_restarts_optimizer
+        self.normalize_y = normalize_y
+        self.random_state = random_state
+
+        # Hyperparameters are optimized in log space: [log c, log length_scale]
+        self.theta_initial = np.log([constant_value, length_scale])
+        self.theta_ = self.theta_initial
+        self.bounds_ = np.log([constant_bounds, length_scale_bounds])
+
+        self.X_train_ = None
+        self.L_ = None  # Cholesky factor of K(X_train) + alpha·I
+        self.alpha_ = None  # (K + alpha·I)^-1 y
+        self.log_marginal_likelihood_value_ = None
+
+    @property
+    def constant_value_(self) -> float:
+        return float(np.exp(self.theta_[0]))
+
+    @property
+    def length_scale_(self) -> float:
+        return float(np.exp(self.theta_[1]))
+
+    @property
+    def kernel_(self) -> str:
+        return (
+            f"{math.sqrt(self.constant_value_):.3g}**2 * "
+            f"Matern(length_scale={self.length_scale_:.3g}, nu={self.nu})"
+        )
+
+    def _distances(self, A: np.ndarray, B: np.ndarray) -> np.ndarray:
+        sq = (A * A).sum(1)[:, None] + (B * B).sum(1)[None, :] - 2.0 * A @ B.T
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def log_marginal_likelihood(self, theta: np.ndarray) -> Tuple[float, np.ndarray]:
+        """
+        Log marginal likelihood of the training data and its gradient.
+
+        Args:
+            theta: [log constant, log length_scale]
+
+        Returns:
+            (lml, d lml / d theta); (-inf, zeros) if K is not positive definite
+        """
+        c, length_scale = np.exp(theta)
+        corr, dcorr = _matern(self._r_train / length_scale, self.nu)
+        K = c * corr
+        K[np.diag_indices_from(K)] += self.alpha
+
+        try:
+            L = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            return -np.inf, np.zeros_like(theta)
+
+        alpha = cho_solve((L, True), self._y_train, check_finite=False)
+        lml = (
+            -0.5 * self._y_train @ alpha
+            - np.log(np.diag(L)).sum()
+            - 0.5 * len(K) * math.log(2.0 * math.pi)
+        )
+
+        # d lml / d theta_j = ½ tr((αα^T - K^-1) dK/dtheta_j); both factors
+        # are symmetric, so the trace is an elementwise sum
+        inner = np.outer(alpha, alpha) - cho_solve((L, True), self._eye, check_finite=False)
+        grad = 0.5 * c * np.array([(inner * corr).sum(), (inner * dcorr).sum()])
+        return float(lml), grad
+
+    def batch_log_marginal_likelihood(
+        self, thetas: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Log marginal likelihood, gradient and Hessian for a batch of
+        hyperparameters at once.
+
+        The (B, n, n) covariances are built with one broadcast and factored
+        with one batched Cholesky.
+
+        Args:
+            thetas: (B, 2) array of [log constant, log length_scale]
+
+        Returns:
+            (lml (B,), gradients (B, 2), Hessians (B, 2, 2)); -inf and zeros
+            where K is not positive definite
+        """
+        c = np.exp(thetas[:, 0])[:, None, None]
+        d = self._r_train / np.exp(thetas[:, 1])[:, None, None]
+        corr, dcorr = _matern(d, self.nu)
+        K = c * corr + self.alpha * self._eye
+
+        lml = np.full(len(thetas), -np.inf)
+        grad = np.zeros_like(thetas)
+        hess = np.zeros((len(thetas), 2, 2))
+        try:
+            L = np.linalg.cholesky(K)
+            ok = np.ones(len(thetas), dtype=bool)
+        except np.linalg.LinAlgError:
+            ok = np.array([np.all(np.linalg.eigvalsh(k) > 0) for k in K])
+            if not ok.any():
+                return lml, grad, hess
+            L = np.linalg.cholesky(K[ok])
+
+        c, d, corr, dcorr = c[ok], d[ok], corr[ok], dcorr[ok]
+        L_inv = np.linalg.inv(L)
+        K_inv = np.swapaxes(L_inv, 1, 2) @ L_inv
+        alpha = K_inv @ self._y_train
+        lml[ok] = (
+            -0.5 * alpha @ self._y_train
+            - np.log(np.diagonal(L, axis1=1, axis2=2)).sum(1)
+            - 0.5 * len(self._y_train) * math.log(2.0 * math.pi)
+        )
+
+        # dK/dtheta_0 = c·corr, dK/dtheta_1 = c·dcorr; the second
+        # derivatives are c·corr, c·dcorr and c·d²corr
+        W = alpha[:, :, None] * alpha[:, None, :] - K_inv
+        dK = (c * corr, c * dcorr)
+        d2K = ((dK[0], dK[1]), (dK[1], c * _matern_second(d, self.nu)))
+        grad[ok] = 0.5 * np.column_stack([(W * dK[i]).sum((1, 2)) for i in range(2)])
+
+        # d²lml/dθi dθj = ½ tr(W K_ij) - αᵀ K_i K⁻¹ K_j α + ½ tr(K⁻¹ K_i K⁻¹ K_j)
+        v = [np.einsum("bij,bj->bi", dK[i], alpha) for i in range(2)]
+        M = [K_inv @ dK[i] for i in range(2)]
+        h = np.empty((int(ok.sum()), 2, 2))
+        for i in range(2):
+            for j in range(i, 2):
+                h[:, i, j] = h[:, j, i] = (
+                    0.5 * (W * d2K[i][j]).sum((1, 2))
+                    - np.einsum("bi,bij,bj->b", v[i], K_inv, v[j])
+                    + 0.5 * (M[i] * np.swapaxes(M[j], 1, 2)).sum((1, 2))
+                )
+        hess[ok] = h
+        return lml, grad, hess
+
+    def _batched_ascent(
+        self,
+        starts: np.ndarray,
+        max_iter: int = 30,
+        merge_tol: float = 1e-2,
+        gtol: float = 1e-5,
+    ) -> List[np.ndarray]:
+        """
+        Run Newton's method from all restarts in lockstep and merge those
+        that meet.
+
+        Every iteration evaluates all active restarts with one
+        batch_log_marginal_likelihood call. Steps use the analytic Hessian
+        with its eigenvalues made negative (so saddle points and convex
+        regions still go uphill), skip coordinates pinned at a bound, and
+        are halved until they increase the likelihood. Restarts within
+        merge_tol of a better one have reached the same optimum and are
+        dropped; the loop ends once one restart is left or all have
+        converged.
+
+        Returns:
+            Distinct near-optimal points, best first, for the L-BFGS-B polish
+        """
+        lo, hi = self.bounds_[:, 0], self.bounds_[:, 1]
+        theta = np.clip(starts, lo, hi)
+        lml, grad, hess = self.batch_log_marginal_likelihood(theta)
+        t = np.ones(len(theta))
+
+        for _ in range(max_iter):
+            theta, lml, grad, hess, t = _drop_merged(merge_tol, theta, lml, grad, hess, t)
+
+            blocked = ((theta <= lo) & (grad < 0)) | ((theta >= hi) & (grad > 0))
+            g = np.where(blocked, 0.0, grad)
+            active = (np.abs(g).max(1) > gtol) & (t > 1e-6) & np.isfinite(lml)
+            if len(theta) == 1 or not active.any():
+                break
+
+            # Newton direction on the free coordinates
+            H = np.where(blocked[:, :, None] | blocked[:, None, :], 0.0, hess)
+            H[:, 0, 0] += blocked[:, 0]
+            H[:, 1, 1] += blocked[:, 1]
+            eigvals, eigvecs = np.linalg.eigh(H)
+            scale = 1.0 / np.maximum(np.abs(eigvals), 1e-6)
+            direction = np.einsum("bij,bj,bkj,bk->bi", eigvecs, scale, eigvecs, g)
+            # At most one unit (a factor e) per coordinate per step
+            direction /= np.maximum(np.abs(direction).max(1), 1.0)[:, None]
+
+            candidate = np.clip(theta + t[:, None] * direction, lo, hi)
+            new_lml, new_grad, new_hess = self.batch_log_marginal_likelihood(candidate)
+
+            accept = active & (new_lml >= lml + 1e-4 * ((candidate - theta) * g).sum(1))
+            theta[accept], lml[accept] = candidate[accept], new_lml[accept]
+            grad[accept], hess[accept] = new_grad[accept], new_hess[accept]
+            t = np.where(accept, 1.0, np.where(active, t * 0.5, t))
+
+        order = np.argsort(-lml)
+        return [theta[i] for i in order if np.isfinite(lml[i])] or [theta[order[0]]]
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> "NumpyGP":
+        """Optimize the hyperparameters and factor the training covariance."""
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        if self.normalize_y:
+            self._y_mean = float(np.mean(y))
+            std = float(np.std(y))
+            self._y_std = std if std > 10 * np.finfo(float).eps else 1.0
+        else:
+            self._y_mean, self._y_std = 0.0, 1.0
+
+        self.X_train_ = X
+        self._y_train = (y - self._y_mean) / self._y_std
+        self._r_train = self._distances(X, X)
+        self._eye = np.eye(len(X))
+
+        def objective(theta):
+            lml, grad = self.log_marginal_likelihood(theta)
+            return -lml, -grad
+
+        starts = [self.theta_initial]
+        if self.n_restarts_optimizer > 0:
+            # Same draws as sklearn: uniform in log-space bounds
+            rng = np.random.RandomState(self.random_state)
+            starts += [
+                rng.uniform(self.bounds_[:, 0], self.bounds_[:, 1])
+                for _ in range(self.n_restarts_optimizer)
+            ]
+
+        # Climb all starts together, then polish only the distinct optima
+        best_theta, best_value = self.theta_initial, np.inf
+        for start in self._batched_ascent(np.array(starts)):
+            result = minimize(objective, start, jac=True, method="L-BFGS-B", bounds=self.bounds_)
+            if result.fun < best_value:
+                best_theta, best_value = result.x, result.fun
+
+        self.theta_ = best_theta
+        self.log_marginal_likelihood_value_ = -float(best_value)
+
+        c, length_scale = np.exp(self.theta_)
+        K = c * _matern(self._r_train / length_scale, self.nu)[0]
+        K[np.diag_indices_from(K)] += self.alpha
+        self.L_ = np.linalg.cholesky(K)
+        self.alpha_ = cho_solve((self.L_, True), self._y_train)
+        return self
+
+    def predict(
+        self, X: np.ndarray, return_std: bool = False, return_cov: bool = False
+    ):
+        """
+        Posterior mean (and std or covariance) at X.
+
+        Returns:
+            mean, (mean, std) or (mean, cov), like GaussianProcessRegressor
+        """
+        X = np.asarray(X, dtype=float)
+        c, length_scale = np.exp(self.theta_)
+        K_trans = c * _matern(self._distances(X, self.X_train_) / length_scale, self.nu)[0]
+
+        mean = K_trans @ self.alpha_ * self._y_std + self._y_mean
+        if not (return_std or return_cov):
+            return mean
+
+        V = solve_triangular(self.L_, K_trans.T, lower=True, check_finite=False)
+        if return_cov:
+            K = c * _matern(self._distances(X, X) / length_scale, self.nu)[0]
+            return mean, (K - V.T @ V) * self._y_std**2
+
+        var = np.maximum(c - np.einsum("ij,ij->j", V, V), 0.0)
+        return mean, np.sqrt(var) * self._y_std
+
+
+def _drop_merged(tol: float, theta: np.ndarray, lml: np.ndarray, *state: np.ndarray):
+    """Keep only the best of any restarts within tol of each other."""
+    order = np.argsort(-lml)
+    close = np.abs(theta[:, None, :] - theta[None, :, :]).max(2) <= tol
+    keep: List[int] = []
+    for i in order:
+        if not close[i, keep].any():
+            keep.append(i)
+    if len(keep) == len(theta):
+        return (theta, lml, *state)
+    keep = np.array(keep)
+    return (theta[keep], lml[keep], *(array[keep] for array in state))
+
+
+def _make_numpy_gp(config: Dict[str, Any]) -> NumpyGP:
+    return NumpyGP(
+        nu=config["kernel_nu"],
+        length_scale=config["length_scale_initial"],
+        length_scale_bounds=tuple(config["length_scale_bounds"]),
+        constant_bounds=tuple(config["constant_kernel_bounds"]),
+        alpha=config["alpha"],
+        n_restarts_optimizer=config["n_restarts_optimizer"],
+        normalize_y=config["normalize_y"],
+        random_state=config["random_state"],
+    )
+
+
+GP_BACKENDS = {
+    "sklearn": _make_sklearn_gp,
+    "numpy": _make_numpy_gp,
+}
+
+
 # ============================================================================
 # BAYESIAN OPTIMIZATION CLASS
 # ============================================================================
@@ -183,16 +586,6 @@ class RoboTasteBO:
         # Load config with defaults
         self.config = {**DEFAULT_BO_CONFIG, **(config or {})}
 
-        # Extract parameters from config
-        kernel_nu = self.config["kernel_nu"]
-        alpha = self.config["alpha"]
-        n_restarts = self.config["n_restarts_optimizer"]
-        length_scale_initial = self.config["length_scale_initial"]
-        length_scale_bounds = tuple(self.config["length_scale_bounds"])
-        constant_bounds = tuple(self.config["constant_kernel_bounds"])
-        normalize_y = self.config["normalize_y"]
-        random_state = self.config["random_state"]
-
         # Validate ranges
         for name in self.ingredient_names:
             if name not in self.ranges:
@@ -202,21 +595,14 @@ class RoboTasteBO:
                 raise ValueError(
                     f"Invalid range for {name}: min ({min_c}) >= max ({max_c})"
                 )
+        self._range_key = _range_key(self.ranges, self.ingredient_names)
+        self._range_min, self._range_span = _range_arrays(self._range_key)
 
         # GP with Matern kernel (configurable smoothness)
-        kernel = C(1.0, constant_bounds) * Matern(
-            length_scale=length_scale_initial,
-            length_scale_bounds=length_scale_bounds,
-            nu=kernel_nu,
-        )
-
-        self.gp = GaussianProcessRegressor(
-            kernel=kernel,
-            alpha=alpha,  # Noise regularization
-            n_restarts_optimizer=n_restarts,
-            normalize_y=normalize_y,
-            random_state=random_state,
-        )
+        backend = self.config.get("gp_backend", "sklearn")
+        if backend not in GP_BACKENDS:
+            raise ValueError(f"Unknown GP backend: {backend}")
+        self.gp = GP_BACKENDS[backend](self.config)
 
         self.is_fitted = False
         self.best_observed_value = -np.inf
@@ -225,7 +611,8 @@ class RoboTasteBO:
 
         logger.debug(
             f"Initialized RoboTasteBO with {self.n_dim} ingredients: {self.ingredient_names}, "
-            f"kernel_nu={kernel_nu}, alpha={alpha}, acquisition={self.config['acquisition_function']}"
+            f"kernel_nu={self.config['kernel_nu']}, alpha={self.config['alpha']}, "
+            f"gp_backend={backend}, acquisition={self.config['acquisition_function']}"
         )
 
     def _normalize_features(self, X: np.ndarray) -> np.ndarray:
@@ -234,19 +621,19 @@ class RoboTasteBO:
 
         Essential for GP kernel to work properly across different concentration scales.
         """
-        X_norm = np.zeros_like(X, dtype=float)
-        for i, name in enumerate(self.ingredient_names):
-            min_c, max_c = self.ranges[name]
-            X_norm[:, i] = (X[:, i] - min_c) / (max_c - min_c)
-        return X_norm
+        return (np.asarray(X, dtype=float) - self._range_min) / self._range_span
 
     def _denormalize_features(self, X_norm: np.ndarray) -> np.ndarray:
         """Convert normalized [0, 1] features back to original concentration scale."""
-        X = np.zeros_like(X_norm, dtype=float)
-        for i, name in enumerate(self.ingredient_names):
-            min_c, max_c = self.ranges[name]
-            X[:, i] = X_norm[:, i] * (max_c - min_c) + min_c
-        return X
+        return np.asarray(X_norm, dtype=float) * self._range_span + self._range_min
+
+    def _gp_inputs(self, X) -> np.ndarray:
+        """Normalized X; a CandidateSet built for this model's ranges is used as is."""
+        if isinstance(X, CandidateSet):
+            if X.ranges == self._range_key:
+                return X.normalized
+            X = X.candidates
+        return self._normalize_features(X)
 
     def fit(self, X: np.ndarray, y: np.ndarray) -> None:
         """
@@ -296,7 +683,8 @@ class RoboTasteBO:
         Predict mean and uncertainty for new samples.
 
         Args:
-            X: (n_candidates, n_ingredients) array of concentrations
+            X: (n_candidates, n_ingredients) array of concentrations, or a
+                CandidateSet
             return_std: If True, return standard deviation
             return_cov: If True, return full covariance matrix
 
@@ -308,7 +696,7 @@ class RoboTasteBO:
         if not self.is_fitted:
             raise ValueError("GP not fitted. Call fit() first.")
 
-        X_norm = self._normalize_features(X)
+        X_norm = self._gp_inputs(X)
         return self.gp.predict(X_norm, return_std=return_std, return_cov=return_cov)  # type: ignore
 
     def expected_improvement(
@@ -336,7 +724,12 @@ class RoboTasteBO:
             return np.zeros(len(X))
 
         mu, sigma = self.predict(X, return_std=True)
+        return self._expected_improvement(mu, sigma, xi)
 
+    def _expected_improvement(
+        self, mu: np.ndarray, sigma: np.ndarray, xi: float = 0.01, use_ei_per_cost: bool = False
+    ) -> np.ndarray:
+        """EI from predicted mean and std (see expected_improvement)."""
         # Avoid division by zero
         sigma = np.maximum(sigma, 1e-9)
 
@@ -374,11 +767,16 @@ class RoboTasteBO:
             return np.zeros(len(X))
 
         mu, sigma = self.predict(X, return_std=True)
+        return self._upper_confidence_bound(mu, sigma, kappa)
+
+    def _upper_confidence_bound(
+        self, mu: np.ndarray, sigma: np.ndarray, kappa: float = 2.0
+    ) -> np.ndarray:
         return mu + kappa * sigma
 
     def suggest_next_sample(
         self,
-        candidates: np.ndarray,
+        candidates,
         acquisition: Optional[str] = None,
         return_all_scores: bool = False,
         current_cycle: Optional[int] = None,
@@ -389,7 +787,8 @@ class RoboTasteBO:
         Recommend next sample to test based on acquisition function.
 
         Args:
-            candidates: (n_candidates, n_ingredients) array of possible samples
+            candidates: (n_candidates, n_ingredients) array of possible samples,
+                or a CandidateSet (see get_candidate_set)
             acquisition: Acquisition function to use ("ei" or "ucb", uses config default if None)
             return_all_scores: If True, return scores for all candidates
             current_cycle: Current optimization cycle (for adaptive acquisition, 0-indexed)
@@ -399,10 +798,12 @@ class RoboTasteBO:
         Returns:
             Dict with suggestion details
         """
+        points = candidates.candidates if isinstance(candidates, CandidateSet) else candidates
+
         if not self.is_fitted:
             # Random exploration if no data yet
-            idx = np.random.randint(len(candidates))
-            best_candidate = candidates[idx]
+            idx = np.random.randint(len(points))
+            best_candidate = points[idx]
 
             result = {
                 "best_candidate": best_candidate,
@@ -466,20 +867,19 @@ class RoboTasteBO:
             elif acquisition == "ucb" and "kappa" not in acq_kwargs:
                 acq_kwargs["kappa"] = self.config.get("ucb_kappa", 2.0)
 
-        # Calculate acquisition function
-        if acquisition == "ei":
-            acq_values = self.expected_improvement(candidates, **acq_kwargs)
-        elif acquisition == "ucb":
-            acq_values = self.upper_confidence_bound(candidates, **acq_kwargs)
-        else:
+        if acquisition not in ("ei", "ucb"):
             raise ValueError(f"Unknown acquisition function: {acquisition}")
 
-        # Get predictions
+        # One GP prediction serves both the acquisition function and the result
         mu_values, sigma_values = self.predict(candidates, return_std=True)
+        if acquisition == "ei":
+            acq_values = self._expected_improvement(mu_values, sigma_values, **acq_kwargs)
+        else:
+            acq_values = self._upper_confidence_bound(mu_values, sigma_values, **acq_kwargs)
 
         # Select best candidate (max acquisition)
         best_idx = np.argmax(acq_values)
-        best_candidate = candidates[best_idx]
+        best_candidate = points[best_idx]
 
         result = {
             "best_candidate": best_candidate,
@@ -498,7 +898,7 @@ class RoboTasteBO:
         }
 
         if return_all_scores:
-            result["all_candidates"] = candidates
+            result["all_candidates"] = points
             result["all_acquisition_values"] = acq_values
             result["all_predictions"] = mu_values
             result["all_uncertainties"] = sigma_values
@@ -723,11 +1123,120 @@ def generate_candidates_latin_hypercube(
     samples_normalized = sampler.random(n=n_candidates)
 
     # Scale to actual concentration ranges
-    candidates = np.zeros_like(samples_normalized)
-    for i, name in enumerate(ingredient_names):
-        min_c, max_c = ranges[name]
-        candidates[:, i] = samples_normalized[:, i] * (max_c - min_c) + min_c
+    range_min, range_span = _range_arrays(_range_key(ranges, ingredient_names))
+    candidates = samples_normalized * range_span + range_min
 
     logger.debug(f"Generated {n_candidates} candidates via LHS for {n_dim} ingredients")
 
     return candidates
+
+
+# ============================================================================
+# SHARED CANDIDATE SETS
+# ============================================================================
+#
+# A protocol's ingredient ranges are fixed, so the candidates its suggestions
+# score only depend on (ranges, method, size, seed). Sets are generated once,
+# stored with their normalized coordinates, and shared by every cycle and
+# session whose protocol has the same ranges (bounded LRU).
+
+MAX_CACHED_CANDIDATE_SETS = 32
+
+RangeKey = Tuple[Tuple[str, Tuple[float, float]], ...]
+
+
+def _range_key(ranges: Dict[str, Tuple[float, float]], names: List[str]) -> RangeKey:
+    """Hashable ((name, (min, max)), ...) in the given ingredient order."""
+    return tuple((name, (float(ranges[name][0]), float(ranges[name][1]))) for name in names)
+
+
+def _range_arrays(range_key: RangeKey) -> Tuple[np.ndarray, np.ndarray]:
+    """(min, max - min) per ingredient, for broadcasting over (n, n_ingredients)."""
+    bounds = np.array([bound for _, bound in range_key], dtype=float).reshape(-1, 2)
+    return bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+
+
+def _read_only(X: np.ndarray) -> np.ndarray:
+    X = np.ascontiguousarray(X, dtype=float)
+    X.flags.writeable = False
+    return X
+
+
+class CandidateSet:
+    """
+    Candidate concentrations with their [0, 1] coordinates, shared read-only.
+
+    RoboTasteBO models trained on the same ranges predict on `normalized`
+    directly instead of re-normalizing the candidates on every call.
+
+    Attributes:
+        ranges: ((name, (min_mM, max_mM)), ...) the set was generated for
+        candidates: (n_candidates, n_ingredients) concentrations
+        normalized: candidates scaled to [0, 1] per ingredient
+    """
+
+    def __init__(self, ranges: RangeKey, candidates: np.ndarray):
+        self.ranges = ranges
+        range_min, range_span = _range_arrays(ranges)
+        self.candidates = _read_only(candidates)
+        self.normalized = _read_only((self.candidates - range_min) / range_span)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+
+_candidate_sets: "OrderedDict[tuple, CandidateSet]" = OrderedDict()
+_candidate_sets_lock = threading.Lock()
+
+
+def get_candidate_set(
+    ranges: Dict[str, Tuple[float, float]],
+    method: str,
+    size: int,
+    random_state: int = 42,
+) -> CandidateSet:
+    """
+    Cached candidate set for an ingredient space.
+
+    Args:
+        ranges: Ordered dict ingredient name -> (min_mM, max_mM)
+        method: "grid" (2 ingredients, size points per axis, as
+            generate_candidate_grid_2d) or "lhs" (size points, as
+            generate_candidates_latin_hypercube)
+        size: Points per axis (grid) or number of candidates (lhs)
+        random_state: LHS seed (ignored for grids)
+
+    Returns:
+        Shared CandidateSet; its arrays are read-only
+
+    Raises:
+        ValueError: Unknown method, or a grid for other than 2 ingredients
+    """
+    range_key = _range_key(ranges, list(ranges))
+    key = (range_key, method, int(size), random_state if method == "lhs" else None)
+
+    with _candidate_sets_lock:
+        candidate_set = _candidate_sets.get(key)
+        if candidate_set is not None:
+            _candidate_sets.move_to_end(key)
+            return candidate_set
+
+    if method == "grid":
+        if len(range_key) != 2:
+            raise ValueError(f"Grid candidates need 2 ingredients, got {len(range_key)}")
+        (_, range_x), (_, range_y) = range_key
+        candidates = generate_candidate_grid_2d(range_x, range_y, n_points=int(size))
+    elif method == "lhs":
+        candidates = generate_candidates_latin_hypercube(
+            dict(range_key), n_candidates=int(size), random_state=random_state
+        )
+    else:
+        raise ValueError(f"Unknown candidate method: {method}")
+    candidate_set = CandidateSet(range_key, candidates)
+
+    with _candidate_sets_lock:
+        _candidate_sets[key] = candidate_set
+        while len(_candidate_sets) > MAX_CACHED_CANDIDATE_SETS:
+            _candidate_sets.popitem(last=False)
+
+    return candidate_set
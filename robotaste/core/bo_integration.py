@@ -3,20 +3,50 @@ RoboTaste Bayesian Optimization Integration
 
 Handles BO suggestion generation for sessions.
 
+Everything derived from a session's GP (the fitted model, the suggestion,
+the visualization surface and the convergence summary) is bundled in one
+BOArtifact per training-data fingerprint. /bo-model, /bo-suggestion and
+prepare_cycle_sample all read the same artifact, so a poll trains at most
+one GP and the plotted surface always comes from the model that made the
+suggestion. Artifacts are built on the shared BO scheduler (bo_scheduler),
+which bounds concurrent fits across sessions and serves subject requests
+before moderator visualization.
+
 Author: RoboTaste Team
 Version: 3.0 (Refactored Architecture)
 """
 
+import copy
+import hashlib
 import logging
 import math
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 
+import numpy as np
+import pandas as pd
+
 from robotaste.data import database as sql
+from robotaste.utils import json_codec
 from robotaste.config.bo_config import get_bo_config_from_experiment
+from robotaste.core.compiled_protocol import get_compiled_protocol_for_session
+from robotaste.core.bo_scheduler import PRIORITY_SUBJECT, get_bo_scheduler
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Points per dimension of the visualization grid (2D → 625 candidates), and
+# the finer line used for the 1D case
+GP_GRID_SIZE = 25
+GP_GRID_1D_SIZE = GP_GRID_SIZE * GP_GRID_SIZE
+
+# A GP needs at least this many points to fit the visualization model
+MIN_SAMPLES_FOR_MODEL = 3
+
+# Maximum number of sessions whose current artifact is kept in memory
+MAX_CACHED_ARTIFACTS = 32
+
 
 def get_ingredient_range(ing: Dict[str, Any]) -> tuple:
     """
@@ -54,6 +84,233 @@ def should_use_bo_for_cycle(session_id: str, cycle_number: int) -> bool:
         return False
 
 
+class BOArtifact:
+    """BO results for one version of a session's training data."""
+
+    def __init__(
+        self,
+        fingerprint: str,
+        training_data: pd.DataFrame,
+        bo_config: Dict[str, Any],
+    ):
+        self.fingerprint = fingerprint
+        self.training_data = training_data
+        self.bo_config = bo_config
+        # Target column is whatever get_training_data actually produced (last
+        # column, matching the protocol's inline questionnaire bayesian_target)
+        # rather than a hardcoded name — inline questionnaires can target any
+        # variable (e.g. "sweetness"), not just "overall_liking".
+        self.target_column: Optional[str] = (
+            training_data.columns[-1] if len(training_data.columns) else None
+        )
+        self.model = None  # RoboTasteBO, None if too few samples or training failed
+        self.suggestion: Optional[Dict[str, Any]] = None
+        self._surface: Optional[Dict[str, Any]] = None
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.training_data)
+
+    def surface(self) -> Optional[Dict[str, Any]]:
+        """
+        GP mean/std/acquisition over the model's normalization frame.
+
+        Computed on first use and kept with the artifact.
+
+        Returns:
+            {"predictions": {...}, "observations": {...}} with NumPy arrays
+            (a GP_GRID_SIZE² grid for 2 ingredients, else a GP_GRID_1D_SIZE
+            line over the first ingredient), or None without a model
+        """
+        if self.model is None:
+            return None
+        if self._surface is None:
+            self._surface = self._compute_surface()
+        return self._surface
+
+    def _acquisition(self, candidates: np.ndarray) -> np.ndarray:
+        if self.bo_config.get("acquisition_function", "ei") == "ucb":
+            return self.model.upper_confidence_bound(candidates)
+        return self.model.expected_improvement(candidates)
+
+    def _compute_surface(self) -> Dict[str, Any]:
+        names = self.model.ingredient_names
+        data = self.training_data
+
+        if len(names) == 2:
+            (x_min, x_max), (y_min, y_max) = self.model.ranges[names[0]], self.model.ranges[names[1]]
+            x_vals = np.linspace(x_min, x_max, GP_GRID_SIZE)
+            # y descending so row 0 of the grid is the top of the rendered
+            # heatmap (max y), matching HeatmapPanel's row-major rendering.
+            y_vals = np.linspace(y_max, y_min, GP_GRID_SIZE)
+            xv, yv = np.meshgrid(x_vals, y_vals)
+            candidates = np.column_stack([xv.ravel(), yv.ravel()])
+
+            mu, sigma = self.model.predict(candidates, return_std=True)
+            acq = self._acquisition(candidates)
+            shape = (GP_GRID_SIZE, GP_GRID_SIZE)
+            return {
+                "predictions": {
+                    "x": x_vals,
+                    "y": y_vals,
+                    "mean": mu.reshape(shape),
+                    "std": sigma.reshape(shape),
+                    "acquisition": acq.reshape(shape),
+                },
+                "observations": {
+                    "x": data[names[0]].to_numpy(),
+                    "y": data[names[1]].to_numpy(),
+                    "z": data[self.target_column].to_numpy(),
+                },
+            }
+
+        x_min, x_max = self.model.ranges[names[0]]
+        x_vals = np.linspace(x_min, x_max, GP_GRID_1D_SIZE)
+        candidates = x_vals.reshape(-1, 1)
+
+        mu, sigma = self.model.predict(candidates, return_std=True)
+        return {
+            "predictions": {
+                "x": x_vals,
+                "mean": mu,
+                "std": sigma,
+                "acquisition": self._acquisition(candidates),
+            },
+            "observations": {
+                "x": data[names[0]].to_numpy(),
+                "y": data[self.target_column].to_numpy(),
+            },
+        }
+
+
+_artifacts: "OrderedDict[str, BOArtifact]" = OrderedDict()
+_artifacts_lock = threading.Lock()
+
+
+def _training_fingerprint(
+    training_data: pd.DataFrame,
+    bo_config: Dict[str, Any],
+    experiment_config: Dict[str, Any],
+) -> str:
+    """Hash of everything a BO artifact is computed from."""
+    payload = {
+        "columns": list(training_data.columns),
+        "values": training_data.to_numpy(),
+        "bo_config": bo_config,
+        "ingredients": experiment_config.get("ingredients", []),
+        "stopping_criteria": experiment_config.get("stopping_criteria"),
+        "current_cycle": experiment_config.get("current_cycle", 0),
+    }
+    return hashlib.sha256(json_codec.dumps_bytes(payload, sort_keys=True)).hexdigest()
+
+
+def get_bo_artifact(session_id: str, priority: int = PRIORITY_SUBJECT) -> Optional[BOArtifact]:
+    """
+    Get the BO artifact of a session's current training data.
+
+    The GP is trained, and the suggestion and convergence summary computed,
+    only when the training data, BO config or cycle changed since the last
+    call; otherwise the cached artifact is returned. Training runs on the BO
+    scheduler, so concurrent requests for the same fingerprint share one fit.
+
+    Args:
+        session_id: Session identifier
+        priority: Scheduler priority of the training job (PRIORITY_SUBJECT
+            or PRIORITY_MODERATOR)
+
+    Returns:
+        BOArtifact, or None if the session does not exist
+    """
+    session = sql.get_session(session_id)
+    if not session:
+        logger.warning(f"Session {session_id} not found")
+        return None
+
+    experiment_config = session.get("experiment_config", {})
+    # Use the merged + validated BO config (defaults <- protocol override)
+    # so candidate/gate params come from the same source of truth as the
+    # engine, instead of the raw, un-merged protocol section.
+    bo_config = get_bo_config_from_experiment(experiment_config)
+    training_data = sql.get_training_data(
+        session_id, only_final=bo_config.get("only_final_responses", True)
+    )
+    fingerprint = _training_fingerprint(training_data, bo_config, experiment_config)
+
+    artifact = _cached_artifact(session_id, fingerprint)
+    if artifact is not None:
+        return artifact
+
+    def build() -> BOArtifact:
+        # A job for this fingerprint may have finished since the check above
+        cached = _cached_artifact(session_id, fingerprint)
+        if cached is not None:
+            return cached
+
+        artifact = BOArtifact(fingerprint, training_data, bo_config)
+        artifact.model = _train_model(session_id, artifact)
+        artifact.suggestion = _build_suggestion(session_id, session, artifact)
+
+        with _artifacts_lock:
+            _artifacts[session_id] = artifact
+            _artifacts.move_to_end(session_id)
+            while len(_artifacts) > MAX_CACHED_ARTIFACTS:
+                _artifacts.popitem(last=False)
+        return artifact
+
+    return get_bo_scheduler().run((session_id, fingerprint), build, priority)
+
+
+def get_bo_surface(artifact: BOArtifact, priority: int = PRIORITY_SUBJECT) -> Optional[Dict[str, Any]]:
+    """artifact.surface(), computed on the BO scheduler the first time."""
+    if artifact.model is None or artifact._surface is not None:
+        return artifact.surface()
+    return get_bo_scheduler().run(
+        ("surface", id(artifact)), artifact.surface, priority
+    )
+
+
+def _cached_artifact(session_id: str, fingerprint: str) -> Optional[BOArtifact]:
+    with _artifacts_lock:
+        artifact = _artifacts.get(session_id)
+        if artifact is not None and artifact.fingerprint == fingerprint:
+            _artifacts.move_to_end(session_id)
+            return artifact
+    return None
+
+
+def _train_model(session_id: str, artifact: BOArtifact):
+    """Fit the session's GP on the artifact's training data."""
+    from robotaste.core.bo_engine import RoboTasteBO
+    from robotaste.core.bo_utils import get_ingredient_ranges_for_training
+
+    min_samples = min(MIN_SAMPLES_FOR_MODEL, artifact.bo_config.get("min_samples_for_bo", 3))
+    if artifact.n_samples < min_samples:
+        logger.info(
+            f"Insufficient data for BO training: {artifact.n_samples} samples "
+            f"< {min_samples} required"
+        )
+        return None
+
+    try:
+        # Ingredient columns keep the experiment config order; target is last
+        ingredient_names = [c for c in artifact.training_data.columns if c != artifact.target_column]
+        X = artifact.training_data[ingredient_names].to_numpy(dtype=float)
+        y = artifact.training_data[artifact.target_column].to_numpy(dtype=float)
+
+        # Normalization frame: the protocol's configured ranges, the same
+        # frame the candidates are generated over
+        ranges = get_ingredient_ranges_for_training(session_id, ingredient_names, X)
+
+        model = RoboTasteBO(ingredient_names, ranges, config=artifact.bo_config)
+        model.fit(X, y)
+        logger.info(f"Trained BO model for session {session_id} with {len(X)} samples")
+        return model
+
+    except Exception as e:
+        logger.error(f"Error training BO model: {e}", exc_info=True)
+        return None
+
+
 def get_bo_suggestion_for_session(
     session_id: str, participant_id: str
 ) -> Optional[Dict[str, Any]]:
@@ -62,7 +319,8 @@ def get_bo_suggestion_for_session(
 
     This function checks if BO should be active (cycle >= 3), trains the BO model
     from existing data, generates candidate samples, and returns the best suggestion
-    with interface-specific values.
+    with interface-specific values. The work is shared with /bo-model through
+    the session's BO artifact (see get_bo_artifact).
 
     Args:
         session_id: Session identifier for database queries
@@ -82,25 +340,29 @@ def get_bo_suggestion_for_session(
         }
     """
     try:
-        from robotaste.core.bo_utils import train_bo_model_for_participant
-        from robotaste.core.bo_engine import (
-            generate_candidate_grid_2d,
-            generate_candidates_latin_hypercube,
-        )
+        artifact = get_bo_artifact(session_id)
+        if artifact is None or artifact.suggestion is None:
+            return None
+        # Callers store and extend the suggestion; keep the cached one intact
+        return copy.deepcopy(artifact.suggestion)
+
+    except Exception as e:
+        logger.error(f"Error getting BO suggestion: {e}", exc_info=True)
+        return None
 
-        # Get current cycle and experiment config
-        current_cycle = sql.get_current_cycle(session_id)
-        session = sql.get_session(session_id)
 
-        if not session:
-            logger.warning(f"Session {session_id} not found")
-            return None
+def _build_suggestion(
+    session_id: str,
+    session: Dict[str, Any],
+    artifact: BOArtifact,
+) -> Optional[Dict[str, Any]]:
+    """Suggestion of an artifact's model (None if BO is not ready/active)."""
+    try:
+        from robotaste.core.bo_engine import get_candidate_set
 
         experiment_config = session.get("experiment_config", {})
-        # Use the merged + validated BO config (defaults <- protocol override)
-        # so candidate/gate params come from the same source of truth as the
-        # engine, instead of the raw, un-merged protocol section.
-        bo_config = get_bo_config_from_experiment(experiment_config)
+        current_cycle = experiment_config.get("current_cycle", 0)
+        bo_config = artifact.bo_config
 
         # Check if BO is enabled
         if not bo_config.get("enabled", True):
@@ -113,46 +375,40 @@ def get_bo_suggestion_for_session(
             logger.info(f"BO not ready: cycle {current_cycle} < min {min_samples}")
             return None
 
-        # Train BO model
-        logger.info(f"Training BO model for cycle {current_cycle}")
-        bo_model = train_bo_model_for_participant(
-            participant_id=participant_id, session_id=session_id, bo_config=bo_config
-        )
+        if artifact.n_samples < min_samples:
+            logger.info(
+                f"Insufficient data for BO training: {artifact.n_samples} samples < {min_samples} required"
+            )
+            return None
 
+        bo_model = artifact.model
         if bo_model is None:
             logger.warning("BO model training failed")
             return None
+        logger.info(f"Generating BO suggestion for cycle {current_cycle}")
 
         # Get ingredient configuration
         ingredients = experiment_config.get("ingredients", [])
         num_ingredients = len(ingredients)
 
-        # Generate candidates based on interface type
+        # Candidates based on interface type, shared across cycles and
+        # sessions with the same ingredient ranges
+        ingredient_ranges = {
+            ing["name"]: get_ingredient_range(ing) for ing in ingredients
+        }
         if num_ingredients == 2:
-            # 2D Grid interface - use grid sampling
-            ingredient_ranges = {
-                ing["name"]: get_ingredient_range(ing) for ing in ingredients
-            }
-
-            # Get concentration ranges for the two ingredients
-            ranges_list = list(ingredient_ranges.values())
+            # 2D Grid interface - use grid sampling.
             # n_candidates_grid is the TOTAL grid size (e.g. 400 = 20x20);
-            # generate_candidate_grid_2d takes points-per-axis, so take the
-            # square root. Prevents a total like 400 exploding to 400x400.
+            # grids take points-per-axis, so take the square root. Prevents
+            # a total like 400 exploding to 400x400.
             n_points = int(round(math.sqrt(bo_config.get("n_candidates_grid", 400))))
-            candidates = generate_candidate_grid_2d(
-                sugar_range=ranges_list[0],
-                salt_range=ranges_list[1],
-                n_points=n_points,
-            )
+            candidates = get_candidate_set(ingredient_ranges, "grid", n_points)
         else:
             # Slider interface - use Latin Hypercube Sampling
-            ingredient_ranges = {
-                ing["name"]: get_ingredient_range(ing) for ing in ingredients
-            }
-            candidates = generate_candidates_latin_hypercube(
-                ranges=ingredient_ranges,
-                n_candidates=bo_config.get("n_candidates_lhs", 1000),
+            candidates = get_candidate_set(
+                ingredient_ranges,
+                "lhs",
+                bo_config.get("n_candidates_lhs", 1000),
                 random_state=bo_config.get("random_state", 42),
             )
 
@@ -268,13 +524,9 @@ def get_bo_suggestion_for_session(
         # Check if override is allowed (from protocol config)
         allows_override = True  # Default to allowing override
         if is_protocol_driven:
-            schedule = experiment_config.get("sample_selection_schedule", [])
-            for entry in schedule:
-                cycle_range = entry.get("cycle_range", {})
-                if cycle_range.get("start", 0) <= current_cycle <= cycle_range.get("end", 0):
-                    config = entry.get("config", {})
-                    allows_override = config.get("allow_override", True)
-                    break
+            compiled = get_compiled_protocol_for_session(session)
+            if compiled:
+                allows_override = compiled.entry_config(current_cycle).get("allow_override", True)
 
         result["allows_override"] = allows_override
 
@@ -286,5 +538,5 @@ def get_bo_suggestion_for_session(
         return result
 
     except Exception as e:
-        logger.error(f"Error getting BO suggestion: {e}", exc_info=True)
+        logger.error(f"Error building BO suggestion: {e}", exc_info=True)
         return None
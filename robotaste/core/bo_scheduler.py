@@ -0,0 +1,295 @@
+"""
+RoboTaste BO Compute Scheduler
+
+Runs GP work (training, suggestions, visualization surfaces) for all
+sessions on a small, fixed set of worker threads instead of on whichever
+FastAPI threadpool thread received the request. With several tablets
+polling one moderator laptop, this bounds GP CPU usage to max_workers fits
+at a time, so fits no longer oversubscribe the cores.
+
+The BLAS thread limit (blas_threads) is a process-wide setting: threadpoolctl
+changes the BLAS library's global thread count, not one thread's. The
+scheduler sets it once when its workers start and restores it on close(),
+so it also applies to any NumPy work outside the scheduler in this process.
+
+- Coalescing: jobs are keyed (e.g. by session and training-data
+  fingerprint); submitting a key that is already queued or running returns
+  the pending job's future instead of queueing a second fit.
+- Priority: subject-facing work (PRIORITY_SUBJECT, e.g. /cycle-info) is
+  dequeued before moderator visualization (PRIORITY_MODERATOR, /bo-model).
+  A queued job resubmitted at a higher priority is promoted.
+- Metrics: queue depth, running jobs, coalesced submissions and recent
+  wait/run latencies per priority (see metrics()).
+
+Threads rather than processes: the fitted models are cached in this
+process (bo_integration's artifact cache) and the sklearn/NumPy fit spends
+its time in BLAS/LAPACK with the GIL released.
+
+Author: RoboTaste Team
+Version: 1.0
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover - depends on the environment
+    threadpool_limits = None
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+PRIORITY_SUBJECT = 0
+PRIORITY_MODERATOR = 1
+
+PRIORITY_NAMES = {PRIORITY_SUBJECT: "subject", PRIORITY_MODERATOR: "moderator"}
+
+# Concurrent GP jobs and the process-wide BLAS thread limit. Override with the
+# ROBOTASTE_BO_WORKERS / ROBOTASTE_BO_BLAS_THREADS env vars.
+BO_MAX_WORKERS = int(os.environ.get("ROBOTASTE_BO_WORKERS", "2"))
+BO_BLAS_THREADS = int(os.environ.get("ROBOTASTE_BO_BLAS_THREADS", "1"))
+
+# Completed jobs kept per priority for the latency metrics
+LATENCY_WINDOW = 200
+
+
+class _Job:
+    __slots__ = ("key", "fn", "future", "priority", "seq", "submitted_at", "started")
+
+    def __init__(self, key: Hashable, fn: Callable[[], Any], priority: int, seq: int):
+        self.key = key
+        self.fn = fn
+        self.future: Future = Future()
+        self.priority = priority
+        self.seq = seq
+        self.submitted_at = time.perf_counter()
+        self.started = False
+
+
+class BOScheduler:
+    """
+    Bounded, prioritized, coalescing executor for GP work.
+
+    Worker threads are started on the first submit() and stopped by close().
+    """
+
+    def __init__(
+        self,
+        max_workers: int = BO_MAX_WORKERS,
+        blas_threads: Optional[int] = BO_BLAS_THREADS,
+        latency_window: int = LATENCY_WINDOW,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.blas_threads = blas_threads
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+
+        self._queue: list = []  # heap of (priority, seq, key)
+        self._jobs: Dict[Hashable, _Job] = {}  # queued or running, by key
+        self._seq = itertools.count()
+        self._running = 0
+        self._latencies: Dict[int, deque] = {}
+        self._latency_window = latency_window
+        self._cond = threading.Condition()
+        self._threads: list = []
+        self._blas_limiter = None
+        self._closed = False
+
+    def submit(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        priority: int = PRIORITY_SUBJECT,
+    ) -> Future:
+        """
+        Queue fn, or join the pending job with the same key.
+
+        Args:
+            key: Coalescing key; callers that submit the same key while a job
+                for it is queued or running share that job's result
+            fn: Zero-argument callable run on a worker thread
+            priority: PRIORITY_SUBJECT or PRIORITY_MODERATOR
+
+        Returns:
+            Future resolved with fn's return value (or exception)
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BO scheduler is closed")
+
+            self.submitted += 1
+            job = self._jobs.get(key)
+            if job is not None:
+                self.coalesced += 1
+                if priority < job.priority and not job.started:
+                    # Promote: the old heap entry is skipped as stale
+                    job.priority, job.seq = priority, next(self._seq)
+                    heapq.heappush(self._queue, (job.priority, job.seq, key))
+                    self._cond.notify()
+                return job.future
+
+            job = _Job(key, fn, priority, next(self._seq))
+            self._jobs[key] = job
+            heapq.heappush(self._queue, (priority, job.seq, key))
+            self._start_workers()
+            self._cond.notify()
+            return job.future
+
+    def run(self, key: Hashable, fn: Callable[[], Any], priority: int = PRIORITY_SUBJECT) -> Any:
+        """submit() and wait for the result."""
+        return self.submit(key, fn, priority).result()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Current load and recent latencies.
+
+        Returns:
+            {
+                "max_workers": int, "blas_threads": int | None,
+                "queue_depth": int,  # jobs waiting for a worker
+                "running": int,
+                "submitted": int, "coalesced": int,
+                "completed": int, "failed": int,
+                "latency_ms": {"subject": {"count", "wait_p50", "wait_p95",
+                               "wait_max", "run_p50", "run_p95", "run_max"},
+                               "moderator": {...}}
+            }
+        """
+        with self._cond:
+            latencies = {
+                PRIORITY_NAMES.get(priority, str(priority)): list(samples)
+                for priority, samples in self._latencies.items()
+            }
+            metrics = {
+                "max_workers": self.max_workers,
+                "blas_threads": self.blas_threads,
+                "queue_depth": len(self._jobs) - self._running,
+                "running": self._running,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+        metrics["latency_ms"] = {
+            name: _summarize_latencies(samples) for name, samples in latencies.items()
+        }
+        return metrics
+
+    def close(self) -> None:
+        """Stop the workers after the jobs already queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+
+        for thread in threads:
+            thread.join()
+
+        with self._cond:
+            limiter, self._blas_limiter = self._blas_limiter, None
+        if limiter is not None:
+            limiter.restore_original_limits()
+
+    def _start_workers(self) -> None:
+        if not self._threads and threadpool_limits is not None and self.blas_threads:
+            # Process-wide: set once for all workers rather than per job, so
+            # overlapping jobs cannot restore each other's limit mid-fit
+            self._blas_limiter = threadpool_limits(limits=self.blas_threads, user_api="blas")
+
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._run, name=f"bo-worker-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                while self._queue:
+                    _, seq, key = heapq.heappop(self._queue)
+                    job = self._jobs.get(key)
+                    if job is not None and job.seq == seq and not job.started:
+                        job.started = True
+                        self._running += 1
+                        return job
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            started_at = time.perf_counter()
+            try:
+                result = job.fn()
+                error = None
+            except BaseException as e:
+                error = e
+            finished_at = time.perf_counter()
+
+            with self._cond:
+                self._running -= 1
+                del self._jobs[job.key]
+                if error is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                samples = self._latencies.setdefault(
+                    job.priority, deque(maxlen=self._latency_window)
+                )
+                samples.append((started_at - job.submitted_at, finished_at - started_at))
+
+            if error is None:
+                job.future.set_result(result)
+            else:
+                logger.error(f"BO job {job.key!r} failed: {error}")
+                job.future.set_exception(error)
+
+
+def _summarize_latencies(samples: list) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+
+    waits = sorted(wait for wait, _ in samples)
+    runs = sorted(run for _, run in samples)
+
+    def pct(values, q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1e3, 2)
+
+    return {
+        "count": len(samples),
+        "wait_p50": pct(waits, 0.5),
+        "wait_p95": pct(waits, 0.95),
+        "wait_max": round(waits[-1] * 1e3, 2),
+        "run_p50": pct(runs, 0.5),
+        "run_p95": pct(runs, 0.95),
+        "run_max": round(runs[-1] * 1e3, 2),
+    }
+
+
+_scheduler: Optional[BOScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_bo_scheduler() -> BOScheduler:
+    """Process-wide scheduler shared by all sessions."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BOScheduler()
+        return _scheduler
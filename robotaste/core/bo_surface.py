@@ -1,8 +1,9 @@
 """
 Post-hoc BO response-surface computation.
 
-Shared by the live BO model endpoint (api/routers/sessions.py::get_bo_model)
-and the Analysis Hub's post-hoc "BO Surfaces" tab (api/routers/analysis.py).
+Powers the Analysis Hub's post-hoc "BO Surfaces" tab (api/routers/analysis.py);
+the live BO model endpoint uses the session's BO artifact instead
+(robotaste/core/bo_integration.py).
 
 Unlike the live endpoint, callers here can request the surface as it existed
 after only the first N cycles (`up_to_cycle`), by training on a truncated,
@@ -13,17 +14,26 @@ surface — and every participant's surface, when they share a protocol — is
 normalized on the exact same grid. That's what makes replay animations and
 cross-participant comparisons valid instead of comparing apples to oranges.
 
+GP fits run on the shared BO scheduler at moderator priority, keyed on the
+session and a fingerprint of the data they train on, so these endpoints stay
+within the scheduler's worker bound and identical concurrent requests share
+one job.
+
 Author: RoboTaste Team
 """
 
+import hashlib
 import logging
 from typing import Any, Dict, List, Optional
 
 import numpy as np
+import pandas as pd
 
 from robotaste.data.database import get_training_data, get_bo_config
 from robotaste.core.bo_engine import train_bo_model
+from robotaste.core.bo_scheduler import PRIORITY_MODERATOR, get_bo_scheduler
 from robotaste.core.bo_utils import get_ingredient_ranges_for_training
+from robotaste.utils import json_codec
 
 logger = logging.getLogger(__name__)
 
@@ -37,10 +47,29 @@ GP_GRID_SIZE = 25
 MIN_SAMPLES_FOR_SURFACE = 3
 
 
+def _job_key(
+    kind: str,
+    session_id: str,
+    training_data: pd.DataFrame,
+    bo_config: Optional[Dict[str, Any]],
+    ranges: Dict[str, Any],
+) -> tuple:
+    """Scheduler key: requests for the same computation on the same data share a job."""
+    payload = {
+        "columns": list(training_data.columns),
+        "values": training_data.to_numpy(),
+        "bo_config": bo_config,
+        "ranges": ranges,
+    }
+    digest = hashlib.sha256(json_codec.dumps_bytes(payload, sort_keys=True)).hexdigest()
+    return (kind, session_id, digest)
+
+
 def compute_bo_surface_2d(
     session_id: str,
     experiment_config: Dict[str, Any],
     up_to_cycle: Optional[int] = None,
+    priority: int = PRIORITY_MODERATOR,
 ) -> Optional[Dict[str, Any]]:
     """
     Compute a 2D GP response surface for a session, optionally truncated to
@@ -48,7 +77,8 @@ def compute_bo_surface_2d(
 
     Returns None if the session isn't a 2-ingredient BO experiment, or there
     isn't enough data to train even at full cycle count. Otherwise returns a
-    dict shaped like BOModel2D (frontend/src/types/index.ts) plus:
+    dict shaped like BOModel2D (frontend/src/types/index.ts), with NumPy
+    arrays for the grids and observations (render with FastJSONResponse), plus:
       - ingredient_names, target_column
       - n_cycles_total: total trainable samples available for this session
       - n_cycles_used: samples actually used to train this surface
@@ -61,6 +91,7 @@ def compute_bo_surface_2d(
         up_to_cycle: If given, train only on the first N chronological
             samples instead of all of them (post-hoc replay). Clamped to
             [MIN_SAMPLES_FOR_SURFACE, n_cycles_total].
+        priority: BO scheduler priority of the fit.
     """
     ingredients = experiment_config.get("ingredients", [])
     if len(ingredients) != 2:
@@ -90,61 +121,67 @@ def compute_bo_surface_2d(
         return None
 
     bo_config = get_bo_config(session_id)
-    model = train_bo_model(
-        df,
-        ingredient_names,
-        target_column,
-        bo_config=bo_config,
-        concentration_ranges=ranges,
-    )
-    if model is None:
-        return None
 
-    acquisition_fn_name = (bo_config or {}).get("acquisition_function", "ei")
-
-    def acquisition(candidates: np.ndarray) -> np.ndarray:
-        if acquisition_fn_name == "ucb":
-            return model.upper_confidence_bound(candidates)
-        return model.expected_improvement(candidates)
-
-    name_x, name_y = ingredient_names[0], ingredient_names[1]
-    range_x, range_y = ranges[name_x], ranges[name_y]
-
-    x_vals = np.linspace(range_x[0], range_x[1], GP_GRID_SIZE)
-    # y descending so grid row 0 is the top of the rendered heatmap/surface,
-    # matching the live BOVisualization2D convention (HeatmapPanel is
-    # row-major).
-    y_vals = np.linspace(range_y[1], range_y[0], GP_GRID_SIZE)
-    xv, yv = np.meshgrid(x_vals, y_vals)
-    candidates = np.column_stack([xv.ravel(), yv.ravel()])
-
-    mu, sigma = model.predict(candidates, return_std=True)
-    acq = acquisition(candidates)
-
-    return {
-        "predictions": {
-            "x": x_vals.tolist(),
-            "y": y_vals.tolist(),
-            "mean": mu.reshape(GP_GRID_SIZE, GP_GRID_SIZE).tolist(),
-            "std": sigma.reshape(GP_GRID_SIZE, GP_GRID_SIZE).tolist(),
-            "acquisition": acq.reshape(GP_GRID_SIZE, GP_GRID_SIZE).tolist(),
-        },
-        "observations": {
-            "x": df[name_x].tolist(),
-            "y": df[name_y].tolist(),
-            "z": df[target_column].tolist(),
-        },
-        "ingredient_names": [name_x, name_y],
-        "target_column": target_column,
-        "n_cycles_total": n_cycles_total,
-        "n_cycles_used": n_cycles_used,
-        "mean_sigma": float(np.mean(sigma)),
-    }
+    def fit_surface() -> Optional[Dict[str, Any]]:
+        model = train_bo_model(
+            df,
+            ingredient_names,
+            target_column,
+            bo_config=bo_config,
+            concentration_ranges=ranges,
+        )
+        if model is None:
+            return None
+
+        acquisition_fn_name = (bo_config or {}).get("acquisition_function", "ei")
+
+        def acquisition(candidates: np.ndarray) -> np.ndarray:
+            if acquisition_fn_name == "ucb":
+                return model.upper_confidence_bound(candidates)
+            return model.expected_improvement(candidates)
+
+        name_x, name_y = ingredient_names[0], ingredient_names[1]
+        range_x, range_y = ranges[name_x], ranges[name_y]
+
+        x_vals = np.linspace(range_x[0], range_x[1], GP_GRID_SIZE)
+        # y descending so grid row 0 is the top of the rendered heatmap/surface,
+        # matching the live BOVisualization2D convention (HeatmapPanel is
+        # row-major).
+        y_vals = np.linspace(range_y[1], range_y[0], GP_GRID_SIZE)
+        xv, yv = np.meshgrid(x_vals, y_vals)
+        candidates = np.column_stack([xv.ravel(), yv.ravel()])
+
+        mu, sigma = model.predict(candidates, return_std=True)
+        acq = acquisition(candidates)
+
+        return {
+            "predictions": {
+                "x": x_vals,
+                "y": y_vals,
+                "mean": mu.reshape(GP_GRID_SIZE, GP_GRID_SIZE),
+                "std": sigma.reshape(GP_GRID_SIZE, GP_GRID_SIZE),
+                "acquisition": acq.reshape(GP_GRID_SIZE, GP_GRID_SIZE),
+            },
+            "observations": {
+                "x": df[name_x].to_numpy(),
+                "y": df[name_y].to_numpy(),
+                "z": df[target_column].to_numpy(),
+            },
+            "ingredient_names": [name_x, name_y],
+            "target_column": target_column,
+            "n_cycles_total": n_cycles_total,
+            "n_cycles_used": n_cycles_used,
+            "mean_sigma": float(np.mean(sigma)),
+        }
+
+    key = (*_job_key("surface", session_id, training_data, bo_config, ranges), n_cycles_used)
+    return get_bo_scheduler().run(key, fit_surface, priority)
 
 
 def compute_bo_calibration(
     session_id: str,
     experiment_config: Dict[str, Any],
+    priority: int = PRIORITY_MODERATOR,
 ) -> Optional[List[Dict[str, Any]]]:
     """
     Walk a 2-ingredient BO session's samples in chronological order, training
@@ -165,7 +202,8 @@ def compute_bo_calibration(
           "abs_error": float,
         }
     Cycles that fail to train (e.g. a transient data issue) are skipped
-    rather than aborting the whole walk.
+    rather than aborting the whole walk. Each truncated fit is its own BO
+    scheduler job at `priority`.
     """
     ingredients = experiment_config.get("ingredients", [])
     if len(ingredients) != 2:
@@ -185,8 +223,7 @@ def compute_bo_calibration(
     ranges = get_ingredient_ranges_for_training(session_id, ingredient_names, X_full)
     bo_config = get_bo_config(session_id)
 
-    rows: List[Dict[str, Any]] = []
-    for n in range(MIN_SAMPLES_FOR_SURFACE, n_total):
+    def predict_next(n: int) -> Optional[Dict[str, Any]]:
         df_train = training_data.iloc[:n]
         model = train_bo_model(
             df_train,
@@ -196,7 +233,7 @@ def compute_bo_calibration(
             concentration_ranges=ranges,
         )
         if model is None:
-            continue
+            return None
 
         next_row = training_data.iloc[n]
         next_point = next_row[ingredient_names].to_numpy(dtype=float).reshape(1, -1)
@@ -204,13 +241,22 @@ def compute_bo_calibration(
         observed = float(next_row[target_column])
         predicted = float(mu[0])
 
-        rows.append({
+        return {
             "cycle": n + 1,
             "point": {name: float(next_row[name]) for name in ingredient_names},
             "observed": observed,
             "predicted": predicted,
             "uncertainty": float(sigma[0]),
             "abs_error": abs(observed - predicted),
-        })
+        }
 
-    return rows
+    # One job per truncated fit, so subject-priority jobs are dequeued
+    # between fits instead of waiting for the whole walk
+    scheduler = get_bo_scheduler()
+    key = _job_key("calibration", session_id, training_data, bo_config, ranges)
+    futures = [
+        scheduler.submit((*key, n), lambda n=n: predict_next(n), priority)
+        for n in range(MIN_SAMPLES_FOR_SURFACE, n_total)
+    ]
+    rows = [future.result() for future in futures]
+    return [row for row in rows if row is not None]
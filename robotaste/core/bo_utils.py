@@ -403,15 +403,21 @@ def get_bo_status(session_id: str) -> Dict[str, Any]:
 # ============================================================================
 
 
-def get_convergence_metrics(session_id: str) -> Dict[str, Any]:
+def get_convergence_metrics(
+    session_id: str, experiment_config: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
-    Analyze BO convergence metrics from stored sample data.
+    Analyze BO convergence metrics from the session's convergence accumulator.
 
-    Retrieves time series of BO metrics (acquisition values, predictions, uncertainties)
-    from the database and calculates convergence indicators.
+    The accumulator (session_convergence_state / session_convergence_points)
+    is advanced by save_sample_cycle, so this reads two small tables instead
+    of re-parsing every sample. Sessions recorded before the accumulator
+    existed are rebuilt from their samples once.
 
     Args:
         session_id: Session identifier
+        experiment_config: Session experiment_config, if already loaded
+            (used for the stability window)
 
     Returns:
         Dictionary with convergence metrics:
@@ -435,10 +441,10 @@ def get_convergence_metrics(session_id: str) -> Dict[str, Any]:
         ...     print("Low expected improvement - nearing convergence")
     """
     from robotaste.data.database import (
-        get_database_connection,
-        get_training_data,
+        get_convergence_state,
         get_current_cycle,
         get_session,
+        rebuild_convergence_state,
     )
     from robotaste.config.bo_config import resolve_stopping_criteria
 
@@ -446,28 +452,17 @@ def get_convergence_metrics(session_id: str) -> Dict[str, Any]:
         # Resolve the configured stability window (default 5) for this session so
         # convergence stability/improvement use the same window the stopping
         # logic checks against, instead of a hardcoded value.
-        session = get_session(session_id)
-        experiment_config = session.get("experiment_config", {}) if session else {}
+        if experiment_config is None:
+            session = get_session(session_id)
+            experiment_config = session.get("experiment_config", {}) if session else {}
         num_ingredients = len(experiment_config.get("ingredients", []))
         stability_window = resolve_stopping_criteria(
             experiment_config, num_ingredients
         ).get("stability_window", 5)
 
-        # Get all samples with BO metadata
-        with get_database_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT sample_id, selection_data, created_at
-                FROM samples
-                WHERE session_id = ?
-                ORDER BY created_at ASC
-                """,
-                (session_id,),
-            )
-            rows = cursor.fetchall()
+        state = get_convergence_state(session_id) or rebuild_convergence_state(session_id)
 
-        if not rows:
+        if not state or not state["n_samples"]:
             return {
                 "current_cycle": 0,
                 "n_samples": 0,
@@ -482,41 +477,17 @@ def get_convergence_metrics(session_id: str) -> Dict[str, Any]:
                 "has_sufficient_data": False,
             }
 
-        # Parse BO metadata from each sample
-        acquisition_values = []
-        predicted_values = []
-        uncertainties = []
-        best_values = []
-        n_bo_samples = 0
-
-        # Get training data to calculate best values over time
-        training_df = get_training_data(session_id, only_final=False)
-        target_col = training_df.columns[-1] if not training_df.empty else None
-
-        for i, row in enumerate(rows):
-            selection_data_json = row[1]
-
-            if selection_data_json:
-                selection_data = json.loads(selection_data_json)
-
-                # Extract BO metrics if available
-                if selection_data.get("mode") == "bayesian_optimization":
-                    n_bo_samples += 1
-                    acquisition_values.append(
-                        selection_data.get("acquisition_value", 0.0)
-                    )
-                    predicted_values.append(selection_data.get("predicted_value", 0.0))
-                    uncertainties.append(selection_data.get("uncertainty", 0.0))
-
-                    # Get best observed value at this point in time
-                    if target_col and not training_df.empty:
-                        # Best value up to and including current sample
-                        best_so_far = training_df.iloc[: i + 1][target_col].max()
-                        best_values.append(float(best_so_far))
+        points = state["points"]
+        acquisition_values = [p["acquisition_value"] for p in points]
+        predicted_values = [p["predicted_value"] for p in points]
+        uncertainties = [p["uncertainty"] for p in points]
+        # Best observed value at each BO sample (none before the first rating)
+        best_values = [p["best_value"] for p in points if p["best_value"] is not None]
+        n_bo_samples = state["n_bo_samples"]
 
         # Calculate derived metrics
         current_cycle = get_current_cycle(session_id)
-        n_samples = len(rows)
+        n_samples = state["n_samples"]
         has_sufficient_data = n_bo_samples >= 3
 
         # Max acquisition (most recent if available)
@@ -648,7 +619,7 @@ def check_convergence(
         stability_window = sc.get("stability_window", 5)
 
         # Get convergence metrics
-        metrics = get_convergence_metrics(session_id)
+        metrics = get_convergence_metrics(session_id, experiment_config)
 
         current_cycle = metrics["current_cycle"]
         max_acquisition = metrics["max_acquisition"]
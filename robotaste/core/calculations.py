@@ -2,7 +2,7 @@
 RoboTaste Core Calculations Module
 
 Pure Python module for concentration mapping and mixture calculations.
-NO external dependencies (no Streamlit, no SQL).
+NO external dependencies (no Streamlit, no SQL); batch helpers use NumPy.
 
 Contains:
 - ConcentrationMapper: Coordinate ↔ concentration conversions
@@ -17,6 +17,8 @@ import math
 import random
 from typing import Tuple, Dict, Any, Optional, List
 
+import numpy as np
+
 
 # ============================================================================
 # CONSTANTS
@@ -429,3 +431,57 @@ def calculate_stock_volumes(
         "total_volume": final_volume_mL,
         "ingredient_configs": ingredient_configs,  # Include for reference
     }
+
+
+def calculate_stock_volumes_batch(
+    concentrations: np.ndarray,
+    stock_concentrations: np.ndarray,
+    final_volume_mL: float = 10.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Calculate stock solution volumes for many samples at once.
+
+    Vectorized form of calculate_stock_volumes: one row per sample, one
+    column per ingredient.
+
+    Args:
+        concentrations: (n_samples × n_ingredients) desired mM; NaN marks an
+            ingredient that is not part of a sample
+        stock_concentrations: (n_ingredients,) stock mM; NaN or 0 marks an
+            ingredient that cannot be diluted from stock
+        final_volume_mL: Final solution volume in mL (default 10.0 mL)
+
+    Returns:
+        Dict with:
+        {
+            "stock_volumes": (n_samples × n_ingredients) µL, rounded to 3
+                decimals; 0 where not requested (or requested at 0 mM), NaN
+                where requested without a usable stock,
+            "water_volume": (n_samples,) µL of water to reach final volume,
+            "feasible": (n_samples,) True if every requested ingredient has a
+                stock and the stock volumes fit in the final volume
+        }
+
+    Example:
+        Sugar (1000 mM stock) and Salt (100 mM stock), 10 mL final volume:
+        [[12.5, 3.0], [40.0, NaN]] → stock volumes [[125, 300], [400, 0]] µL,
+        water [9575, 9600] µL
+    """
+    concentrations = np.atleast_2d(np.asarray(concentrations, dtype=float))
+    stock = np.asarray(stock_concentrations, dtype=float)
+    stock = np.where(stock > 0, stock, np.nan)
+
+    requested = ~np.isnan(concentrations)
+    volumes = np.round(concentrations * (final_volume_mL * 1000.0) / stock, 3)
+    volumes[concentrations == 0] = 0.0
+    volumes[~requested] = 0.0
+
+    missing_stock = np.isnan(volumes).any(axis=1)
+    water_volume = final_volume_mL * 1000.0 - np.nansum(volumes, axis=1)
+    feasible = ~missing_stock & (volumes >= 0).all(axis=1, where=~np.isnan(volumes)) & (water_volume >= 0)
+
+    return {
+        "stock_volumes": volumes,
+        "water_volume": water_volume,
+        "feasible": feasible,
+    }
@@ -0,0 +1,258 @@
+"""
+Compiled Protocol Cache
+
+Resolving "what happens in cycle N" used to mean loading the session, finding
+the protocol (embedded in experiment_config or loaded from protocol_library),
+then scanning sample_selection_schedule. CompiledProtocol does that work once
+per protocol version and keeps the lookup structures:
+
+- cycle → schedule entry (sorted, non-overlapping intervals + bisect)
+- ingredient name → ingredient config
+- ingredient name / pump address → pump config
+- ordered phase ids of the phase sequence
+
+Entries are keyed by (protocol_id, protocol_hash), so sessions started from
+the same protocol version share one compiled object, and an edited protocol
+(new hash) never returns stale data. protocol_repo.update_protocol and
+delete_protocol drop a protocol's entries explicitly.
+
+Author: RoboTaste Team
+Version: 1.0
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from robotaste.config.protocol_schema import ScheduleIndex, normalize_selection_mode
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of compiled protocol versions kept in memory
+MAX_COMPILED_PROTOCOLS = 64
+
+# Fields that define a compiled protocol (used to key protocols without a hash)
+COMPILED_FIELDS = (
+    "sample_selection_schedule",
+    "ingredients",
+    "pump_config",
+    "phase_sequence",
+)
+
+PREDETERMINED_ABSOLUTE_MODES = ("predetermined", "predetermined_absolute")
+PREDETERMINED_MODES = PREDETERMINED_ABSOLUTE_MODES + ("predetermined_randomized",)
+
+
+class CompiledProtocol:
+    """Parsed protocol plus precomputed lookup tables."""
+
+    def __init__(self, protocol: Dict[str, Any], protocol_id: Optional[str], protocol_hash: str):
+        self.protocol = protocol
+        self.protocol_id = protocol_id
+        self.protocol_hash = protocol_hash
+        self.schedule: List[Dict[str, Any]] = protocol.get("sample_selection_schedule") or []
+
+        # Schedule: sorted interval index (earlier entries win on overlap)
+        self.schedule_intervals = ScheduleIndex(self.schedule)
+
+        # Predetermined samples: cycle -> concentrations
+        self.predetermined_samples: Dict[int, Dict[str, float]] = {}
+        for entry in self.schedule:
+            if entry.get("mode") not in PREDETERMINED_ABSOLUTE_MODES:
+                continue
+            cycle_range = entry.get("cycle_range", {})
+            start, end = cycle_range.get("start", 0), cycle_range.get("end", 0)
+            for sample in entry.get("predetermined_samples", []):
+                cycle = sample.get("cycle")
+                if cycle is not None and start <= cycle <= end:
+                    self.predetermined_samples.setdefault(cycle, sample.get("concentrations"))
+
+        # Cycles of every predetermined block (absolute or randomized), in schedule order
+        self.predetermined_cycles: List[int] = []
+        for entry in self.schedule:
+            if entry.get("mode") in PREDETERMINED_MODES:
+                cycle_range = entry.get("cycle_range", {})
+                self.predetermined_cycles.extend(
+                    range(cycle_range.get("start", 0), cycle_range.get("end", 0) + 1)
+                )
+
+        # Modes: unique modes and number of cycles scheduled per mode
+        self.modes: List[str] = list(set(entry.get("mode", "user_selected") for entry in self.schedule))
+        self.mode_cycle_counts: Dict[str, int] = {}
+        for entry in self.schedule:
+            cycle_range = entry.get("cycle_range", {})
+            count = cycle_range.get("end", 0) - cycle_range.get("start", 0) + 1
+            mode = entry.get("mode", "user_selected")
+            self.mode_cycle_counts[mode] = self.mode_cycle_counts.get(mode, 0) + count
+
+        # Ingredients and pumps
+        self.ingredients_by_name: Dict[str, Dict[str, Any]] = {
+            ing.get("name"): ing for ing in protocol.get("ingredients", []) if ing.get("name")
+        }
+        pump_config = protocol.get("pump_config") or {}
+        self.pump_config: Dict[str, Any] = pump_config
+        self.pump_by_ingredient: Dict[str, Dict[str, Any]] = {
+            cfg.get("ingredient"): cfg for cfg in pump_config.get("pumps", []) if cfg.get("ingredient")
+        }
+        self.pump_by_address: Dict[int, Dict[str, Any]] = {
+            cfg.get("address", 0): cfg for cfg in pump_config.get("pumps", [])
+        }
+
+        # Phase sequence (dict with 'phases' or a plain list)
+        phase_sequence = protocol.get("phase_sequence")
+        if isinstance(phase_sequence, dict):
+            phase_sequence = phase_sequence.get("phases", [])
+        self.phase_ids: List[str] = [
+            phase.get("phase_id", f"phase_{idx}")
+            for idx, phase in enumerate(phase_sequence or [])
+            if isinstance(phase, dict)
+        ]
+
+    # ─── Cycle lookups ──────────────────────────────────────────────────────
+
+    def schedule_index(self, cycle_number: int) -> int:
+        """Index of the schedule entry covering a cycle, or -1."""
+        return self.schedule_intervals.lookup(cycle_number)
+
+    def schedule_entry(self, cycle_number: int) -> Optional[Dict[str, Any]]:
+        """Schedule entry covering a cycle, or None."""
+        return self.schedule_intervals.entry(cycle_number)
+
+    def selection_mode(self, cycle_number: int) -> str:
+        """Raw selection mode for a cycle ("user_selected" if unscheduled)."""
+        entry = self.schedule_entry(cycle_number)
+        return entry.get("mode", "user_selected") if entry else "user_selected"
+
+    def normalized_mode(self, cycle_number: int) -> str:
+        """Selection mode with legacy aliases normalized."""
+        return normalize_selection_mode(self.selection_mode(cycle_number))
+
+    def entry_config(self, cycle_number: int) -> Dict[str, Any]:
+        """The 'config' block of the entry covering a cycle ({} if none)."""
+        entry = self.schedule_entry(cycle_number)
+        return (entry or {}).get("config", {}) or {}
+
+    def cycle_range_start(self, cycle_number: int) -> int:
+        """First cycle of the entry covering a cycle (1 if none)."""
+        entry = self.schedule_entry(cycle_number)
+        return (entry or {}).get("cycle_range", {}).get("start", 1)
+
+    def predetermined_sample(self, cycle_number: int) -> Optional[Dict[str, float]]:
+        """Predetermined concentrations for a cycle, or None."""
+        return self.predetermined_samples.get(cycle_number)
+
+    def sample_bank_config(self, cycle_number: int) -> Optional[Dict[str, Any]]:
+        """Sample bank config if the cycle is in a predetermined_randomized block."""
+        entry = self.schedule_entry(cycle_number)
+        if entry and entry.get("mode") == "predetermined_randomized":
+            return entry.get("sample_bank")
+        return None
+
+
+# ─── CACHE ──────────────────────────────────────────────────────────────────
+
+_compiled: "OrderedDict[Tuple[Optional[str], str], CompiledProtocol]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def _content_hash(protocol: Dict[str, Any]) -> str:
+    subset = {field: protocol.get(field) for field in COMPILED_FIELDS}
+    return hashlib.sha256(json.dumps(subset, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def compile_protocol(
+    protocol: Dict[str, Any],
+    protocol_id: Optional[str] = None,
+    protocol_hash: Optional[str] = None
+) -> CompiledProtocol:
+    """
+    Get the compiled form of a protocol, compiling it on first use.
+
+    Args:
+        protocol: Protocol dict (or a session experiment_config embedding one)
+        protocol_id: Protocol ID (defaults to protocol["protocol_id"])
+        protocol_hash: Version hash (defaults to protocol["protocol_hash"],
+            else a hash of the compiled fields)
+
+    Returns:
+        CompiledProtocol shared by every caller with the same id and hash
+    """
+    protocol_id = protocol_id or protocol.get("protocol_id")
+    protocol_hash = protocol_hash or protocol.get("protocol_hash") or _content_hash(protocol)
+    key = (protocol_id, protocol_hash)
+
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+
+    compiled = CompiledProtocol(protocol, protocol_id, protocol_hash)
+
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > MAX_COMPILED_PROTOCOLS:
+            _compiled.popitem(last=False)
+
+    logger.debug(f"Compiled protocol {protocol_id} ({protocol_hash[:8]})")
+    return compiled
+
+
+def get_compiled_protocol_for_session(session: Dict[str, Any]) -> Optional[CompiledProtocol]:
+    """
+    Compiled protocol of a session.
+
+    Uses the protocol snapshot embedded in experiment_config when present,
+    otherwise the protocol referenced by experiment_config["protocol_id"].
+
+    Args:
+        session: Session dict as returned by database.get_session()
+
+    Returns:
+        CompiledProtocol, or None if the session has no protocol
+    """
+    experiment_config = session.get("experiment_config") or {}
+
+    if "sample_selection_schedule" in experiment_config:
+        # The snapshot reshapes some fields (e.g. ingredients), so it must not
+        # share an entry with the library protocol of the same hash.
+        snapshot_hash = experiment_config.get("protocol_hash")
+        return compile_protocol(
+            experiment_config,
+            protocol_hash=f"session:{snapshot_hash}" if snapshot_hash else None,
+        )
+
+    protocol_id = experiment_config.get("protocol_id")
+    if not protocol_id:
+        return None
+
+    from robotaste.data import protocol_repo
+
+    protocol_hash = protocol_repo.get_protocol_hash(protocol_id)
+    if protocol_hash:
+        with _compiled_lock:
+            compiled = _compiled.get((protocol_id, protocol_hash))
+        if compiled is not None:
+            return compiled
+
+    protocol = protocol_repo.get_protocol_by_id(protocol_id)
+    if not protocol:
+        return None
+    return compile_protocol(protocol, protocol_id, protocol_hash)
+
+
+def invalidate_compiled_protocol(protocol_id: Optional[str] = None) -> int:
+    """
+    Drop compiled versions of a protocol (all protocols if protocol_id is None).
+
+    Returns:
+        Number of entries removed
+    """
+    with _compiled_lock:
+        keys = [key for key in _compiled if protocol_id is None or key[0] == protocol_id]
+        for key in keys:
+            del _compiled[key]
+    return len(keys)
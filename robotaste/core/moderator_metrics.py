@@ -18,8 +18,7 @@ from robotaste.data.database import (
     get_session_samples,
     get_current_cycle,
 )
-from robotaste.core.trials import get_selection_mode_for_cycle_runtime
-from robotaste.config.protocol_schema import get_selection_mode_for_cycle
+from robotaste.core.compiled_protocol import get_compiled_protocol_for_session
 
 logger = logging.getLogger(__name__)
 
@@ -46,11 +45,13 @@ def get_current_mode_info(session_id: str) -> Dict[str, Any]:
     """
     try:
         current_cycle = get_current_cycle(session_id)
-        current_mode = get_selection_mode_for_cycle_runtime(session_id, current_cycle)
 
         # Get protocol schedule
         session = get_session(session_id)
-        if not session:
+        compiled = get_compiled_protocol_for_session(session) if session else None
+        current_mode = compiled.selection_mode(current_cycle) if compiled else "user_selected"
+
+        if not compiled:
             return {
                 "current_cycle": current_cycle,
                 "current_mode": current_mode,
@@ -59,24 +60,10 @@ def get_current_mode_info(session_id: str) -> Dict[str, Any]:
                 "schedule": []
             }
 
-        experiment_config = session.get("experiment_config", {})
-
-        # Check for embedded protocol or referenced protocol
-        protocol = None
-        if "sample_selection_schedule" in experiment_config:
-            protocol = experiment_config
-        else:
-            protocol_id = experiment_config.get("protocol_id")
-            if protocol_id:
-                from robotaste.data import protocol_repo
-                protocol_obj = protocol_repo.get_protocol_by_id(protocol_id)
-                if protocol_obj:
-                    protocol = protocol_obj.get("protocol_json", {})
-
-        schedule = protocol.get("sample_selection_schedule", []) if protocol else []
+        schedule = compiled.schedule
 
         # Determine all unique modes
-        all_modes = list(set(entry.get("mode", "user_selected") for entry in schedule))
+        all_modes = list(compiled.modes)
         is_mixed_mode = len(all_modes) > 1
 
         return {
@@ -119,39 +106,12 @@ def get_predetermined_metrics(session_id: str) -> Dict[str, Any]:
         if not session:
             return _empty_predetermined_metrics()
 
-        experiment_config = session.get("experiment_config", {})
-
-        # Get protocol
-        protocol = None
-        if "sample_selection_schedule" in experiment_config:
-            protocol = experiment_config
-        else:
-            protocol_id = experiment_config.get("protocol_id")
-            if protocol_id:
-                from robotaste.data import protocol_repo
-                protocol_obj = protocol_repo.get_protocol_by_id(protocol_id)
-                if protocol_obj:
-                    protocol = protocol_obj.get("protocol_json", {})
-
-        if not protocol:
+        compiled = get_compiled_protocol_for_session(session)
+        if not compiled:
             return _empty_predetermined_metrics()
 
-        from robotaste.config.protocol_schema import get_predetermined_sample
-
-        # Get all predetermined cycles from protocol schedule
-        schedule = protocol.get("sample_selection_schedule", [])
-        predetermined_cycles = []
-
-        for entry in schedule:
-            mode = entry.get("mode")
-            # Support all predetermined modes (legacy and new)
-            if mode in ["predetermined", "predetermined_absolute", "predetermined_randomized"]:
-                cycle_range = entry.get("cycle_range", {})
-                start = cycle_range.get("start", 0)
-                end = cycle_range.get("end", 0)
-                for cycle_num in range(start, end + 1):
-                    predetermined_cycles.append(cycle_num)
-
+        # Get all predetermined cycles from protocol schedule (legacy and new modes)
+        predetermined_cycles = compiled.predetermined_cycles
         total_predetermined = len(predetermined_cycles)
 
         # Get completed samples from database
@@ -165,28 +125,23 @@ def get_predetermined_metrics(session_id: str) -> Dict[str, Any]:
         for cycle_num in predetermined_cycles:
             # Get expected concentrations from protocol
             # Try to get from predetermined_samples first (for predetermined_absolute mode)
-            expected_conc = get_predetermined_sample(protocol, cycle_num)
+            expected_conc = compiled.predetermined_sample(cycle_num)
 
             # If not found, try to get from sample bank (for predetermined_randomized mode)
             if expected_conc is None:
-                from robotaste.config.protocol_schema import get_sample_bank_config, get_schedule_index_for_cycle
                 from robotaste.core.sample_bank import get_next_sample_from_bank
 
-                bank_config = get_sample_bank_config(protocol, cycle_num)
-                schedule_index = get_schedule_index_for_cycle(protocol, cycle_num)
+                bank_config = compiled.sample_bank_config(cycle_num)
+                schedule_index = compiled.schedule_index(cycle_num)
 
                 if bank_config and schedule_index >= 0:
                     try:
-                        # Get cycle_range_start
-                        schedule_entry = schedule[schedule_index]
-                        cycle_range_start = schedule_entry.get("cycle_range", {}).get("start", 1)
-
                         expected_conc = get_next_sample_from_bank(
                             session_id,
                             schedule_index,
                             bank_config,
                             cycle_num,
-                            cycle_range_start
+                            compiled.cycle_range_start(cycle_num)
                         )
                     except Exception as e:
                         logger.warning(f"Could not get sample from bank for cycle {cycle_num}: {e}")
@@ -277,25 +232,8 @@ def get_user_selection_metrics(session_id: str) -> Dict[str, Any]:
         completed = len(user_samples)
 
         # Count total user_selected cycles from protocol
-        experiment_config = session.get("experiment_config", {})
-        protocol = None
-        if "sample_selection_schedule" in experiment_config:
-            protocol = experiment_config
-        else:
-            protocol_id = experiment_config.get("protocol_id")
-            if protocol_id:
-                from robotaste.data import protocol_repo
-                protocol_obj = protocol_repo.get_protocol_by_id(protocol_id)
-                if protocol_obj:
-                    protocol = protocol_obj.get("protocol_json", {})
-
-        total_user = 0
-        if protocol:
-            schedule = protocol.get("sample_selection_schedule", [])
-            for entry in schedule:
-                if entry.get("mode") == "user_selected":
-                    cycle_range = entry.get("cycle_range", {})
-                    total_user += cycle_range.get("end", 0) - cycle_range.get("start", 0) + 1
+        compiled = get_compiled_protocol_for_session(session)
+        total_user = compiled.mode_cycle_counts.get("user_selected", 0) if compiled else 0
 
         # Check for trajectory data (graceful fallback if missing)
         has_trajectory = False
@@ -408,27 +346,11 @@ def get_bo_mode_metrics(session_id: str) -> Dict[str, Any]:
 
         # Count total BO cycles from protocol
         experiment_config = session.get("experiment_config", {})
-        protocol = None
-        if "sample_selection_schedule" in experiment_config:
-            protocol = experiment_config
-        else:
-            protocol_id = experiment_config.get("protocol_id")
-            if protocol_id:
-                from robotaste.data import protocol_repo
-                protocol_obj = protocol_repo.get_protocol_by_id(protocol_id)
-                if protocol_obj:
-                    protocol = protocol_obj.get("protocol_json", {})
-
-        total_bo = 0
-        if protocol:
-            schedule = protocol.get("sample_selection_schedule", [])
-            for entry in schedule:
-                if entry.get("mode") == "bo_selected":
-                    cycle_range = entry.get("cycle_range", {})
-                    total_bo += cycle_range.get("end", 0) - cycle_range.get("start", 0) + 1
+        compiled = get_compiled_protocol_for_session(session)
+        total_bo = compiled.mode_cycle_counts.get("bo_selected", 0) if compiled else 0
 
         # Get convergence data (reuse existing functions)
-        convergence_metrics = get_convergence_metrics(session_id)
+        convergence_metrics = get_convergence_metrics(session_id, experiment_config)
 
         bo_config = experiment_config.get("bayesian_optimization", {})
         stopping_criteria = bo_config.get("stopping_criteria")
@@ -9,8 +9,13 @@ Date: January 2026
 """
 
 from dataclasses import dataclass, field
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional, Tuple
+import copy
+import hashlib
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +29,18 @@ DEFAULT_PHASES = [
     {"phase_id": "complete", "phase_type": "builtin", "required": True},
 ]
 
+# Fixed transitions inside the experiment loop (questionnaire depends on the cycle)
+LOOP_TRANSITIONS = {
+    "selection": "loading",
+    "cup_ready": "robot_preparing",
+    "loading": "questionnaire",
+    "robot_preparing": "questionnaire",
+}
+LOOP_PHASES = frozenset(LOOP_TRANSITIONS) | {"questionnaire"}
+
+# Maximum number of parsed phase sequences kept by get_phase_engine()
+MAX_CACHED_ENGINES = 64
+
 
 @dataclass
 class PhaseDefinition:
@@ -112,6 +129,57 @@ class PhaseEngine:
             )
             self.phase_sequence = self._parse_default_phases()
 
+        self._build_transition_table()
+
+    def _build_transition_table(self) -> None:
+        """Precompute phase lookups and sequential transitions.
+
+        Builds:
+        - _phase_index: phase_id → index of its first occurrence
+        - _next_index[skip_optional][i + 1]: index of the phase that follows
+          index i (i = -1 for phases not in the sequence), or None at the end
+        - _phase_after_loop: phase that follows the experiment_loop
+        """
+        self._phase_index: Dict[str, int] = {}
+        for idx, phase in enumerate(self.phase_sequence):
+            self._phase_index.setdefault(phase.phase_id, idx)
+
+        self._next_index: Dict[bool, List[Optional[int]]] = {}
+        for skip_optional in (False, True):
+            table: List[Optional[int]] = []
+            for current_idx in range(-1, len(self.phase_sequence)):
+                next_idx = current_idx + 1
+                while next_idx < len(self.phase_sequence):
+                    next_phase_def = self.phase_sequence[next_idx]
+                    if next_phase_def.phase_type == "loop":
+                        break
+                    if skip_optional and not next_phase_def.required:
+                        next_idx += 1
+                        continue
+                    break
+                table.append(next_idx if next_idx < len(self.phase_sequence) else None)
+            self._next_index[skip_optional] = table
+
+        loop_idx = self._phase_index.get("experiment_loop", -1)
+        if loop_idx != -1 and loop_idx + 1 < len(self.phase_sequence):
+            self._phase_after_loop = self.phase_sequence[loop_idx + 1].phase_id
+        else:
+            self._phase_after_loop = "completion"
+
+    def for_session(self, session_id: str) -> "PhaseEngine":
+        """Copy of this engine for another session, sharing the parsed tables.
+
+        Args:
+            session_id: Session ID for logging and state tracking
+
+        Returns:
+            PhaseEngine with its own transition counter
+        """
+        engine = copy.copy(self)
+        engine.session_id = session_id
+        engine.transition_count = 0
+        return engine
+
     def _parse_default_phases(self) -> List[PhaseDefinition]:
         """Parse DEFAULT_PHASES into PhaseDefinition objects.
 
@@ -189,10 +257,7 @@ class PhaseEngine:
         Returns:
             Index of phase in sequence, or -1 if not found
         """
-        for idx, phase in enumerate(self.phase_sequence):
-            if phase.phase_id == phase_id:
-                return idx
-        return -1
+        return self._phase_index.get(phase_id, -1)
 
     def _is_in_loop(self, phase_id: str) -> bool:
         """Check if phase is part of experiment loop.
@@ -205,7 +270,7 @@ class PhaseEngine:
         Returns:
             True if phase is part of loop
         """
-        return phase_id in ["loading", "questionnaire", "selection", "robot_preparing", "cup_ready"]
+        return phase_id in LOOP_PHASES
 
     def _should_stop_experiment(self, current_cycle: int) -> bool:
         """Determine if experiment should stop based on stopping criteria.
@@ -236,19 +301,8 @@ class PhaseEngine:
         Returns:
             Phase ID that follows the experiment_loop in sequence
         """
-        # Find experiment_loop in sequence
-        loop_idx = self._find_phase_index("experiment_loop")
-
-        if loop_idx == -1:
-            # No explicit loop phase, default to completion
-            return "completion"
-
-        # Return next phase after loop
-        if loop_idx + 1 < len(self.phase_sequence):
-            return self.phase_sequence[loop_idx + 1].phase_id
-
-        # No phase after loop, default to completion
-        return "completion"
+        # Precomputed: next phase after experiment_loop, or completion
+        return self._phase_after_loop
 
     def _get_next_loop_phase(self, current_phase: str, current_cycle: int) -> str:
         """Determine next phase within experiment loop.
@@ -261,12 +315,9 @@ class PhaseEngine:
             Next phase ID in loop
         """
         # Standard loop progression
-        if current_phase == "selection":
-            return "loading"
-        elif current_phase == "cup_ready":
-            return "robot_preparing"
-        elif current_phase == "loading" or current_phase == "robot_preparing":
-            return "questionnaire"
+        next_phase = LOOP_TRANSITIONS.get(current_phase)
+        if next_phase is not None:
+            return next_phase
         elif current_phase == "questionnaire":
             # Check if we should stop the experiment loop
             if self._should_stop_experiment(current_cycle):
@@ -333,39 +384,30 @@ class PhaseEngine:
                 # Default to going to next phase in sequence
                 current_idx = 0
 
-        # Find next phase
-        next_idx = current_idx + 1
-
-        while next_idx < len(self.phase_sequence):
-            next_phase_def = self.phase_sequence[next_idx]
-
-            # Check if this phase is the experiment loop
-            if next_phase_def.phase_type == "loop":
-                # Enter the loop - start with selection (prepare sample first)
-                logger.info(f"Session {self.session_id}: Entering experiment loop")
-                return "selection"
+        # Find next phase (optional phases already skipped in the table)
+        next_idx = self._next_index[skip_optional][current_idx + 1]
 
-            # If skipping optional phases and this phase is optional, skip it
-            if skip_optional and not next_phase_def.required:
-                logger.info(
-                    f"Session {self.session_id}: Skipping optional phase "
-                    f"{next_phase_def.phase_id}"
-                )
-                next_idx += 1
-                continue
-
-            # Found next phase
+        if next_idx is None:
+            # No more phases, go to completion
             logger.info(
-                f"Session {self.session_id}: Phase transition "
-                f"{current_phase} → {next_phase_def.phase_id}"
+                f"Session {self.session_id}: Reached end of sequence, going to completion"
             )
-            return next_phase_def.phase_id
+            return "completion"
+
+        next_phase_def = self.phase_sequence[next_idx]
+
+        # Check if this phase is the experiment loop
+        if next_phase_def.phase_type == "loop":
+            # Enter the loop - start with selection (prepare sample first)
+            logger.info(f"Session {self.session_id}: Entering experiment loop")
+            return "selection"
 
-        # No more phases, go to completion
+        # Found next phase
         logger.info(
-            f"Session {self.session_id}: Reached end of sequence, going to completion"
+            f"Session {self.session_id}: Phase transition "
+            f"{current_phase} → {next_phase_def.phase_id}"
         )
-        return "completion"
+        return next_phase_def.phase_id
 
     def should_auto_advance(self, current_phase: str) -> Tuple[bool, int]:
         """Check if phase should auto-advance.
@@ -429,3 +471,61 @@ class PhaseEngine:
             return phase_def.content
 
         return None
+
+
+# =============================================================================
+# Engine Cache
+# =============================================================================
+
+_engines: "OrderedDict[str, PhaseEngine]" = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def _engine_cache_key(protocol: Dict[str, Any]) -> str:
+    """Cache key: protocol_hash plus stopping_criteria (sessions may override it)."""
+    stopping_criteria = json.dumps(protocol.get("stopping_criteria"), sort_keys=True, default=str)
+    protocol_hash = protocol.get("protocol_hash")
+    if protocol_hash:
+        return f"{protocol_hash}:{stopping_criteria}"
+    phase_sequence = json.dumps(protocol.get("phase_sequence"), sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{phase_sequence}:{stopping_criteria}".encode("utf-8")
+    ).hexdigest()
+
+
+def get_phase_engine(protocol: Dict[str, Any], session_id: str) -> PhaseEngine:
+    """Get a PhaseEngine for a session, reusing the parsed protocol.
+
+    The phase sequence is parsed once per protocol version (protocol_hash,
+    or a hash of phase_sequence and stopping_criteria when there is none).
+    Each call returns a lightweight per-session copy with its own circuit
+    breaker counter.
+
+    Args:
+        protocol: Protocol dictionary (or session experiment_config)
+        session_id: Session ID for logging and state tracking
+
+    Returns:
+        PhaseEngine for the session
+    """
+    key = _engine_cache_key(protocol)
+
+    with _engines_lock:
+        template = _engines.get(key)
+        if template is not None:
+            _engines.move_to_end(key)
+
+    if template is None:
+        template = PhaseEngine(protocol, session_id)
+        with _engines_lock:
+            _engines[key] = template
+            while len(_engines) > MAX_CACHED_ENGINES:
+                _engines.popitem(last=False)
+
+    return template.for_session(session_id)
+
+
+def clear_phase_engine_cache() -> None:
+    """Drop all cached phase engines."""
+    with _engines_lock:
+        _engines.clear()
@@ -14,8 +14,14 @@ from typing import Dict, Optional, Any, List
 from robotaste.core.trials import prepare_cycle_sample
 from robotaste.core.calculations import calculate_stock_volumes
 from robotaste.data.protocol_repo import get_protocol_by_id
-from robotaste.data.database import get_database_connection
+from robotaste.data.database import get_database_connection, get_session
 from robotaste.utils.pump_db import create_pump_operation, get_current_operation_for_session
+from robotaste.core.pump_timing import DispenseTimingModel
+from robotaste.core.recipe_planner import (
+    find_diluent_pump,
+    get_planned_recipe,
+    matches_planned_concentrations,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -61,13 +67,19 @@ def _merge_pump_config_into_ingredients(ingredients: List[Dict[str, Any]], pump_
     return effective_ingredients
 
 
-def should_create_pump_operation(session_id: str, protocol: Dict[str, Any]) -> bool:
+def should_create_pump_operation(
+    session_id: str,
+    protocol: Dict[str, Any],
+    db_path: Optional[str] = None
+) -> bool:
     """
     Check if pump operation should be created for the current cycle.
 
     Args:
         session_id: Session ID
-        protocol: Protocol configuration
+        protocol: Protocol configuration (or a session's experiment_config,
+            which carries the protocol's pump_config)
+        db_path: Database path (optional)
 
     Returns:
         True if pump operation should be created
@@ -79,7 +91,7 @@ def should_create_pump_operation(session_id: str, protocol: Dict[str, Any]) -> b
         return False
 
     # Check if there's already a pending/in_progress operation for this session
-    existing_operation = get_current_operation_for_session(session_id)
+    existing_operation = get_current_operation_for_session(session_id, db_path=db_path)
     if existing_operation:
         logger.debug(f"Pump operation already exists for session {session_id}: {existing_operation['id']}")
         return False
@@ -111,6 +123,29 @@ def create_pump_operation_for_cycle(
         Operation ID if created, None otherwise
     """
     try:
+        # Planned cycles (predetermined / sample bank): insert the recipe
+        # computed at session start. The enabled check reads pump_config from
+        # the session's cached config snapshot, so the protocol isn't loaded.
+        planned = get_planned_recipe(session_id, cycle_number)
+        if planned and (
+            concentrations is None
+            or matches_planned_concentrations(concentrations, planned["concentrations"])
+        ):
+            session = get_session(session_id)
+            experiment_config = session["experiment_config"] if session else {}
+            if not should_create_pump_operation(session_id, experiment_config, db_path=db_path):
+                return None
+
+            operation_id = create_pump_operation(
+                session_id=session_id,
+                cycle_number=cycle_number,
+                trial_number=trial_number,
+                recipe_json=planned["recipe_json"],
+                db_path=db_path
+            )
+            logger.info(f"Created pump operation {operation_id} from planned recipe: {planned['recipe_json']}")
+            return operation_id
+
         # Get protocol
         with get_database_connection() as conn:
             cursor = conn.cursor()
@@ -132,7 +167,7 @@ def create_pump_operation_for_cycle(
             return None
 
         # Check if pump operation should be created
-        if not should_create_pump_operation(session_id, protocol):
+        if not should_create_pump_operation(session_id, protocol, db_path=db_path):
             return None
 
         logger.info(f"Creating pump operation for session {session_id}, cycle {cycle_number}")
@@ -171,21 +206,7 @@ def create_pump_operation_for_cycle(
             # This might happen for a zero-concentration sample
 
         # Check if there's a water/diluent pump and calculate dilution volume
-        pump_configs = pump_config.get("pumps", [])
-
-        # Find water/diluent pump
-        water_pump = None
-        for pump_cfg in pump_configs:
-            ingredient_name = pump_cfg.get("ingredient", "")
-            # Check if this is water or a diluent
-            if ingredient_name.lower() == "water":
-                water_pump = ingredient_name
-                break
-            # Also check in ingredients list for is_diluent flag
-            for ing in ingredients:
-                if ing.get("name") == ingredient_name and ing.get("is_diluent", False):
-                    water_pump = ingredient_name
-                    break
+        water_pump = find_diluent_pump(pump_config, ingredients)
 
         # If water pump exists, calculate dilution volume
         if water_pump:
@@ -293,7 +314,8 @@ def get_pump_operation_for_cycle(session_id: str, cycle_number: int) -> Optional
 def calculate_total_pump_time(
     recipe_volumes: Dict[str, float],
     pump_config: Dict[str, Any],
-    buffer_percent: float = 10.0
+    buffer_percent: float = 10.0,
+    timing_model: Optional[DispenseTimingModel] = None
 ) -> float:
     """
     Calculate total time needed for pump operation.
@@ -301,11 +323,19 @@ def calculate_total_pump_time(
     Args:
         recipe_volumes: {"Sugar": 125.0, "Salt": 40.0} in µL
         pump_config: Pump configuration from protocol
-        buffer_percent: Safety buffer (default 10%)
+        buffer_percent: Safety buffer (default 10%), used without a timing model
+        timing_model: Model fitted from dispense history (optional). When given,
+            its prediction (including per-operation overhead) is returned
+            instead of volume/rate plus buffer.
 
     Returns:
         Total time in seconds needed for dispensing
     """
+    if timing_model is not None:
+        expected, _ = timing_model.predict(recipe_volumes, pump_config)
+        logger.debug(f"Predicted pump time from history: {expected:.2f}s")
+        return expected
+
     dispensing_rate = pump_config.get("dispensing_rate_ul_min", 2000)
     simultaneous = pump_config.get("simultaneous_dispensing", True)
 
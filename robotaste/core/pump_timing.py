@@ -0,0 +1,319 @@
+"""
+Dispense Timing Model
+
+Predicts how long a dispense operation takes from the history in
+pump_operations (started_at → completed_at) instead of a flat
+volume/rate + 10% guess.
+
+For every completed operation the nominal pumping time of each pump is
+commanded_volume / rate. Per dispensing mode the model fits
+
+    sequential:            duration = overhead + Σ slope[address] · nominal[address]
+    simultaneous / burst:  duration = overhead + slope[a*] · nominal[a*]
+
+where a* is the pump with the longest nominal time. Both are linear, so the
+fit keeps only the normal-equation sums and refreshes incrementally from the
+last operation it has seen. A ridge prior pulls every parameter toward
+"no overhead, slope 1", so pumps without history fall back to the nominal
+rate.
+
+Operation durations contain the service's own completion wait, so they only
+feed progress/ETA predictions (predict()). Completion waits (pump_wait()) are
+sized from a second fit on pump_run_s, the run time measured by polling the
+pumps until they report stopped. Operations whose wait ran out before the
+pumps stopped record NULL there and are left out, so waits are never fitted
+to earlier waits, and they never exceed nominal + FALLBACK_BUFFER.
+
+All durations are in seconds; volumes in µL.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODES = ("burst", "simultaneous", "sequential")
+
+# Strength of the pull toward overhead=0, slope=1 (in pseudo-observations)
+PRIOR_WEIGHT = 1.0
+# Fitted margins are used only once a mode has this many observations
+MIN_SAMPLES = 5
+# Confidence multiplier on the residual std used for waits
+MARGIN_SIGMAS = 2.0
+# Margin when there is not enough history (the historical flat buffer)
+FALLBACK_BUFFER = 0.10
+# Durations beyond this multiple of nominal (+1 min) are operator pauses, not data
+OUTLIER_FACTOR = 10.0
+# Minimum time between database refreshes of a cached model
+REFRESH_INTERVAL_S = 5.0
+
+
+def dispense_mode(pump_config: Dict[str, Any]) -> str:
+    """
+    Dispensing mode the pump service uses for a pump configuration.
+
+    Returns:
+        "burst", "simultaneous" or "sequential"
+    """
+    simultaneous = pump_config.get("simultaneous_dispensing", False)
+    addresses = [cfg.get("address", 0) for cfg in pump_config.get("pumps", [])]
+    burst_compatible = all(addr <= 9 for addr in addresses)
+
+    if pump_config.get("use_burst_mode", False) and burst_compatible and simultaneous:
+        return "burst"
+    return "simultaneous" if simultaneous else "sequential"
+
+
+def nominal_pump_times(
+    recipe_volumes: Dict[str, float],
+    pump_config: Dict[str, Any]
+) -> Dict[int, float]:
+    """
+    Nominal pumping time per pump address (commanded volume / rate).
+
+    Dual-syringe pumps are commanded half the recipe volume. Ingredients
+    without a configured pump or with no volume are skipped.
+
+    Returns:
+        {pump_address: seconds}
+    """
+    rate = pump_config.get("dispensing_rate_ul_min", 2000)
+    cfg_by_ingredient = {
+        cfg.get("ingredient"): cfg
+        for cfg in pump_config.get("pumps", [])
+        if cfg.get("ingredient")
+    }
+
+    times: Dict[int, float] = {}
+    for ingredient, volume_ul in recipe_volumes.items():
+        cfg = cfg_by_ingredient.get(ingredient)
+        if cfg is None or not volume_ul or volume_ul <= 0:
+            continue
+        commanded = volume_ul / 2 if cfg.get("dual_syringe", False) else volume_ul
+        address = cfg.get("address", 0)
+        times[address] = times.get(address, 0.0) + commanded / rate * 60.0
+    return times
+
+
+class _ModeFit:
+    """Normal-equation sums and fitted parameters for one dispensing mode."""
+
+    def __init__(self):
+        self.addresses: List[int] = []  # Parameter i+1 is the slope of addresses[i]
+        self.xtx = np.zeros((1, 1))
+        self.xty = np.zeros(1)
+        self.yty = 0.0
+        self.n = 0
+        self.theta = np.array([0.0])
+        self.sigma = 0.0
+
+    def _index(self, address: int) -> int:
+        if address not in self.addresses:
+            self.addresses.append(address)
+            self.xtx = np.pad(self.xtx, ((0, 1), (0, 1)))
+            self.xty = np.pad(self.xty, (0, 1))
+            self.theta = np.append(self.theta, 1.0)
+        return self.addresses.index(address) + 1
+
+    def features(self, nominal: Dict[int, float], parallel: bool) -> np.ndarray:
+        if parallel and nominal:
+            address = max(nominal, key=nominal.get)
+            nominal = {address: nominal[address]}
+        indices = {address: self._index(address) for address in nominal}
+        x = np.zeros(len(self.theta))
+        x[0] = 1.0
+        for address, seconds in nominal.items():
+            x[indices[address]] = seconds
+        return x
+
+    def add(self, x: np.ndarray, y: float) -> None:
+        self.xtx += np.outer(x, x)
+        self.xty += x * y
+        self.yty += y * y
+        self.n += 1
+
+    def solve(self) -> None:
+        k = len(self.xty)
+        prior = np.ones(k)
+        prior[0] = 0.0
+        # Scale the ridge per parameter so PRIOR_WEIGHT means pseudo-observations
+        scale = np.maximum(np.diag(self.xtx) / max(self.n, 1), 1.0)
+        ridge = np.diag(PRIOR_WEIGHT * scale)
+        self.theta = np.linalg.solve(self.xtx + ridge, self.xty + ridge @ prior)
+
+        sse = self.yty - 2 * self.theta @ self.xty + self.theta @ self.xtx @ self.theta
+        dof = max(self.n - k, 1)
+        self.sigma = float(np.sqrt(max(sse, 0.0) / dof))
+
+    def slope(self, address: int) -> float:
+        if address in self.addresses:
+            return float(self.theta[self.addresses.index(address) + 1])
+        return 1.0
+
+
+class DispenseTimingModel:
+    """
+    Timing model fitted from completed pump operations in one database.
+
+    Call refresh() to fold in operations completed since the last refresh.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Refresh watermark: (completed_at, id) of the last operation read.
+        # Ordered by completion, not id, since ports finish out of order.
+        self.last_completed: Tuple[str, int] = ("", 0)
+        self.fits: Dict[str, _ModeFit] = {mode: _ModeFit() for mode in MODES}
+        # Measured pump run times only (pump_run_s), for completion waits
+        self.run_fits: Dict[str, _ModeFit] = {mode: _ModeFit() for mode in MODES}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+    def refresh(self) -> int:
+        """
+        Read operations completed since the last refresh and refit.
+
+        Returns:
+            Number of new observations
+        """
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT po.id, po.recipe_json, po.actual_volumes_json,
+                           po.started_at, po.completed_at, po.pump_run_s,
+                           pl.protocol_json
+                    FROM pump_operations po
+                    JOIN sessions s ON s.session_id = po.session_id
+                    JOIN protocol_library pl ON pl.protocol_id = s.protocol_id
+                    WHERE po.status = 'completed'
+                      AND (po.completed_at, po.id) > (?, ?)
+                    ORDER BY po.completed_at, po.id
+                    """,
+                    self.last_completed
+                ).fetchall()
+            finally:
+                conn.close()
+
+            pump_configs: Dict[str, Dict[str, Any]] = {}
+            touched = set()
+            added = 0
+
+            for row in rows:
+                self.last_completed = (row["completed_at"], row["id"])
+                try:
+                    duration = (
+                        datetime.fromisoformat(row["completed_at"])
+                        - datetime.fromisoformat(row["started_at"])
+                    ).total_seconds()
+                    if row["protocol_json"] not in pump_configs:
+                        pump_configs[row["protocol_json"]] = json.loads(
+                            row["protocol_json"]
+                        ).get("pump_config", {})
+                    pump_config = pump_configs[row["protocol_json"]]
+                    volumes = json.loads(row["actual_volumes_json"] or row["recipe_json"])
+                except (TypeError, ValueError):
+                    continue
+
+                nominal = nominal_pump_times(volumes, pump_config)
+                if not nominal or duration <= 0:
+                    continue
+                if duration > OUTLIER_FACTOR * sum(nominal.values()) + 60.0:
+                    continue
+
+                mode = dispense_mode(pump_config)
+                parallel = mode != "sequential"
+                fit = self.fits[mode]
+                fit.add(fit.features(nominal, parallel), duration)
+                run_s = row["pump_run_s"]
+                if run_s is not None and 0 < run_s <= OUTLIER_FACTOR * sum(nominal.values()) + 60.0:
+                    run_fit = self.run_fits[mode]
+                    run_fit.add(run_fit.features(nominal, parallel), run_s)
+                touched.add(mode)
+                added += 1
+
+            for mode in touched:
+                self.fits[mode].solve()
+                if self.run_fits[mode].n:
+                    self.run_fits[mode].solve()
+
+            self._last_refresh = time.monotonic()
+
+        if added:
+            logger.debug(f"Dispense timing model: +{added} operations (up to {self.last_completed[0]})")
+        return added
+
+    def predict(
+        self,
+        recipe_volumes: Dict[str, float],
+        pump_config: Dict[str, Any]
+    ) -> Tuple[float, float]:
+        """
+        Predict the duration of a whole dispense operation.
+
+        Returns:
+            (expected_seconds, residual_std_seconds)
+        """
+        nominal = nominal_pump_times(recipe_volumes, pump_config)
+        if not nominal:
+            return 0.0, 0.0
+
+        mode = dispense_mode(pump_config)
+        fit = self.fits[mode]
+        parallel = mode != "sequential"
+        with self._lock:
+            if parallel:
+                address = max(nominal, key=nominal.get)
+                nominal = {address: nominal[address]}
+            pumping = sum(fit.slope(a) * t for a, t in nominal.items())
+            overhead = float(fit.theta[0]) if fit.n else 0.0
+            return max(overhead + pumping, 0.0), fit.sigma
+
+    def pump_wait(self, mode: str, address: int, nominal_s: float) -> float:
+        """
+        How long to let one pump run before stopping it.
+
+        Learned only from measured run times (pump_run_s). Never shorter than
+        the nominal time and never longer than nominal plus the flat buffer
+        used before; within that, the fitted slope plus a margin of the
+        residual spread once the mode has enough measurements.
+        """
+        fit = self.run_fits[mode]
+        with self._lock:
+            limit = nominal_s * (1.0 + FALLBACK_BUFFER)
+            if fit.n < MIN_SAMPLES:
+                return limit
+            expected = max(nominal_s, fit.slope(address) * nominal_s)
+            margin = min(MARGIN_SIGMAS * fit.sigma, nominal_s * FALLBACK_BUFFER)
+            return min(expected + margin, limit)
+
+
+_models: Dict[str, DispenseTimingModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_timing_model(db_path: str) -> DispenseTimingModel:
+    """
+    Shared timing model for a database, refreshed at most every REFRESH_INTERVAL_S.
+    """
+    with _models_lock:
+        model = _models.get(db_path)
+        if model is None:
+            model = DispenseTimingModel(db_path)
+            _models[db_path] = model
+
+    if time.monotonic() - model._last_refresh >= REFRESH_INTERVAL_S:
+        try:
+            model.refresh()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not refresh dispense timing model: {e}")
+    return model
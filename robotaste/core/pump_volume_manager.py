@@ -2,14 +2,17 @@
 Pump Volume Tracking Manager
 
 Manages cross-session volume tracking for syringe pumps via the pump_global_state
-table. Provides global volume initialization, dispense decrement, refill updates,
-and status queries.
+table. Provides global volume initialization, dispense decrement (optionally in
+the same transaction that completes the operation), refill updates, and status
+queries.
 
 All volumes are in microliters (µL) to match database/UI conventions.
 """
 
+import json
 import sqlite3
 import logging
+from datetime import datetime
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -199,6 +202,87 @@ def update_global_volume_after_dispense(
         logger.error(f"Failed to update global volume after dispense: {e}")
 
 
+def complete_dispense_operation(
+    db_path: str,
+    operation_id: int,
+    session_id: str,
+    actual_volumes: Dict[str, float],
+    pump_config: Dict[str, Any],
+    completed_at: Optional[str] = None,
+    pump_run_s: Optional[float] = None
+) -> bool:
+    """
+    Mark a dispense operation completed and decrement global volumes atomically.
+
+    One connection and one transaction: the operation row and the
+    pump_global_state row of every dispensed pump are updated together, so a
+    crash can never leave a completed operation without its volume decrement
+    (or the reverse). The protocol is resolved from the session inside the
+    transaction.
+
+    Args:
+        db_path: Path to SQLite database
+        operation_id: pump_operations row to complete
+        session_id: Session that owns the operation
+        actual_volumes: Dispensed volume per ingredient (µL)
+        pump_config: pump_config of the already-loaded protocol
+        completed_at: Completion timestamp (ISO format, default now)
+        pump_run_s: Measured pumping time (None if the pumps were not seen
+            stopping before the wait ran out)
+
+    Returns:
+        True if committed, False if the transaction was rolled back
+    """
+    completed_at = completed_at or datetime.now().isoformat()
+    decrements = []
+    for pump_def in pump_config.get("pumps", []):
+        address = pump_def.get("address")
+        volume = actual_volumes.get(pump_def.get("ingredient"))
+        if address is not None and volume is not None:
+            decrements.append((volume, volume, session_id, session_id, address))
+
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute("""
+            UPDATE pump_operations
+            SET status = 'completed', completed_at = ?, actual_volumes_json = ?, pump_run_s = ?
+            WHERE id = ?
+        """, (
+            completed_at,
+            json.dumps(actual_volumes) if actual_volumes else None,
+            pump_run_s,
+            operation_id,
+        ))
+
+        cursor.executemany("""
+            UPDATE pump_global_state
+            SET current_volume_ul = MAX(0, current_volume_ul - ?),
+                total_dispensed_ul = total_dispensed_ul + ?,
+                last_dispensed_at = CURRENT_TIMESTAMP,
+                last_session_id = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE protocol_id = (SELECT protocol_id FROM sessions WHERE session_id = ?)
+              AND pump_address = ?
+        """, decrements)
+
+        cursor.execute("COMMIT")
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to complete dispense operation {operation_id}: {e}")
+        if conn is not None and conn.in_transaction:
+            conn.execute("ROLLBACK")
+        return False
+
+    finally:
+        if conn is not None:
+            conn.close()
+
+
 def update_global_volume_after_refill(
     db_path: str,
     protocol_id: str,
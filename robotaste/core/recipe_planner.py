@@ -0,0 +1,316 @@
+"""
+Session Recipe Planner for RoboTaste
+
+For predetermined and sample-bank cycles the whole concentration sequence is
+known when a session starts. plan_session_recipes() turns that sequence into
+pump recipes (stock + diluent volumes per cycle) in one vectorized pass,
+checks them against syringe capacity and the pumps' current global volumes,
+and stores them in session_cycle_recipes.
+
+create_pump_operation_for_cycle() then only inserts the stored recipe for
+those cycles instead of reloading the protocol and recomputing volumes.
+Cycles chosen at runtime (user_selected, bo_selected) are not planned and keep
+the per-cycle path.
+
+Author: RoboTaste Team
+Version: 1.0
+"""
+
+import json
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from robotaste.core.calculations import calculate_stock_volumes_batch
+from robotaste.core.compiled_protocol import compile_protocol
+from robotaste.core.sample_bank import get_session_sample_sequence
+from robotaste.data.database import get_database_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOTAL_VOLUME_ML = 10.0
+DEFAULT_SYRINGE_CAPACITY_UL = 60000.0
+
+
+def find_diluent_pump(pump_config: Dict[str, Any], ingredients: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Find the pump that tops samples up to the total volume.
+
+    A pump whose ingredient is "water" wins; otherwise the last pump whose
+    ingredient is flagged is_diluent.
+
+    Args:
+        pump_config: Pump configuration dictionary
+        ingredients: Ingredient configurations
+
+    Returns:
+        Ingredient name of the diluent pump, or None
+    """
+    diluents = {ing.get("name") for ing in ingredients if ing.get("is_diluent", False)}
+    diluent_pump = None
+
+    for pump_cfg in pump_config.get("pumps", []):
+        ingredient_name = pump_cfg.get("ingredient", "")
+        if ingredient_name.lower() == "water":
+            return ingredient_name
+        if ingredient_name in diluents:
+            diluent_pump = ingredient_name
+
+    return diluent_pump
+
+
+def get_known_concentration_sequence(
+    session_id: str,
+    protocol: Dict[str, Any]
+) -> Dict[int, Dict[str, float]]:
+    """
+    Concentrations of every cycle that is fixed before the session starts.
+
+    Combines the protocol's predetermined samples with the session's
+    materialized sample-bank sequence (see materialize_session_samples).
+
+    Returns:
+        {cycle_number: {ingredient_name: mM}} in cycle order
+    """
+    sequence = {
+        cycle: concentrations
+        for cycle, concentrations in compile_protocol(protocol).predetermined_samples.items()
+        if concentrations
+    }
+    for cycle, concentrations in get_session_sample_sequence(session_id).items():
+        sequence.setdefault(cycle, concentrations)
+
+    return dict(sorted(sequence.items()))
+
+
+def compute_recipes(
+    sequence: Dict[int, Dict[str, float]],
+    protocol: Dict[str, Any]
+) -> Tuple[List[int], List[Dict[str, float]], List[str]]:
+    """
+    Compute the pump recipe of every cycle in a sequence at once.
+
+    Volumes come from calculate_stock_volumes_batch with stock
+    concentrations taken from the pump configuration, and the diluent pump
+    receives the remainder of the total volume.
+
+    Args:
+        sequence: {cycle_number: {ingredient_name: mM}}
+        protocol: Protocol dict with ingredients and pump_config
+
+    Returns:
+        (cycles, recipes, warnings) where recipes[i] is
+        {ingredient_name: volume_ul} for cycles[i]
+    """
+    cycles = list(sequence)
+    if not cycles:
+        return [], [], []
+
+    ingredients = protocol.get("ingredients", [])
+    pump_config = protocol.get("pump_config") or {}
+    total_volume_ml = pump_config.get("total_volume_ml", DEFAULT_TOTAL_VOLUME_ML)
+
+    # Column order: first appearance across the sequence (keeps recipe key order)
+    names: List[str] = []
+    for concentrations in sequence.values():
+        names.extend(name for name in concentrations if name not in names)
+    column = {name: idx for idx, name in enumerate(names)}
+
+    # Stock concentrations: pump config overrides the ingredient list
+    stock = {ing.get("name"): ing.get("stock_concentration_mM") for ing in ingredients}
+    for pump_def in pump_config.get("pumps", []):
+        if pump_def.get("ingredient") in stock and pump_def.get("stock_concentration_mM") is not None:
+            stock[pump_def["ingredient"]] = pump_def["stock_concentration_mM"]
+    stock_vector = np.array(
+        [stock.get(name) if stock.get(name) is not None else np.nan for name in names],
+        dtype=float
+    )
+
+    desired = np.full((len(cycles), len(names)), np.nan)
+    for row, concentrations in enumerate(sequence.values()):
+        for name, value in concentrations.items():
+            desired[row, column[name]] = value
+
+    result = calculate_stock_volumes_batch(desired, stock_vector, total_volume_ml)
+    volumes = result["stock_volumes"]
+    present = ~np.isnan(desired) & ~np.isnan(volumes)
+    diluent_volumes = result["water_volume"]
+
+    diluent_pump = find_diluent_pump(pump_config, ingredients)
+    recipes: List[Dict[str, float]] = []
+    warnings: List[str] = []
+
+    for row, col in zip(*np.nonzero(np.isnan(volumes))):
+        warnings.append(f"Cycle {cycles[row]}: {names[col]} has no stock concentration to dilute from")
+
+    for row, cycle in enumerate(cycles):
+        recipe = {names[col]: float(volumes[row, col]) for col in np.flatnonzero(present[row])}
+        if diluent_pump:
+            if diluent_volumes[row] > 0:
+                recipe[diluent_pump] = float(diluent_volumes[row])
+            elif diluent_volumes[row] < 0:
+                warnings.append(
+                    f"Cycle {cycle}: stock volumes exceed total volume by {-diluent_volumes[row]:.1f} µL"
+                )
+        recipes.append(recipe)
+
+    return cycles, recipes, warnings
+
+
+def check_recipes_against_pumps(
+    cycles: List[int],
+    recipes: List[Dict[str, float]],
+    protocol: Dict[str, Any],
+    global_state: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Check planned recipes against syringe capacity and current pump volumes.
+
+    Args:
+        cycles: Planned cycle numbers, ascending
+        recipes: Recipe per cycle ({ingredient_name: volume_ul})
+        protocol: Protocol dict with pump_config
+        global_state: Output of get_global_volume_status (optional)
+
+    Returns:
+        (pumps, warnings) where pumps maps ingredient name to
+        {"planned_ul", "current_ul", "max_capacity_ul", "refill_before_cycle"};
+        refill_before_cycle is the first cycle the current volume cannot
+        cover, or None
+    """
+    global_state = global_state or {}
+    pumps: Dict[str, Dict[str, Any]] = {}
+    warnings: List[str] = []
+
+    for pump_def in (protocol.get("pump_config") or {}).get("pumps", []):
+        ingredient = pump_def.get("ingredient")
+        if not ingredient:
+            continue
+
+        capacity_ul = pump_def.get("syringe_capacity_ul", DEFAULT_SYRINGE_CAPACITY_UL)
+        if pump_def.get("dual_syringe", False):
+            capacity_ul *= 2
+        state = global_state.get(ingredient, {})
+        capacity_ul = state.get("max_capacity_ul", capacity_ul)
+        current_ul = state.get("current_ul")
+
+        per_cycle = np.array([recipe.get(ingredient, 0.0) for recipe in recipes], dtype=float)
+        cumulative = np.cumsum(per_cycle)
+
+        too_large = np.flatnonzero(per_cycle > capacity_ul)
+        if too_large.size:
+            warnings.append(
+                f"{ingredient}: cycle {cycles[too_large[0]]} needs {per_cycle[too_large[0]]:.1f} µL, "
+                f"more than the syringe capacity ({capacity_ul:.1f} µL)"
+            )
+
+        refill_before_cycle = None
+        if current_ul is not None:
+            short = np.flatnonzero(cumulative > current_ul)
+            if short.size:
+                refill_before_cycle = cycles[short[0]]
+                warnings.append(
+                    f"{ingredient}: {current_ul:.1f} µL loaded, refill needed before cycle "
+                    f"{refill_before_cycle} ({cumulative[-1]:.1f} µL planned)"
+                )
+
+        pumps[ingredient] = {
+            "planned_ul": float(cumulative[-1]) if cumulative.size else 0.0,
+            "current_ul": current_ul,
+            "max_capacity_ul": capacity_ul,
+            "refill_before_cycle": refill_before_cycle,
+        }
+
+    return pumps, warnings
+
+
+def plan_session_recipes(
+    session_id: str,
+    protocol: Dict[str, Any],
+    global_state: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Precompute and store the pump recipes of a session's known cycles.
+
+    Call after materialize_session_samples so sample-bank cycles are
+    included. Replanning is safe: rows are rewritten.
+
+    Args:
+        session_id: Session ID
+        protocol: Full protocol dict (ingredients, pump_config, schedule)
+        global_state: Current pump volumes (get_global_volume_status output)
+
+    Returns:
+        {"cycles": [...], "pumps": {...}, "warnings": [...]}; empty when
+        pump control is disabled
+    """
+    pump_config = protocol.get("pump_config") or {}
+    if not pump_config.get("enabled", False):
+        return {"cycles": [], "pumps": {}, "warnings": []}
+
+    sequence = get_known_concentration_sequence(session_id, protocol)
+    cycles, recipes, warnings = compute_recipes(sequence, protocol)
+    pumps, pump_warnings = check_recipes_against_pumps(cycles, recipes, protocol, global_state)
+    warnings.extend(pump_warnings)
+
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM session_cycle_recipes WHERE session_id = ?", (session_id,))
+        cursor.executemany(
+            """
+            INSERT INTO session_cycle_recipes
+            (session_id, cycle_number, concentrations, recipe_json)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (session_id, cycle, json.dumps(sequence[cycle]), json.dumps(recipe))
+                for cycle, recipe in zip(cycles, recipes)
+            ]
+        )
+        conn.commit()
+
+    for warning in warnings:
+        logger.warning(f"Session {session_id} recipe plan: {warning}")
+
+    return {"cycles": cycles, "pumps": pumps, "warnings": warnings}
+
+
+def get_planned_recipe(session_id: str, cycle_number: int) -> Optional[Dict[str, Any]]:
+    """
+    Read a cycle's planned recipe.
+
+    Returns:
+        {"concentrations": {...}, "recipe_json": str} or None if the cycle
+        was not planned
+    """
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT concentrations, recipe_json
+            FROM session_cycle_recipes
+            WHERE session_id = ? AND cycle_number = ?
+            """,
+            (session_id, cycle_number)
+        )
+        row = cursor.fetchone()
+
+    if not row:
+        return None
+
+    return {"concentrations": json.loads(row[0]), "recipe_json": row[1]}
+
+
+def matches_planned_concentrations(
+    concentrations: Dict[str, float],
+    planned: Dict[str, float]
+) -> bool:
+    """True if runtime concentrations are the ones a recipe was planned for."""
+    if concentrations.keys() != planned.keys():
+        return False
+    return all(
+        math.isclose(float(concentrations[name]), float(planned[name]), rel_tol=1e-9, abs_tol=1e-9)
+        for name in planned
+    )
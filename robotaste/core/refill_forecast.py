@@ -0,0 +1,249 @@
+"""
+Refill Forecasting for RoboTaste
+
+Predicts when each pump of a protocol runs dry, so syringes can be refilled
+between participants instead of stalling a cycle. The forecast combines:
+
+- current volumes from pump_global_state
+- remaining recipes of the protocol's running sessions (started, and either
+  updated recently or waiting on a pump operation): the recipes planned at
+  session start (session_cycle_recipes) where available, otherwise the
+  expected volume of the cycle
+- expected per-cycle volumes: predetermined samples exactly, sample banks as
+  the mean of the bank, runtime-selected cycles from the protocol's completed
+  pump operations
+
+All volumes are in microliters (µL) to match pump_volume_manager.
+"""
+
+import json
+import logging
+import math
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from robotaste.core.compiled_protocol import compile_protocol
+from robotaste.core.recipe_planner import compute_recipes
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent completed operations used for the historical average
+HISTORY_OPERATIONS = 200
+
+# Started sessions idle for longer than this (and with no pending pump
+# operation) are treated as abandoned and no longer reserve stock
+SESSION_IDLE_HOURS = 12
+
+
+def forecast_refills(
+    db_path: str,
+    protocol_id: str,
+    protocol: Dict[str, Any],
+    global_state: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Forecast when each pump of a protocol needs a refill.
+
+    Args:
+        db_path: Path to SQLite database
+        protocol_id: Protocol identifier
+        protocol: Full protocol dict
+        global_state: Output of get_global_volume_status / get_or_create_global_state
+
+    Returns:
+        Dict keyed by ingredient name:
+        {
+            "Sugar": {
+                "current_ul": 39000,
+                "committed_ul": 4200,          # remaining cycles of active sessions
+                "runs_dry_at": {"session_id": "abc-123", "cycle_number": 7} or None,
+                "mean_cycle_ul": 310.5,        # expected use per cycle
+                "session_estimate_ul": 6210.0, # expected use of a full session
+                "full_sessions_remaining": 5,  # after the active sessions (None if unknown)
+                "refill_recommended": False
+            }
+        }
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        history = _fetch_history_mean(cursor, protocol_id)
+        remaining = _fetch_remaining_cycles(cursor, protocol_id, _total_cycles(protocol))
+        conn.close()
+    except Exception as e:
+        logger.error(f"Failed to load refill forecast data: {e}")
+        return {}
+
+    expected = expected_cycle_volumes(protocol, history)
+    session_estimate = _sum_recipes(expected.values())
+
+    # Remaining consumption of the active sessions, in cycle order
+    events: List[Tuple[int, str, Dict[str, float]]] = []
+    for session_id, cycles in remaining.items():
+        for cycle_number, planned in cycles:
+            events.append((cycle_number, session_id, planned or expected.get(cycle_number, {})))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    forecast = {}
+    for ingredient, state in global_state.items():
+        current_ul = state.get("current_ul", 0.0)
+        per_event = np.array([recipe.get(ingredient, 0.0) for _, _, recipe in events], dtype=float)
+        cumulative = np.cumsum(per_event)
+
+        runs_dry_at = None
+        short = np.flatnonzero(cumulative > current_ul)
+        if short.size:
+            cycle_number, session_id, _ = events[short[0]]
+            runs_dry_at = {"session_id": session_id, "cycle_number": cycle_number}
+
+        committed_ul = float(cumulative[-1]) if cumulative.size else 0.0
+        per_session = session_estimate.get(ingredient, 0.0)
+        full_sessions_remaining = (
+            max(0, math.floor((current_ul - committed_ul) / per_session)) if per_session > 0 else None
+        )
+        cycle_volumes = [recipe.get(ingredient, 0.0) for recipe in expected.values()]
+
+        forecast[ingredient] = {
+            "current_ul": current_ul,
+            "committed_ul": committed_ul,
+            "runs_dry_at": runs_dry_at,
+            "mean_cycle_ul": float(np.mean(cycle_volumes)) if cycle_volumes else 0.0,
+            "session_estimate_ul": per_session,
+            "full_sessions_remaining": full_sessions_remaining,
+            "refill_recommended": runs_dry_at is not None or full_sessions_remaining == 0,
+        }
+
+    return forecast
+
+
+def expected_cycle_volumes(
+    protocol: Dict[str, Any],
+    history_mean: Optional[Dict[str, float]] = None
+) -> Dict[int, Dict[str, float]]:
+    """
+    Expected recipe of every cycle of a full session.
+
+    Predetermined cycles use their exact recipe, sample-bank cycles the mean
+    recipe of the bank, and other cycles the historical mean (if any).
+
+    Args:
+        protocol: Full protocol dict
+        history_mean: Mean volume per ingredient of completed operations
+
+    Returns:
+        {cycle_number: {ingredient_name: volume_ul}} for cycles 1..N
+    """
+    compiled = compile_protocol(protocol)
+    expected = {cycle: dict(history_mean or {}) for cycle in range(1, _total_cycles(protocol) + 1)}
+
+    for entry in compiled.schedule:
+        bank = entry.get("sample_bank") or {}
+        if entry.get("mode") != "predetermined_randomized" or not bank.get("samples"):
+            continue
+        _, recipes, _ = compute_recipes(
+            {idx: s.get("concentrations") or {} for idx, s in enumerate(bank["samples"])},
+            protocol
+        )
+        bank_mean = {name: total / len(recipes) for name, total in _sum_recipes(recipes).items()}
+        cycle_range = entry.get("cycle_range", {})
+        for cycle in range(cycle_range.get("start", 1), cycle_range.get("end", 0) + 1):
+            if cycle in expected:
+                expected[cycle] = bank_mean
+
+    cycles, recipes, _ = compute_recipes(compiled.predetermined_samples, protocol)
+    for cycle, recipe in zip(cycles, recipes):
+        if cycle in expected:
+            expected[cycle] = recipe
+
+    return expected
+
+
+def _total_cycles(protocol: Dict[str, Any]) -> int:
+    """Cycles in a full session: stopping_criteria.max_cycles, else the schedule end."""
+    max_cycles = (protocol.get("stopping_criteria") or {}).get("max_cycles")
+    if max_cycles:
+        return int(max_cycles)
+    ends = [
+        entry.get("cycle_range", {}).get("end", 0)
+        for entry in protocol.get("sample_selection_schedule", [])
+    ]
+    return max(ends, default=0)
+
+
+def _sum_recipes(recipes) -> Dict[str, float]:
+    totals: Dict[str, float] = {}
+    for recipe in recipes:
+        for name, volume in recipe.items():
+            totals[name] = totals.get(name, 0.0) + volume
+    return totals
+
+
+def _fetch_history_mean(cursor: sqlite3.Cursor, protocol_id: str) -> Dict[str, float]:
+    """Mean volume per ingredient over the protocol's recent completed operations."""
+    cursor.execute("""
+        SELECT o.recipe_json
+        FROM pump_operations o
+        JOIN sessions s ON s.session_id = o.session_id
+        WHERE s.protocol_id = ? AND o.status = 'completed'
+        ORDER BY o.completed_at DESC
+        LIMIT ?
+    """, (protocol_id, HISTORY_OPERATIONS))
+
+    recipes = []
+    for (recipe_json,) in cursor.fetchall():
+        try:
+            recipes.append(json.loads(recipe_json))
+        except (TypeError, ValueError):
+            continue
+
+    if not recipes:
+        return {}
+    return {name: total / len(recipes) for name, total in _sum_recipes(recipes).items()}
+
+
+def _fetch_remaining_cycles(
+    cursor: sqlite3.Cursor,
+    protocol_id: str,
+    total_cycles: int
+) -> Dict[str, List[Tuple[int, Optional[Dict[str, float]]]]]:
+    """
+    Cycles the protocol's running sessions have not dispensed yet.
+
+    Only sessions that have started (current_cycle > 0) count, and only while
+    they were updated in the last SESSION_IDLE_HOURS or still have a pump
+    operation waiting. Sessions created but never started and sessions
+    abandoned without being ended do not reserve stock.
+
+    Returns:
+        {session_id: [(cycle_number, planned recipe or None), ...]}
+    """
+    cursor.execute("""
+        SELECT s.session_id,
+               (SELECT MAX(o.cycle_number) FROM pump_operations o
+                WHERE o.session_id = s.session_id AND o.status = 'completed')
+        FROM sessions s
+        WHERE s.protocol_id = ? AND s.state = 'active' AND s.deleted_at IS NULL
+          AND s.current_cycle > 0
+          AND (s.updated_at >= datetime('now', ?)
+               OR EXISTS (SELECT 1 FROM pump_operations o
+                          WHERE o.session_id = s.session_id
+                            AND o.status IN ('pending', 'in_progress')))
+    """, (protocol_id, f"-{SESSION_IDLE_HOURS} hours"))
+    sessions = cursor.fetchall()
+
+    remaining = {}
+    for session_id, last_dispensed in sessions:
+        cursor.execute("""
+            SELECT cycle_number, recipe_json FROM session_cycle_recipes
+            WHERE session_id = ? AND cycle_number > ?
+        """, (session_id, last_dispensed or 0))
+        planned = {cycle: json.loads(recipe_json) for cycle, recipe_json in cursor.fetchall()}
+
+        remaining[session_id] = [
+            (cycle, planned.get(cycle))
+            for cycle in range((last_dispensed or 0) + 1, total_cycles + 1)
+        ]
+
+    return remaining
@@ -12,7 +12,7 @@ Created: 2026-01-18
 import json
 import random
 from typing import List, Dict, Any, Optional
-from robotaste.data.database import get_database_connection
+from robotaste.data.database import assign_protocol_session_number, get_database_connection
 
 
 def generate_randomized_order(
@@ -105,7 +105,9 @@ def get_next_sample_from_bank(
     """
     Get sample from bank for a specific cycle.
 
-    Main entry point called by prepare_cycle_sample(). Handles:
+    Main entry point called by prepare_cycle_sample(). Reads the sequence
+    materialized at session start (materialize_session_samples); if there is
+    none, falls back to:
     1. Initializing randomized order on first call (lazy initialization)
     2. Determining Latin square session number
     3. Retrieving sample from sequence based on cycle number
@@ -126,6 +128,63 @@ def get_next_sample_from_bank(
     Raises:
         ValueError: If sample bank is invalid or empty
     """
+    materialized = get_materialized_sample(session_id, cycle_number)
+    if materialized is not None and materialized["schedule_index"] == schedule_index:
+        return materialized["concentrations"]
+
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        randomized_order = _get_or_create_bank_order(
+            cursor, session_id, schedule_index, sample_bank_config
+        )
+        conn.commit()
+
+    # Calculate position based on cycle number (idempotent)
+    # Position = cycle_number - cycle_range_start
+    # This ensures the same cycle always returns the same sample
+    sample_id = _sample_id_for_cycle(randomized_order, cycle_number, cycle_range_start)
+
+    # Find the sample concentrations
+    concentrations = _samples_by_id(sample_bank_config).get(sample_id)
+    if concentrations is None:
+        raise ValueError(f"Sample ID '{sample_id}' not found in bank")
+
+    return concentrations
+
+
+def _samples_by_id(sample_bank_config: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Map sample ID -> concentrations (first definition wins)."""
+    by_id: Dict[str, Dict[str, float]] = {}
+    for sample in sample_bank_config.get("samples", []):
+        by_id.setdefault(sample["id"], sample["concentrations"])
+    return by_id
+
+
+def _sample_id_for_cycle(randomized_order: List[str], cycle_number: int, cycle_range_start: int) -> str:
+    """Sample ID at a cycle's position in the order (wrapping around)."""
+    position_in_sequence = cycle_number - cycle_range_start
+
+    # Handle wrap-around if needed
+    if position_in_sequence >= len(randomized_order):
+        position_in_sequence = position_in_sequence % len(randomized_order)
+
+    return randomized_order[position_in_sequence]
+
+
+def _get_or_create_bank_order(
+    cursor,
+    session_id: str,
+    schedule_index: int,
+    sample_bank_config: Dict[str, Any]
+) -> List[str]:
+    """
+    Load the persisted sample order of a bank, generating it on first use.
+
+    The caller commits.
+
+    Raises:
+        ValueError: If the sample bank is empty
+    """
     # Extract bank configuration
     samples = sample_bank_config.get("samples", [])
     design_type = sample_bank_config.get("design_type", "randomized")
@@ -136,128 +195,205 @@ def get_next_sample_from_bank(
 
     sample_ids = [s["id"] for s in samples]
 
-    with get_database_connection() as conn:
-        cursor = conn.cursor()
-
-        # Check if state exists
-        cursor.execute(
-            """
-            SELECT randomized_order, current_position, latin_square_session_number
-            FROM session_sample_bank_state
-            WHERE session_id = ? AND protocol_schedule_index = ?
-            """,
-            (session_id, schedule_index)
+    # Check if state exists
+    cursor.execute(
+        """
+        SELECT randomized_order, current_position, latin_square_session_number
+        FROM session_sample_bank_state
+        WHERE session_id = ? AND protocol_schedule_index = ?
+        """,
+        (session_id, schedule_index)
+    )
+
+    row = cursor.fetchone()
+
+    if row is not None:
+        # State exists - load it
+        return json.loads(row[0])
+
+    # First time - initialize state
+    if design_type == "latin_square":
+        # Session number assigned when the session was linked to its protocol
+        session_number = _get_latin_square_session_number(session_id, cursor)
+        randomized_order = generate_latin_square_sequence(
+            sample_ids, session_number, constraints
         )
+    else:  # randomized
+        randomized_order = generate_randomized_order(
+            sample_ids, constraints
+        )
+        session_number = None
+
+    # Store state in database (current_position not used, kept for schema compatibility)
+    cursor.execute(
+        """
+        INSERT INTO session_sample_bank_state
+        (session_id, protocol_schedule_index, randomized_order, current_position,
+         latin_square_session_number, design_type, created_at, updated_at)
+        VALUES (?, ?, ?, 0, ?, ?, datetime('now'), datetime('now'))
+        """,
+        (session_id, schedule_index, json.dumps(randomized_order),
+         session_number, design_type)
+    )
+    return randomized_order
+
+
+def materialize_session_samples(session_id: str, protocol: Dict[str, Any]) -> int:
+    """
+    Precompute the concentrations of every sample-bank cycle of a session.
 
-        row = cursor.fetchone()
+    Generates (or loads) the order of each predetermined_randomized schedule
+    entry and writes one session_cycle_samples row per cycle in a single
+    transaction. Afterwards every bank cycle is a primary-key read, and the
+    whole sequence is available up front (get_session_sample_sequence).
 
-        if row is None:
-            # First time - initialize state
-            if design_type == "latin_square":
-                # Determine session number by counting previous sessions
-                session_number = _get_latin_square_session_number(session_id)
-                randomized_order = generate_latin_square_sequence(
-                    sample_ids, session_number, constraints
-                )
-            else:  # randomized
-                randomized_order = generate_randomized_order(
-                    sample_ids, constraints
-                )
-                session_number = None
-
-            # Store state in database (current_position not used, kept for schema compatibility)
-            cursor.execute(
-                """
-                INSERT INTO session_sample_bank_state
-                (session_id, protocol_schedule_index, randomized_order, current_position,
-                 latin_square_session_number, design_type, created_at, updated_at)
-                VALUES (?, ?, ?, 0, ?, ?, datetime('now'), datetime('now'))
-                """,
-                (session_id, schedule_index, json.dumps(randomized_order),
-                 session_number, design_type)
-            )
-            conn.commit()
-        else:
-            # State exists - load it
-            randomized_order = json.loads(row[0])
+    Calling this again is safe: orders are persisted, so rows are rewritten
+    with the same values.
+
+    Args:
+        session_id: Session ID
+        protocol: Protocol dict (or session experiment_config) with
+            sample_selection_schedule
 
-        # Calculate position based on cycle number (idempotent)
-        # Position = cycle_number - cycle_range_start
-        # This ensures the same cycle always returns the same sample
-        position_in_sequence = cycle_number - cycle_range_start
+    Returns:
+        Number of cycles materialized
+
+    Raises:
+        ValueError: If a sample bank is empty or references an unknown sample
+    """
+    rows = []
 
-        # Handle wrap-around if needed
-        if position_in_sequence >= len(randomized_order):
-            position_in_sequence = position_in_sequence % len(randomized_order)
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
 
-        sample_id = randomized_order[position_in_sequence]
+        for schedule_index, entry in enumerate(protocol.get("sample_selection_schedule", [])):
+            if entry.get("mode") != "predetermined_randomized" or not entry.get("sample_bank"):
+                continue
 
-        # Find the sample concentrations
-        concentrations = None
-        for sample in samples:
-            if sample["id"] == sample_id:
-                concentrations = sample["concentrations"]
-                break
+            bank_config = entry["sample_bank"]
+            cycle_range = entry.get("cycle_range", {})
+            start, end = cycle_range.get("start", 1), cycle_range.get("end", 0)
 
-        if concentrations is None:
-            raise ValueError(f"Sample ID '{sample_id}' not found in bank")
+            randomized_order = _get_or_create_bank_order(cursor, session_id, schedule_index, bank_config)
+            samples_by_id = _samples_by_id(bank_config)
 
-    return concentrations
+            for cycle_number in range(start, end + 1):
+                sample_id = _sample_id_for_cycle(randomized_order, cycle_number, start)
+                if sample_id not in samples_by_id:
+                    raise ValueError(f"Sample ID '{sample_id}' not found in bank")
+                rows.append((
+                    session_id, cycle_number, schedule_index, sample_id,
+                    json.dumps(samples_by_id[sample_id])
+                ))
 
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO session_cycle_samples
+            (session_id, cycle_number, schedule_index, sample_id, concentrations)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        conn.commit()
 
-def _get_latin_square_session_number(session_id: str) -> int:
-    """
-    Determine Latin square session number by counting previous sessions.
+    return len(rows)
 
-    Session number is based on how many sessions with the same protocol_id
-    have been created before this one.
 
-    Args:
-        session_id: Current session ID
+def get_materialized_sample(session_id: str, cycle_number: int) -> Optional[Dict[str, Any]]:
+    """
+    Read a cycle's precomputed sample.
 
     Returns:
-        Session number (1-indexed)
+        {"schedule_index", "sample_id", "concentrations"} or None if the cycle
+        was not materialized
     """
     with get_database_connection() as conn:
         cursor = conn.cursor()
-
-        # Get protocol_id and creation time for this session
         cursor.execute(
             """
-            SELECT protocol_id, created_at
-            FROM sessions
-            WHERE session_id = ?
+            SELECT schedule_index, sample_id, concentrations
+            FROM session_cycle_samples
+            WHERE session_id = ? AND cycle_number = ?
             """,
-            (session_id,)
+            (session_id, cycle_number)
         )
-
         row = cursor.fetchone()
-        if not row:
-            return 1  # Default to session 1 if not found
 
-        protocol_id = row[0]
-        created_at = row[1]
+    if not row:
+        return None
 
-        # Count sessions with same protocol_id created before this one
+    return {
+        "schedule_index": row[0],
+        "sample_id": row[1],
+        "concentrations": json.loads(row[2]),
+    }
+
+
+def get_session_sample_sequence(session_id: str) -> Dict[int, Dict[str, float]]:
+    """
+    All precomputed samples of a session.
+
+    Returns:
+        {cycle_number: {ingredient_name: concentration}}
+    """
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
-            SELECT COUNT(*) as count
-            FROM sessions
-            WHERE protocol_id = ?
-            AND created_at < (
-                SELECT created_at
-                FROM sessions
-                WHERE session_id = ?
-            )
-            AND deleted_at IS NULL
+            SELECT cycle_number, concentrations
+            FROM session_cycle_samples
+            WHERE session_id = ?
+            ORDER BY cycle_number
             """,
-            (protocol_id, session_id)
+            (session_id,)
         )
+        rows = cursor.fetchall()
+
+    return {row[0]: json.loads(row[1]) for row in rows}
+
+
+def _get_latin_square_session_number(session_id: str, cursor=None) -> int:
+    """
+    Get the Latin square session number of a session.
+
+    The number is the session's position among sessions started with the
+    same protocol, assigned once by database.assign_session_protocol() and
+    stored on the session row.
+
+    Args:
+        session_id: Current session ID
+        cursor: Cursor of an open transaction to read (and, if needed,
+            assign) through; a new connection is used if None
+
+    Returns:
+        Session number (1-indexed)
+    """
+    if cursor is None:
+        with get_database_connection() as conn:
+            session_number = _get_latin_square_session_number(session_id, conn.cursor())
+            conn.commit()
+        return session_number
+
+    cursor.execute(
+        """
+        SELECT protocol_id, protocol_session_number
+        FROM sessions
+        WHERE session_id = ?
+        """,
+        (session_id,)
+    )
+    row = cursor.fetchone()
+
+    if not row:
+        return 1  # Default to session 1 if not found
+
+    protocol_id, session_number = row[0], row[1]
 
-        count = cursor.fetchone()[0]
+    # Linked to a protocol without a number (e.g. protocol_id set directly)
+    if session_number is None and protocol_id:
+        session_number = assign_protocol_session_number(cursor, session_id, protocol_id)
 
-        # Session number is count + 1 (1-indexed)
-        return count + 1
+    return session_number or 1
 
 
 def get_bank_state(session_id: str, schedule_index: int) -> Optional[Dict[str, Any]]:
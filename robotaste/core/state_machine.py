@@ -436,7 +436,7 @@ class ExperimentStateMachine:
         """
         # Import PhaseEngine here to avoid circular imports
         try:
-            from robotaste.core.phase_engine import PhaseEngine
+            from robotaste.core.phase_engine import get_phase_engine
         except ImportError:
             logger.error(
                 "Failed to import PhaseEngine, falling back to VALID_TRANSITIONS"
@@ -446,7 +446,7 @@ class ExperimentStateMachine:
         # If protocol has phase_sequence, use PhaseEngine
         if protocol and "phase_sequence" in protocol:
             try:
-                engine = PhaseEngine(protocol, session_id or "")
+                engine = get_phase_engine(protocol, session_id or "")
                 next_phase = engine.get_next_phase(
                     current_phase, current_cycle=current_cycle
                 )
@@ -11,13 +11,7 @@ import logging
 from typing import Dict, Any
 
 from robotaste.data import database as sql
-from robotaste.config.protocol_schema import (
-    get_selection_mode_for_cycle,
-    get_predetermined_sample,
-    get_sample_bank_config,
-    get_schedule_index_for_cycle,
-    normalize_selection_mode,
-)
+from robotaste.core.compiled_protocol import get_compiled_protocol_for_session
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -40,38 +34,17 @@ def get_selection_mode_for_cycle_runtime(session_id: str, cycle_number: int) ->
         Falls back to "user_selected" if no protocol or cycle not in schedule.
     """
     try:
-        # Load session to get protocol
         session = sql.get_session(session_id)
         if not session:
             logger.warning(f"Session {session_id} not found, defaulting to user_selected mode")
             return "user_selected"
 
-        # Check if session has a protocol_id
-        # First check experiment_config for protocol data
-        experiment_config = session.get("experiment_config", {})
-        protocol = None
-
-        # Protocol might be embedded in experiment_config or referenced by protocol_id
-        if "sample_selection_schedule" in experiment_config:
-            # Protocol data is embedded in experiment_config
-            protocol = experiment_config
-        else:
-            # Try to load protocol from database using protocol_id
-            from robotaste.data import protocol_repo
-
-            # Get protocol_id from session (stored during session creation)
-            protocol_id_from_session = experiment_config.get("protocol_id")
-            if protocol_id_from_session:
-                protocol_obj = protocol_repo.get_protocol_by_id(protocol_id_from_session)
-                if protocol_obj:
-                    protocol = protocol_obj.get("protocol_json", {})
-
-        if not protocol or "sample_selection_schedule" not in protocol:
+        compiled = get_compiled_protocol_for_session(session)
+        if not compiled or not compiled.schedule:
             logger.info(f"No protocol with sample_selection_schedule found for session {session_id}, using user_selected mode")
             return "user_selected"
 
-        # Use protocol_schema helper to get mode
-        mode = get_selection_mode_for_cycle(protocol, cycle_number)
+        mode = compiled.selection_mode(cycle_number)
         logger.info(f"Session {session_id}, cycle {cycle_number}: mode = {mode}")
         return mode
 
@@ -107,11 +80,13 @@ def prepare_cycle_sample(session_id: str, cycle_number: int) -> Dict[str, Any]:
         }
     """
     try:
-        # Determine mode from protocol
-        mode = get_selection_mode_for_cycle_runtime(session_id, cycle_number)
+        # Resolve the session's protocol once; every lookup below is an index hit
+        session = sql.get_session(session_id)
+        compiled = get_compiled_protocol_for_session(session) if session else None
 
         # Normalize mode for backward compatibility (predetermined -> predetermined_absolute)
-        normalized_mode = normalize_selection_mode(mode)
+        normalized_mode = compiled.normalized_mode(cycle_number) if compiled else "user_selected"
+        logger.info(f"Session {session_id}, cycle {cycle_number}: mode = {normalized_mode}")
 
         # Initialize result
         result = {
@@ -129,103 +104,51 @@ def prepare_cycle_sample(session_id: str, cycle_number: int) -> Dict[str, Any]:
         # Handle each mode
         if normalized_mode == "predetermined_absolute":
             # Get predetermined concentrations from protocol
-            session = sql.get_session(session_id)
-            if session:
-                experiment_config = session.get("experiment_config", {})
-                protocol = None
-
-                # Get protocol (same logic as get_selection_mode_for_cycle_runtime)
-                if "sample_selection_schedule" in experiment_config:
-                    protocol = experiment_config
-                else:
-                    from robotaste.data import protocol_repo
-                    protocol_id_from_session = experiment_config.get("protocol_id")
-                    if protocol_id_from_session:
-                        protocol_obj = protocol_repo.get_protocol_by_id(protocol_id_from_session)
-                        if protocol_obj:
-                            protocol = protocol_obj.get("protocol_json", {})
-
-                if protocol:
-                    concentrations = get_predetermined_sample(protocol, cycle_number)
-                    if concentrations:
-                        result["concentrations"] = concentrations
-                        result["metadata"]["is_predetermined"] = True
-                        logger.info(f"Predetermined sample for cycle {cycle_number}: {concentrations}")
-                    else:
-                        logger.warning(f"No predetermined sample found for cycle {cycle_number}")
+            concentrations = compiled.predetermined_sample(cycle_number)
+            if concentrations:
+                result["concentrations"] = concentrations
+                result["metadata"]["is_predetermined"] = True
+                logger.info(f"Predetermined sample for cycle {cycle_number}: {concentrations}")
+            else:
+                logger.warning(f"No predetermined sample found for cycle {cycle_number}")
 
         elif normalized_mode == "predetermined_randomized":
             # Get sample from randomized bank
             from robotaste.core.sample_bank import get_next_sample_from_bank
 
-            session = sql.get_session(session_id)
-            if session:
-                experiment_config = session.get("experiment_config", {})
-                protocol = None
-
-                # Get protocol (same logic as predetermined_absolute)
-                if "sample_selection_schedule" in experiment_config:
-                    protocol = experiment_config
-                else:
-                    from robotaste.data import protocol_repo
-                    protocol_id_from_session = experiment_config.get("protocol_id")
-                    if protocol_id_from_session:
-                        protocol_obj = protocol_repo.get_protocol_by_id(protocol_id_from_session)
-                        if protocol_obj:
-                            protocol = protocol_obj.get("protocol_json", {})
-
-                if protocol:
-                    # Get sample bank config and schedule index
-                    bank_config = get_sample_bank_config(protocol, cycle_number)
-                    schedule_index = get_schedule_index_for_cycle(protocol, cycle_number)
-
-                    if bank_config and schedule_index >= 0:
-                        try:
-                            # Get cycle_range_start from the schedule entry
-                            schedule = protocol.get("sample_selection_schedule", [])
-                            cycle_range_start = 1  # Default
-                            if schedule_index < len(schedule):
-                                cycle_range = schedule[schedule_index].get("cycle_range", {})
-                                cycle_range_start = cycle_range.get("start", 1)
-
-                            concentrations = get_next_sample_from_bank(
-                                session_id,
-                                schedule_index,
-                                bank_config,
-                                cycle_number,
-                                cycle_range_start
-                            )
-                            result["concentrations"] = concentrations
-                            result["metadata"]["is_predetermined"] = True
-                            result["metadata"]["from_bank"] = True
-                            logger.info(f"Sample from bank for cycle {cycle_number}: {concentrations}")
-                        except Exception as e:
-                            logger.error(f"Error getting sample from bank: {e}", exc_info=True)
-                    else:
-                        logger.warning(f"No sample bank config found for cycle {cycle_number}")
+            bank_config = compiled.sample_bank_config(cycle_number)
+            schedule_index = compiled.schedule_index(cycle_number)
+
+            if bank_config and schedule_index >= 0:
+                try:
+                    concentrations = get_next_sample_from_bank(
+                        session_id,
+                        schedule_index,
+                        bank_config,
+                        cycle_number,
+                        compiled.cycle_range_start(cycle_number)
+                    )
+                    result["concentrations"] = concentrations
+                    result["metadata"]["is_predetermined"] = True
+                    result["metadata"]["from_bank"] = True
+                    logger.info(f"Sample from bank for cycle {cycle_number}: {concentrations}")
+                except Exception as e:
+                    logger.error(f"Error getting sample from bank: {e}", exc_info=True)
+            else:
+                logger.warning(f"No sample bank config found for cycle {cycle_number}")
 
         elif normalized_mode == "bo_selected":
             # Get BO suggestion
             from robotaste.core.bo_integration import get_bo_suggestion_for_session
 
-            session = sql.get_session(session_id)
             if session:
-                experiment_config = session.get("experiment_config", {})
-                schedule = experiment_config.get("sample_selection_schedule", [])
                 # bo_selected means "the algorithm chooses" — default to auto-accept
                 # unless a schedule block explicitly opts out, so protocols that don't
                 # set this config (e.g. older/wizard-created ones) still auto-apply
                 # instead of silently stalling on the manual Select page.
-                auto_accept_suggestion = True
-                allows_override = False
-
-                for entry in schedule:
-                    cycle_range = entry.get("cycle_range", {})
-                    if cycle_range.get("start", 0) <= cycle_number <= cycle_range.get("end", 0):
-                        config = entry.get("config", {})
-                        auto_accept_suggestion = bool(config.get("auto_accept_suggestion", True))
-                        allows_override = bool(config.get("allow_override", not auto_accept_suggestion))
-                        break
+                config = compiled.entry_config(cycle_number)
+                auto_accept_suggestion = bool(config.get("auto_accept_suggestion", True))
+                allows_override = bool(config.get("allow_override", not auto_accept_suggestion))
 
                 if auto_accept_suggestion:
                     # Auto-accept mode is system-selected; never expose manual override.
@@ -13,8 +13,11 @@ Version: 3.0 (Refactored Architecture)
 
 import sqlite3
 import pandas as pd
+import hashlib
 import json
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from contextlib import contextmanager
 from typing import Optional, Tuple, Dict, Any, List
@@ -22,6 +25,8 @@ import logging
 import os
 from pathlib import Path
 
+from robotaste.utils import json_codec
+
 # Configuration — resolved relative to the project root so it works regardless
 # of the current working directory. Override with ROBOTASTE_DB_PATH env var.
 DB_PATH = os.environ.get(
@@ -68,6 +73,18 @@ def _column_exists(cursor: sqlite3.Cursor, table_name: str, column_name: str) ->
     return any(col["name"] == column_name for col in columns)
 
 
+# Indexes replaced by the composite indexes in schema.sql
+SUPERSEDED_INDEXES = (
+    "idx_samples_session_id",            # -> idx_samples_session_cycle
+    "idx_samples_is_final",              # -> idx_samples_session_final_cycle
+    "idx_sessions_state",                # -> idx_sessions_state_created
+    "idx_sessions_protocol_id",          # -> idx_sessions_protocol_created
+    "idx_pump_operations_session_id",    # -> idx_pump_operations_session_created
+    "idx_protocol_library_archived",     # -> idx_protocol_library_live_created
+    "idx_pump_global_state_protocol",    # -> UNIQUE(protocol_id, pump_address)
+)
+
+
 def _apply_schema_migrations(cursor: sqlite3.Cursor) -> None:
     """Apply lightweight schema migrations for existing databases."""
     if not _column_exists(cursor, "samples", "sample_temperature_c"):
@@ -79,6 +96,136 @@ def _apply_schema_migrations(cursor: sqlite3.Cursor) -> None:
     if not _column_exists(cursor, "users", "is_smoker"):
         cursor.execute("ALTER TABLE users ADD COLUMN is_smoker INTEGER")
         logger.info("Applied migration: added users.is_smoker")
+    for table in ("pump_operations", "pump_refill_operations"):
+        if not _column_exists(cursor, table, "claimed_by"):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN claimed_by TEXT")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN lease_expires_at TIMESTAMP")
+            logger.info(f"Applied migration: added {table}.claimed_by/lease_expires_at")
+        if not _column_exists(cursor, table, "claimed_at"):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN claimed_at TIMESTAMP")
+            logger.info(f"Applied migration: added {table}.claimed_at")
+    if not _column_exists(cursor, "pump_operations", "pump_run_s"):
+        cursor.execute("ALTER TABLE pump_operations ADD COLUMN pump_run_s REAL")
+        logger.info("Applied migration: added pump_operations.pump_run_s")
+    if not _column_exists(cursor, "sessions", "protocol_session_number"):
+        cursor.execute("ALTER TABLE sessions ADD COLUMN protocol_session_number INTEGER")
+        # Backfill in creation order, as the Latin-square numbering used to count
+        cursor.execute("""
+            UPDATE sessions
+            SET protocol_session_number = (
+                SELECT numbered.n FROM (
+                    SELECT session_id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY protocol_id ORDER BY created_at, rowid
+                           ) AS n
+                    FROM sessions
+                    WHERE protocol_id IS NOT NULL AND deleted_at IS NULL
+                ) AS numbered
+                WHERE numbered.session_id = sessions.session_id
+            )
+            WHERE protocol_id IS NOT NULL AND deleted_at IS NULL
+        """)
+        cursor.execute("""
+            INSERT INTO protocol_session_counters (protocol_id, last_session_number)
+            SELECT protocol_id, MAX(protocol_session_number)
+            FROM sessions
+            WHERE protocol_session_number IS NOT NULL
+            GROUP BY protocol_id
+            ON CONFLICT(protocol_id) DO UPDATE SET
+                last_session_number = MAX(last_session_number, excluded.last_session_number)
+        """)
+        logger.info("Applied migration: added and backfilled sessions.protocol_session_number")
+    for index_name in SUPERSEDED_INDEXES:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)
+        )
+        if cursor.fetchone():
+            cursor.execute(f"DROP INDEX {index_name}")
+            logger.info(f"Applied migration: dropped superseded index {index_name}")
+    for column, column_type in (
+        ("config_snapshot_hash", "TEXT"),
+        ("config_applied_at", "TIMESTAMP"),
+        ("initial_pump_volumes", "TEXT"),
+    ):
+        if not _column_exists(cursor, "sessions", column):
+            cursor.execute(f"ALTER TABLE sessions ADD COLUMN {column} {column_type}")
+            logger.info(f"Applied migration: added sessions.{column}")
+    _migrate_pending_concentrations(cursor)
+    _migrate_session_snapshots(cursor)
+
+
+def _migrate_pending_concentrations(cursor: sqlite3.Cursor) -> None:
+    """Move experiment_config["_pending_concentrations"] maps into pending_selections."""
+    if not _column_exists(cursor, "sessions", "experiment_config"):
+        return
+
+    cursor.execute("""
+        SELECT session_id, experiment_config FROM sessions
+        WHERE instr(experiment_config, '"_pending_concentrations"') > 0
+    """)
+    rows = cursor.fetchall()
+
+    for row in rows:
+        try:
+            config = json_codec.loads(row["experiment_config"])
+        except (TypeError, ValueError):
+            continue
+        pending = config.pop("_pending_concentrations", None)
+        if not isinstance(pending, dict):
+            continue
+
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO pending_selections
+            (session_id, cycle_number, concentrations, selection_mode, selection_data)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    row["session_id"],
+                    int(cycle),
+                    json_codec.dumps(entry.get("concentrations") or {}),
+                    entry.get("selection_mode", "user_selected"),
+                    json_codec.dumps(entry["selection_data"]) if entry.get("selection_data") else None,
+                )
+                for cycle, entry in pending.items()
+                if isinstance(entry, dict)
+            ],
+        )
+        cursor.execute(
+            "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+            (json_codec.dumps(config), row["session_id"]),
+        )
+
+    if rows:
+        logger.info(f"Applied migration: moved pending selections of {len(rows)} sessions")
+
+
+def _migrate_session_snapshots(cursor: sqlite3.Cursor) -> None:
+    """Split experiment_config of existing sessions into snapshot + state columns."""
+    if not _column_exists(cursor, "sessions", "experiment_config"):
+        return
+
+    cursor.execute("""
+        SELECT session_id, experiment_config FROM sessions
+        WHERE config_snapshot_hash IS NULL
+          AND experiment_config IS NOT NULL AND experiment_config NOT IN ('', '{}')
+    """)
+    rows = cursor.fetchall()
+
+    migrated = 0
+    for row in rows:
+        try:
+            config = json_codec.loads(row["experiment_config"])
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(config, dict):
+            continue
+        _write_session_config(cursor, row["session_id"], config)
+        migrated += 1
+
+    if migrated:
+        logger.info(f"Applied migration: moved configs of {migrated} sessions to protocol_snapshots")
 
 
 def init_database() -> bool:
@@ -199,6 +346,8 @@ def create_session(
         """,
             (session_id, session_code, protocol_id),
         )
+        if protocol_id:
+            assign_protocol_session_number(cursor, session_id, protocol_id)
         conn.commit()
         if protocol_id:
             logger.info(f"Created session {session_id} with code {session_code} using protocol {protocol_id}")
@@ -207,6 +356,302 @@ def create_session(
         return session_id, session_code
 
 
+def assign_protocol_session_number(
+    cursor: sqlite3.Cursor, session_id: str, protocol_id: str
+) -> Optional[int]:
+    """
+    Link a session to a protocol and take the protocol's next session number.
+
+    Must run inside a write transaction; the counter row stays locked until
+    commit, so concurrent starts never share a number. Use
+    assign_session_protocol() outside an open transaction.
+
+    Args:
+        cursor: Cursor of the caller's write transaction
+        session_id: Session UUID
+        protocol_id: Protocol UUID
+
+    Returns:
+        Session number (1-indexed), or None if the session does not exist
+    """
+    cursor.execute(
+        "SELECT protocol_id, protocol_session_number FROM sessions WHERE session_id = ?",
+        (session_id,),
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if row[0] == protocol_id and row[1] is not None:
+        return row[1]  # Already numbered for this protocol
+
+    cursor.execute(
+        """
+        INSERT INTO protocol_session_counters (protocol_id, last_session_number, updated_at)
+        VALUES (?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(protocol_id) DO UPDATE SET
+            last_session_number = last_session_number + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (protocol_id,),
+    )
+    cursor.execute(
+        "SELECT last_session_number FROM protocol_session_counters WHERE protocol_id = ?",
+        (protocol_id,),
+    )
+    session_number = cursor.fetchone()[0]
+
+    cursor.execute(
+        """
+        UPDATE sessions
+        SET protocol_id = ?, protocol_session_number = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE session_id = ?
+        """,
+        (protocol_id, session_number, session_id),
+    )
+    return session_number
+
+
+def assign_session_protocol(session_id: str, protocol_id: str) -> Optional[int]:
+    """
+    Link a session to a protocol and assign its per-protocol session number.
+
+    Session numbers count sessions started with the protocol (1, 2, 3, ...)
+    and drive Latin-square counterbalancing. Calling this again for the same
+    session and protocol returns the number already assigned.
+
+    Args:
+        session_id: Session UUID
+        protocol_id: Protocol UUID
+
+    Returns:
+        Session number (1-indexed), or None if the session does not exist or
+        the update failed
+    """
+    try:
+        with get_database_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            session_number = assign_protocol_session_number(
+                conn.cursor(), session_id, protocol_id
+            )
+            conn.commit()
+
+        if session_number is not None:
+            logger.info(
+                f"Session {session_id} is session #{session_number} of protocol {protocol_id}"
+            )
+        return session_number
+
+    except Exception as e:
+        logger.error(f"Failed to assign protocol {protocol_id} to session {session_id}: {e}")
+        return None
+
+
+def save_pending_selection(
+    session_id: str,
+    cycle_number: int,
+    concentrations: Dict[str, float],
+    selection_mode: str = "user_selected",
+    selection_data: Optional[Dict] = None,
+) -> bool:
+    """
+    Store the selection of a cycle until its response is saved.
+
+    Re-submitting a selection for the same cycle replaces it.
+
+    Args:
+        session_id: Session UUID
+        cycle_number: Cycle the selection is for
+        concentrations: Selected concentrations
+        selection_mode: Mode the selection was made in
+        selection_data: Selection metadata (e.g. BO acquisition values)
+
+    Returns:
+        True if saved
+    """
+    try:
+        with get_database_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO pending_selections
+                (session_id, cycle_number, concentrations, selection_mode, selection_data)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(session_id, cycle_number) DO UPDATE SET
+                    concentrations = excluded.concentrations,
+                    selection_mode = excluded.selection_mode,
+                    selection_data = excluded.selection_data,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (
+                    session_id,
+                    cycle_number,
+                    json_codec.dumps(concentrations),
+                    selection_mode,
+                    json_codec.dumps(selection_data) if selection_data else None,
+                ),
+            )
+            conn.commit()
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to save pending selection for session {session_id}, cycle {cycle_number}: {e}")
+        return False
+
+
+def get_pending_selection(session_id: str, cycle_number: int) -> Optional[Dict]:
+    """
+    Get the stored selection of a cycle.
+
+    Args:
+        session_id: Session UUID
+        cycle_number: Cycle number
+
+    Returns:
+        {"concentrations", "selection_mode", "selection_data"} or None
+    """
+    try:
+        with get_database_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT concentrations, selection_mode, selection_data
+                FROM pending_selections
+                WHERE session_id = ? AND cycle_number = ?
+                """,
+                (session_id, cycle_number),
+            )
+            row = cursor.fetchone()
+
+        if not row:
+            return None
+
+        return {
+            "concentrations": json_codec.loads(row["concentrations"]),
+            "selection_mode": row["selection_mode"],
+            "selection_data": json_codec.loads(row["selection_data"]) if row["selection_data"] else None,
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get pending selection for session {session_id}, cycle {cycle_number}: {e}")
+        return None
+
+
+# experiment_config keys that change per session. They are stored in typed
+# sessions columns; the rest of the config is the protocol snapshot.
+SESSION_STATE_KEYS = ("current_cycle", "created_at", "initial_pump_volumes_ml")
+
+# Maximum number of parsed protocol snapshots kept in memory
+MAX_CACHED_SNAPSHOTS = 64
+
+_snapshot_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+
+def _store_protocol_snapshot(cursor: sqlite3.Cursor, snapshot: Dict[str, Any]) -> str:
+    """Insert a snapshot unless an identical one exists and return its hash."""
+    config_json = json_codec.dumps_canonical(snapshot)
+    snapshot_hash = hashlib.sha256(config_json.encode("utf-8")).hexdigest()
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO protocol_snapshots
+        (snapshot_hash, protocol_id, protocol_hash, config_json)
+        VALUES (?, ?, ?, ?)
+        """,
+        (snapshot_hash, snapshot.get("protocol_id"), snapshot.get("protocol_hash"), config_json),
+    )
+    return snapshot_hash
+
+
+def _write_session_config(
+    cursor: sqlite3.Cursor, session_id: str, experiment_config: Dict[str, Any]
+) -> str:
+    """Store a full experiment_config as snapshot reference plus state columns."""
+    snapshot = {k: v for k, v in experiment_config.items() if k not in SESSION_STATE_KEYS}
+    snapshot_hash = _store_protocol_snapshot(cursor, snapshot)
+    pump_volumes = experiment_config.get("initial_pump_volumes_ml")
+
+    cursor.execute(
+        """
+        UPDATE sessions
+        SET experiment_config = NULL,
+            config_snapshot_hash = ?,
+            config_applied_at = ?,
+            initial_pump_volumes = ?,
+            current_cycle = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE session_id = ?
+        """,
+        (
+            snapshot_hash,
+            experiment_config.get("created_at"),
+            json_codec.dumps(pump_volumes) if pump_volumes else None,
+            experiment_config.get("current_cycle", 0),
+            session_id,
+        ),
+    )
+    return snapshot_hash
+
+
+def get_protocol_snapshot(
+    snapshot_hash: str, cursor: Optional[sqlite3.Cursor] = None
+) -> Dict[str, Any]:
+    """
+    Get a parsed protocol snapshot, parsing it once per process.
+
+    Snapshots are immutable, so the cached dict is shared between callers
+    and must not be modified.
+
+    Args:
+        snapshot_hash: protocol_snapshots.snapshot_hash
+        cursor: Open cursor to read with (a new connection if omitted)
+
+    Returns:
+        Snapshot config, or {} if not found
+    """
+    with _snapshot_lock:
+        snapshot = _snapshot_cache.get(snapshot_hash)
+        if snapshot is not None:
+            _snapshot_cache.move_to_end(snapshot_hash)
+            return snapshot
+
+    query = "SELECT config_json FROM protocol_snapshots WHERE snapshot_hash = ?"
+    if cursor is not None:
+        row = cursor.execute(query, (snapshot_hash,)).fetchone()
+    else:
+        with get_database_connection() as conn:
+            row = conn.execute(query, (snapshot_hash,)).fetchone()
+    if not row:
+        logger.error(f"Protocol snapshot {snapshot_hash} not found")
+        return {}
+
+    snapshot = json_codec.loads(row[0])
+    with _snapshot_lock:
+        _snapshot_cache[snapshot_hash] = snapshot
+        while len(_snapshot_cache) > MAX_CACHED_SNAPSHOTS:
+            _snapshot_cache.popitem(last=False)
+    return snapshot
+
+
+def _session_experiment_config(cursor: sqlite3.Cursor, row: sqlite3.Row) -> Dict[str, Any]:
+    """
+    Assemble a session's experiment_config from its snapshot and state columns.
+
+    The row must include experiment_config, current_cycle, config_snapshot_hash,
+    config_applied_at and initial_pump_volumes. Top-level keys are copied per
+    call; nested sections are shared with the snapshot cache.
+    """
+    if not row["config_snapshot_hash"]:
+        # Not configured yet, or written directly as a full JSON config
+        return json_codec.loads(row["experiment_config"]) if row["experiment_config"] else {}
+
+    config = dict(get_protocol_snapshot(row["config_snapshot_hash"], cursor))
+    config["current_cycle"] = row["current_cycle"] or 0
+    if row["config_applied_at"]:
+        config["created_at"] = row["config_applied_at"]
+    if row["initial_pump_volumes"]:
+        config["initial_pump_volumes_ml"] = json_codec.loads(row["initial_pump_volumes"])
+    return config
+
+
 def get_session(session_id: str) -> Optional[Dict]:
     """
     Get complete session configuration with parsed JSON fields.
@@ -226,6 +671,7 @@ def get_session(session_id: str) -> Optional[Dict]:
                 SELECT
                     s.session_id, s.session_code, s.user_id, s.ingredients,
                     s.state, s.current_phase, s.current_cycle, s.experiment_config,
+                    s.config_snapshot_hash, s.config_applied_at, s.initial_pump_volumes,
                     s.created_at, s.updated_at
                 FROM sessions s
                 WHERE s.session_id = ?
@@ -243,15 +689,11 @@ def get_session(session_id: str) -> Optional[Dict]:
                 "session_code": row["session_code"],
                 "user_id": row["user_id"],
                 "ingredients": (
-                    json.loads(row["ingredients"]) if row["ingredients"] else []
+                    json_codec.loads(row["ingredients"]) if row["ingredients"] else []
                 ),
                 "state": row["state"],
                 "current_phase": row["current_phase"],
-                "experiment_config": (
-                    json.loads(row["experiment_config"])
-                    if row["experiment_config"]
-                    else {}
-                ),
+                "experiment_config": _session_experiment_config(cursor, row),
                 "created_at": row["created_at"],
                 "updated_at": row["updated_at"],
             }
@@ -280,6 +722,7 @@ def get_session_by_code(session_code: str) -> Optional[Dict]:
                 SELECT
                     s.session_id, s.session_code, s.user_id, s.ingredients,
                     s.state, s.current_phase, s.current_cycle, s.experiment_config,
+                    s.config_snapshot_hash, s.config_applied_at, s.initial_pump_volumes,
                     s.created_at, s.updated_at
                 FROM sessions s
                 WHERE s.session_code = ?
@@ -297,15 +740,11 @@ def get_session_by_code(session_code: str) -> Optional[Dict]:
                 "session_code": row["session_code"],
                 "user_id": row["user_id"],
                 "ingredients": (
-                    json.loads(row["ingredients"]) if row["ingredients"] else []
+                    json_codec.loads(row["ingredients"]) if row["ingredients"] else []
                 ),
                 "state": row["state"],
                 "current_phase": row["current_phase"],
-                "experiment_config": (
-                    json.loads(row["experiment_config"])
-                    if row["experiment_config"]
-                    else {}
-                ),
+                "experiment_config": _session_experiment_config(cursor, row),
                 "created_at": row["created_at"],
                 "updated_at": row["updated_at"],
             }
@@ -328,7 +767,7 @@ def get_questionnaire_from_session(session_info: Dict[str, Any]) -> Optional[Dic
     # Extract inline questionnaire from experiment_config
     experiment_config = session_info.get("experiment_config", {})
     if isinstance(experiment_config, str):
-        experiment_config = json.loads(experiment_config)
+        experiment_config = json_codec.loads(experiment_config)
 
     questionnaire = experiment_config.get("questionnaire")
     return questionnaire  # Returns None if not found (expected for historical sessions)
@@ -362,7 +801,10 @@ def get_available_sessions(available_only: bool = True) -> List[Dict]:
                     s.current_cycle,
                     s.state,
                     s.created_at,
-                    s.experiment_config
+                    s.experiment_config,
+                    s.config_snapshot_hash,
+                    s.config_applied_at,
+                    s.initial_pump_volumes
                 FROM sessions s
                 WHERE s.state = 'active'
                   {user_filter}
@@ -374,12 +816,10 @@ def get_available_sessions(available_only: bool = True) -> List[Dict]:
             sessions = []
 
             for row in rows:
-                experiment_config = {}
-                if row["experiment_config"]:
-                    try:
-                        experiment_config = json.loads(row["experiment_config"])
-                    except json.JSONDecodeError:
-                        pass
+                try:
+                    experiment_config = _session_experiment_config(cursor, row)
+                except json.JSONDecodeError:
+                    experiment_config = {}
 
                 moderator_name = experiment_config.get("moderator_name", "Moderator")
 
@@ -535,26 +975,45 @@ def increment_cycle(session_id: str) -> int:
         New cycle number (0 if failed)
     """
     try:
-        session = get_session(session_id)
-        if not session:
-            return 0
-
-        config = session["experiment_config"]
-        config["current_cycle"] = config.get("current_cycle", 0) + 1
-
         with get_database_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """
-                UPDATE sessions
-                SET experiment_config = ?, current_cycle = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE session_id = ?
-            """,
-                (json.dumps(config), config["current_cycle"], session_id),
+                "SELECT config_snapshot_hash, experiment_config FROM sessions WHERE session_id = ?",
+                (session_id,),
             )
+            row = cursor.fetchone()
+            if not row:
+                return 0
+
+            if row["config_snapshot_hash"]:
+                cursor.execute(
+                    """
+                    UPDATE sessions
+                    SET current_cycle = COALESCE(current_cycle, 0) + 1,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE session_id = ?
+                """,
+                    (session_id,),
+                )
+                cursor.execute(
+                    "SELECT current_cycle FROM sessions WHERE session_id = ?", (session_id,)
+                )
+                new_cycle = cursor.fetchone()["current_cycle"]
+            else:
+                # Legacy session with the full config in experiment_config
+                config = json_codec.loads(row["experiment_config"]) if row["experiment_config"] else {}
+                config["current_cycle"] = config.get("current_cycle", 0) + 1
+                new_cycle = config["current_cycle"]
+                cursor.execute(
+                    """
+                    UPDATE sessions
+                    SET experiment_config = ?, current_cycle = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE session_id = ?
+                """,
+                    (json_codec.dumps(config), new_cycle, session_id),
+                )
             conn.commit()
 
-        new_cycle = config["current_cycle"]
         logger.info(f"Incremented session {session_id} to cycle {new_cycle}")
         return new_cycle
 
@@ -614,6 +1073,7 @@ def get_sessions_by_protocol(protocol_id: str) -> List[Dict]:
                 SELECT
                     s.session_id, s.session_code, s.user_id, s.ingredients,
                     s.state, s.current_phase, s.current_cycle, s.experiment_config,
+                    s.config_snapshot_hash, s.config_applied_at, s.initial_pump_volumes,
                     s.created_at, s.updated_at
                 FROM sessions s
                 WHERE s.protocol_id = ?
@@ -630,15 +1090,11 @@ def get_sessions_by_protocol(protocol_id: str) -> List[Dict]:
                         "session_code": row["session_code"],
                         "user_id": row["user_id"],
                         "ingredients": (
-                            json.loads(row["ingredients"]) if row["ingredients"] else []
+                            json_codec.loads(row["ingredients"]) if row["ingredients"] else []
                         ),
                         "state": row["state"],
                         "current_phase": row["current_phase"],
-                        "experiment_config": (
-                            json.loads(row["experiment_config"])
-                            if row["experiment_config"]
-                            else {}
-                        ),
+                        "experiment_config": _session_experiment_config(cursor, row),
                         "created_at": row["created_at"],
                         "updated_at": row["updated_at"],
                     }
@@ -747,23 +1203,18 @@ def update_session_with_config(
                 f"Updating session {session_id} (code: {row['session_code']}) with full configuration"
             )
 
-            # Update session with full config (inline questionnaire only)
+            # Update session with full config (inline questionnaire only);
+            # the protocol-derived part is shared through protocol_snapshots
             cursor.execute(
                 """
                 UPDATE sessions
                 SET user_id = ?,
-                    ingredients = ?,
-                    experiment_config = ?,
-                    updated_at = CURRENT_TIMESTAMP
+                    ingredients = ?
                 WHERE session_id = ?
             """,
-                (
-                    user_id,
-                    json.dumps(ingredients),
-                    json.dumps(full_config),
-                    session_id,
-                ),
+                (user_id, json_codec.dumps(ingredients), session_id),
             )
+            _write_session_config(cursor, session_id, full_config)
 
             # Insert or replace BO configuration
             stopping_criteria = bo_config.get("stopping_criteria", {})
@@ -801,8 +1252,8 @@ def update_session_with_config(
                     # GP kernel parameters
                     bo_config.get("kernel_nu", 2.5),
                     bo_config.get("length_scale_initial", 1.0),
-                    json.dumps(bo_config.get("length_scale_bounds", [0.1, 10.0])),
-                    json.dumps(bo_config.get("constant_kernel_bounds", [0.001, 1000.0])),
+                    json_codec.dumps(bo_config.get("length_scale_bounds", [0.1, 10.0])),
+                    json_codec.dumps(bo_config.get("constant_kernel_bounds", [0.001, 1000.0])),
                     bo_config.get("alpha", 0.001),
                     bo_config.get("n_restarts_optimizer", 10),
                     1 if bo_config.get("normalize_y", True) else 0,
@@ -968,11 +1419,14 @@ def save_sample_cycle(
     selection_mode: str = "user_selected",
     was_bo_overridden: bool = False,
     sample_temperature_c: Optional[float] = None,
+    target_value: Optional[float] = None,
 ) -> str:
     """
     Save complete cycle data in ONE row.
 
     Combines: solution tasted + questionnaire + selection for next.
+    Also advances the session's convergence accumulator (see
+    get_convergence_state) in the same transaction.
 
     Args:
         session_id: Session UUID
@@ -984,6 +1438,8 @@ def save_sample_cycle(
         selection_mode: Mode used for this sample ("user_selected", "bo_selected", "predetermined")
         was_bo_overridden: True if user overrode BO suggestion in bo_selected mode
         sample_temperature_c: Fixed protocol-level sample temperature in Celsius
+        target_value: BO target extracted from questionnaire_answer (resolved
+            from the session's questionnaire when omitted)
 
     Returns:
         sample_id (UUID)
@@ -991,6 +1447,9 @@ def save_sample_cycle(
     try:
         sample_id = str(uuid.uuid4())
 
+        if target_value is None and questionnaire_answer:
+            target_value = _extract_sample_target(session_id, questionnaire_answer)
+
         with get_database_connection() as conn:
             cursor = conn.cursor()
 
@@ -1029,10 +1488,10 @@ def save_sample_cycle(
                     sample_id,
                     session_id,
                     cycle_number,
-                    json.dumps(ingredient_concentration),
+                    json_codec.dumps(ingredient_concentration),
                     sample_temperature_c,
-                    json.dumps(selection_data) if selection_data else None,
-                    json.dumps(questionnaire_answer),
+                    json_codec.dumps(selection_data) if selection_data else None,
+                    json_codec.dumps(questionnaire_answer),
                     1 if is_final else 0,
                     selection_mode,
                     1 if was_bo_overridden else 0,
@@ -1045,6 +1504,14 @@ def save_sample_cycle(
                 ),
             )
 
+            is_bo_sample = isinstance(selection_data, dict) and selection_data.get("mode") == "bayesian_optimization"
+            if not ingredient_concentration:
+                target_value = None  # Not used as training data
+            _update_convergence_state(
+                cursor, session_id, cycle_number, is_bo_sample,
+                acquisition_value, predicted_value, uncertainty, target_value
+            )
+
             conn.commit()
             logger.info(
                 f"Saved sample {sample_id} for session {session_id}, cycle {cycle_number}, mode={selection_mode}"
@@ -1064,6 +1531,184 @@ def save_sample_cycle(
         raise
 
 
+def _extract_sample_target(session_id: str, questionnaire_answer: Dict) -> Optional[float]:
+    """BO target of a questionnaire answer, using the session's target config."""
+    from robotaste.config.questionnaire import extract_target_variable
+
+    session = get_session(session_id)
+    if not session:
+        return None
+    _, questionnaire_config = get_target_questionnaire_config(session)
+    return extract_target_variable(questionnaire_answer, questionnaire_config)
+
+
+def _update_convergence_state(
+    cursor: sqlite3.Cursor,
+    session_id: str,
+    cycle_number: int,
+    is_bo_sample: bool,
+    acquisition_value: Optional[float],
+    predicted_value: Optional[float],
+    uncertainty: Optional[float],
+    target_value: Optional[float],
+) -> None:
+    """
+    Advance a session's convergence accumulator by one sample.
+
+    Reads one state row and writes at most two rows, independent of the
+    number of samples. Sessions whose samples predate the accumulator have
+    no state row; they are left alone here and rebuilt on first read
+    (rebuild_convergence_state).
+    """
+    cursor.execute(
+        "SELECT n_samples, n_bo_samples, best_value FROM session_convergence_state WHERE session_id = ?",
+        (session_id,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            "SELECT COUNT(*) FROM samples WHERE session_id = ?", (session_id,)
+        )
+        if cursor.fetchone()[0] > 1:
+            return
+        n_samples, n_bo_samples, best_value = 0, 0, None
+    else:
+        n_samples, n_bo_samples, best_value = row[0], row[1], row[2]
+
+    if target_value is not None:
+        best_value = target_value if best_value is None else max(best_value, target_value)
+
+    if is_bo_sample:
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO session_convergence_points (
+                session_id, point_index, cycle_number,
+                acquisition_value, predicted_value, uncertainty, best_value
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (session_id, n_bo_samples, cycle_number,
+             acquisition_value, predicted_value, uncertainty, best_value),
+        )
+        n_bo_samples += 1
+
+    cursor.execute(
+        """
+        INSERT INTO session_convergence_state (session_id, n_samples, n_bo_samples, best_value)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(session_id) DO UPDATE SET
+            n_samples = excluded.n_samples,
+            n_bo_samples = excluded.n_bo_samples,
+            best_value = excluded.best_value,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (session_id, n_samples + 1, n_bo_samples, best_value),
+    )
+
+
+def get_convergence_state(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a session's convergence accumulator.
+
+    Args:
+        session_id: Session UUID
+
+    Returns:
+        {"n_samples", "n_bo_samples", "best_value", "points": [...]} where each
+        point has cycle_number, acquisition_value, predicted_value,
+        uncertainty and best_value, in BO sample order. None if the session
+        has no accumulator yet.
+    """
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT n_samples, n_bo_samples, best_value FROM session_convergence_state WHERE session_id = ?",
+            (session_id,),
+        )
+        state = cursor.fetchone()
+        if state is None:
+            return None
+
+        cursor.execute(
+            """
+            SELECT cycle_number, acquisition_value, predicted_value, uncertainty, best_value
+            FROM session_convergence_points
+            WHERE session_id = ?
+            ORDER BY point_index
+            """,
+            (session_id,),
+        )
+        points = [dict(row) for row in cursor.fetchall()]
+
+    return {
+        "n_samples": state["n_samples"],
+        "n_bo_samples": state["n_bo_samples"],
+        "best_value": state["best_value"],
+        "points": points,
+    }
+
+
+def rebuild_convergence_state(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Recompute a session's convergence accumulator from its samples.
+
+    Used once for sessions recorded before the accumulator existed.
+
+    Args:
+        session_id: Session UUID
+
+    Returns:
+        The rebuilt state (as get_convergence_state), or None if the session
+        has no samples
+    """
+    from robotaste.config.questionnaire import extract_target_variable
+
+    session = get_session(session_id)
+    if not session:
+        return None
+    _, questionnaire_config = get_target_questionnaire_config(session)
+
+    with get_database_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT cycle_number, ingredient_concentration, selection_data, questionnaire_answer,
+                   acquisition_value, predicted_value, uncertainty
+            FROM samples
+            WHERE session_id = ?
+            ORDER BY created_at ASC, rowid ASC
+            """,
+            (session_id,),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+
+        cursor.execute("DELETE FROM session_convergence_points WHERE session_id = ?", (session_id,))
+        cursor.execute(
+            "INSERT OR REPLACE INTO session_convergence_state (session_id) VALUES (?)",
+            (session_id,),
+        )
+
+        for row in rows:
+            selection_data = json_codec.loads(row["selection_data"]) if row["selection_data"] else {}
+            concentrations = json_codec.loads(row["ingredient_concentration"]) if row["ingredient_concentration"] else None
+            target_value = None
+            if concentrations and row["questionnaire_answer"]:
+                target_value = extract_target_variable(
+                    json_codec.loads(row["questionnaire_answer"]), questionnaire_config
+                )
+            _update_convergence_state(
+                cursor, session_id, row["cycle_number"],
+                selection_data.get("mode") == "bayesian_optimization",
+                row["acquisition_value"], row["predicted_value"], row["uncertainty"],
+                target_value,
+            )
+        conn.commit()
+
+    logger.info(f"Rebuilt convergence state for session {session_id} from {len(rows)} samples")
+    return get_convergence_state(session_id)
+
+
 def get_sample(sample_id: str) -> Optional[Dict]:
     """
     Get sample by ID with parsed JSON fields.
@@ -1087,12 +1732,12 @@ def get_sample(sample_id: str) -> Optional[Dict]:
                 "sample_id": row["sample_id"],
                 "session_id": row["session_id"],
                 "cycle_number": row["cycle_number"],
-                "ingredient_concentration": json.loads(row["ingredient_concentration"]),
+                "ingredient_concentration": json_codec.loads(row["ingredient_concentration"]),
                 "sample_temperature_c": row["sample_temperature_c"],
                 "selection_data": (
-                    json.loads(row["selection_data"]) if row["selection_data"] else None
+                    json_codec.loads(row["selection_data"]) if row["selection_data"] else None
                 ),
-                "questionnaire_answer": json.loads(row["questionnaire_answer"]),
+                "questionnaire_answer": json_codec.loads(row["questionnaire_answer"]),
                 "is_final": bool(row["is_final"]),
                 "created_at": row["created_at"],
                 "updated_at": row["updated_at"],
@@ -1144,16 +1789,16 @@ def get_session_samples(session_id: str, only_final: bool = False) -> List[Dict]
                         "sample_id": row["sample_id"],
                         "session_id": row["session_id"],
                         "cycle_number": row["cycle_number"],
-                        "ingredient_concentration": json.loads(
+                        "ingredient_concentration": json_codec.loads(
                             row["ingredient_concentration"]
                         ),
                         "sample_temperature_c": row["sample_temperature_c"],
                         "selection_data": (
-                            json.loads(row["selection_data"])
+                            json_codec.loads(row["selection_data"])
                             if row["selection_data"]
                             else None
                         ),
-                        "questionnaire_answer": json.loads(row["questionnaire_answer"]),
+                        "questionnaire_answer": json_codec.loads(row["questionnaire_answer"]),
                         "is_final": bool(row["is_final"]),
                         "created_at": row["created_at"],
                     }
@@ -1196,7 +1841,7 @@ def get_latest_sample_concentrations(session_id: str) -> Optional[Dict[str, floa
                 return None
 
             # Parse and return concentrations
-            concentrations = json.loads(row["ingredient_concentration"])
+            concentrations = json_codec.loads(row["ingredient_concentration"])
             return concentrations
 
     except Exception as e:
@@ -1246,7 +1891,7 @@ def get_session_bank_state(
                 return None
 
             return {
-                "randomized_order": json.loads(row["randomized_order"]),
+                "randomized_order": json_codec.loads(row["randomized_order"]),
                 "current_position": row["current_position"],
                 "latin_square_session_number": row["latin_square_session_number"],
                 "design_type": row["design_type"],
@@ -1294,7 +1939,7 @@ def save_session_bank_state(
                     latin_square_session_number = excluded.latin_square_session_number,
                     updated_at = datetime('now')
                 """,
-                (session_id, schedule_index, json.dumps(randomized_order),
+                (session_id, schedule_index, json_codec.dumps(randomized_order),
                  latin_square_session_number, design_type)
             )
             conn.commit()
@@ -1345,6 +1990,72 @@ def update_bank_position(
 # ============================================================================
 
 
+def get_target_questionnaire_config(session: Dict) -> Tuple[str, Dict]:
+    """
+    Resolve the BO target of a session.
+
+    Args:
+        session: Session dict from get_session()
+
+    Returns:
+        (target column name, questionnaire config with bayesian_target)
+    """
+    experiment_config = session.get("experiment_config", {})
+
+    # Get target variable name from questionnaire config.
+    # Prefer the inline questionnaire stored on the experiment config (preferred
+    # per protocol schema) over the legacy library lookup by name, since the
+    # inline config is the one that actually has the correct bayesian_target
+    # for this protocol.
+    target_column_name = "target_value"  # Default fallback
+    questionnaire_config = experiment_config.get("questionnaire")
+    if questionnaire_config and "bayesian_target" in questionnaire_config:
+        target_key = questionnaire_config.get("bayesian_target", {}).get("variable")
+        if target_key:
+            target_column_name = target_key
+            logger.info(f"Using target column name: '{target_column_name}' (inline questionnaire)")
+    else:
+        questionnaire_config = None
+        # Legacy fallback: look up by questionnaire name in the library
+        questionnaire_type = experiment_config.get("questionnaire_name") or session.get(
+            "questionnaire_name"
+        )
+        if not questionnaire_type:
+            logger.warning(f"No questionnaire type for session {session.get('session_id')}")
+        else:
+            try:
+                from robotaste.config.questionnaire import QUESTIONNAIRE_CONFIGS
+
+                questionnaire_type_normalized = questionnaire_type.strip().lower()
+                q_def = QUESTIONNAIRE_CONFIGS.get(questionnaire_type_normalized)
+                if not q_def:
+                    q_def = QUESTIONNAIRE_CONFIGS.get(questionnaire_type)
+                if q_def:
+                    questionnaire_config = q_def  # Store the full config
+                    bayesian_config = q_def.get("bayesian_target", {})
+                    target_key = bayesian_config.get("variable")
+                    if target_key:
+                        target_column_name = target_key
+                        logger.info(f"Using target column name: '{target_column_name}'")
+            except Exception as e:
+                logger.warning(
+                    f"Could not get target variable name from config: {e}, using default 'target_value'"
+                )
+
+    # Fallback questionnaire config if not found
+    if not questionnaire_config:
+        logger.warning(f"Using fallback questionnaire config for session {session.get('session_id')}")
+        questionnaire_config = {
+            "bayesian_target": {
+                "variable": "overall_liking",
+                "higher_is_better": True,
+                "expected_range": [1, 9]
+            }
+        }
+
+    return target_column_name, questionnaire_config
+
+
 def get_training_data(session_id: str, only_final: bool = False) -> pd.DataFrame:
     """
     Get training data for BO model.
@@ -1389,45 +2100,7 @@ def get_training_data(session_id: str, only_final: bool = False) -> pd.DataFrame
             else:
                 return pd.DataFrame()
 
-        # Get target variable name from questionnaire config.
-        # Prefer the inline questionnaire stored on the experiment config (preferred
-        # per protocol schema) over the legacy library lookup by name, since the
-        # inline config is the one that actually has the correct bayesian_target
-        # for this protocol.
-        target_column_name = "target_value"  # Default fallback
-        questionnaire_config = experiment_config.get("questionnaire")
-        if questionnaire_config and "bayesian_target" in questionnaire_config:
-            target_key = questionnaire_config.get("bayesian_target", {}).get("variable")
-            if target_key:
-                target_column_name = target_key
-                logger.info(f"Using target column name: '{target_column_name}' (inline questionnaire)")
-        else:
-            questionnaire_config = None
-            # Legacy fallback: look up by questionnaire name in the library
-            questionnaire_type = experiment_config.get("questionnaire_name") or session.get(
-                "questionnaire_name"
-            )
-            if not questionnaire_type:
-                logger.warning(f"No questionnaire type for session {session_id}")
-            else:
-                try:
-                    from robotaste.config.questionnaire import QUESTIONNAIRE_CONFIGS
-
-                    questionnaire_type_normalized = questionnaire_type.strip().lower()
-                    q_def = QUESTIONNAIRE_CONFIGS.get(questionnaire_type_normalized)
-                    if not q_def:
-                        q_def = QUESTIONNAIRE_CONFIGS.get(questionnaire_type)
-                    if q_def:
-                        questionnaire_config = q_def  # Store the full config
-                        bayesian_config = q_def.get("bayesian_target", {})
-                        target_key = bayesian_config.get("variable")
-                        if target_key:
-                            target_column_name = target_key
-                            logger.info(f"Using target column name: '{target_column_name}'")
-                except Exception as e:
-                    logger.warning(
-                        f"Could not get target variable name from config: {e}, using default 'target_value'"
-                    )
+        target_column_name, questionnaire_config = get_target_questionnaire_config(session)
 
         # Get samples
         samples = get_session_samples(session_id, only_final=only_final)
@@ -1435,17 +2108,6 @@ def get_training_data(session_id: str, only_final: bool = False) -> pd.DataFrame
             logger.info(f"No samples found for session {session_id}")
             return pd.DataFrame()
 
-        # Fallback questionnaire config if not found
-        if not questionnaire_config:
-            logger.warning(f"Using fallback questionnaire config for session {session_id}")
-            questionnaire_config = {
-                "bayesian_target": {
-                    "variable": "overall_liking",
-                    "higher_is_better": True,
-                    "expected_range": [1, 9]
-                }
-            }
-
         # Build training data with ORDERED columns matching experiment config
         data = []
         for sample in samples:
@@ -1534,8 +2196,8 @@ def get_bo_config(session_id: str) -> Dict:
                 "kappa_exploitation": row["kappa_exploitation"],
                 "kernel_nu": row["kernel_nu"],
                 "length_scale_initial": row["length_scale_initial"],
-                "length_scale_bounds": json.loads(row["length_scale_bounds"]),
-                "constant_kernel_bounds": json.loads(row["constant_kernel_bounds"]),
+                "length_scale_bounds": json_codec.loads(row["length_scale_bounds"]),
+                "constant_kernel_bounds": json_codec.loads(row["constant_kernel_bounds"]),
                 "alpha": row["alpha"],
                 "n_restarts_optimizer": row["n_restarts_optimizer"],
                 "normalize_y": bool(row["normalize_y"]),
@@ -1722,6 +2384,7 @@ def cleanup_orphaned_sessions(max_age_minutes: int = 30) -> int:
                 """
                 DELETE FROM sessions
                 WHERE experiment_config IS NULL
+                AND config_snapshot_hash IS NULL
                 AND user_id IS NULL
                 AND datetime(created_at) < datetime('now', ? || ' minutes')
                 AND deleted_at IS NULL
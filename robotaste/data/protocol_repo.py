@@ -11,11 +11,12 @@ Created: 2026-01-01
 """
 
 import sqlite3
-import json
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
 
+from robotaste.utils import json_codec
+
 # Correctly import the database connection context manager
 from robotaste.data.database import get_database_connection
 from robotaste.config.protocols import (
@@ -24,6 +25,7 @@ from robotaste.config.protocols import (
     compute_protocol_hash,
     validate_protocol
 )
+from robotaste.core.compiled_protocol import invalidate_compiled_protocol
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +63,7 @@ def create_protocol_in_db(protocol: Dict[str, Any]) -> Optional[str]:
         description = protocol.get("description", "")
         version = protocol.get("version", "1.0")
         created_by = protocol.get("created_by", "")
-        tags = json.dumps(protocol.get("tags", []))
+        tags = json_codec.dumps(protocol.get("tags", []))
         protocol_hash = protocol.get("protocol_hash", compute_protocol_hash(protocol))
 
         # Insert into database using the connection context manager
@@ -128,6 +130,32 @@ def get_protocol_by_id(protocol_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def get_protocol_hash(protocol_id: str) -> Optional[str]:
+    """
+    Get the version hash of a protocol without loading its JSON.
+
+    Args:
+        protocol_id: Protocol ID
+
+    Returns:
+        protocol_hash if found, None otherwise
+    """
+    try:
+        with get_database_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT protocol_hash FROM protocol_library
+                WHERE protocol_id = ? AND deleted_at IS NULL
+            """, (protocol_id,))
+            row = cursor.fetchone()
+
+        return row[0] if row else None
+
+    except Exception as e:
+        logger.error(f"Failed to retrieve protocol hash {protocol_id}: {e}")
+        return None
+
+
 def list_protocols(
     search: Optional[str] = None,
     tags: Optional[List[str]] = None,
@@ -191,7 +219,7 @@ def list_protocols(
                 "created_at": row[5],
                 "updated_at": row[6],
                 "is_archived": bool(row[7]),
-                "tags": json.loads(row[8]) if row[8] else []
+                "tags": json_codec.loads(row[8]) if row[8] else []
             }
 
             # Tag filter (post-query since tags are JSON)
@@ -238,7 +266,7 @@ def update_protocol(protocol: Dict[str, Any]) -> bool:
         name = protocol.get("name")
         description = protocol.get("description", "")
         version = protocol.get("version", "1.0")
-        tags = json.dumps(protocol.get("tags", []))
+        tags = json_codec.dumps(protocol.get("tags", []))
         protocol_hash = protocol.get("protocol_hash", compute_protocol_hash(protocol))
 
         with get_database_connection() as conn:
@@ -262,6 +290,8 @@ def update_protocol(protocol: Dict[str, Any]) -> bool:
                 conn.rollback()
                 raise
 
+        invalidate_compiled_protocol(protocol_id)
+
         if rows_affected == 0:
             logger.warning(f"Protocol not found for update: {protocol_id}")
             return False
@@ -310,6 +340,8 @@ def delete_protocol(protocol_id: str, hard_delete: bool = False) -> bool:
                 conn.rollback()
                 raise
 
+        invalidate_compiled_protocol(protocol_id)
+
         if rows_affected == 0:
             logger.warning(f"Protocol not found for deletion: {protocol_id}")
             return False
@@ -440,7 +472,7 @@ def get_all_tags() -> List[str]:
         all_tags = set()
         for row in rows:
             if row[0]:
-                tags = json.loads(row[0])
+                tags = json_codec.loads(row[0])
                 all_tags.update(tags)
 
         return sorted(all_tags)
@@ -454,6 +486,7 @@ def get_all_tags() -> List[str]:
 __all__ = [
     'create_protocol_in_db',
     'get_protocol_by_id',
+    'get_protocol_hash',
     'list_protocols',
     'update_protocol',
     'delete_protocol',
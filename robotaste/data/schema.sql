@@ -52,16 +52,21 @@ CREATE TABLE IF NOT EXISTS sessions (
     ingredients TEXT,
     question_type_id INTEGER,  -- DEPRECATED: Legacy FK (no longer used, preserved for data integrity)
     protocol_id TEXT,  -- Link to protocol_library (optional)
+    protocol_session_number INTEGER DEFAULT NULL,  -- 1-based start order among sessions of protocol_id
     state TEXT NOT NULL DEFAULT 'active',
     current_phase TEXT DEFAULT 'waiting',
     current_cycle INTEGER DEFAULT 0,
     consent_given INTEGER DEFAULT NULL,
     consent_timestamp TIMESTAMP DEFAULT NULL,
-    experiment_config TEXT,
+    experiment_config TEXT,  -- Legacy: full config JSON of sessions without a snapshot
+    config_snapshot_hash TEXT,  -- Immutable part of the config (protocol_snapshots)
+    config_applied_at TIMESTAMP,  -- When the config was applied to the session
+    initial_pump_volumes TEXT,  -- JSON {ingredient_name: mL} given at session start
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     deleted_at TIMESTAMP DEFAULT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (config_snapshot_hash) REFERENCES protocol_snapshots(snapshot_hash),
     FOREIGN KEY (question_type_id) REFERENCES questionnaire_types(id),  -- DEPRECATED: Legacy FK preserved for historical data
     FOREIGN KEY (protocol_id) REFERENCES protocol_library(protocol_id)
 );
@@ -152,8 +157,14 @@ CREATE TABLE IF NOT EXISTS pump_operations (
 
     -- Results
     actual_volumes_json TEXT,  -- JSON: {"ingredient": actual_ul, ...}
+    pump_run_s REAL DEFAULT NULL,  -- Measured run until the pumps reported stopped; NULL if the wait ran out first
     error_message TEXT,
 
+    -- Worker claim (see pump_db.claim_next_operation)
+    claimed_by TEXT DEFAULT NULL,  -- Worker ID holding the operation
+    claimed_at TIMESTAMP DEFAULT NULL,  -- When the worker claimed it; started_at is set when dispensing begins
+    lease_expires_at TIMESTAMP DEFAULT NULL,  -- Claim is abandoned after this time
+
     FOREIGN KEY (session_id) REFERENCES sessions(session_id)
 );
 
@@ -189,8 +200,6 @@ CREATE TABLE IF NOT EXISTS pump_global_state (
     UNIQUE(protocol_id, pump_address)
 );
 
-CREATE INDEX IF NOT EXISTS idx_pump_global_state_protocol ON pump_global_state(protocol_id);
-
 -- Table 12: Pump Refill Operations (Withdraw/Purge Queue)
 CREATE TABLE IF NOT EXISTS pump_refill_operations (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -204,7 +213,10 @@ CREATE TABLE IF NOT EXISTS pump_refill_operations (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     started_at TIMESTAMP,
     completed_at TIMESTAMP,
-    error_message TEXT
+    error_message TEXT,
+    claimed_by TEXT DEFAULT NULL,
+    claimed_at TIMESTAMP DEFAULT NULL,
+    lease_expires_at TIMESTAMP DEFAULT NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_pump_refill_ops_status ON pump_refill_operations(status, created_at);
@@ -223,30 +235,137 @@ CREATE TABLE IF NOT EXISTS session_sample_bank_state (
     FOREIGN KEY (session_id) REFERENCES sessions(session_id)
 );
 
+-- Table 14: Pump Device State (Shadow copy of parameters programmed into each pump)
+-- Lets the pump service skip DIA/RAT/VOL-unit/DIR commands the pump already holds,
+-- including across service restarts. NULL means "unknown, must be sent".
+CREATE TABLE IF NOT EXISTS pump_device_state (
+    serial_port TEXT NOT NULL,
+    pump_address INTEGER NOT NULL,
+    diameter_mm REAL,
+    rate_ul_min REAL,
+    volume_unit TEXT,              -- "ML" or "UL"
+    direction TEXT,                -- "INF" or "WDR"
+    last_verified_at TIMESTAMP,    -- Last time values were confirmed against the pump
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (serial_port, pump_address)
+);
+
+-- Table 15: Protocol Session Counters (Per-protocol session numbering for Latin squares)
+-- Incremented when a session is linked to a protocol; the assigned value is
+-- stored on sessions.protocol_session_number.
+CREATE TABLE IF NOT EXISTS protocol_session_counters (
+    protocol_id TEXT PRIMARY KEY,
+    last_session_number INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table 16: Session Cycle Samples (Sample-bank sequence materialized at session start)
+CREATE TABLE IF NOT EXISTS session_cycle_samples (
+    session_id TEXT NOT NULL,
+    cycle_number INTEGER NOT NULL,
+    schedule_index INTEGER NOT NULL,          -- Schedule entry the cycle belongs to
+    sample_id TEXT NOT NULL,                  -- Sample ID within the bank
+    concentrations TEXT NOT NULL,             -- JSON {ingredient_name: concentration}
+    PRIMARY KEY (session_id, cycle_number)
+) WITHOUT ROWID;
+
+-- Table 17: Session Cycle Recipes (Pump recipes planned at session start)
+-- One row per cycle whose concentrations are known before the participant
+-- starts (predetermined and sample-bank cycles). recipe_json is inserted
+-- verbatim into pump_operations when the cycle is dispensed.
+CREATE TABLE IF NOT EXISTS session_cycle_recipes (
+    session_id TEXT NOT NULL,
+    cycle_number INTEGER NOT NULL,
+    concentrations TEXT NOT NULL,             -- JSON {ingredient_name: mM}
+    recipe_json TEXT NOT NULL,                -- JSON {ingredient_name: volume_ul}
+    PRIMARY KEY (session_id, cycle_number)
+) WITHOUT ROWID;
+
+-- Table 18: Session Convergence State (Running BO convergence accumulator)
+-- Updated by save_sample_cycle in the same transaction as the sample insert.
+CREATE TABLE IF NOT EXISTS session_convergence_state (
+    session_id TEXT PRIMARY KEY,
+    n_samples INTEGER NOT NULL DEFAULT 0,
+    n_bo_samples INTEGER NOT NULL DEFAULT 0,
+    best_value REAL,                          -- Best target value observed so far
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table 19: Session Convergence Points (One row per BO-selected sample)
+CREATE TABLE IF NOT EXISTS session_convergence_points (
+    session_id TEXT NOT NULL,
+    point_index INTEGER NOT NULL,             -- 0-based position among BO samples
+    cycle_number INTEGER NOT NULL,
+    acquisition_value REAL,
+    predicted_value REAL,
+    uncertainty REAL,
+    best_value REAL,                          -- Best target value up to this sample
+    PRIMARY KEY (session_id, point_index)
+) WITHOUT ROWID;
+
+-- Table 20: Pending Selections (Selection of the current cycle until its response is saved)
+-- Written by /selection, read by /confirm-cup-ready and /response. Kept out of
+-- sessions.experiment_config so the config stays the same size all session.
+CREATE TABLE IF NOT EXISTS pending_selections (
+    session_id TEXT NOT NULL,
+    cycle_number INTEGER NOT NULL,
+    concentrations TEXT NOT NULL,             -- JSON {ingredient_name: concentration}
+    selection_mode TEXT NOT NULL DEFAULT 'user_selected',
+    selection_data TEXT,                      -- JSON, NULL if none
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (session_id, cycle_number)
+) WITHOUT ROWID;
+
+-- Table 21: Protocol Snapshots (Immutable experiment config shared by sessions)
+-- Content-addressed: sessions started from the same protocol version store
+-- identical snapshots and reference one row.
+CREATE TABLE IF NOT EXISTS protocol_snapshots (
+    snapshot_hash TEXT PRIMARY KEY,           -- SHA-256 of config_json
+    protocol_id TEXT,
+    protocol_hash TEXT,                       -- protocol_library.protocol_hash at session start
+    config_json TEXT NOT NULL,                -- experiment_config without per-session state
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for performance
+-- Composite indexes follow the hot queries (filter columns first, then the
+-- ORDER BY column) so lookups never fall back to a scan or a temp sort.
+-- tests/test_query_plans.py checks the plans; indexes superseded by these are
+-- dropped in database._apply_schema_migrations.
+
 -- Protocol Library indexes
 CREATE INDEX IF NOT EXISTS idx_protocol_library_name ON protocol_library(name);
 CREATE INDEX IF NOT EXISTS idx_protocol_library_tags ON protocol_library(tags);
 CREATE INDEX IF NOT EXISTS idx_protocol_library_created_by ON protocol_library(created_by);
-CREATE INDEX IF NOT EXISTS idx_protocol_library_archived ON protocol_library(is_archived);
+-- list_protocols: live protocols, newest first
+CREATE INDEX IF NOT EXISTS idx_protocol_library_live_created ON protocol_library(created_at) WHERE deleted_at IS NULL;
 
 -- Sessions indexes
 CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id);
-CREATE INDEX IF NOT EXISTS idx_sessions_state ON sessions(state);
 CREATE INDEX IF NOT EXISTS idx_sessions_code ON sessions(session_code);
-CREATE INDEX IF NOT EXISTS idx_sessions_protocol_id ON sessions(protocol_id);
+-- Active session list, newest first
+CREATE INDEX IF NOT EXISTS idx_sessions_state_created ON sessions(state, created_at);
+-- Sessions of a protocol, newest first
+CREATE INDEX IF NOT EXISTS idx_sessions_protocol_created ON sessions(protocol_id, created_at);
 
 -- Samples indexes
-CREATE INDEX IF NOT EXISTS idx_samples_session_id ON samples(session_id);
-CREATE INDEX IF NOT EXISTS idx_samples_is_final ON samples(is_final);
 CREATE INDEX IF NOT EXISTS idx_samples_cycle_number ON samples(cycle_number);
 CREATE INDEX IF NOT EXISTS idx_samples_acquisition_function ON samples(acquisition_function);
 CREATE INDEX IF NOT EXISTS idx_samples_selection_mode ON samples(selection_mode);
+-- Session history by cycle (all samples / final samples only)
+CREATE INDEX IF NOT EXISTS idx_samples_session_cycle ON samples(session_id, cycle_number);
+CREATE INDEX IF NOT EXISTS idx_samples_session_final_cycle ON samples(session_id, cycle_number) WHERE is_final = 1;
+-- Latest sample of a session / BO training data in time order
+CREATE INDEX IF NOT EXISTS idx_samples_session_created ON samples(session_id, created_at);
 
 -- Pump operations indexes
 CREATE INDEX IF NOT EXISTS idx_pump_operations_status ON pump_operations(status, created_at);
-CREATE INDEX IF NOT EXISTS idx_pump_operations_session_id ON pump_operations(session_id);
 CREATE INDEX IF NOT EXISTS idx_pump_operations_cycle ON pump_operations(cycle_number);
+-- Latest operation of a session (optionally by status or cycle)
+CREATE INDEX IF NOT EXISTS idx_pump_operations_session_created ON pump_operations(session_id, created_at);
+-- Dispense timing model refresh watermark
+CREATE INDEX IF NOT EXISTS idx_pump_operations_status_completed ON pump_operations(status, completed_at, id);
 
 -- Pump logs indexes
 CREATE INDEX IF NOT EXISTS idx_pump_logs_operation_id ON pump_logs(operation_id);
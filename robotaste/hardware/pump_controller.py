@@ -15,7 +15,7 @@ import serial  # pip install pyserial
 import time
 import logging
 import re
-from typing import Optional, Literal, List, Tuple
+from typing import Callable, Optional, Literal, List, Tuple
 from threading import RLock
 from dataclasses import dataclass
 
@@ -479,6 +479,10 @@ class NE4000Pump:
         self._current_rate_ul_min: Optional[float] = (
             None  # Track current rate for time calculations
         )
+        # Optional audit hook: (address, command, response, success, error_message)
+        self.command_logger: Optional[
+            Callable[[int, str, Optional[str], bool, Optional[str]], None]
+        ] = None
 
         # Validate parameters
         if not 0 <= address <= 99:
@@ -740,7 +744,10 @@ class NE4000Pump:
             logger.warning(f"[Pump {self.address}] Could not verify rate")
 
     def set_volume(
-        self, volume_ul: float, volume_unit: Literal["ML", "UL"] = "ML"
+        self,
+        volume_ul: float,
+        volume_unit: Literal["ML", "UL"] = "ML",
+        set_unit: bool = True,
     ) -> None:
         """
         Set volume to dispense with verification (does not start pumping).
@@ -748,6 +755,7 @@ class NE4000Pump:
         Args:
             volume_ul: Volume in microliters
             volume_unit: "ML" or "UL" for pump volume units
+            set_unit: If False, skip the "VOL <unit>" command (unit already programmed)
 
         Raises:
             ValueError: If volume is negative
@@ -775,8 +783,8 @@ class NE4000Pump:
             f"[Pump {self.address}] Programming volume: {volume_ul:.1f} µL "
             f"({volume_str} {volume_unit})"
         )
-        response = self._send_command(f"{self.CMD_VOLUME} {volume_unit}")
-        logger.debug(f"[Pump {self.address}] Set volume unit response: {response}")
+        if set_unit:
+            self.set_volume_unit(volume_unit)
         response = self._send_command(f"{self.CMD_VOLUME} {volume_str}")
         logger.info(f"[Pump {self.address}] Set volume response: {response}")
 
@@ -808,6 +816,22 @@ class NE4000Pump:
         else:
             logger.warning(f"[Pump {self.address}] Could not verify volume")
 
+    def set_volume_unit(self, volume_unit: Literal["ML", "UL"]) -> None:
+        """
+        Set the unit used for subsequent volume values.
+
+        Args:
+            volume_unit: "ML" or "UL"
+
+        Raises:
+            ValueError: If unit invalid
+        """
+        if volume_unit not in ["ML", "UL"]:
+            raise ValueError(f"Volume unit must be 'ML' or 'UL', got {volume_unit}")
+
+        response = self._send_command(f"{self.CMD_VOLUME} {volume_unit}")
+        logger.debug(f"[Pump {self.address}] Set volume unit response: {response}")
+
     def set_direction(self, direction: Literal["INF", "WDR"]) -> None:
         """
         Set pumping direction with verification.
@@ -1160,6 +1184,8 @@ class NE4000Pump:
         wait: bool = True,
         volume_unit: Literal["ML", "UL"] = "ML",
         direction: Optional[str] = None,
+        configure: bool = True,
+        wait_s: Optional[float] = None,
     ) -> None:
         """
         Dispense a specific volume (high-level convenience method).
@@ -1174,6 +1200,11 @@ class NE4000Pump:
             wait: If True, block until dispensing completes
             volume_unit: "ML" or "UL" for pump volume units
             direction: "INF" (infuse) or "WDR" (withdraw). Defaults to INF.
+            configure: If False, the caller guarantees direction, rate and volume
+                unit are already programmed; only VOL and RUN are sent and
+                rate_ul_min is used for timing only.
+            wait_s: Time to let the pump run before stopping it (optional,
+                defaults to the expected time plus a 10% buffer)
 
         Raises:
             ValueError: If rate is not specified and no current rate is set
@@ -1189,13 +1220,16 @@ class NE4000Pump:
             )
             return
 
-        # Set direction (default to infuse)
-        pump_dir = direction if direction in (self.DIR_INFUSE, self.DIR_WITHDRAW) else self.DIR_INFUSE
-        self.set_direction(pump_dir)
+        if configure:
+            # Set direction (default to infuse)
+            pump_dir = direction if direction in (self.DIR_INFUSE, self.DIR_WITHDRAW) else self.DIR_INFUSE
+            self.set_direction(pump_dir)
 
-        # Set rate if specified
-        if rate_ul_min is not None:
-            self.set_rate(rate_ul_min, self.UNIT_UL_MIN)
+            # Set rate if specified
+            if rate_ul_min is not None:
+                self.set_rate(rate_ul_min, self.UNIT_UL_MIN)
+        elif rate_ul_min is not None:
+            self._current_rate_ul_min = rate_ul_min
 
         # Ensure rate is known for time calculation
         if self._current_rate_ul_min is None:
@@ -1205,13 +1239,13 @@ class NE4000Pump:
 
         # Calculate expected dispense time
         expected_time_seconds = (volume_ul / self._current_rate_ul_min) * 60.0
-        wait_time = expected_time_seconds * 1.1  # 10% buffer
+        wait_time = wait_s if wait_s is not None else expected_time_seconds * 1.1  # 10% buffer
         logger.info(
             f"[Pump {self.address}] Expected time: {expected_time_seconds:.2f}s (with buffer: {wait_time:.2f}s)"
         )
 
         # Set volume
-        self.set_volume(volume_ul, volume_unit=volume_unit)
+        self.set_volume(volume_ul, volume_unit=volume_unit, set_unit=configure)
 
         # Start pumping
         self.start()
@@ -1329,10 +1363,12 @@ class NE4000Pump:
                         logger.error(f"[Pump {self.address}] ❌ Pump error: {response}")
                         raise PumpCommandError(f"Pump error: {response}")
 
+                    self._record_command(command, response, True)
                     return response
 
             except (PumpTimeoutError, PumpCommandError) as e:
                 last_error = e
+                self._record_command(command, None, False, str(e))
                 if attempt < attempts:
                     wait_time = 0.1 * (2 ** (attempt - 1))  # Exponential backoff
                     logger.warning(
@@ -1348,6 +1384,7 @@ class NE4000Pump:
             except Exception as e:
                 last_error = e
                 logger.error(f"Unexpected error: {e}")
+                self._record_command(command, None, False, str(e))
                 raise PumpCommandError(f"Command failed: {e}")
 
         # Should not reach here, but just in case
@@ -1408,14 +1445,32 @@ class NE4000Pump:
                 if check_errors:
                     self._check_burst_response_for_errors(command, response)
 
+                self._record_command(command, response, True)
                 return response
 
-        except PumpCommandError:
+        except PumpCommandError as e:
+            self._record_command(command, None, False, str(e))
             raise  # Re-raise our own errors
         except Exception as e:
             logger.error(f"[Burst Mode] Command failed: {e}")
+            self._record_command(command, None, False, str(e))
             raise PumpCommandError(f"Burst command failed: {e}")
 
+    def _record_command(
+        self,
+        command: str,
+        response: Optional[str],
+        success: bool,
+        error_message: Optional[str] = None,
+    ) -> None:
+        """Pass a command to the audit hook; hook failures never reach the caller."""
+        if self.command_logger is None:
+            return
+        try:
+            self.command_logger(self.address, command, response, success, error_message)
+        except Exception as e:
+            logger.warning(f"[Pump {self.address}] Command logger failed: {e}")
+
     def _check_burst_response_for_errors(self, command: str, response: str) -> None:
         """
         Check burst response for error indicators.
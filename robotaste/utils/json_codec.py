@@ -0,0 +1,122 @@
+"""
+JSON codec for database blobs and API responses.
+
+Every JSON column (experiment_config, ingredient_concentration,
+questionnaire_answer, selection_data, recipe_json, ...) and every large API
+payload goes through this module, so the encoder is chosen in one place:
+orjson when it is installed, the standard library otherwise. Both backends
+write compact UTF-8 JSON and read each other's output.
+
+- NumPy arrays and scalars serialize directly (orjson reads the array
+  buffer; the stdlib fallback converts them through tolist())
+- loads() falls back to the stdlib parser for documents orjson rejects,
+  such as NaN/Infinity written by json.dumps into older rows
+- orjson writes NaN/Infinity as null, as strict JSON requires
+- dumps_canonical() is the one encoding for persisted content hashes: the
+  backends format some floats differently (1e-05 vs 0.00001), so hashes
+  must not depend on which one is installed
+"""
+
+import json
+import logging
+from typing import Any, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Encode types the backend does not handle natively."""
+    if isinstance(obj, np.ndarray):
+        # orjson only reads C-contiguous arrays of native dtypes
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """
+    Encode an object as UTF-8 JSON bytes.
+
+    Args:
+        obj: Object to encode
+        sort_keys: Sort object keys (for content hashing)
+
+    Returns:
+        Compact JSON bytes
+
+    Raises:
+        TypeError: If obj contains a type that cannot be encoded
+    """
+    if orjson is not None:
+        options = _ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=_default, option=options)
+    return dumps(obj, sort_keys=sort_keys).encode("utf-8")
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """
+    Encode an object as a JSON string (drop-in for json.dumps).
+
+    Args:
+        obj: Object to encode
+        sort_keys: Sort object keys (for content hashing)
+
+    Returns:
+        Compact JSON string
+    """
+    if orjson is not None:
+        return dumps_bytes(obj, sort_keys=sort_keys).decode("utf-8")
+    return json.dumps(
+        obj, default=_default, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+def dumps_canonical(obj: Any) -> str:
+    """
+    Encode an object in the canonical form used for stored content hashes.
+
+    Always the standard library's json.dumps(obj, sort_keys=True) with its
+    default separators, whichever backend is installed, so equal content
+    hashes the same on every install and as it did before this module.
+
+    Args:
+        obj: Object to encode
+
+    Returns:
+        Canonical JSON string
+    """
+    return json.dumps(obj, default=_default, sort_keys=True)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Decode a JSON document (drop-in for json.loads).
+
+    Args:
+        data: JSON string or bytes
+
+    Returns:
+        Decoded object
+
+    Raises:
+        json.JSONDecodeError: If data is not valid JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # Let the stdlib parser accept NaN or raise its usual error
+    return json.loads(data)
@@ -5,12 +5,18 @@ Provides CRUD operations for pump_operations and pump_logs tables,
 used by the pump control service to manage dispensing tasks.
 """
 
-import json
+import logging
 import sqlite3
-from datetime import datetime
+import threading
+from collections import deque
+from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
 from pathlib import Path
 
+from robotaste.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
 
 def get_db_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
     """
@@ -103,6 +109,265 @@ def get_pending_operations(
     return [dict(row) for row in rows]
 
 
+# ─── CLAIMING (MULTI-WORKER SAFE) ───────────────────────────────────────────
+
+# How long a claimed operation stays owned without a lease renewal
+DEFAULT_LEASE_SECONDS = 60.0
+
+# Tables whose rows can be claimed by a pump service worker
+_CLAIMABLE_TABLES = ("pump_operations", "pump_refill_operations")
+
+
+def _claim_next(
+    table: str,
+    worker_id: str,
+    lease_seconds: float,
+    db_path: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically move the oldest pending row of a table to in_progress.
+
+    BEGIN IMMEDIATE takes the write lock before the SELECT, so no other
+    connection can pick the same row between the read and the update.
+    """
+    if table not in _CLAIMABLE_TABLES:
+        raise ValueError(f"Table '{table}' is not claimable")
+
+    now = datetime.now()
+    conn = get_db_connection(db_path)
+    conn.isolation_level = None  # Manual transaction control
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            f"""
+            SELECT id
+            FROM {table}
+            WHERE status = 'pending'
+            ORDER BY created_at ASC, id ASC
+            LIMIT 1
+            """
+        )
+        row = cursor.fetchone()
+
+        if not row:
+            cursor.execute("COMMIT")
+            return None
+
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET status = 'in_progress',
+                claimed_at = ?,
+                claimed_by = ?,
+                lease_expires_at = ?
+            WHERE id = ?
+            """,
+            (
+                now.isoformat(),
+                worker_id,
+                (now + timedelta(seconds=lease_seconds)).isoformat(),
+                row['id'],
+            )
+        )
+        cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (row['id'],))
+        claimed = dict(cursor.fetchone())
+        cursor.execute("COMMIT")
+        return claimed
+
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def claim_next_operation(
+    worker_id: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    db_path: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claim the oldest pending pump operation for a worker.
+
+    The operation is marked in_progress with a lease; the worker must keep
+    renewing it (see renew_leases) or it is treated as abandoned. The claim
+    records claimed_at; started_at stays NULL until the worker actually
+    begins dispensing (mark_operation_in_progress), so a claimed operation
+    still waiting for its pump port has no started_at.
+
+    Args:
+        worker_id: Unique identifier of the claiming worker
+        lease_seconds: Lease duration in seconds
+        db_path: Database path (optional)
+
+    Returns:
+        Claimed operation dictionary or None if nothing is pending
+    """
+    return _claim_next("pump_operations", worker_id, lease_seconds, db_path)
+
+
+def claim_next_refill_operation(
+    worker_id: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    db_path: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claim the oldest pending refill operation for a worker.
+
+    Args:
+        worker_id: Unique identifier of the claiming worker
+        lease_seconds: Lease duration in seconds
+        db_path: Database path (optional)
+
+    Returns:
+        Claimed refill operation dictionary or None if nothing is pending
+    """
+    return _claim_next("pump_refill_operations", worker_id, lease_seconds, db_path)
+
+
+def renew_leases(
+    worker_id: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    db_path: Optional[str] = None
+) -> int:
+    """
+    Extend the lease of every in-progress operation held by a worker.
+
+    Args:
+        worker_id: Worker identifier used when claiming
+        lease_seconds: New lease duration from now, in seconds
+        db_path: Database path (optional)
+
+    Returns:
+        Number of leases renewed
+    """
+    expires_at = (datetime.now() + timedelta(seconds=lease_seconds)).isoformat()
+
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    renewed = 0
+    for table in _CLAIMABLE_TABLES:
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET lease_expires_at = ?
+            WHERE claimed_by = ? AND status = 'in_progress'
+            """,
+            (expires_at, worker_id)
+        )
+        renewed += cursor.rowcount
+
+    conn.commit()
+    conn.close()
+
+    return renewed
+
+
+def release_operation(
+    operation_id: int,
+    worker_id: str,
+    refill: bool = False,
+    db_path: Optional[str] = None
+) -> bool:
+    """
+    Return a claimed operation that was never started to the pending queue.
+
+    Args:
+        operation_id: Operation ID
+        worker_id: Worker identifier used when claiming
+        refill: True for a pump_refill_operations row
+        db_path: Database path (optional)
+
+    Returns:
+        True if the operation was released
+    """
+    table = "pump_refill_operations" if refill else "pump_operations"
+
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        f"""
+        UPDATE {table}
+        SET status = 'pending',
+            started_at = NULL,
+            claimed_by = NULL,
+            claimed_at = NULL,
+            lease_expires_at = NULL
+        WHERE id = ? AND claimed_by = ? AND status = 'in_progress'
+        """,
+        (operation_id, worker_id)
+    )
+
+    released = cursor.rowcount > 0
+    conn.commit()
+    conn.close()
+
+    return released
+
+
+def recover_expired_leases(
+    requeue: bool = False,
+    db_path: Optional[str] = None
+) -> int:
+    """
+    Recover operations whose worker stopped renewing its lease (crashed).
+
+    By default such operations are marked failed: a dispense interrupted
+    mid-way may have partially filled the cup, so re-running it blindly
+    could double-dispense. Pass requeue=True to put them back to pending.
+
+    Args:
+        requeue: If True, reset to pending instead of failing
+        db_path: Database path (optional)
+
+    Returns:
+        Number of operations recovered
+    """
+    now = datetime.now().isoformat()
+
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    recovered = 0
+    for table in _CLAIMABLE_TABLES:
+        if requeue:
+            cursor.execute(
+                f"""
+                UPDATE {table}
+                SET status = 'pending',
+                    started_at = NULL,
+                    claimed_by = NULL,
+                    claimed_at = NULL,
+                    lease_expires_at = NULL
+                WHERE status = 'in_progress' AND lease_expires_at < ?
+                """,
+                (now,)
+            )
+        else:
+            cursor.execute(
+                f"""
+                UPDATE {table}
+                SET status = 'failed',
+                    completed_at = ?,
+                    error_message = 'Lease expired: worker ' || COALESCE(claimed_by, '?') || ' stopped responding',
+                    lease_expires_at = NULL
+                WHERE status = 'in_progress' AND lease_expires_at < ?
+                """,
+                (now, now)
+            )
+        recovered += cursor.rowcount
+
+    conn.commit()
+    conn.close()
+
+    return recovered
+
+
 def get_operation_by_id(
     operation_id: int,
     db_path: Optional[str] = None
@@ -192,7 +457,8 @@ def update_operation_status(
     completed_at: Optional[str] = None,
     actual_volumes_json: Optional[str] = None,
     error_message: Optional[str] = None,
-    db_path: Optional[str] = None
+    db_path: Optional[str] = None,
+    pump_run_s: Optional[float] = None
 ) -> None:
     """
     Update pump operation status and related fields.
@@ -205,6 +471,7 @@ def update_operation_status(
         actual_volumes_json: JSON string with actual dispensed volumes
         error_message: Error message if failed
         db_path: Database path (optional)
+        pump_run_s: Measured pumping time in seconds
     """
     conn = get_db_connection(db_path)
     cursor = conn.cursor()
@@ -229,6 +496,10 @@ def update_operation_status(
         updates.append("error_message = ?")
         params.append(error_message)
 
+    if pump_run_s is not None:
+        updates.append("pump_run_s = ?")
+        params.append(pump_run_s)
+
     params.append(operation_id)
 
     query = f"""
@@ -247,7 +518,10 @@ def mark_operation_in_progress(
     db_path: Optional[str] = None
 ) -> None:
     """
-    Mark operation as in_progress with current timestamp.
+    Mark operation as in_progress and record when dispensing began.
+
+    Claimed operations are already in_progress; this sets started_at, which
+    the claim leaves NULL, so it excludes time spent waiting for the pump.
 
     Args:
         operation_id: Operation ID
@@ -264,7 +538,8 @@ def mark_operation_in_progress(
 def mark_operation_completed(
     operation_id: int,
     actual_volumes: Optional[Dict[str, float]] = None,
-    db_path: Optional[str] = None
+    db_path: Optional[str] = None,
+    pump_run_s: Optional[float] = None
 ) -> None:
     """
     Mark operation as completed with current timestamp.
@@ -273,15 +548,17 @@ def mark_operation_completed(
         operation_id: Operation ID
         actual_volumes: Dictionary of actual dispensed volumes (optional)
         db_path: Database path (optional)
+        pump_run_s: Measured pumping time in seconds (optional)
     """
-    actual_volumes_json = json.dumps(actual_volumes) if actual_volumes else None
+    actual_volumes_json = json_codec.dumps(actual_volumes) if actual_volumes else None
 
     update_operation_status(
         operation_id,
         status='completed',
         completed_at=datetime.now().isoformat(),
         actual_volumes_json=actual_volumes_json,
-        db_path=db_path
+        db_path=db_path,
+        pump_run_s=pump_run_s
     )
 
 
@@ -382,6 +659,140 @@ def get_operation_logs(
     return [dict(row) for row in rows]
 
 
+# ─── BUFFERED COMMAND LOG ───────────────────────────────────────────────────
+
+
+class PumpLogSink:
+    """
+    Buffered writer for pump_logs.
+
+    log() only appends to an in-memory ring buffer, so command-level audit
+    logging adds no disk I/O to the serial round-trip. A background thread
+    writes the buffer with one executemany per batch once flush_size entries
+    are queued or flush_interval_s has passed. Call flush() at the end of an
+    operation and close() on shutdown to persist everything still queued.
+
+    A batch that fails to write goes back to the front of the buffer and is
+    retried with the next flush. If the database stalls long enough for the
+    buffer to fill, the oldest entries are dropped (and counted) rather than
+    blocking the pumps.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        capacity: int = 10000,
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0
+    ):
+        self.db_path = db_path
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self.dropped = 0
+
+        self._buffer: deque = deque(maxlen=capacity)
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Keeps batches in insertion order
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._thread = threading.Thread(
+            target=self._run, name="pump-log-sink", daemon=True
+        )
+        self._thread.start()
+
+    def log(
+        self,
+        operation_id: int,
+        pump_address: int,
+        command: str,
+        response: Optional[str] = None,
+        success: bool = True,
+        error_message: Optional[str] = None
+    ) -> None:
+        """Queue a pump command entry (same fields as log_pump_command)."""
+        entry = (
+            operation_id, datetime.now().isoformat(), pump_address, command,
+            response, 1 if success else 0, error_message
+        )
+        with self._buffer_lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Write all queued entries now, on the calling thread.
+
+        Returns:
+            Number of entries written
+        """
+        with self._write_lock:
+            with self._buffer_lock:
+                rows = list(self._buffer)
+                self._buffer.clear()
+
+            if not rows:
+                return 0
+
+            conn = None
+            try:
+                conn = get_db_connection(self.db_path)
+                conn.executemany(
+                    """
+                    INSERT INTO pump_logs
+                        (operation_id, timestamp, pump_address, command, response, success, error_message)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    rows
+                )
+                conn.commit()
+            except Exception as e:
+                requeued = self._requeue(rows)
+                logger.error(
+                    f"Failed to write {len(rows)} pump log entries "
+                    f"({requeued} kept for retry): {e}"
+                )
+                return 0
+            finally:
+                if conn is not None:
+                    conn.close()
+
+            return len(rows)
+
+    def _requeue(self, rows: list) -> int:
+        """Put an unwritten batch back ahead of newer entries; returns how many fit."""
+        with self._buffer_lock:
+            pending = rows + list(self._buffer)
+            overflow = max(0, len(pending) - self._buffer.maxlen)
+            self.dropped += overflow
+            self._buffer.clear()
+            self._buffer.extend(pending[overflow:])
+        return max(0, len(rows) - overflow)
+
+    def close(self) -> None:
+        """Stop the background thread and write any remaining entries."""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+        if self._buffer:
+            logger.error(f"Pump log sink closed with {len(self._buffer)} entries unwritten")
+        if self.dropped:
+            logger.warning(f"Pump log buffer overflowed: {self.dropped} entries dropped")
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval_s)
+            self._wakeup.clear()
+            self.flush()
+
+
 def get_recent_operations(
     session_id: Optional[str] = None,
     limit: int = 10,
@@ -679,3 +1090,137 @@ def update_refill_operation_status(
     cursor.execute(query, params)
     conn.commit()
     conn.close()
+
+
+# ─── PUMP DEVICE STATE (SHADOW PARAMETERS) ──────────────────────────────────
+
+# Parameters tracked per pump in pump_device_state
+PUMP_STATE_FIELDS = ("diameter_mm", "rate_ul_min", "volume_unit", "direction")
+
+
+def get_pump_device_state(
+    serial_port: str,
+    pump_address: int,
+    db_path: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Get the last known parameters programmed into a pump.
+
+    Args:
+        serial_port: Serial port the pump is attached to
+        pump_address: Pump network address
+        db_path: Database path (optional)
+
+    Returns:
+        State dictionary or None if the pump has never been tracked
+    """
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT *
+        FROM pump_device_state
+        WHERE serial_port = ? AND pump_address = ?
+    """, (serial_port, pump_address))
+
+    row = cursor.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
+
+
+def save_pump_device_state(
+    serial_port: str,
+    pump_address: int,
+    values: Dict[str, Any],
+    verified: bool = True,
+    db_path: Optional[str] = None
+) -> None:
+    """
+    Record parameters known to be programmed into a pump.
+
+    Only the keys present in ``values`` are written; a value of None marks
+    that parameter as unknown so it is re-sent on next use.
+
+    Args:
+        serial_port: Serial port the pump is attached to
+        pump_address: Pump network address
+        values: Subset of PUMP_STATE_FIELDS -> value
+        verified: If True, stamp last_verified_at with the current time
+        db_path: Database path (optional)
+
+    Raises:
+        ValueError: If values contains an unknown field
+    """
+    unknown = set(values) - set(PUMP_STATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown pump state fields: {sorted(unknown)}")
+
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO pump_device_state (serial_port, pump_address)
+        VALUES (?, ?)
+    """, (serial_port, pump_address))
+
+    updates = ["updated_at = CURRENT_TIMESTAMP"]
+    params: list = []
+
+    for field in PUMP_STATE_FIELDS:
+        if field in values:
+            updates.append(f"{field} = ?")
+            params.append(values[field])
+
+    if verified:
+        updates.append("last_verified_at = ?")
+        params.append(datetime.now().isoformat())
+
+    params.extend([serial_port, pump_address])
+
+    query = f"""
+        UPDATE pump_device_state
+        SET {', '.join(updates)}
+        WHERE serial_port = ? AND pump_address = ?
+    """
+
+    cursor.execute(query, params)
+    conn.commit()
+    conn.close()
+
+
+def clear_pump_device_state(
+    serial_port: str,
+    pump_address: Optional[int] = None,
+    db_path: Optional[str] = None
+) -> int:
+    """
+    Forget tracked parameters so they are re-sent on next use.
+
+    Args:
+        serial_port: Serial port the pump is attached to
+        pump_address: Pump network address (None clears every pump on the port)
+        db_path: Database path (optional)
+
+    Returns:
+        Number of state rows removed
+    """
+    conn = get_db_connection(db_path)
+    cursor = conn.cursor()
+
+    if pump_address is None:
+        cursor.execute(
+            "DELETE FROM pump_device_state WHERE serial_port = ?",
+            (serial_port,)
+        )
+    else:
+        cursor.execute(
+            "DELETE FROM pump_device_state WHERE serial_port = ? AND pump_address = ?",
+            (serial_port, pump_address)
+        )
+
+    deleted_count = cursor.rowcount
+    conn.commit()
+    conn.close()
+
+    return deleted_count
@@ -0,0 +1,61 @@
+"""
+Benchmark GP fits of the sklearn and NumPy backends.
+
+For each (samples, dimensions) size, fits RoboTasteBO with the default BO
+config (n_restarts_optimizer=10) on synthetic ratings and reports the best
+fit time per backend and the log marginal likelihood each one reaches (the
+same value means the same result quality).
+
+Usage: python scripts/benchmark_gp_backends.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from robotaste.config.bo_config import get_default_bo_config  # noqa: E402
+from robotaste.core.bo_engine import RoboTasteBO  # noqa: E402
+
+SIZES = [(5, 2), (12, 2), (20, 3), (30, 4), (50, 6)]
+
+
+def _data(n, d, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0.0, 100.0, (n, d))
+    y = 5 + 2 * np.sin(X.sum(1) / 60) + rng.normal(0, 0.5, n)
+    return X, y
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'n':>4}{'d':>3}{'sklearn ms':>13}{'numpy ms':>11}{'speedup':>10}  lml sklearn / numpy")
+    for n, d in SIZES:
+        X, y = _data(n, d)
+        names = [f"I{i}" for i in range(d)]
+        ranges = {name: (0.0, 100.0) for name in names}
+        results = {}
+        for backend in ("sklearn", "numpy"):
+            config = {**get_default_bo_config(), "gp_backend": backend}
+
+            def fit():
+                bo = RoboTasteBO(names, ranges, config=config)
+                bo.fit(X, y)
+                return bo
+
+            seconds = min(timeit.repeat(fit, number=1, repeat=args.repeat))
+            results[backend] = (seconds * 1e3, fit().gp.log_marginal_likelihood_value_)
+
+        (t_sk, lml_sk), (t_np, lml_np) = results["sklearn"], results["numpy"]
+        print(f"{n:>4}{d:>3}{t_sk:>13.1f}{t_np:>11.1f}{t_sk / t_np:>9.1f}x  {lml_sk:.6f} / {lml_np:.6f}")
+
+
+if __name__ == "__main__":
+    main()
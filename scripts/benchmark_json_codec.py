@@ -0,0 +1,116 @@
+"""
+Benchmark the JSON codec against the stdlib paths it replaces.
+
+Measures, per request:
+  - /bo-model style response: 25×25 mean/std/acquisition grids rendered
+    as .tolist() + jsonable_encoder + JSONResponse (before) vs. arrays
+    rendered by FastJSONResponse (after)
+  - session read: json.loads of a protocol-sized experiment_config vs.
+    json_codec.loads
+  - cycle write: json.dumps of ingredient_concentration, questionnaire_answer
+    and selection_data vs. json_codec.dumps
+  - float32 grids: the same response with ?grid_format=float32 vs. the
+    number-list response (time and payload size)
+
+Usage: python scripts/benchmark_json_codec.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from api.responses import FastJSONResponse, grid_response  # noqa: E402
+from robotaste.utils import json_codec  # noqa: E402
+
+GRID_SIZE = 25
+
+
+def _surface():
+    rng = np.random.default_rng(0)
+    x = np.linspace(0.0, 100.0, GRID_SIZE)
+    y = np.linspace(50.0, 0.0, GRID_SIZE)
+    grids = {name: rng.random((GRID_SIZE, GRID_SIZE)) for name in ("mean", "std", "acquisition")}
+    observations = {axis: rng.random(12) * 50 for axis in ("x", "y", "z")}
+    return {"x": x, "y": y, **grids}, observations
+
+
+def _experiment_config():
+    protocol_dir = os.path.join(os.path.dirname(__file__), "..", "protocols")
+    for name in sorted(os.listdir(protocol_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(protocol_dir, name)) as f:
+                return json.load(f)
+    return {"ingredients": [{"name": f"I{i}"} for i in range(5)], "current_cycle": 3}
+
+
+def _cycle_blobs():
+    return (
+        {"Sugar": 12.5, "Salt": 3.25},
+        {"liking": 7, "sweetness": 5.5, "comment": "ok"},
+        {"mode": "bayesian_optimization", "acquisition_value": 0.012, "predicted_value": 6.8,
+         "uncertainty": 0.9, "all_predictions": list(np.linspace(0, 1, 50))},
+    )
+
+
+def _time(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    predictions, observations = _surface()
+
+    def surface_before():
+        content = {
+            "status": "ready",
+            "predictions": {k: v.tolist() for k, v in predictions.items()},
+            "observations": {k: v.tolist() for k, v in observations.items()},
+        }
+        return JSONResponse(jsonable_encoder(content)).body
+
+    def surface_after():
+        content = {"status": "ready", "predictions": predictions, "observations": observations}
+        return FastJSONResponse(content).body
+
+    def surface_float32():
+        content = {"status": "ready", "predictions": predictions, "observations": observations}
+        return grid_response(content, float32_grids=True).body
+
+    assert json.loads(surface_before()) == json.loads(surface_after())
+
+    config_text = json.dumps(_experiment_config())
+    blobs = _cycle_blobs()
+
+    rows = [
+        ("BO surface response", surface_before, surface_after),
+        ("experiment_config read",
+         lambda: json.loads(config_text), lambda: json_codec.loads(config_text)),
+        ("cycle blobs write",
+         lambda: [json.dumps(b) for b in blobs], lambda: [json_codec.dumps(b) for b in blobs]),
+        ("BO surface float32 grids", surface_after, surface_float32),
+    ]
+
+    print(f"json_codec backend: {json_codec.BACKEND}  (best of {args.repeat})")
+    print(f"{'path':<26}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for label, before, after in rows:
+        t_before, t_after = _time(before, args.repeat), _time(after, args.repeat)
+        print(f"{label:<26}{t_before:>12.3f}{t_after:>12.3f}{t_before / t_after:>9.1f}x")
+
+    sizes = [len(surface_before()), len(surface_after()), len(surface_float32())]
+    print(f"\nBO surface payload bytes: stdlib {sizes[0]}, codec {sizes[1]}, float32 {sizes[2]} "
+          f"({sizes[1] / sizes[2]:.1f}x smaller than number lists)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""Shared pytest fixtures."""
+
+import os
+import tempfile
+
+import pytest
+
+import robotaste.data.database as database
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Temporary database initialized from schema.sql."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+    monkeypatch.setattr(database, "DB_PATH", temp_db.name)
+    database.init_database()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
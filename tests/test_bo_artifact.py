@@ -0,0 +1,210 @@
+"""
+Tests for the per-session BO artifact.
+
+Validates that:
+- Suggestion and /bo-model share one fitted GP per training-data fingerprint
+- A new sample (or cycle) invalidates the artifact
+- The plotted suggestion is the artifact model's prediction at that point
+- Callers can't mutate the cached suggestion
+- Post-hoc surface and calibration fits run on the BO scheduler's workers,
+  one job per calibration fit so subject jobs run between them
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+from starlette.requests import Request
+
+import api.routers.sessions as sessions
+import robotaste.core.bo_integration as bo_integration
+import robotaste.core.bo_surface as bo_surface
+import robotaste.data.database as database
+from robotaste.core.bo_engine import RoboTasteBO
+from robotaste.core.bo_scheduler import PRIORITY_SUBJECT, BOScheduler
+from robotaste.data.database import create_session, get_database_connection, save_sample_cycle
+
+EXPERIMENT_CONFIG = {
+    "ingredients": [
+        {"name": "Sugar", "min_concentration": 0.0, "max_concentration": 100.0},
+        {"name": "Salt", "min_concentration": 0.0, "max_concentration": 10.0},
+    ],
+    "questionnaire": {
+        "bayesian_target": {"variable": "liking", "higher_is_better": True, "expected_range": [1, 9]}
+    },
+    "bayesian_optimization": {"enabled": True, "min_samples_for_bo": 3},
+}
+
+# (Sugar, Salt, liking)
+SAMPLES = [(10.0, 1.0, 3), (50.0, 5.0, 7), (90.0, 2.0, 5), (30.0, 8.0, 4)]
+
+
+def _request():
+    return Request({"type": "http", "headers": []})
+
+
+def _set_cycle(session_id, cycle):
+    with get_database_connection() as conn:
+        conn.execute(
+            "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+            (json.dumps({**EXPERIMENT_CONFIG, "current_cycle": cycle}), session_id),
+        )
+        conn.commit()
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Temporary database initialized from schema.sql, empty artifact cache."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+    monkeypatch.setattr(database, "DB_PATH", temp_db.name)
+    database.init_database()
+    bo_integration._artifacts.clear()
+
+    yield temp_db.name
+
+    bo_integration._artifacts.clear()
+    os.unlink(temp_db.name)
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    """Counts GP fits."""
+    calls = []
+    fit = RoboTasteBO.fit
+
+    def counting_fit(self, X, y):
+        calls.append(len(X))
+        return fit(self, X, y)
+
+    monkeypatch.setattr(RoboTasteBO, "fit", counting_fit)
+    return calls
+
+
+@pytest.fixture
+def session_id(test_db):
+    """Session at cycle 5 with the SAMPLES saved."""
+    session_id, _ = create_session("mod")
+    _set_cycle(session_id, 1)
+    for cycle, (sugar, salt, rating) in enumerate(SAMPLES, start=1):
+        save_sample_cycle(
+            session_id, cycle, {"Sugar": sugar, "Salt": salt},
+            {"method": "grid"}, {"liking": rating}, is_final=True,
+        )
+    _set_cycle(session_id, len(SAMPLES) + 1)
+    return session_id
+
+
+class TestArtifactCache:
+    """One GP per training-data fingerprint."""
+
+    def test_shared_between_suggestion_and_model(self, session_id, fits):
+        suggestion = bo_integration.get_bo_suggestion_for_session(session_id, "")
+        body = json.loads(sessions.get_bo_model(session_id, _request(), None).body)
+        bo_integration.get_bo_suggestion_for_session(session_id, "")
+
+        assert fits == [len(SAMPLES)]
+        assert body["status"] == "ready"
+        assert body["suggestion"]["x"] == suggestion["concentrations"]["Sugar"]
+        assert body["suggestion"]["y"] == suggestion["concentrations"]["Salt"]
+        assert np.array(body["predictions"]["mean"]).shape == (
+            bo_integration.GP_GRID_SIZE, bo_integration.GP_GRID_SIZE
+        )
+
+    def test_new_sample_invalidates(self, session_id, fits):
+        first = bo_integration.get_bo_artifact(session_id)
+        save_sample_cycle(
+            session_id, 5, {"Sugar": 70.0, "Salt": 3.0}, {"method": "grid"}, {"liking": 8}, is_final=True
+        )
+        second = bo_integration.get_bo_artifact(session_id)
+
+        assert second is not first
+        assert fits == [len(SAMPLES), len(SAMPLES) + 1]
+
+    def test_cycle_change_invalidates(self, session_id, fits):
+        first = bo_integration.get_bo_artifact(session_id)
+        _set_cycle(session_id, len(SAMPLES) + 2)
+        second = bo_integration.get_bo_artifact(session_id)
+
+        assert second is not first
+        assert second.suggestion["current_cycle"] == len(SAMPLES) + 2
+
+    def test_insufficient_data(self, test_db):
+        session_id, _ = create_session("mod")
+        _set_cycle(session_id, 1)
+        save_sample_cycle(
+            session_id, 1, {"Sugar": 10.0, "Salt": 1.0}, {"method": "grid"}, {"liking": 3}, is_final=True
+        )
+        _set_cycle(session_id, 2)
+
+        assert sessions.get_bo_model(session_id, _request(), None)["status"] == "insufficient_data"
+        assert bo_integration.get_bo_suggestion_for_session(session_id, "") is None
+
+
+class TestArtifactConsistency:
+    """Suggestion and surface come from the same model."""
+
+    def test_suggestion_matches_surface_model(self, session_id):
+        artifact = bo_integration.get_bo_artifact(session_id)
+        conc = artifact.suggestion["concentrations"]
+        point = np.array([[conc["Sugar"], conc["Salt"]]])
+
+        mean = artifact.model.predict(point)
+        assert float(np.ravel(mean)[0]) == pytest.approx(artifact.suggestion["predicted_value"])
+
+    def test_returned_suggestion_is_a_copy(self, session_id):
+        suggestion = bo_integration.get_bo_suggestion_for_session(session_id, "")
+        suggestion["concentrations"]["Sugar"] = -1.0
+
+        again = bo_integration.get_bo_suggestion_for_session(session_id, "")
+        assert again["concentrations"]["Sugar"] != -1.0
+
+
+class TestPostHocFits:
+    """Analysis surfaces share the scheduler's bounded workers."""
+
+    def test_fits_run_on_scheduler(self, session_id, monkeypatch):
+        threads = []
+        fit = RoboTasteBO.fit
+
+        def recording_fit(self, X, y):
+            threads.append(threading.current_thread().name)
+            return fit(self, X, y)
+
+        monkeypatch.setattr(RoboTasteBO, "fit", recording_fit)
+
+        surface = bo_surface.compute_bo_surface_2d(session_id, EXPERIMENT_CONFIG, up_to_cycle=3)
+        rows = bo_surface.compute_bo_calibration(session_id, EXPERIMENT_CONFIG)
+
+        assert surface["n_cycles_used"] == 3
+        assert len(rows) == len(SAMPLES) - 3
+        assert threads and all(name.startswith("bo-worker") for name in threads)
+
+
+    def test_subject_job_runs_between_calibration_fits(self, session_id, monkeypatch):
+        for cycle, (sugar, salt, rating) in enumerate([(70.0, 6.0, 6), (20.0, 3.0, 2)], start=5):
+            save_sample_cycle(
+                session_id, cycle, {"Sugar": sugar, "Salt": salt},
+                {"method": "grid"}, {"liking": rating}, is_final=True,
+            )
+        scheduler = BOScheduler(max_workers=1, blas_threads=None)
+        monkeypatch.setattr(bo_surface, "get_bo_scheduler", lambda: scheduler)
+        order = []
+        fit = RoboTasteBO.fit
+
+        def recording_fit(self, X, y):
+            order.append(len(X))
+            if len(order) == 1:
+                scheduler.submit("cycle-info", lambda: order.append("subject"), PRIORITY_SUBJECT)
+            return fit(self, X, y)
+
+        monkeypatch.setattr(RoboTasteBO, "fit", recording_fit)
+
+        rows = bo_surface.compute_bo_calibration(session_id, EXPERIMENT_CONFIG)
+        scheduler.close()
+
+        assert [row["cycle"] for row in rows] == [4, 5, 6]
+        assert order == [3, "subject", 4, 5]
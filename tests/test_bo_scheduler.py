@@ -0,0 +1,135 @@
+"""
+Tests for the BO compute scheduler.
+
+Validates that:
+- Duplicate submissions for a key share one job
+- Subject jobs run before queued moderator jobs, and resubmitting a queued
+  moderator job as subject promotes it
+- Queue depth and latency metrics reflect the work done
+- Job exceptions reach every waiter
+- The BLAS thread limit is set once for the process, not per job
+"""
+
+import threading
+
+import pytest
+
+from robotaste.core import bo_scheduler
+from robotaste.core.bo_scheduler import PRIORITY_MODERATOR, PRIORITY_SUBJECT, BOScheduler
+
+
+@pytest.fixture
+def scheduler():
+    """Single-worker scheduler."""
+    scheduler = BOScheduler(max_workers=1, blas_threads=1)
+    yield scheduler
+    scheduler.close()
+
+
+def _block(scheduler):
+    """Occupy the worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def gate():
+        started.set()
+        release.wait(5)
+
+    scheduler.submit("gate", gate)
+    assert started.wait(5)
+    return release
+
+
+class TestBOScheduler:
+    """Coalescing, priority and metrics."""
+
+    def test_coalesces_duplicate_keys(self, scheduler):
+        release = _block(scheduler)
+        calls = []
+
+        first = scheduler.submit(("s1", "fp"), lambda: calls.append(1) or "artifact")
+        second = scheduler.submit(("s1", "fp"), lambda: calls.append(2) or "other")
+        release.set()
+
+        assert first is second
+        assert first.result(5) == "artifact"
+        assert calls == [1]
+        assert scheduler.metrics()["coalesced"] == 1
+
+    def test_subject_before_moderator(self, scheduler):
+        release = _block(scheduler)
+        order = []
+
+        jobs = [
+            scheduler.submit("viz-1", lambda: order.append("viz-1"), PRIORITY_MODERATOR),
+            scheduler.submit("viz-2", lambda: order.append("viz-2"), PRIORITY_MODERATOR),
+            scheduler.submit("cycle", lambda: order.append("cycle"), PRIORITY_SUBJECT),
+        ]
+        # Subject request for a key already queued by the moderator view
+        scheduler.submit("viz-2", lambda: order.append("dup"), PRIORITY_SUBJECT)
+
+        assert scheduler.metrics()["queue_depth"] == 3
+        release.set()
+        for job in jobs:
+            job.result(5)
+
+        assert order == ["cycle", "viz-2", "viz-1"]
+
+    def test_metrics(self, scheduler):
+        scheduler.run("a", lambda: None, PRIORITY_SUBJECT)
+        scheduler.run("b", lambda: None, PRIORITY_MODERATOR)
+
+        metrics = scheduler.metrics()
+        assert metrics["queue_depth"] == 0
+        assert metrics["running"] == 0
+        assert metrics["completed"] == 2
+        assert metrics["latency_ms"]["subject"]["count"] == 1
+        assert metrics["latency_ms"]["moderator"]["count"] == 1
+        assert metrics["latency_ms"]["subject"]["wait_max"] >= 0
+
+    def test_exception_reaches_all_waiters(self, scheduler):
+        release = _block(scheduler)
+
+        def fail():
+            raise ValueError("fit diverged")
+
+        first = scheduler.submit("k", fail)
+        second = scheduler.submit("k", fail)
+        release.set()
+
+        for future in (first, second):
+            with pytest.raises(ValueError, match="fit diverged"):
+                future.result(5)
+        assert scheduler.metrics()["failed"] == 1
+
+    def test_closed(self, scheduler):
+        scheduler.close()
+
+        with pytest.raises(RuntimeError):
+            scheduler.submit("k", lambda: None)
+
+
+class TestBlasLimit:
+    """Process-wide BLAS thread limit."""
+
+    def test_set_once_while_jobs_overlap(self, monkeypatch):
+        calls = []
+
+        class _Limiter:
+            def __init__(self, limits, user_api):
+                calls.append(("set", limits, user_api))
+
+            def restore_original_limits(self):
+                calls.append(("restore",))
+
+        monkeypatch.setattr(bo_scheduler, "threadpool_limits", _Limiter)
+        scheduler = BOScheduler(max_workers=2, blas_threads=1)
+        both_running = threading.Barrier(2, timeout=5)
+
+        jobs = [scheduler.submit(key, both_running.wait) for key in ("a", "b")]
+        for job in jobs:
+            job.result(5)
+        scheduler.run("c", lambda: None)
+
+        assert calls == [("set", 1, "blas")]
+        scheduler.close()
+        assert calls == [("set", 1, "blas"), ("restore",)]
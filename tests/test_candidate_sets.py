@@ -0,0 +1,131 @@
+"""
+Tests for shared, pre-normalized BO candidate sets.
+
+Validates that:
+- Vectorized normalization matches the per-ingredient formula and round-trips
+- get_candidate_set returns one shared, read-only set per (ranges, method, size)
+- Cached sets hold the same points as the candidate generators
+- Suggestions from a CandidateSet match suggestions from the raw candidates,
+  including for models trained on different ranges
+"""
+
+import numpy as np
+import pytest
+
+from robotaste.core import bo_engine
+from robotaste.core.bo_engine import (
+    RoboTasteBO,
+    generate_candidate_grid_2d,
+    generate_candidates_latin_hypercube,
+    get_candidate_set,
+)
+
+RANGES = {"Sugar": (0.73, 73.0), "Salt": (0.10, 10.0)}
+RANGES_3D = {"Sugar": (0.73, 73.0), "Salt": (0.10, 10.0), "Citric": (0.0, 5.0)}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    bo_engine._candidate_sets.clear()
+    yield
+    bo_engine._candidate_sets.clear()
+
+
+def _fit(ranges=RANGES):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(0.73, 73.0, 8), rng.uniform(0.10, 10.0, 8)])
+    y = 5 + 2 * np.sin(X[:, 0] / 20) - 0.3 * X[:, 1]
+    bo = RoboTasteBO(["Sugar", "Salt"], ranges)
+    bo.fit(X, y)
+    return bo
+
+
+class TestNormalization:
+    """Broadcast normalization."""
+
+    def test_matches_formula(self):
+        bo = RoboTasteBO(["Sugar", "Salt"], RANGES)
+        X = generate_candidate_grid_2d(RANGES["Sugar"], RANGES["Salt"], n_points=5)
+
+        normalized = bo._normalize_features(X)
+
+        expected = np.column_stack([(X[:, 0] - 0.73) / 72.27, (X[:, 1] - 0.10) / 9.9])
+        np.testing.assert_allclose(normalized, expected)
+        np.testing.assert_allclose(bo._denormalize_features(normalized), X)
+
+
+class TestCandidateSetCache:
+    """Sharing and contents."""
+
+    def test_shared(self):
+        first = get_candidate_set(RANGES, "grid", 20)
+        second = get_candidate_set(dict(RANGES), "grid", 20)
+
+        assert first is second
+        assert get_candidate_set(RANGES, "grid", 10) is not first
+        assert not first.normalized.flags.writeable
+        assert first.normalized.flags.c_contiguous
+
+    def test_grid_points(self):
+        candidate_set = get_candidate_set(RANGES, "grid", 20)
+
+        expected = generate_candidate_grid_2d(RANGES["Sugar"], RANGES["Salt"], n_points=20)
+        np.testing.assert_array_equal(candidate_set.candidates, expected)
+        assert candidate_set.normalized.min() == 0.0
+        assert candidate_set.normalized.max() == 1.0
+
+    def test_lhs_points(self):
+        candidate_set = get_candidate_set(RANGES_3D, "lhs", 200, random_state=7)
+
+        expected = generate_candidates_latin_hypercube(RANGES_3D, n_candidates=200, random_state=7)
+        np.testing.assert_allclose(candidate_set.candidates, expected)
+        assert get_candidate_set(RANGES_3D, "lhs", 200, random_state=8) is not candidate_set
+
+    def test_bounded(self, monkeypatch):
+        monkeypatch.setattr(bo_engine, "MAX_CACHED_CANDIDATE_SETS", 2)
+        for n_points in (3, 4, 5):
+            get_candidate_set(RANGES, "grid", n_points)
+
+        assert len(bo_engine._candidate_sets) == 2
+
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="Unknown candidate method"):
+            get_candidate_set(RANGES, "sobol", 10)
+        with pytest.raises(ValueError, match="2 ingredients"):
+            get_candidate_set(RANGES_3D, "grid", 10)
+
+
+class TestSuggestionFromCandidateSet:
+    """Same suggestion as from the raw array."""
+
+    @pytest.mark.parametrize("acquisition", ["ei", "ucb"])
+    def test_same_suggestion(self, acquisition):
+        bo = _fit()
+        candidate_set = get_candidate_set(RANGES, "grid", 20)
+
+        expected = bo.suggest_next_sample(np.array(candidate_set.candidates), acquisition=acquisition)
+        actual = bo.suggest_next_sample(candidate_set, acquisition=acquisition)
+
+        assert bo._gp_inputs(candidate_set) is candidate_set.normalized
+        assert actual["best_candidate_dict"] == expected["best_candidate_dict"]
+        assert actual["acquisition_value"] == pytest.approx(expected["acquisition_value"])
+        assert actual["predicted_value"] == pytest.approx(expected["predicted_value"])
+
+    def test_matches_acquisition_function(self):
+        bo = _fit()
+        candidate_set = get_candidate_set(RANGES, "grid", 20)
+
+        suggestion = bo.suggest_next_sample(candidate_set, acquisition="ei", xi=0.05)
+
+        ei = bo.expected_improvement(candidate_set, xi=0.05)
+        assert suggestion["acquisition_value"] == pytest.approx(float(ei.max()))
+
+    def test_other_model_ranges(self):
+        # A model trained on padded/inferred ranges still normalizes in its own frame
+        bo = _fit({"Sugar": (0.0, 80.0), "Salt": (0.0, 12.0)})
+        candidate_set = get_candidate_set(RANGES, "grid", 20)
+
+        mean = bo.predict(candidate_set, return_std=False)
+        expected = bo.predict(np.array(candidate_set.candidates), return_std=False)
+        np.testing.assert_allclose(mean, expected)
+        assert bo._gp_inputs(candidate_set) is not candidate_set.normalized
@@ -0,0 +1,169 @@
+"""
+Tests for the compiled protocol cache.
+
+Validates that:
+- Cycle lookups match the linear schedule scan (first matching entry wins)
+- Sessions on the same protocol version share one compiled object
+- Editing or deleting a protocol drops its compiled versions
+- Embedded session snapshots never share entries with library protocols
+"""
+
+import os
+import tempfile
+import uuid
+
+import pytest
+
+import robotaste.data.database
+from robotaste.core.compiled_protocol import (
+    compile_protocol,
+    get_compiled_protocol_for_session,
+    invalidate_compiled_protocol,
+)
+from robotaste.data.protocol_repo import (
+    create_protocol_in_db,
+    delete_protocol,
+    get_protocol_by_id,
+    update_protocol,
+)
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Temporary database with an empty compiled-protocol cache."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+    monkeypatch.setattr(robotaste.data.database, "DB_PATH", temp_db.name)
+    robotaste.data.database.init_database()
+    invalidate_compiled_protocol()
+
+    yield temp_db.name
+
+    invalidate_compiled_protocol()
+    os.unlink(temp_db.name)
+
+
+def _protocol():
+    return {
+        "protocol_id": str(uuid.uuid4()),
+        "name": "Compiled Protocol Test",
+        "version": "1.0",
+        "ingredients": [
+            {"name": "Sugar", "min_concentration": 0.0, "max_concentration": 100.0},
+            {"name": "Salt", "min_concentration": 0.0, "max_concentration": 50.0},
+        ],
+        "sample_selection_schedule": [
+            {
+                "cycle_range": {"start": 1, "end": 2},
+                "mode": "predetermined",
+                "predetermined_samples": [
+                    {"cycle": 1, "concentrations": {"Sugar": 10.0, "Salt": 2.0}},
+                    {"cycle": 2, "concentrations": {"Sugar": 20.0, "Salt": 4.0}},
+                ],
+            },
+            {"cycle_range": {"start": 3, "end": 5}, "mode": "user_selected"},
+            {
+                "cycle_range": {"start": 6, "end": 10},
+                "mode": "bo_selected",
+                "config": {"auto_accept_suggestion": False, "allow_override": True},
+            },
+        ],
+        "questionnaire": {
+            "name": "Hedonic",
+            "questions": [
+                {"id": "overall_liking", "type": "slider", "label": "Liking",
+                 "min": 1.0, "max": 9.0, "required": True}
+            ],
+            "bayesian_target": {"variable": "overall_liking", "higher_is_better": True},
+        },
+        "bayesian_optimization": {"enabled": True, "acquisition_function": "ucb"},
+    }
+
+
+def _session_for(protocol_id):
+    return {"session_id": "s", "experiment_config": {"protocol_id": protocol_id}}
+
+
+class TestCycleLookups:
+    """Lookups on a compiled protocol."""
+
+    def test_modes_and_entries(self):
+        compiled = compile_protocol(_protocol())
+
+        assert compiled.selection_mode(1) == "predetermined"
+        assert compiled.normalized_mode(2) == "predetermined_absolute"
+        assert compiled.selection_mode(4) == "user_selected"
+        assert compiled.selection_mode(10) == "bo_selected"
+        assert compiled.selection_mode(11) == "user_selected"
+        assert compiled.schedule_index(7) == 2
+        assert compiled.schedule_index(0) == -1
+        assert compiled.entry_config(6)["allow_override"] is True
+        assert compiled.cycle_range_start(8) == 6
+
+    def test_predetermined_samples_and_counts(self):
+        compiled = compile_protocol(_protocol())
+
+        assert compiled.predetermined_sample(2) == {"Sugar": 20.0, "Salt": 4.0}
+        assert compiled.predetermined_sample(3) is None
+        assert compiled.predetermined_cycles == [1, 2]
+        assert compiled.mode_cycle_counts == {
+            "predetermined": 2, "user_selected": 3, "bo_selected": 5
+        }
+
+    def test_overlapping_ranges_first_entry_wins(self):
+        protocol = _protocol()
+        protocol["sample_selection_schedule"] = [
+            {"cycle_range": {"start": 3, "end": 6}, "mode": "user_selected"},
+            {"cycle_range": {"start": 1, "end": 10}, "mode": "bo_selected"},
+        ]
+        compiled = compile_protocol(protocol)
+
+        assert [compiled.selection_mode(c) for c in range(1, 11)] == (
+            ["bo_selected"] * 2 + ["user_selected"] * 4 + ["bo_selected"] * 4
+        )
+
+
+class TestCache:
+    """Sharing and invalidation of compiled protocols."""
+
+    def test_sessions_share_compiled_protocol(self, test_db):
+        protocol_id = create_protocol_in_db(_protocol())
+
+        first = get_compiled_protocol_for_session(_session_for(protocol_id))
+        second = get_compiled_protocol_for_session(_session_for(protocol_id))
+
+        assert first is not None
+        assert first is second
+        assert first.selection_mode(7) == "bo_selected"
+
+    def test_update_invalidates(self, test_db):
+        protocol_id = create_protocol_in_db(_protocol())
+        before = get_compiled_protocol_for_session(_session_for(protocol_id))
+
+        protocol = get_protocol_by_id(protocol_id)
+        protocol["sample_selection_schedule"][2]["mode"] = "user_selected"
+        assert update_protocol(protocol)
+
+        after = get_compiled_protocol_for_session(_session_for(protocol_id))
+        assert after is not before
+        assert after.selection_mode(7) == "user_selected"
+
+    def test_delete_invalidates(self, test_db):
+        protocol_id = create_protocol_in_db(_protocol())
+        get_compiled_protocol_for_session(_session_for(protocol_id))
+
+        assert delete_protocol(protocol_id)
+        assert get_compiled_protocol_for_session(_session_for(protocol_id)) is None
+
+    def test_snapshot_not_shared_with_library(self, test_db):
+        protocol_id = create_protocol_in_db(_protocol())
+        library = get_compiled_protocol_for_session(_session_for(protocol_id))
+
+        snapshot = dict(get_protocol_by_id(protocol_id))
+        snapshot["ingredients"] = [{"name": "Sugar", "min_concentration_mM": 0.0}]
+        embedded = get_compiled_protocol_for_session(
+            {"session_id": "s", "experiment_config": snapshot}
+        )
+
+        assert embedded is not library
+        assert "max_concentration" not in embedded.ingredients_by_name["Sugar"]
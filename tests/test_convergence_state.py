@@ -0,0 +1,116 @@
+"""
+Tests for the persisted BO convergence accumulator.
+
+Validates that:
+- save_sample_cycle advances the running best and the BO point series
+- Convergence metrics match a rebuild from the stored samples
+- Sessions without an accumulator are rebuilt on first read
+- The stability window follows the session's stopping criteria
+"""
+
+import json
+
+import pytest
+
+from robotaste.core.bo_utils import get_convergence_metrics
+from robotaste.data.database import (
+    create_session,
+    get_convergence_state,
+    get_database_connection,
+    rebuild_convergence_state,
+    save_sample_cycle,
+)
+
+EXPERIMENT_CONFIG = {
+    "ingredients": [{"name": "Sugar"}, {"name": "Salt"}],
+    "questionnaire": {
+        "bayesian_target": {"variable": "liking", "higher_is_better": True, "expected_range": [1, 9]}
+    },
+    "bayesian_optimization": {"stopping_criteria": {"stability_window": 3}},
+}
+
+# (liking rating, BO selection data or None)
+CYCLES = [
+    (4, None),
+    (6, None),
+    (5, {"mode": "bayesian_optimization", "acquisition_value": 0.2, "predicted_value": 5.5, "uncertainty": 1.0}),
+    (8, {"mode": "bayesian_optimization", "acquisition_value": 0.1, "predicted_value": 6.5, "uncertainty": 0.8}),
+    (7, {"mode": "bayesian_optimization", "acquisition_value": 0.05, "predicted_value": 7.5, "uncertainty": 0.5}),
+]
+
+
+@pytest.fixture
+def session_id(test_db):
+    """Session with EXPERIMENT_CONFIG and the CYCLES samples saved."""
+    session_id, _ = create_session("mod")
+    with get_database_connection() as conn:
+        conn.execute(
+            "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+            (json.dumps(EXPERIMENT_CONFIG), session_id),
+        )
+        conn.commit()
+
+    for cycle, (rating, selection_data) in enumerate(CYCLES, start=1):
+        save_sample_cycle(
+            session_id, cycle, {"Sugar": 10.0 * cycle, "Salt": 1.0},
+            selection_data or {"method": "grid"}, {"liking": rating},
+            selection_mode="bo_selected" if selection_data else "user_selected",
+        )
+    return session_id
+
+
+class TestConvergenceState:
+    """Incremental accumulator."""
+
+    def test_running_best_and_points(self, session_id):
+        state = get_convergence_state(session_id)
+
+        assert state["n_samples"] == 5
+        assert state["n_bo_samples"] == 3
+        assert state["best_value"] == 8.0
+        assert [p["cycle_number"] for p in state["points"]] == [3, 4, 5]
+        assert [p["best_value"] for p in state["points"]] == [6.0, 8.0, 8.0]
+        assert [p["acquisition_value"] for p in state["points"]] == [0.2, 0.1, 0.05]
+
+    def test_explicit_target_value(self, test_db):
+        session_id, _ = create_session("mod")
+        save_sample_cycle(session_id, 1, {"Sugar": 1.0}, {}, {}, target_value=3.5)
+
+        assert get_convergence_state(session_id)["best_value"] == 3.5
+
+    def test_matches_rebuild(self, session_id):
+        incremental = get_convergence_state(session_id)
+
+        assert rebuild_convergence_state(session_id) == incremental
+
+
+class TestConvergenceMetrics:
+    """Metrics read from the accumulator."""
+
+    def test_metrics(self, session_id):
+        metrics = get_convergence_metrics(session_id)
+
+        assert metrics["n_samples"] == 5
+        assert metrics["n_bo_samples"] == 3
+        assert metrics["best_values"] == [6.0, 8.0, 8.0]
+        assert metrics["max_acquisition"] == 0.05
+        assert metrics["has_sufficient_data"] is True
+        # Window of 3 from the session's stopping criteria
+        assert metrics["improvement_rate"] == pytest.approx(2.0)
+        assert metrics["recent_stability"] == pytest.approx(0.9428, abs=1e-4)
+
+    def test_legacy_session_rebuilt_on_read(self, session_id):
+        with get_database_connection() as conn:
+            conn.execute("DELETE FROM session_convergence_state")
+            conn.execute("DELETE FROM session_convergence_points")
+            conn.commit()
+
+        metrics = get_convergence_metrics(session_id)
+
+        assert metrics["best_values"] == [6.0, 8.0, 8.0]
+        assert get_convergence_state(session_id)["n_samples"] == 5
+
+    def test_no_samples(self, test_db):
+        session_id, _ = create_session("mod")
+
+        assert get_convergence_metrics(session_id)["n_samples"] == 0
@@ -0,0 +1,113 @@
+"""
+Tests for completing a dispense and decrementing global volumes together.
+
+Validates that:
+- The operation is completed and every dispensed pump decremented in one commit
+- Only the protocol of the operation's session is affected
+- A failed update rolls back the operation status as well
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+import robotaste.data.database as database
+from robotaste.core.pump_volume_manager import complete_dispense_operation, get_global_volume_status
+from robotaste.data.database import create_session
+
+PUMP_CONFIG = {
+    "pumps": [
+        {"address": 0, "ingredient": "Sugar"},
+        {"address": 1, "ingredient": "Water"},
+        {"address": 2, "ingredient": "Salt"},
+    ]
+}
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """Database with one pending operation and global state for two protocols."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+    monkeypatch.setattr(database, "DB_PATH", temp_db.name)
+    database.init_database()
+
+    conn = sqlite3.connect(temp_db.name)
+    for protocol_id in ("p", "other"):
+        for address, ingredient in enumerate(["Sugar", "Water", "Salt"]):
+            conn.execute(
+                "INSERT INTO pump_global_state (protocol_id, pump_address, ingredient_name, "
+                "current_volume_ul, max_capacity_ul) VALUES (?, ?, ?, 5000, 60000)",
+                (protocol_id, address, ingredient),
+            )
+    conn.commit()
+    conn.close()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
+
+
+def _create_operation(db_path, session_id):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute(
+        "INSERT INTO pump_operations (session_id, cycle_number, recipe_json, status) "
+        "VALUES (?, 1, '{}', 'in_progress')",
+        (session_id,),
+    )
+    conn.commit()
+    operation_id = cursor.lastrowid
+    conn.close()
+    return operation_id
+
+
+def _operation(db_path, operation_id):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute(
+        "SELECT status, actual_volumes_json FROM pump_operations WHERE id = ?", (operation_id,)
+    ).fetchone()
+    conn.close()
+    return row
+
+
+class TestCompleteDispenseOperation:
+    """Atomic completion."""
+
+    def test_completes_and_decrements(self, test_db):
+        session_id, _ = create_session("mod", protocol_id="p")
+        operation_id = _create_operation(test_db, session_id)
+        volumes = {"Sugar": 125.0, "Water": 9875.0}
+
+        assert complete_dispense_operation(test_db, operation_id, session_id, volumes, PUMP_CONFIG)
+
+        status, actual = _operation(test_db, operation_id)
+        assert status == "completed"
+        assert json.loads(actual) == volumes
+
+        state = get_global_volume_status(test_db, "p")
+        assert state["Sugar"]["current_ul"] == 4875.0
+        assert state["Sugar"]["total_dispensed_ul"] == 125.0
+        assert state["Sugar"]["last_session_id"] == session_id
+        assert state["Water"]["current_ul"] == 0.0  # Clamped at empty
+        assert state["Salt"]["current_ul"] == 5000.0
+        assert get_global_volume_status(test_db, "other")["Sugar"]["current_ul"] == 5000.0
+
+    def test_failure_rolls_back_operation(self, test_db):
+        session_id, _ = create_session("mod", protocol_id="p")
+        operation_id = _create_operation(test_db, session_id)
+
+        conn = sqlite3.connect(test_db)
+        conn.execute(
+            "CREATE TRIGGER fail_decrement BEFORE UPDATE ON pump_global_state "
+            "BEGIN SELECT RAISE(ABORT, 'boom'); END"
+        )
+        conn.commit()
+        conn.close()
+
+        assert not complete_dispense_operation(
+            test_db, operation_id, session_id, {"Sugar": 100.0}, PUMP_CONFIG
+        )
+        assert _operation(test_db, operation_id)[0] == "in_progress"
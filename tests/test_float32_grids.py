@@ -0,0 +1,90 @@
+"""
+Tests for float32-encoded GP surface grids.
+
+Validates that:
+- Grids decode to the same shape and float32 values
+- The encoding is opted into by query flag or Accept header
+- /bo-surface keeps number lists unless float32 grids are requested
+"""
+
+import base64
+import json
+
+import numpy as np
+import pytest
+from starlette.requests import Request
+
+import api.routers.analysis as analysis
+from api.responses import (
+    FLOAT32_GRIDS_MEDIA_TYPE,
+    encode_float32_grid,
+    grid_response,
+    wants_float32_grids,
+)
+
+GRID = np.linspace(0.0, 1.0, 12).reshape(3, 4)
+
+
+def _request(accept="application/json"):
+    return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+
+def _decode(encoded):
+    values = np.frombuffer(base64.b64decode(encoded["data"]), dtype="<f4")
+    return values.reshape(encoded["shape"])
+
+
+class TestEncoding:
+    """Grid encoding."""
+
+    def test_round_trip(self):
+        encoded = encode_float32_grid(GRID)
+
+        assert encoded["dtype"] == "float32"
+        assert encoded["shape"] == [3, 4]
+        np.testing.assert_array_equal(_decode(encoded), GRID.astype(np.float32))
+
+    def test_non_contiguous(self):
+        np.testing.assert_array_equal(_decode(encode_float32_grid(GRID.T)), GRID.T.astype(np.float32))
+
+    def test_opt_in(self):
+        assert not wants_float32_grids(_request())
+        assert wants_float32_grids(_request(), "float32")
+        assert wants_float32_grids(_request(FLOAT32_GRIDS_MEDIA_TYPE))
+        assert not wants_float32_grids(_request(FLOAT32_GRIDS_MEDIA_TYPE), "json")
+
+    def test_grid_response(self):
+        content = {"predictions": {"mean": GRID}, "ingredient_names": ["Sugar", "Salt"]}
+
+        plain = json.loads(grid_response(content).body)
+        compact = json.loads(grid_response(content, float32_grids=True).body)
+
+        assert plain["predictions"]["mean"] == GRID.tolist()
+        assert compact["grid_encoding"] == "float32"
+        assert compact["ingredient_names"] == ["Sugar", "Salt"]
+        np.testing.assert_allclose(_decode(compact["predictions"]["mean"]), GRID, rtol=1e-6)
+
+
+class TestBOSurfaceEndpoint:
+    """Opt-in on /analysis/bo-surface."""
+
+    @pytest.fixture(autouse=True)
+    def surface(self, monkeypatch):
+        monkeypatch.setattr(analysis, "get_session", lambda session_id: {"experiment_config": {}})
+        monkeypatch.setattr(
+            analysis, "compute_bo_surface_2d",
+            lambda *args, **kwargs: {"predictions": {"x": GRID[0], "mean": GRID}, "n_cycles_used": 5},
+        )
+
+    def test_default_lists(self):
+        body = json.loads(analysis.get_bo_surface("s", _request(), None, None).body)
+
+        assert body["predictions"]["mean"] == GRID.tolist()
+        assert "grid_encoding" not in body
+
+    def test_float32(self):
+        body = json.loads(analysis.get_bo_surface("s", _request(), None, "float32").body)
+
+        assert body["n_cycles_used"] == 5
+        assert body["predictions"]["x"]["shape"] == [4]
+        np.testing.assert_allclose(_decode(body["predictions"]["mean"]), GRID, rtol=1e-6)
@@ -0,0 +1,144 @@
+"""
+Tests for the pluggable GP backend.
+
+Validates that:
+- bo_config["gp_backend"] selects the GP implementation
+- NumpyGP's log marginal likelihood gradient matches finite differences
+- NumpyGP fits the same hyperparameters and predictions as sklearn for
+  every supported Matern smoothness
+- Invalid backend names are corrected by validation
+"""
+
+import numpy as np
+import pytest
+from sklearn.gaussian_process import GaussianProcessRegressor
+
+from robotaste.config.bo_config import get_default_bo_config, validate_bo_config
+from robotaste.core.bo_engine import NumpyGP, RoboTasteBO, generate_candidate_grid_2d
+
+RANGES = {"Sugar": (0.0, 100.0), "Salt": (0.0, 10.0)}
+
+
+def _data(n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.uniform(0, 100, n), rng.uniform(0, 10, n)])
+    y = 5 + 2 * np.sin(X[:, 0] / 30) - 0.2 * X[:, 1] + rng.normal(0, 0.3, n)
+    return X, y
+
+
+def _fit(backend, nu=2.5, n=12):
+    config = {**get_default_bo_config(), "gp_backend": backend, "kernel_nu": nu}
+    bo = RoboTasteBO(["Sugar", "Salt"], RANGES, config=config)
+    bo.fit(*_data(n))
+    return bo
+
+
+class TestBackendSelection:
+    """Config switch."""
+
+    def test_default_is_sklearn(self):
+        bo = RoboTasteBO(["Sugar", "Salt"], RANGES)
+        assert isinstance(bo.gp, GaussianProcessRegressor)
+
+    def test_numpy(self):
+        bo = RoboTasteBO(["Sugar", "Salt"], RANGES, config={"gp_backend": "numpy"})
+        assert isinstance(bo.gp, NumpyGP)
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="Unknown GP backend"):
+            RoboTasteBO(["Sugar", "Salt"], RANGES, config={"gp_backend": "torch"})
+
+    def test_validation_falls_back(self):
+        validated = validate_bo_config({**get_default_bo_config(), "gp_backend": "torch"})
+        assert validated["gp_backend"] == "sklearn"
+
+
+class TestNumpyGP:
+    """Agreement with sklearn."""
+
+    @pytest.mark.parametrize("nu", [0.5, 1.5, 2.5, float("inf")])
+    def test_gradient(self, nu):
+        X, y = _data()
+        gp = NumpyGP(nu=nu, alpha=0.15, normalize_y=True)
+        gp.fit(X / 100.0, y)
+
+        theta = np.log([1.7, 0.4])
+        _, grad = gp.log_marginal_likelihood(theta)
+        eps = 1e-6
+        lml = lambda t: gp.log_marginal_likelihood(t)[0]
+        numeric = [(lml(theta + step) - lml(theta - step)) / (2 * eps) for step in np.eye(2) * eps]
+        np.testing.assert_allclose(grad, numeric, rtol=1e-5, atol=1e-7)
+
+    @pytest.mark.parametrize("nu", [0.5, 1.5, 2.5, float("inf")])
+    def test_matches_sklearn(self, nu):
+        reference, fast = _fit("sklearn", nu), _fit("numpy", nu)
+
+        assert fast.gp.length_scale_ == pytest.approx(reference.gp.kernel_.k2.length_scale, rel=1e-4)
+        assert fast.gp.constant_value_ == pytest.approx(reference.gp.kernel_.k1.constant_value, rel=1e-4)
+        assert fast.gp.log_marginal_likelihood_value_ == pytest.approx(
+            reference.gp.log_marginal_likelihood_value_, rel=1e-6
+        )
+
+        candidates = generate_candidate_grid_2d(RANGES["Sugar"], RANGES["Salt"], n_points=15)
+        for expected, actual in zip(reference.predict(candidates), fast.predict(candidates)):
+            np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+    def test_covariance_matches_sklearn(self):
+        reference, fast = _fit("sklearn"), _fit("numpy")
+        candidates = generate_candidate_grid_2d(RANGES["Sugar"], RANGES["Salt"], n_points=4)
+
+        _, expected = reference.predict(candidates, return_std=False, return_cov=True)
+        _, actual = fast.predict(candidates, return_std=False, return_cov=True)
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+    def test_same_suggestion(self):
+        candidates = generate_candidate_grid_2d(RANGES["Sugar"], RANGES["Salt"], n_points=20)
+
+        expected = _fit("sklearn").suggest_next_sample(candidates, current_cycle=5, max_cycles=30)
+        actual = _fit("numpy").suggest_next_sample(candidates, current_cycle=5, max_cycles=30)
+
+        assert actual["best_candidate_dict"] == expected["best_candidate_dict"]
+        assert actual["predicted_value"] == pytest.approx(expected["predicted_value"], rel=1e-5)
+
+
+class TestBatchedRestarts:
+    """Lockstep restart optimization."""
+
+    @pytest.fixture
+    def gp(self):
+        X, y = _data()
+        return NumpyGP(nu=2.5, alpha=0.15, normalize_y=True, n_restarts_optimizer=10).fit(X / 100.0, y)
+
+    def test_batch_matches_single(self, gp):
+        thetas = np.log([[1.7, 0.4], [0.2, 3.0], [30.0, 0.5]])
+        lml, grad, _ = gp.batch_log_marginal_likelihood(thetas)
+
+        for theta, batch_lml, batch_grad in zip(thetas, lml, grad):
+            single_lml, single_grad = gp.log_marginal_likelihood(theta)
+            assert batch_lml == pytest.approx(single_lml, rel=1e-10)
+            np.testing.assert_allclose(batch_grad, single_grad, rtol=1e-8, atol=1e-10)
+
+    @pytest.mark.parametrize("nu", [0.5, 1.5, 2.5, float("inf")])
+    def test_hessian(self, nu):
+        X, y = _data()
+        gp = NumpyGP(nu=nu, alpha=0.15, normalize_y=True).fit(X / 100.0, y)
+
+        theta = np.log([[1.7, 0.4]])
+        _, _, hess = gp.batch_log_marginal_likelihood(theta)
+        eps = 1e-5
+        numeric = np.column_stack([
+            (gp.batch_log_marginal_likelihood(theta + step)[1][0]
+             - gp.batch_log_marginal_likelihood(theta - step)[1][0]) / (2 * eps)
+            for step in np.eye(2) * eps
+        ])
+        np.testing.assert_allclose(hess[0], numeric, rtol=1e-5, atol=1e-6)
+
+    def test_restarts_merge(self, gp):
+        rng = np.random.RandomState(0)
+        starts = rng.uniform(gp.bounds_[:, 0], gp.bounds_[:, 1], size=(11, 2))
+
+        optima = gp._batched_ascent(starts)
+
+        assert len(optima) < len(starts)
+        best = gp.log_marginal_likelihood(optima[0])[0]
+        assert best == pytest.approx(gp.log_marginal_likelihood_value_, abs=1e-6)
@@ -0,0 +1,81 @@
+"""
+Tests for the JSON codec.
+
+Validates that:
+- Both backends round-trip database blobs and read each other's output
+- NumPy arrays (including non-contiguous ones) and scalars encode directly
+- Rows written by json.dumps with NaN still decode
+- Invalid JSON raises json.JSONDecodeError as before
+- Canonical (hashing) output is the same for both backends
+- FastJSONResponse renders array content
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from api.responses import FastJSONResponse
+from robotaste.utils import json_codec
+
+BLOB = {"Sugar": 12.5, "Salt": 0.1, "note": "süß", "nested": {"b": [1, 2], "a": None}}
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def codec(request, monkeypatch):
+    """json_codec with its default backend and with the stdlib fallback."""
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_codec, "orjson", None)
+    return json_codec
+
+
+class TestCodec:
+    """Encoding and decoding."""
+
+    def test_round_trip(self, codec):
+        assert codec.loads(codec.dumps(BLOB)) == BLOB
+        assert json.loads(codec.dumps(BLOB)) == BLOB
+
+    def test_reads_stdlib_output(self, codec):
+        assert codec.loads(json.dumps(BLOB)) == BLOB
+
+    def test_sort_keys(self, codec):
+        assert codec.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+
+    def test_canonical(self, codec):
+        blob = {**BLOB, "tiny": 0.00001, "array": np.array([1.5, 2.0])}
+
+        expected = json.dumps({**blob, "array": [1.5, 2.0]}, sort_keys=True)
+        assert codec.dumps_canonical(blob) == expected
+
+    def test_numpy(self, codec):
+        grid = np.arange(12, dtype=float).reshape(3, 4)
+        payload = {"grid": grid, "column": grid[:, 1], "best": np.float64(2.5), "n": np.int64(3)}
+
+        assert codec.loads(codec.dumps(payload)) == {
+            "grid": grid.tolist(), "column": [1.0, 5.0, 9.0], "best": 2.5, "n": 3,
+        }
+
+    def test_non_str_keys(self, codec):
+        assert codec.loads(codec.dumps({1: "a"})) == {"1": "a"}
+
+    def test_legacy_nan(self, codec):
+        assert np.isnan(codec.loads(json.dumps({"predicted_value": float("nan")}))["predicted_value"])
+
+    def test_invalid_json(self, codec):
+        with pytest.raises(json.JSONDecodeError):
+            codec.loads("{not json")
+
+    def test_unsupported_type(self, codec):
+        with pytest.raises(TypeError):
+            codec.dumps({"x": object()})
+
+
+class TestFastJSONResponse:
+    """API response rendering."""
+
+    def test_renders_arrays(self):
+        response = FastJSONResponse({"mean": np.ones((2, 2)), "status": "ready"})
+
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == {"mean": [[1.0, 1.0], [1.0, 1.0]], "status": "ready"}
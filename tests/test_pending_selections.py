@@ -0,0 +1,83 @@
+"""
+Tests for pending cycle selections.
+
+Validates that:
+- A saved selection is read back per session and cycle
+- Re-submitting a selection for a cycle replaces it
+- Legacy _pending_concentrations maps are moved out of experiment_config
+"""
+
+import json
+
+import robotaste.data.database as database
+from robotaste.data.database import (
+    create_session,
+    get_database_connection,
+    get_pending_selection,
+    get_session,
+    save_pending_selection,
+)
+
+
+class TestPendingSelection:
+    """Save and read."""
+
+    def test_round_trip(self, test_db):
+        session_id, _ = create_session("mod")
+        save_pending_selection(
+            session_id, 2, {"Sugar": 12.5}, "bo_selected", {"acquisition_value": 0.3}
+        )
+
+        assert get_pending_selection(session_id, 2) == {
+            "concentrations": {"Sugar": 12.5},
+            "selection_mode": "bo_selected",
+            "selection_data": {"acquisition_value": 0.3},
+        }
+        assert get_pending_selection(session_id, 1) is None
+
+    def test_resubmit_replaces(self, test_db):
+        session_id, _ = create_session("mod")
+        save_pending_selection(session_id, 1, {"Sugar": 10.0}, "bo_selected", {"x": 1})
+        save_pending_selection(session_id, 1, {"Sugar": 20.0})
+
+        pending = get_pending_selection(session_id, 1)
+        assert pending["concentrations"] == {"Sugar": 20.0}
+        assert pending["selection_mode"] == "user_selected"
+        assert pending["selection_data"] is None
+
+    def test_experiment_config_untouched(self, test_db):
+        session_id, _ = create_session("mod")
+        before = get_session(session_id)["experiment_config"]
+        save_pending_selection(session_id, 1, {"Sugar": 10.0})
+
+        assert get_session(session_id)["experiment_config"] == before
+
+
+class TestPendingConcentrationsMigration:
+    """Legacy sessions."""
+
+    def test_moved_to_table(self, test_db):
+        session_id, _ = create_session("mod")
+        config = {
+            "pump_config": {"enabled": True},
+            "_pending_concentrations": {
+                "1": {"concentrations": {"Sugar": 5.0}, "selection_mode": "user_selected",
+                      "selection_data": None},
+                "2": {"concentrations": {"Sugar": 7.0}, "selection_mode": "bo_selected",
+                      "selection_data": {"predicted_value": 6.1}},
+            },
+        }
+        with get_database_connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+                (json.dumps(config), session_id),
+            )
+            conn.commit()
+
+        database.init_database()
+
+        config = get_session(session_id)["experiment_config"]
+        assert "_pending_concentrations" not in config
+        assert config["pump_config"] == {"enabled": True}
+        assert get_pending_selection(session_id, 1)["concentrations"] == {"Sugar": 5.0}
+        assert get_pending_selection(session_id, 2)["selection_data"] == {"predicted_value": 6.1}
@@ -9,13 +9,20 @@ Tests for the PhaseEngine class, including:
 - Loop handling
 - Circuit breaker
 - Error handling
+- Engine cache (get_phase_engine)
 
 Author: Claude Sonnet 4.5
 Date: January 2026
 """
 
 import pytest
-from robotaste.core.phase_engine import PhaseEngine, PhaseDefinition, DEFAULT_PHASES
+from robotaste.core.phase_engine import (
+    PhaseEngine,
+    PhaseDefinition,
+    DEFAULT_PHASES,
+    clear_phase_engine_cache,
+    get_phase_engine,
+)
 
 
 class TestPhaseDefinition:
@@ -528,5 +535,59 @@ class TestComplexScenarios:
         assert next_phase == "instructions"
 
 
+class TestPhaseEngineCache:
+    """Test get_phase_engine() reuse of parsed protocols."""
+
+    PROTOCOL = {
+        "protocol_hash": "abc123",
+        "phase_sequence": {
+            "phases": [
+                {"phase_id": "waiting", "phase_type": "builtin"},
+                {"phase_id": "intro", "phase_type": "custom", "required": False},
+                {"phase_id": "experiment_loop", "phase_type": "loop"},
+                {"phase_id": "survey", "phase_type": "custom"},
+            ]
+        },
+        "stopping_criteria": {"max_cycles": 3},
+    }
+
+    def setup_method(self):
+        clear_phase_engine_cache()
+
+    def test_sessions_share_parsed_sequence(self):
+        """Engines for the same protocol share tables but not session state."""
+        first = get_phase_engine(self.PROTOCOL, "session-a")
+        second = get_phase_engine(self.PROTOCOL, "session-b")
+
+        assert first is not second
+        assert first.phase_sequence is second.phase_sequence
+        assert second.session_id == "session-b"
+
+        first.transition_count = 50
+        assert get_phase_engine(self.PROTOCOL, "session-c").transition_count == 0
+
+    def test_transitions_match_fresh_engine(self):
+        """Cached engines answer exactly like a freshly parsed engine."""
+        cached = get_phase_engine(self.PROTOCOL, "session-a")
+        fresh = PhaseEngine(self.PROTOCOL, "session-a")
+
+        for phase in ["waiting", "intro", "survey", "unknown", "custom",
+                      "selection", "loading", "robot_preparing", "cup_ready"]:
+            for skip in (False, True):
+                assert cached.get_next_phase(phase, skip_optional=skip, current_cycle=1) == \
+                    fresh.get_next_phase(phase, skip_optional=skip, current_cycle=1)
+
+        assert cached.get_next_phase("questionnaire", current_cycle=4) == "survey"
+
+    def test_stopping_criteria_keyed_separately(self):
+        """Same hash with different stopping criteria gets its own engine."""
+        other = dict(self.PROTOCOL, stopping_criteria={"max_cycles": 10})
+
+        assert get_phase_engine(self.PROTOCOL, "s").get_next_phase(
+            "questionnaire", current_cycle=5) == "survey"
+        assert get_phase_engine(other, "s").get_next_phase(
+            "questionnaire", current_cycle=5) == "selection"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
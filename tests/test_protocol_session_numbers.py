@@ -0,0 +1,99 @@
+"""
+Tests for per-protocol session numbering (Latin-square counterbalancing).
+
+Validates that:
+- Sessions started with a protocol are numbered 1, 2, 3, ... per protocol
+- Assignment is idempotent and unique under concurrent starts
+- Existing databases are backfilled in creation order
+- Sample bank initialization reads the stored number
+"""
+
+import sqlite3
+import threading
+
+from robotaste.core.sample_bank import _get_latin_square_session_number
+from robotaste.data.database import (
+    _apply_schema_migrations,
+    assign_session_protocol,
+    create_session,
+)
+
+
+class TestAssignSessionProtocol:
+    """Assigning session numbers."""
+
+    def test_numbers_are_per_protocol(self, test_db):
+        sessions = [create_session("mod")[0] for _ in range(3)]
+
+        assert assign_session_protocol(sessions[0], "protocol-a") == 1
+        assert assign_session_protocol(sessions[1], "protocol-b") == 1
+        assert assign_session_protocol(sessions[2], "protocol-a") == 2
+
+    def test_idempotent(self, test_db):
+        session_id, _ = create_session("mod")
+
+        assert assign_session_protocol(session_id, "protocol-a") == 1
+        assert assign_session_protocol(session_id, "protocol-a") == 1
+
+    def test_create_session_with_protocol(self, test_db):
+        create_session("mod", protocol_id="protocol-a")
+        session_id, _ = create_session("mod", protocol_id="protocol-a")
+
+        assert _get_latin_square_session_number(session_id) == 2
+
+    def test_unknown_session(self, test_db):
+        assert assign_session_protocol("missing", "protocol-a") is None
+
+    def test_concurrent_starts_get_unique_numbers(self, test_db):
+        sessions = [create_session("mod")[0] for _ in range(8)]
+        results = []
+
+        def start(session_id):
+            results.append(assign_session_protocol(session_id, "protocol-a"))
+
+        threads = [threading.Thread(target=start, args=(s,)) for s in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == list(range(1, 9))
+
+
+class TestBackfill:
+    """Migrating databases without protocol_session_number."""
+
+    def test_backfill_in_creation_order(self, test_db):
+        conn = sqlite3.connect(test_db)
+        conn.row_factory = sqlite3.Row
+        # Recreate the pre-migration sessions table
+        conn.execute("DROP TABLE sessions")
+        conn.execute(
+            """
+            CREATE TABLE sessions (
+                session_id TEXT PRIMARY KEY, session_code TEXT, protocol_id TEXT,
+                created_at TIMESTAMP, deleted_at TIMESTAMP
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO sessions (session_id, session_code, protocol_id, created_at, deleted_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                ("s2", "B", "p", "2026-01-02", None),
+                ("s1", "A", "p", "2026-01-01", None),
+                ("gone", "C", "p", "2026-01-03", "2026-01-04"),
+                ("s3", "D", "p", "2026-01-05", None),
+            ],
+        )
+        _apply_schema_migrations(conn.cursor())
+        conn.commit()
+
+        numbers = dict(conn.execute("SELECT session_id, protocol_session_number FROM sessions"))
+        counter = conn.execute(
+            "SELECT last_session_number FROM protocol_session_counters WHERE protocol_id = 'p'"
+        ).fetchone()[0]
+        conn.close()
+
+        assert numbers == {"s1": 1, "s2": 2, "gone": None, "s3": 3}
+        assert counter == 3
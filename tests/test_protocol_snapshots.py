@@ -0,0 +1,148 @@
+"""
+Tests for protocol snapshots shared between sessions.
+
+Validates that:
+- Sessions configured from the same protocol reference one snapshot row,
+  whichever JSON backend wrote it
+- get_session reassembles the full experiment_config from snapshot + state
+- Cycle increments only touch the session's state columns
+- Legacy full-JSON configs are split into snapshots by init_database
+"""
+
+import json
+
+import robotaste.data.database as database
+from robotaste.config.bo_config import get_default_bo_config
+from robotaste.data.database import (
+    create_session,
+    get_database_connection,
+    get_protocol_snapshot,
+    get_session,
+    increment_cycle,
+    update_session_with_config,
+)
+from robotaste.utils import json_codec
+
+EXPERIMENT_CONFIG = {
+    "protocol_id": "proto-1",
+    "protocol_hash": "abc123",
+    "ingredients": [{"name": "Sugar", "min_concentration_mM": 0, "max_concentration_mM": 100}],
+    "questionnaire": {"questions": [], "bayesian_target": {"variable": "liking"}},
+    "sample_selection_schedule": [{"cycle_range": {"start": 1, "end": 5}, "mode": "user_selected"}],
+}
+
+
+def _configure(session_id, **extra):
+    return update_session_with_config(
+        session_id=session_id,
+        user_id=None,
+        num_ingredients=1,
+        interface_type="single_slider",
+        method="linear",
+        ingredients=EXPERIMENT_CONFIG["ingredients"],
+        bo_config=get_default_bo_config(),
+        experiment_config={**EXPERIMENT_CONFIG, **extra},
+    )
+
+
+def _session_row(session_id):
+    with get_database_connection() as conn:
+        return conn.execute(
+            "SELECT experiment_config, config_snapshot_hash, current_cycle FROM sessions "
+            "WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+
+
+class TestSnapshotSharing:
+    """Deduplication across sessions."""
+
+    def test_sessions_share_snapshot(self, test_db):
+        first, _ = create_session("mod")
+        second, _ = create_session("mod")
+        assert _configure(first, initial_pump_volumes_ml={"Sugar": 50.0})
+        assert _configure(second, initial_pump_volumes_ml={"Sugar": 20.0})
+
+        with get_database_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM protocol_snapshots").fetchone()[0] == 1
+        assert _session_row(first)["config_snapshot_hash"] == _session_row(second)["config_snapshot_hash"]
+        assert _session_row(first)["experiment_config"] is None
+
+    def test_hash_independent_of_backend(self, test_db, monkeypatch):
+        # orjson and the stdlib format 1e-05 differently
+        first, _ = create_session("mod")
+        second, _ = create_session("mod")
+        _configure(first, stopping_criteria={"tolerance": 0.00001})
+        monkeypatch.setattr(json_codec, "orjson", None)
+        _configure(second, stopping_criteria={"tolerance": 0.00001})
+
+        with get_database_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM protocol_snapshots").fetchone()[0] == 1
+
+    def test_config_reassembled(self, test_db):
+        session_id, _ = create_session("mod")
+        _configure(session_id, initial_pump_volumes_ml={"Sugar": 50.0})
+
+        config = get_session(session_id)["experiment_config"]
+
+        assert config["questionnaire"] == EXPERIMENT_CONFIG["questionnaire"]
+        assert config["protocol_hash"] == "abc123"
+        assert config["interface_type"] == "single_slider"
+        assert config["current_cycle"] == 1
+        assert config["initial_pump_volumes_ml"] == {"Sugar": 50.0}
+        assert "created_at" in config
+
+    def test_snapshot_parsed_once(self, test_db):
+        session_id, _ = create_session("mod")
+        _configure(session_id)
+        snapshot_hash = _session_row(session_id)["config_snapshot_hash"]
+
+        assert get_protocol_snapshot(snapshot_hash) is get_protocol_snapshot(snapshot_hash)
+
+
+class TestSessionState:
+    """Mutable state columns."""
+
+    def test_increment_cycle(self, test_db):
+        session_id, _ = create_session("mod")
+        _configure(session_id)
+        before = _session_row(session_id)["config_snapshot_hash"]
+
+        assert increment_cycle(session_id) == 2
+        assert increment_cycle(session_id) == 3
+
+        assert _session_row(session_id)["config_snapshot_hash"] == before
+        assert get_session(session_id)["experiment_config"]["current_cycle"] == 3
+
+    def test_legacy_config_increment(self, test_db):
+        session_id, _ = create_session("mod")
+        with get_database_connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+                (json.dumps({**EXPERIMENT_CONFIG, "current_cycle": 4}), session_id),
+            )
+            conn.commit()
+
+        assert increment_cycle(session_id) == 5
+        assert get_session(session_id)["experiment_config"]["current_cycle"] == 5
+
+
+class TestSnapshotMigration:
+    """Existing sessions."""
+
+    def test_legacy_config_split(self, test_db):
+        session_id, _ = create_session("mod")
+        legacy = {**EXPERIMENT_CONFIG, "current_cycle": 3, "initial_pump_volumes_ml": {"Sugar": 9.0}}
+        with get_database_connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+                (json.dumps(legacy), session_id),
+            )
+            conn.commit()
+
+        database.init_database()
+
+        row = _session_row(session_id)
+        assert row["experiment_config"] is None
+        assert row["current_cycle"] == 3
+        assert get_session(session_id)["experiment_config"] == legacy
@@ -0,0 +1,189 @@
+"""
+Tests for atomic claiming of pump operations.
+
+Validates that:
+- Each pending operation is claimed by exactly one worker, even under contention
+- Operations are claimed oldest first
+- A claim records claimed_at; started_at is only set when dispensing begins
+- Lease renewal, release and expiry recovery behave as documented
+- Refill operations use the same claim semantics
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from robotaste.utils.pump_db import (
+    create_pump_operation,
+    create_refill_operation,
+    claim_next_operation,
+    claim_next_refill_operation,
+    renew_leases,
+    release_operation,
+    recover_expired_leases,
+    get_operation_by_id,
+    get_refill_operation_by_id,
+    mark_operation_in_progress,
+)
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "robotaste", "data", "schema.sql"
+)
+
+
+@pytest.fixture
+def db_path():
+    """Create a temporary database with the full schema."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+
+    conn = sqlite3.connect(temp_db.name)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.close()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
+
+
+def _expire_leases(db_path, table="pump_operations"):
+    past = (datetime.now() - timedelta(seconds=5)).isoformat()
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"UPDATE {table} SET lease_expires_at = ?", (past,))
+    conn.commit()
+    conn.close()
+
+
+class TestClaimNextOperation:
+    """Atomic claim of dispense operations."""
+
+    def test_claim_sets_lease(self, db_path):
+        op_id = create_pump_operation("s1", 1, '{"Sugar": 10}', db_path=db_path)
+
+        claimed = claim_next_operation("worker-a", db_path=db_path)
+
+        assert claimed["id"] == op_id
+        assert claimed["status"] == "in_progress"
+        assert claimed["claimed_by"] == "worker-a"
+        assert claimed["lease_expires_at"] > datetime.now().isoformat()
+
+    def test_started_when_dispensing_begins(self, db_path):
+        op_id = create_pump_operation("s1", 1, '{"Sugar": 10}', db_path=db_path)
+
+        claimed = claim_next_operation("worker-a", db_path=db_path)
+        assert claimed["claimed_at"] is not None
+        assert claimed["started_at"] is None
+
+        mark_operation_in_progress(op_id, db_path)
+
+        op = get_operation_by_id(op_id, db_path)
+        assert op["claimed_at"] == claimed["claimed_at"]
+        assert op["started_at"] >= op["claimed_at"]
+
+    def test_claims_oldest_first(self, db_path):
+        first = create_pump_operation("s1", 1, "{}", db_path=db_path)
+        second = create_pump_operation("s2", 1, "{}", db_path=db_path)
+
+        assert claim_next_operation("w", db_path=db_path)["id"] == first
+        assert claim_next_operation("w", db_path=db_path)["id"] == second
+        assert claim_next_operation("w", db_path=db_path) is None
+
+    def test_concurrent_claims_are_exclusive(self, db_path):
+        op_ids = {
+            create_pump_operation(f"s{i}", 1, "{}", db_path=db_path)
+            for i in range(20)
+        }
+        claimed = []
+        claimed_lock = threading.Lock()
+
+        def worker(name):
+            while True:
+                op = claim_next_operation(name, db_path=db_path)
+                if op is None:
+                    return
+                with claimed_lock:
+                    claimed.append(op["id"])
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10.0)
+
+        assert sorted(claimed) == sorted(op_ids)
+
+
+class TestLeases:
+    """Renewal, release and crash recovery."""
+
+    def test_renew_extends_only_own_leases(self, db_path):
+        create_pump_operation("s1", 1, "{}", db_path=db_path)
+        create_pump_operation("s2", 1, "{}", db_path=db_path)
+        mine = claim_next_operation("w1", lease_seconds=1, db_path=db_path)
+        theirs = claim_next_operation("w2", lease_seconds=1, db_path=db_path)
+
+        assert renew_leases("w1", lease_seconds=600, db_path=db_path) == 1
+
+        assert (get_operation_by_id(mine["id"], db_path)["lease_expires_at"]
+                > mine["lease_expires_at"])
+        assert (get_operation_by_id(theirs["id"], db_path)["lease_expires_at"]
+                == theirs["lease_expires_at"])
+
+    def test_release_returns_to_pending(self, db_path):
+        op_id = create_pump_operation("s1", 1, "{}", db_path=db_path)
+        claim_next_operation("w1", db_path=db_path)
+
+        assert not release_operation(op_id, "other", db_path=db_path)
+        assert release_operation(op_id, "w1", db_path=db_path)
+
+        op = get_operation_by_id(op_id, db_path)
+        assert op["status"] == "pending"
+        assert op["claimed_by"] is None
+        assert op["claimed_at"] is None
+        assert claim_next_operation("w2", db_path=db_path)["id"] == op_id
+
+    def test_expired_lease_marked_failed(self, db_path):
+        op_id = create_pump_operation("s1", 1, "{}", db_path=db_path)
+        claim_next_operation("crashed", db_path=db_path)
+        _expire_leases(db_path)
+
+        assert recover_expired_leases(db_path=db_path) == 1
+
+        op = get_operation_by_id(op_id, db_path)
+        assert op["status"] == "failed"
+        assert "crashed" in op["error_message"]
+
+    def test_expired_lease_requeued(self, db_path):
+        op_id = create_pump_operation("s1", 1, "{}", db_path=db_path)
+        claim_next_operation("crashed", db_path=db_path)
+        _expire_leases(db_path)
+
+        assert recover_expired_leases(requeue=True, db_path=db_path) == 1
+        assert claim_next_operation("w2", db_path=db_path)["id"] == op_id
+
+    def test_live_lease_not_recovered(self, db_path):
+        create_pump_operation("s1", 1, "{}", db_path=db_path)
+        claim_next_operation("w1", db_path=db_path)
+
+        assert recover_expired_leases(db_path=db_path) == 0
+
+
+class TestClaimRefillOperation:
+    """Refill operations share the claim semantics."""
+
+    def test_claim_and_release_refill(self, db_path):
+        refill_id = create_refill_operation(
+            "proto", 0, "Sugar", "withdraw", 1000, "WDR", db_path=db_path
+        )
+
+        claimed = claim_next_refill_operation("w1", db_path=db_path)
+        assert claimed["id"] == refill_id
+        assert claim_next_refill_operation("w2", db_path=db_path) is None
+
+        assert release_operation(refill_id, "w1", refill=True, db_path=db_path)
+        assert get_refill_operation_by_id(refill_id, db_path)["status"] == "pending"
@@ -0,0 +1,207 @@
+"""
+Tests for persistent pump shadow state in the pump control service.
+
+Validates that:
+- Parameters already held by a pump are not re-sent
+- Only changed parameters are programmed
+- State survives a service restart (it lives in the DB)
+- Stale state is re-verified against the hardware before diffing
+- A pump that lost its connection has its state cleared on reconnect
+"""
+
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+import pump_control_service as service
+from robotaste.utils.pump_db import (
+    get_pump_device_state,
+    save_pump_device_state,
+    clear_pump_device_state,
+)
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "robotaste", "data", "schema.sql"
+)
+
+
+@pytest.fixture
+def db_path():
+    """Create a temporary database with the full schema."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+
+    conn = sqlite3.connect(temp_db.name)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.close()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
+
+
+def _mock_pump(address=0, port="COM_TEST"):
+    pump = MagicMock()
+    pump.address = address
+    pump.port = port
+    return pump
+
+
+class TestPumpDeviceStateDb:
+    """CRUD helpers in pump_db."""
+
+    def test_save_and_get_roundtrip(self, db_path):
+        save_pump_device_state("COM_TEST", 0, {"diameter_mm": 26.7}, db_path=db_path)
+        state = get_pump_device_state("COM_TEST", 0, db_path)
+        assert state["diameter_mm"] == 26.7
+        assert state["rate_ul_min"] is None
+        assert state["last_verified_at"] is not None
+
+    def test_partial_update_keeps_other_fields(self, db_path):
+        save_pump_device_state("COM_TEST", 0, {"diameter_mm": 26.7}, db_path=db_path)
+        save_pump_device_state("COM_TEST", 0, {"direction": "WDR"}, db_path=db_path)
+        state = get_pump_device_state("COM_TEST", 0, db_path)
+        assert state["diameter_mm"] == 26.7
+        assert state["direction"] == "WDR"
+
+    def test_unknown_field_rejected(self, db_path):
+        with pytest.raises(ValueError):
+            save_pump_device_state("COM_TEST", 0, {"speed": 1}, db_path=db_path)
+
+    def test_clear_state(self, db_path):
+        save_pump_device_state("COM_TEST", 0, {"diameter_mm": 26.7}, db_path=db_path)
+        save_pump_device_state("COM_TEST", 1, {"diameter_mm": 26.7}, db_path=db_path)
+        assert clear_pump_device_state("COM_TEST", db_path=db_path) == 2
+        assert get_pump_device_state("COM_TEST", 0, db_path) is None
+
+
+class TestSyncPumpParameters:
+    """Diffing desired parameters against the shadow state."""
+
+    def test_first_sync_sends_everything(self, db_path):
+        pump = _mock_pump()
+        sent = service.sync_pump_parameters(
+            pump, db_path,
+            diameter_mm=26.7, rate_ul_min=2000, volume_unit="ML", direction="INF",
+        )
+        assert set(sent) == {"diameter_mm", "rate_ul_min", "volume_unit", "direction"}
+        pump.set_diameter.assert_called_once_with(26.7)
+        pump.set_direction.assert_called_once_with("INF")
+
+    def test_repeat_sync_sends_nothing(self, db_path):
+        pump = _mock_pump()
+        kwargs = dict(diameter_mm=26.7, rate_ul_min=2000, volume_unit="ML", direction="INF")
+        service.sync_pump_parameters(pump, db_path, **kwargs)
+        pump.reset_mock()
+
+        # Simulates a service restart: fresh pump object, state read from DB
+        restarted = _mock_pump()
+        assert service.sync_pump_parameters(restarted, db_path, **kwargs) == {}
+        restarted.set_diameter.assert_not_called()
+        restarted.set_rate.assert_not_called()
+        restarted.set_volume_unit.assert_not_called()
+        restarted.set_direction.assert_not_called()
+
+    def test_only_changed_parameter_sent(self, db_path):
+        pump = _mock_pump()
+        service.sync_pump_parameters(
+            pump, db_path, diameter_mm=26.7, rate_ul_min=2000, direction="INF"
+        )
+        pump.reset_mock()
+
+        sent = service.sync_pump_parameters(
+            pump, db_path, diameter_mm=26.7, rate_ul_min=2000, direction="WDR"
+        )
+        assert sent == {"direction": "WDR"}
+        pump.set_diameter.assert_not_called()
+        pump.set_rate.assert_not_called()
+
+    def test_within_tolerance_not_resent(self, db_path):
+        pump = _mock_pump()
+        service.sync_pump_parameters(pump, db_path, diameter_mm=14.567)
+        pump.reset_mock()
+
+        # Pump stores 2 decimals; 14.57 must count as the same setting
+        assert service.sync_pump_parameters(pump, db_path, diameter_mm=14.57) == {}
+
+    def test_failed_command_marks_parameter_unknown(self, db_path):
+        pump = _mock_pump()
+        pump.set_rate.side_effect = RuntimeError("no response")
+
+        with pytest.raises(RuntimeError):
+            service.sync_pump_parameters(
+                pump, db_path, diameter_mm=26.7, rate_ul_min=2000
+            )
+
+        state = get_pump_device_state("COM_TEST", 0, db_path)
+        assert state["diameter_mm"] == 26.7
+        assert state["rate_ul_min"] is None
+
+    def test_stale_state_is_verified_against_pump(self, db_path):
+        save_pump_device_state(
+            "COM_TEST", 0, {"diameter_mm": 26.7, "direction": "INF"}, db_path=db_path
+        )
+        conn = sqlite3.connect(db_path)
+        old = (datetime.now() - timedelta(seconds=service.STATE_VERIFY_INTERVAL_S + 60))
+        conn.execute(
+            "UPDATE pump_device_state SET last_verified_at = ?", (old.isoformat(),)
+        )
+        conn.commit()
+        conn.close()
+
+        # Someone changed the diameter on the front panel
+        pump = _mock_pump()
+        pump.get_diameter.return_value = 14.57
+        pump.get_rate.return_value = (2.0, "MM")
+        pump.get_direction.return_value = "INF"
+
+        sent = service.sync_pump_parameters(
+            pump, db_path, diameter_mm=26.7, rate_ul_min=2000, direction="INF"
+        )
+        assert sent == {"diameter_mm": 26.7}
+        pump.get_diameter.assert_called_once()
+
+
+class TestReconnect:
+    """Shadow state across reconnects."""
+
+    PUMP_CONFIG = {
+        "enabled": True,
+        "serial_port": "COM_TEST",
+        "pumps": [{"address": 0, "ingredient": "Sugar", "syringe_diameter_mm": 26.7}],
+    }
+
+    @pytest.fixture
+    def new_pumps(self, monkeypatch):
+        created = []
+
+        def make_pump(port, address, **_):
+            pump = _mock_pump(address, port)
+            created.append(pump)
+            return pump
+
+        monkeypatch.setattr(service, "pumps", {})
+        monkeypatch.setattr(service, "NE4000Pump", make_pump)
+        return created
+
+    def test_known_state_kept_on_first_connect(self, db_path, new_pumps):
+        save_pump_device_state("COM_TEST", 0, {"diameter_mm": 26.7}, db_path=db_path)
+
+        assert service.initialize_pumps(self.PUMP_CONFIG, db_path)
+
+        new_pumps[0].set_diameter.assert_not_called()
+
+    def test_lost_connection_clears_state(self, db_path, new_pumps):
+        save_pump_device_state("COM_TEST", 0, {"diameter_mm": 26.7}, db_path=db_path)
+        lost = _mock_pump()
+        lost.is_connected.return_value = False
+        service.pumps[("COM_TEST", 0)] = lost
+
+        assert service.initialize_pumps(self.PUMP_CONFIG, db_path)
+
+        new_pumps[0].set_diameter.assert_called_once_with(26.7)
@@ -0,0 +1,162 @@
+"""
+Tests for the buffered pump command log.
+
+Validates that:
+- Logged commands are not written until a flush
+- Size and time thresholds trigger background flushes
+- close() persists everything still buffered
+- A failed write keeps its batch for the next flush and closes the connection
+- Pump command hooks route entries to the current operation
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import pump_control_service as service
+from robotaste.hardware.pump_controller import NE4000Pump
+from robotaste.utils import pump_db
+from robotaste.utils.pump_db import PumpLogSink, get_operation_logs
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "robotaste", "data", "schema.sql"
+)
+
+
+@pytest.fixture
+def db_path():
+    """Create a temporary database with the full schema."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+
+    conn = sqlite3.connect(temp_db.name)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    conn.close()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestPumpLogSink:
+    """Batching behaviour of PumpLogSink."""
+
+    def test_entries_buffered_until_flush(self, db_path):
+        sink = PumpLogSink(db_path, flush_size=100, flush_interval_s=60)
+        sink.log(1, 0, "RAT 2000 UM", "S")
+        sink.log(1, 0, "RUN", "I")
+
+        assert get_operation_logs(1, db_path) == []
+        assert sink.flush() == 2
+
+        logs = get_operation_logs(1, db_path)
+        assert [log["command"] for log in logs] == ["RAT 2000 UM", "RUN"]
+        sink.close()
+
+    def test_size_threshold_triggers_flush(self, db_path):
+        sink = PumpLogSink(db_path, flush_size=3, flush_interval_s=60)
+        for n in range(3):
+            sink.log(1, 0, f"CMD{n}")
+
+        assert _wait_until(lambda: len(get_operation_logs(1, db_path)) == 3)
+        sink.close()
+
+    def test_time_threshold_triggers_flush(self, db_path):
+        sink = PumpLogSink(db_path, flush_size=100, flush_interval_s=0.05)
+        sink.log(1, 0, "STP", success=False, error_message="timeout")
+
+        assert _wait_until(lambda: len(get_operation_logs(1, db_path)) == 1)
+        log = get_operation_logs(1, db_path)[0]
+        assert log["success"] == 0
+        assert log["error_message"] == "timeout"
+        sink.close()
+
+    def test_close_writes_remaining(self, db_path):
+        sink = PumpLogSink(db_path, flush_size=100, flush_interval_s=60)
+        sink.log(2, 1, "DIR INF")
+        sink.close()
+
+        assert len(get_operation_logs(2, db_path)) == 1
+
+    def test_overflow_drops_oldest(self, db_path):
+        sink = PumpLogSink(db_path, capacity=2, flush_size=100, flush_interval_s=60)
+        for n in range(3):
+            sink.log(1, 0, f"CMD{n}")
+        sink.close()
+
+        assert sink.dropped == 1
+        assert [log["command"] for log in get_operation_logs(1, db_path)] == ["CMD1", "CMD2"]
+
+    def test_failed_write_retried(self, db_path, monkeypatch):
+        sink = PumpLogSink(db_path, flush_size=100, flush_interval_s=60)
+        sink.log(1, 0, "CMD0")
+        sink.log(1, 0, "CMD1")
+
+        failing = MagicMock()
+        failing.executemany.side_effect = sqlite3.OperationalError("database is locked")
+        monkeypatch.setattr(pump_db, "get_db_connection", lambda _: failing)
+        assert sink.flush() == 0
+        failing.close.assert_called_once()
+
+        sink.log(1, 0, "CMD2")
+        monkeypatch.undo()
+        assert sink.flush() == 3
+        assert [log["command"] for log in get_operation_logs(1, db_path)] == ["CMD0", "CMD1", "CMD2"]
+        sink.close()
+
+    def test_requeue_respects_capacity(self, db_path, monkeypatch):
+        sink = PumpLogSink(db_path, capacity=3, flush_size=100, flush_interval_s=60)
+        sink.log(1, 0, "CMD0")
+        sink.log(1, 0, "CMD1")
+
+        def log_during_failed_write(_):
+            sink.log(1, 0, "CMD2")
+            sink.log(1, 0, "CMD3")
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(pump_db, "get_db_connection", log_during_failed_write)
+        sink.flush()
+        monkeypatch.undo()
+        sink.close()
+
+        assert sink.dropped == 1
+        assert [log["command"] for log in get_operation_logs(1, db_path)] == ["CMD1", "CMD2", "CMD3"]
+
+
+class TestCommandHook:
+    """Pump commands reaching the sink through the service hook."""
+
+    def test_commands_logged_for_current_operation(self, db_path, monkeypatch):
+        sink = PumpLogSink(db_path, flush_size=100, flush_interval_s=60)
+        monkeypatch.setattr(service, "command_log", sink)
+
+        pump = NE4000Pump(port="COM_TEST", address=3)
+        pump.command_logger = service._record_pump_command
+        pump._connected = True
+        pump.serial = MagicMock()
+        pump.serial.read_until.return_value = b"\x0203S\x03"
+
+        pump._send_command("DIA")  # No operation running: not logged
+        service.job_context.operation_id = 9
+        try:
+            pump._send_command("RAT 2000 UM")
+        finally:
+            service.job_context.operation_id = None
+        sink.close()
+
+        logs = get_operation_logs(9, db_path)
+        assert [(log["pump_address"], log["command"]) for log in logs] == [(3, "RAT 2000 UM")]
@@ -0,0 +1,159 @@
+"""
+Tests for per-port worker routing in the pump control service.
+
+Validates that:
+- Jobs on different serial ports run concurrently
+- Jobs on the same serial port run one at a time, in order
+- Finished jobs leave the in-flight set so they are not re-dispatched
+- Per-pump guards exclude overlapping jobs on the same pump
+- Completion waits measure the run time only when the pumps report stopped
+"""
+
+import threading
+import time
+
+import pytest
+
+import pump_control_service as service
+
+
+@pytest.fixture(autouse=True)
+def clean_workers():
+    """Ensure each test starts and ends without workers or in-flight jobs."""
+    service.stop_port_workers(timeout=2.0)
+    service.inflight.clear()
+    yield
+    service.stop_port_workers(timeout=2.0)
+    service.inflight.clear()
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestPortWorkers:
+    """Routing jobs to per-port workers."""
+
+    def test_different_ports_run_concurrently(self):
+        started = {"COM_A": threading.Event(), "COM_B": threading.Event()}
+        release = threading.Event()
+
+        def job(port):
+            def run():
+                started[port].set()
+                release.wait(2.0)
+            return run
+
+        service.dispatch_job("COM_A", ("refill", 1), job("COM_A"), ":memory:", 0.05)
+        service.dispatch_job("COM_B", ("dispense", 1), job("COM_B"), ":memory:", 0.05)
+
+        # Both jobs must be running at the same time before either is released
+        assert started["COM_A"].wait(1.0)
+        assert started["COM_B"].wait(1.0)
+        release.set()
+
+    def test_same_port_jobs_serialized_in_order(self):
+        order = []
+        active = []
+
+        def job(n):
+            def run():
+                active.append(n)
+                assert len(active) == 1
+                time.sleep(0.05)
+                order.append(n)
+                active.remove(n)
+            return run
+
+        for n in range(3):
+            service.dispatch_job("COM_A", ("dispense", n), job(n), ":memory:", 0.05)
+
+        assert _wait_until(lambda: len(order) == 3)
+        assert order == [0, 1, 2]
+
+    def test_inflight_released_after_job(self):
+        done = threading.Event()
+        service.dispatch_job("COM_A", ("dispense", 7), done.set, ":memory:", 0.05)
+
+        assert done.wait(1.0)
+        assert _wait_until(lambda: not service._is_inflight(("dispense", 7)))
+
+    def test_failing_job_does_not_kill_worker(self):
+        def boom():
+            raise RuntimeError("pump exploded")
+
+        done = threading.Event()
+        service.dispatch_job("COM_A", ("dispense", 1), boom, ":memory:", 0.05)
+        service.dispatch_job("COM_A", ("dispense", 2), done.set, ":memory:", 0.05)
+
+        assert done.wait(1.0)
+
+
+class TestHoldPumps:
+    """Per-pump mutual exclusion."""
+
+    def test_same_pump_excluded(self):
+        entered = threading.Event()
+
+        with service.hold_pumps("COM_A", [0, 1]):
+            def other():
+                with service.hold_pumps("COM_A", [1]):
+                    entered.set()
+
+            t = threading.Thread(target=other)
+            t.start()
+            assert not entered.wait(0.1)
+
+        t.join(1.0)
+        assert entered.is_set()
+
+    def test_other_port_same_address_not_excluded(self):
+        entered = threading.Event()
+
+        with service.hold_pumps("COM_A", [0]):
+            def other():
+                with service.hold_pumps("COM_B", [0]):
+                    entered.set()
+
+            t = threading.Thread(target=other)
+            t.start()
+            assert entered.wait(1.0)
+            t.join(1.0)
+
+
+class _FakePump:
+    """Reports "stopped" from stop_after seconds after creation (never if None)."""
+
+    def __init__(self, stop_after):
+        self.address = 0
+        self.created = time.monotonic()
+        self.stop_after = stop_after
+
+    def get_status(self):
+        done = self.stop_after is not None and time.monotonic() - self.created >= self.stop_after
+        return {"status": "stopped" if done else "infusing", "raw_response": ""}
+
+
+class TestWaitForPumps:
+    """Measuring pump run times."""
+
+    def test_measures_run_until_stopped(self):
+        pumps = [_FakePump(0.05), _FakePump(0.12)]
+
+        run_s = service.wait_for_pumps(pumps, nominal_s=0.05, wait_s=1.0, poll_interval=0.01)
+
+        assert run_s is not None
+        assert 0.12 <= run_s < 0.5
+
+    def test_wait_runs_out(self):
+        start = time.monotonic()
+
+        run_s = service.wait_for_pumps([_FakePump(None)], nominal_s=0.05, wait_s=0.1, poll_interval=0.01)
+
+        assert run_s is None
+        assert time.monotonic() - start < 0.5
@@ -0,0 +1,256 @@
+"""
+Tests for the dispense timing model.
+
+Validates that:
+- Without history, predictions fall back to nominal volume/rate
+- Overhead and per-pump slopes are learned from pump_operations
+- Refresh only reads operations completed since the last refresh
+- Completion waits never drop below the nominal pumping time
+- Completion waits learn only from measured pump run times, stay within the
+  old 10% buffer, and do not grow when fed the service's own waits
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from robotaste.core.pump_integration import calculate_total_pump_time
+from robotaste.core.pump_timing import (
+    DispenseTimingModel,
+    dispense_mode,
+    nominal_pump_times,
+)
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "robotaste", "data", "schema.sql"
+)
+
+RATE = 600  # µL/min -> 10 µL per second
+
+
+def _pump_config(simultaneous=False, burst=False):
+    return {
+        "enabled": True,
+        "serial_port": "COM_TEST",
+        "dispensing_rate_ul_min": RATE,
+        "simultaneous_dispensing": simultaneous,
+        "use_burst_mode": burst,
+        "pumps": [
+            {"address": 0, "ingredient": "Sugar"},
+            {"address": 1, "ingredient": "Salt", "dual_syringe": True},
+        ],
+    }
+
+
+@pytest.fixture
+def db_path():
+    """Temporary database with one sequential and one simultaneous protocol."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+
+    conn = sqlite3.connect(temp_db.name)
+    with open(SCHEMA_PATH) as f:
+        conn.executescript(f.read())
+    for protocol_id, config in (
+        ("seq", _pump_config()),
+        ("sim", _pump_config(simultaneous=True)),
+    ):
+        conn.execute(
+            "INSERT INTO protocol_library (protocol_id, name, protocol_json) VALUES (?, ?, ?)",
+            (protocol_id, protocol_id, json.dumps({"pump_config": config})),
+        )
+        conn.execute(
+            "INSERT INTO sessions (session_id, session_code, protocol_id) VALUES (?, ?, ?)",
+            (f"session-{protocol_id}", protocol_id.upper(), protocol_id),
+        )
+    conn.commit()
+    conn.close()
+
+    yield temp_db.name
+
+    os.unlink(temp_db.name)
+
+
+def _add_completed(db_path, protocol_id, recipe, duration_s, pump_run_s=None):
+    started = datetime(2026, 1, 1, 12, 0, 0)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        INSERT INTO pump_operations
+            (session_id, cycle_number, recipe_json, status, started_at, completed_at,
+             pump_run_s)
+        VALUES (?, 1, ?, 'completed', ?, ?, ?)
+        """,
+        (
+            f"session-{protocol_id}",
+            json.dumps(recipe),
+            started.isoformat(),
+            (started + timedelta(seconds=duration_s)).isoformat(),
+            pump_run_s,
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestNominalTimes:
+    """Mode and nominal time helpers."""
+
+    def test_dispense_mode(self):
+        assert dispense_mode(_pump_config()) == "sequential"
+        assert dispense_mode(_pump_config(simultaneous=True)) == "simultaneous"
+        assert dispense_mode(_pump_config(simultaneous=True, burst=True)) == "burst"
+
+    def test_dual_syringe_halved(self):
+        times = nominal_pump_times({"Sugar": 100, "Salt": 100}, _pump_config())
+        assert times == pytest.approx({0: 10.0, 1: 5.0})
+
+
+class TestDispenseTimingModel:
+    """Fitting and predicting durations."""
+
+    def test_no_history_predicts_nominal(self, db_path):
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        expected, _ = model.predict({"Sugar": 100, "Salt": 100}, _pump_config())
+        assert expected == pytest.approx(15.0)
+
+    def test_learns_sequential_overhead_and_slope(self, db_path):
+        # True behaviour: 2 s overhead, pump 0 runs 20% slow, pump 1 on rate
+        for sugar, salt in [(50, 0), (100, 40), (200, 100), (150, 300), (300, 20),
+                            (80, 200), (120, 120), (250, 60)]:
+            duration = 2.0 + 1.2 * sugar / 10 + 1.0 * salt / 20
+            _add_completed(db_path, "seq", {"Sugar": sugar, "Salt": salt}, duration)
+
+        model = DispenseTimingModel(db_path)
+        assert model.refresh() == 8
+
+        expected, sigma = model.predict({"Sugar": 100, "Salt": 100}, _pump_config())
+        assert expected == pytest.approx(2.0 + 12.0 + 5.0, rel=0.05)
+        assert sigma < 1.0
+
+    def test_simultaneous_uses_longest_pump(self, db_path):
+        for sugar in (50, 100, 150, 200, 250, 300):
+            _add_completed(db_path, "sim", {"Sugar": sugar, "Salt": 20}, 1.0 + sugar / 10)
+
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        expected, _ = model.predict({"Sugar": 180, "Salt": 20}, _pump_config(simultaneous=True))
+        assert expected == pytest.approx(19.0, rel=0.05)
+
+    def test_refresh_is_incremental(self, db_path):
+        _add_completed(db_path, "seq", {"Sugar": 100}, 10.0)
+        model = DispenseTimingModel(db_path)
+
+        assert model.refresh() == 1
+        assert model.refresh() == 0
+
+        _add_completed(db_path, "seq", {"Sugar": 200}, 20.0)
+        assert model.refresh() == 1
+        assert model.fits["sequential"].n == 2
+
+    def test_out_of_order_completion_picked_up(self, db_path):
+        # Operation 1 is still running on one port when operation 2 finishes
+        _add_completed(db_path, "seq", {"Sugar": 100}, 10.0)
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE pump_operations SET status = 'in_progress', completed_at = NULL")
+        conn.commit()
+        conn.close()
+        _add_completed(db_path, "seq", {"Sugar": 50}, 5.0)
+
+        model = DispenseTimingModel(db_path)
+        assert model.refresh() == 1
+
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "UPDATE pump_operations SET status = 'completed', completed_at = ? WHERE id = 1",
+            (datetime(2026, 1, 1, 12, 0, 30).isoformat(),),
+        )
+        conn.commit()
+        conn.close()
+        assert model.refresh() == 1
+
+    def test_outliers_ignored(self, db_path):
+        _add_completed(db_path, "seq", {"Sugar": 100}, 3600.0)  # Operator left it paused
+        model = DispenseTimingModel(db_path)
+
+        assert model.refresh() == 0
+
+
+class TestPumpWait:
+    """Sizing completion waits."""
+
+    def test_fallback_buffer_without_history(self, db_path):
+        model = DispenseTimingModel(db_path)
+        assert model.pump_wait("simultaneous", 0, 10.0) == pytest.approx(11.0)
+
+    def test_fitted_margin_shrinks_wait(self, db_path):
+        for sugar in (50, 100, 150, 200, 250, 300):
+            _add_completed(db_path, "sim", {"Sugar": sugar}, 1.5 + sugar / 10, 0.5 + sugar / 10)
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        wait = model.pump_wait("simultaneous", 0, 10.0)
+        assert 10.0 <= wait < 11.0
+
+    def test_wait_never_below_nominal(self, db_path):
+        # Pump appears faster than nominal (clock skew); still wait the full time
+        for sugar in (50, 100, 150, 200, 250, 300):
+            _add_completed(db_path, "sim", {"Sugar": sugar}, sugar / 10, 0.8 * sugar / 10)
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        assert model.pump_wait("simultaneous", 0, 10.0) >= 10.0
+
+    def test_wait_capped_at_buffer(self, db_path):
+        # Pump measured 30% slow; the wait still stops at the old 10% buffer
+        for sugar in (50, 100, 150, 200, 250, 300):
+            _add_completed(db_path, "sim", {"Sugar": sugar}, 2 + 1.3 * sugar / 10, 1.3 * sugar / 10)
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        assert model.pump_wait("simultaneous", 0, 10.0) == pytest.approx(11.0)
+
+    def test_unmeasured_durations_ignored(self, db_path):
+        # Durations alone (no pump_run_s) were set by the service's wait
+        for sugar in (50, 100, 150, 200, 250, 300):
+            _add_completed(db_path, "sim", {"Sugar": sugar}, 0.5 + sugar / 10)
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        assert model.run_fits["simultaneous"].n == 0
+        assert model.pump_wait("simultaneous", 0, 10.0) == pytest.approx(11.0)
+
+    @pytest.mark.parametrize("mode,protocol_id", [("simultaneous", "sim"), ("sequential", "seq")])
+    def test_own_waits_do_not_grow(self, db_path, mode, protocol_id):
+        # Feed back operations whose length was the model's own wait plus overhead
+        model = DispenseTimingModel(db_path)
+        recipe = {"Sugar": 100}
+        waits = []
+        for _ in range(50):
+            wait = model.pump_wait(mode, 0, 10.0)
+            waits.append(wait)
+            _add_completed(db_path, protocol_id, recipe, wait + 0.4)
+            model.refresh()
+
+        assert max(waits) == pytest.approx(11.0)
+        assert waits[-1] <= waits[0]
+
+
+class TestCalculateTotalPumpTime:
+    """calculate_total_pump_time with a timing model."""
+
+    def test_uses_model_prediction(self, db_path):
+        for sugar in (50, 100, 150, 200, 250, 300):
+            _add_completed(db_path, "seq", {"Sugar": sugar}, 3.0 + sugar / 10)
+        model = DispenseTimingModel(db_path)
+        model.refresh()
+
+        seconds = calculate_total_pump_time({"Sugar": 100}, _pump_config(), timing_model=model)
+        assert seconds == pytest.approx(13.0, rel=0.05)
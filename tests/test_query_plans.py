@@ -0,0 +1,146 @@
+"""
+Query plan regression tests for the hot queries.
+
+Validates that:
+- Every hot query is answered from an index (no full table scan; listing
+  queries may walk an index in order)
+- No hot query needs a temporary B-tree for ORDER BY
+- Databases with the old single-column indexes are migrated
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from robotaste.data.database import SUPERSEDED_INDEXES, _apply_schema_migrations
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "robotaste", "data", "schema.sql"
+)
+
+# (name, SQL, params) - copies of the queries issued on every cycle / poll
+HOT_QUERIES = [
+    (
+        "get_session_samples(only_final=True)",
+        "SELECT * FROM samples WHERE session_id = ? AND is_final = 1 ORDER BY cycle_number ASC",
+        ("s",),
+    ),
+    (
+        "get_session_samples(only_final=False)",
+        "SELECT * FROM samples WHERE session_id = ? ORDER BY cycle_number ASC",
+        ("s",),
+    ),
+    (
+        "get_latest_sample_concentrations",
+        "SELECT ingredient_concentration FROM samples WHERE session_id = ? "
+        "ORDER BY created_at DESC LIMIT 1",
+        ("s",),
+    ),
+    (
+        "BO training data",
+        "SELECT * FROM samples WHERE session_id = ? ORDER BY created_at ASC",
+        ("s",),
+    ),
+    (
+        "latest pump operation",
+        "SELECT * FROM pump_operations WHERE session_id = ? ORDER BY created_at DESC LIMIT 1",
+        ("s",),
+    ),
+    (
+        "in-progress pump operation",
+        "SELECT * FROM pump_operations WHERE session_id = ? AND status = 'in_progress' "
+        "ORDER BY created_at DESC LIMIT 1",
+        ("s",),
+    ),
+    (
+        "pump operation for cycle",
+        "SELECT * FROM pump_operations WHERE session_id = ? AND cycle_number = ? "
+        "ORDER BY created_at DESC LIMIT 1",
+        ("s", 1),
+    ),
+    (
+        "claim next pump operation",
+        "SELECT id FROM pump_operations WHERE status = 'pending' ORDER BY created_at ASC LIMIT 1",
+        (),
+    ),
+    (
+        "timing model refresh",
+        "SELECT id, completed_at FROM pump_operations WHERE status = 'completed' "
+        "AND (completed_at, id) > (?, ?) ORDER BY completed_at, id",
+        ("", 0),
+    ),
+    (
+        "Latin-square session number",
+        "SELECT protocol_id, protocol_session_number FROM sessions WHERE session_id = ?",
+        ("s",),
+    ),
+    (
+        "sessions of protocol",
+        "SELECT * FROM sessions s WHERE s.protocol_id = ? ORDER BY s.created_at DESC",
+        ("p",),
+    ),
+    (
+        "active sessions",
+        "SELECT * FROM sessions s WHERE s.state = 'active' ORDER BY s.created_at DESC",
+        (),
+    ),
+    (
+        "list_protocols",
+        "SELECT protocol_id, name FROM protocol_library WHERE deleted_at IS NULL "
+        "AND is_archived = 0 ORDER BY created_at DESC",
+        (),
+    ),
+    (
+        "global pump state",
+        "SELECT * FROM pump_global_state WHERE protocol_id = ? ORDER BY pump_address",
+        ("p",),
+    ),
+]
+
+
+@pytest.fixture
+def conn():
+    """Connection to a temporary database created from schema.sql."""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    temp_db.close()
+
+    connection = sqlite3.connect(temp_db.name)
+    with open(SCHEMA_PATH) as f:
+        connection.executescript(f.read())
+
+    yield connection
+
+    connection.close()
+    os.unlink(temp_db.name)
+
+
+def _plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+class TestHotQueryPlans:
+    """Plans of the hot queries."""
+
+    @pytest.mark.parametrize("name,sql,params", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+    def test_uses_index_without_sort(self, conn, name, sql, params):
+        plan = _plan(conn, sql, params)
+
+        assert not any(step.startswith("SCAN") and "INDEX" not in step for step in plan), plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+class TestIndexMigration:
+    """Migrating databases created with the old index set."""
+
+    def test_superseded_indexes_dropped(self, conn):
+        conn.execute("CREATE INDEX idx_samples_session_id ON samples(session_id)")
+        conn.execute("CREATE INDEX idx_samples_is_final ON samples(is_final)")
+
+        conn.row_factory = sqlite3.Row
+        _apply_schema_migrations(conn.cursor())
+
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert not names & set(SUPERSEDED_INDEXES)
+        assert "idx_samples_session_final_cycle" in names
@@ -0,0 +1,189 @@
+"""
+Tests for session-start pump recipe planning.
+
+Validates that:
+- Planned recipes match the per-cycle stock volume calculation
+- Predetermined and sample-bank cycles are planned; runtime cycles are not
+- Refill needs are reported against the current pump volumes
+- Pump operations for planned cycles insert the stored recipe, only while
+  pump control is enabled
+"""
+
+import json
+
+import pytest
+
+import robotaste.data.database as database
+from robotaste.core.calculations import calculate_stock_volumes
+from robotaste.core import pump_integration
+from robotaste.core.pump_integration import create_pump_operation_for_cycle
+from robotaste.core.recipe_planner import (
+    compute_recipes,
+    get_planned_recipe,
+    plan_session_recipes,
+)
+from robotaste.core.sample_bank import materialize_session_samples
+from robotaste.data.database import create_session
+
+PROTOCOL = {
+    "protocol_id": "recipe-test",
+    "ingredients": [
+        {"name": "Sugar", "stock_concentration_mM": 500.0},
+        {"name": "Salt", "stock_concentration_mM": 100.0},
+        {"name": "Water", "stock_concentration_mM": 0.0, "is_diluent": True},
+    ],
+    "pump_config": {
+        "enabled": True,
+        "total_volume_ml": 10.0,
+        "pumps": [
+            {"address": 0, "ingredient": "Sugar", "stock_concentration_mM": 1000.0},
+            {"address": 1, "ingredient": "Salt"},
+            {"address": 2, "ingredient": "Water"},
+        ],
+    },
+    "sample_selection_schedule": [
+        {
+            "cycle_range": {"start": 1, "end": 2},
+            "mode": "predetermined_absolute",
+            "predetermined_samples": [
+                {"cycle": 1, "concentrations": {"Sugar": 12.5, "Salt": 3.0}},
+                {"cycle": 2, "concentrations": {"Sugar": 40.0, "Salt": 0.0}},
+            ],
+        },
+        {"cycle_range": {"start": 3, "end": 3}, "mode": "user_selected"},
+        {
+            "cycle_range": {"start": 4, "end": 5},
+            "mode": "predetermined_randomized",
+            "sample_bank": {
+                "samples": [
+                    {"id": "A", "concentrations": {"Sugar": 100.0, "Salt": 10.0}},
+                    {"id": "B", "concentrations": {"Sugar": 200.0, "Salt": 20.0}},
+                ],
+                "design_type": "latin_square",
+            },
+        },
+    ],
+}
+
+
+@pytest.fixture
+def session_id(test_db):
+    """Session started with PROTOCOL and its sample bank materialized."""
+    session_id, _ = create_session("mod", protocol_id=PROTOCOL["protocol_id"])
+    materialize_session_samples(session_id, PROTOCOL)
+    return session_id
+
+
+def _set_session_config(session_id, experiment_config):
+    with database.get_database_connection() as conn:
+        conn.execute(
+            "UPDATE sessions SET experiment_config = ? WHERE session_id = ?",
+            (json.dumps(experiment_config), session_id),
+        )
+        conn.commit()
+
+
+def _per_cycle_recipe(concentrations):
+    ingredients = [dict(ing) for ing in PROTOCOL["ingredients"]]
+    ingredients[0]["stock_concentration_mM"] = 1000.0
+    stock_volumes = calculate_stock_volumes(concentrations, ingredients, 10.0)["stock_volumes"]
+    stock_volumes["Water"] = 10000.0 - sum(stock_volumes.values())
+    return stock_volumes
+
+
+class TestComputeRecipes:
+    """Vectorized recipe computation."""
+
+    def test_matches_per_cycle_calculation(self):
+        sequence = {
+            1: {"Sugar": 12.5, "Salt": 3.0},
+            2: {"Sugar": 40.0, "Salt": 0.0},
+            7: {"Salt": 55.5},
+        }
+
+        cycles, recipes, warnings = compute_recipes(sequence, PROTOCOL)
+
+        assert cycles == [1, 2, 7]
+        assert warnings == []
+        for cycle, recipe in zip(cycles, recipes):
+            assert recipe == pytest.approx(_per_cycle_recipe(sequence[cycle]))
+            assert list(recipe) == list(_per_cycle_recipe(sequence[cycle]))
+
+    def test_overfull_sample_warns(self):
+        _, recipes, warnings = compute_recipes({1: {"Salt": 150.0}}, PROTOCOL)
+
+        assert "Water" not in recipes[0]
+        assert warnings == ["Cycle 1: stock volumes exceed total volume by 5000.0 µL"]
+
+
+class TestPlanSessionRecipes:
+    """Planning and storing a session's recipes."""
+
+    def test_plans_known_cycles_only(self, session_id):
+        plan = plan_session_recipes(session_id, PROTOCOL)
+
+        assert plan["cycles"] == [1, 2, 4, 5]
+        assert get_planned_recipe(session_id, 3) is None
+        planned = get_planned_recipe(session_id, 1)
+        assert planned["concentrations"] == {"Sugar": 12.5, "Salt": 3.0}
+        assert json.loads(planned["recipe_json"]) == {"Sugar": 125.0, "Salt": 300.0, "Water": 9575.0}
+
+    def test_refill_forecast(self, session_id):
+        global_state = {
+            "Sugar": {"current_ul": 1000.0, "max_capacity_ul": 60000.0},
+            "Salt": {"current_ul": 50000.0, "max_capacity_ul": 60000.0},
+        }
+
+        plan = plan_session_recipes(session_id, PROTOCOL, global_state=global_state)
+
+        # Sugar: 125 + 400 + 1000 (cycle 4, bank sample A) exceeds 1000 µL
+        assert plan["pumps"]["Sugar"]["refill_before_cycle"] == 4
+        assert plan["pumps"]["Salt"]["refill_before_cycle"] is None
+        assert plan["pumps"]["Water"]["refill_before_cycle"] is None
+        assert any("Sugar" in warning for warning in plan["warnings"])
+
+    def test_disabled_pumps_not_planned(self, session_id):
+        protocol = dict(PROTOCOL, pump_config=dict(PROTOCOL["pump_config"], enabled=False))
+
+        assert plan_session_recipes(session_id, protocol)["cycles"] == []
+        assert get_planned_recipe(session_id, 1) is None
+
+
+class TestPlannedPumpOperation:
+    """Creating pump operations from planned recipes."""
+
+    @pytest.fixture(autouse=True)
+    def no_protocol_load(self, monkeypatch):
+        def fail(_):
+            raise AssertionError("planned cycles must not load the protocol")
+
+        monkeypatch.setattr(pump_integration, "get_protocol_by_id", fail)
+
+    def test_inserts_planned_recipe(self, session_id, test_db):
+        _set_session_config(session_id, PROTOCOL)
+        plan_session_recipes(session_id, PROTOCOL)
+
+        op_id = create_pump_operation_for_cycle(
+            session_id, 1, db_path=test_db, concentrations={"Sugar": 12.5, "Salt": 3.0}
+        )
+
+        with database.get_database_connection() as conn:
+            row = conn.execute(
+                "SELECT cycle_number, recipe_json FROM pump_operations WHERE id = ?", (op_id,)
+            ).fetchone()
+        assert row["cycle_number"] == 1
+        assert row["recipe_json"] == get_planned_recipe(session_id, 1)["recipe_json"]
+
+        # A pending operation blocks a second one
+        assert create_pump_operation_for_cycle(session_id, 2, db_path=test_db) is None
+
+    def test_disabled_pumps_skip_planned_recipe(self, session_id, test_db):
+        # Pump control switched off after the recipes were planned
+        plan_session_recipes(session_id, PROTOCOL)
+        _set_session_config(
+            session_id, dict(PROTOCOL, pump_config=dict(PROTOCOL["pump_config"], enabled=False))
+        )
+
+        assert create_pump_operation_for_cycle(session_id, 1, db_path=test_db) is None
+        with database.get_database_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM pump_operations").fetchone()[0] == 0
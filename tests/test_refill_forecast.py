@@ -0,0 +1,155 @@
+"""
+Tests for pump refill forecasting.
+
+Validates that:
+- Expected cycle volumes use predetermined recipes, bank means and history
+- Active sessions' planned recipes predict the cycle a pump runs dry
+- Dispensed cycles no longer count against the current volume
+- Full sessions remaining are estimated after the active sessions
+- Sessions never started, or idle without pending operations, reserve no stock
+"""
+
+import json
+
+import pytest
+
+import robotaste.data.database as database
+from robotaste.core.recipe_planner import plan_session_recipes
+from robotaste.core.refill_forecast import expected_cycle_volumes, forecast_refills
+from robotaste.core.sample_bank import materialize_session_samples
+from robotaste.data.database import create_session
+
+PROTOCOL = {
+    "protocol_id": "forecast-test",
+    "ingredients": [
+        {"name": "Sugar", "stock_concentration_mM": 1000.0},
+        {"name": "Water", "stock_concentration_mM": 0.0, "is_diluent": True},
+    ],
+    "pump_config": {
+        "enabled": True,
+        "total_volume_ml": 10.0,
+        "pumps": [
+            {"address": 0, "ingredient": "Sugar"},
+            {"address": 1, "ingredient": "Water"},
+        ],
+    },
+    "sample_selection_schedule": [
+        {
+            "cycle_range": {"start": 1, "end": 2},
+            "mode": "predetermined_absolute",
+            "predetermined_samples": [
+                {"cycle": 1, "concentrations": {"Sugar": 10.0}},
+                {"cycle": 2, "concentrations": {"Sugar": 20.0}},
+            ],
+        },
+        {
+            "cycle_range": {"start": 3, "end": 4},
+            "mode": "predetermined_randomized",
+            "sample_bank": {
+                "samples": [
+                    {"id": "A", "concentrations": {"Sugar": 30.0}},
+                    {"id": "B", "concentrations": {"Sugar": 50.0}},
+                ],
+                "design_type": "latin_square",
+            },
+        },
+        {"cycle_range": {"start": 5, "end": 5}, "mode": "user_selected"},
+    ],
+}
+
+
+@pytest.fixture
+def session_id(test_db):
+    """Started session of PROTOCOL with planned recipes (bank order A, B)."""
+    session_id, _ = create_session("mod", protocol_id=PROTOCOL["protocol_id"])
+    materialize_session_samples(session_id, PROTOCOL)
+    plan_session_recipes(session_id, PROTOCOL)
+    _set_session(session_id, current_cycle=1)
+    return session_id
+
+
+def _set_session(session_id, current_cycle, idle_hours=0):
+    with database.get_database_connection() as conn:
+        conn.execute(
+            "UPDATE sessions SET current_cycle = ?, updated_at = datetime('now', ?) WHERE session_id = ?",
+            (current_cycle, f"-{idle_hours} hours", session_id),
+        )
+        conn.commit()
+
+
+def _add_operation(session_id, cycle_number, recipe, status="completed"):
+    with database.get_database_connection() as conn:
+        conn.execute(
+            "INSERT INTO pump_operations (session_id, cycle_number, recipe_json, status, completed_at) "
+            "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            (session_id, cycle_number, json.dumps(recipe), status),
+        )
+        conn.commit()
+
+
+def _state(sugar_ul, water_ul=60000.0):
+    return {"Sugar": {"current_ul": sugar_ul}, "Water": {"current_ul": water_ul}}
+
+
+class TestExpectedCycleVolumes:
+    """Expected recipe of each cycle."""
+
+    def test_sources_per_mode(self):
+        expected = expected_cycle_volumes(PROTOCOL, history_mean={"Sugar": 700.0})
+
+        assert [expected[c].get("Sugar") for c in range(1, 6)] == [100.0, 200.0, 400.0, 400.0, 700.0]
+        assert expected[1]["Water"] == 9900.0
+
+
+class TestForecastRefills:
+    """Forecasting against active sessions."""
+
+    def test_runs_dry_in_planned_cycle(self, session_id, test_db):
+        # Planned: 100 + 200 + 300 (A) + 500 (B); cycle 5 has no history
+        forecast = forecast_refills(test_db, PROTOCOL["protocol_id"], PROTOCOL, _state(650.0))
+
+        assert forecast["Sugar"]["committed_ul"] == pytest.approx(1100.0)
+        assert forecast["Sugar"]["runs_dry_at"] == {"session_id": session_id, "cycle_number": 4}
+        assert forecast["Sugar"]["refill_recommended"] is True
+        assert forecast["Water"]["runs_dry_at"] is None
+
+    def test_dispensed_cycles_not_counted(self, session_id, test_db):
+        _add_operation(session_id, 1, {"Sugar": 100.0, "Water": 9900.0})
+        _add_operation(session_id, 2, {"Sugar": 200.0, "Water": 9800.0})
+
+        forecast = forecast_refills(test_db, PROTOCOL["protocol_id"], PROTOCOL, _state(650.0))
+
+        # Cycles 3-4 as planned, cycle 5 at the historical mean (150 µL)
+        assert forecast["Sugar"]["committed_ul"] == pytest.approx(950.0)
+        assert forecast["Sugar"]["runs_dry_at"]["cycle_number"] == 4
+
+    def test_full_sessions_remaining(self, test_db):
+        # No active sessions: 100 + 200 + 400 + 400 (+ no history) per session
+        forecast = forecast_refills(test_db, PROTOCOL["protocol_id"], PROTOCOL, _state(3000.0))
+
+        assert forecast["Sugar"]["session_estimate_ul"] == pytest.approx(1100.0)
+        assert forecast["Sugar"]["full_sessions_remaining"] == 2
+        assert forecast["Sugar"]["refill_recommended"] is False
+
+    def test_unstarted_session_not_counted(self, session_id, test_db):
+        _set_session(session_id, current_cycle=0)
+
+        forecast = forecast_refills(test_db, PROTOCOL["protocol_id"], PROTOCOL, _state(650.0))
+
+        assert forecast["Sugar"]["committed_ul"] == 0.0
+        assert forecast["Sugar"]["runs_dry_at"] is None
+
+    def test_abandoned_session_not_counted(self, session_id, test_db):
+        _set_session(session_id, current_cycle=2, idle_hours=48)
+
+        forecast = forecast_refills(test_db, PROTOCOL["protocol_id"], PROTOCOL, _state(650.0))
+
+        assert forecast["Sugar"]["committed_ul"] == 0.0
+
+    def test_idle_session_with_pending_operation_counted(self, session_id, test_db):
+        _set_session(session_id, current_cycle=1, idle_hours=48)
+        _add_operation(session_id, 1, {"Sugar": 100.0, "Water": 9900.0}, status="pending")
+
+        forecast = forecast_refills(test_db, PROTOCOL["protocol_id"], PROTOCOL, _state(650.0))
+
+        assert forecast["Sugar"]["committed_ul"] == pytest.approx(1100.0)
@@ -0,0 +1,92 @@
+"""
+Tests for session-start materialization of sample-bank sequences.
+
+Validates that:
+- Every predetermined_randomized cycle gets one precomputed row
+- Materialized samples match the lazy per-cycle lookup
+- Latin-square orders follow the session's protocol number
+- Sessions without materialized rows still fall back to lazy generation
+"""
+
+import pytest
+
+from robotaste.core.sample_bank import (
+    get_materialized_sample,
+    get_next_sample_from_bank,
+    get_session_sample_sequence,
+    materialize_session_samples,
+)
+from robotaste.data.database import create_session
+
+BANK = {
+    "samples": [
+        {"id": "A", "concentrations": {"Sugar": 10.0}},
+        {"id": "B", "concentrations": {"Sugar": 20.0}},
+        {"id": "C", "concentrations": {"Sugar": 30.0}},
+    ],
+    "design_type": "latin_square",
+}
+
+PROTOCOL = {
+    "sample_selection_schedule": [
+        {"cycle_range": {"start": 1, "end": 1}, "mode": "user_selected"},
+        {"cycle_range": {"start": 2, "end": 5}, "mode": "predetermined_randomized", "sample_bank": BANK},
+    ]
+}
+
+
+class TestMaterializeSessionSamples:
+    """Materializing bank sequences."""
+
+    def test_one_row_per_bank_cycle(self, test_db):
+        session_id, _ = create_session("mod", protocol_id="p")
+
+        assert materialize_session_samples(session_id, PROTOCOL) == 4
+        assert get_materialized_sample(session_id, 1) is None
+        assert list(get_session_sample_sequence(session_id)) == [2, 3, 4, 5]
+
+    def test_latin_square_rotation_and_wraparound(self, test_db):
+        create_session("mod", protocol_id="p")
+        session_id, _ = create_session("mod", protocol_id="p")  # Session #2 -> B C A
+
+        materialize_session_samples(session_id, PROTOCOL)
+        sequence = get_session_sample_sequence(session_id)
+
+        assert [sequence[c]["Sugar"] for c in range(2, 6)] == [20.0, 30.0, 10.0, 20.0]
+
+    def test_matches_lazy_lookup(self, test_db):
+        materialized_session, _ = create_session("mod", protocol_id="p")
+        lazy_session, _ = create_session("mod", protocol_id="q")  # Also session #1
+
+        materialize_session_samples(materialized_session, PROTOCOL)
+
+        for cycle in range(2, 6):
+            assert get_next_sample_from_bank(materialized_session, 1, BANK, cycle, 2) == \
+                get_next_sample_from_bank(lazy_session, 1, BANK, cycle, 2)
+
+    def test_rematerialize_is_stable(self, test_db):
+        protocol = {
+            "sample_selection_schedule": [
+                {"cycle_range": {"start": 1, "end": 3}, "mode": "predetermined_randomized",
+                 "sample_bank": dict(BANK, design_type="randomized")},
+            ]
+        }
+        session_id, _ = create_session("mod", protocol_id="p")
+
+        materialize_session_samples(session_id, protocol)
+        first = get_session_sample_sequence(session_id)
+        materialize_session_samples(session_id, protocol)
+
+        assert get_session_sample_sequence(session_id) == first
+
+    def test_empty_bank_raises(self, test_db):
+        session_id, _ = create_session("mod", protocol_id="p")
+        protocol = {
+            "sample_selection_schedule": [
+                {"cycle_range": {"start": 1, "end": 2}, "mode": "predetermined_randomized",
+                 "sample_bank": {"samples": [], "design_type": "randomized"}},
+            ]
+        }
+
+        with pytest.raises(ValueError):
+            materialize_session_samples(session_id, protocol)
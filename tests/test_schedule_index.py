@@ -0,0 +1,70 @@
+"""
+Tests for the sample_selection_schedule interval index.
+
+Validates that:
+- Lookups match a linear scan of the schedule, including overlaps
+- Overlaps and gaps are detected once when the index is built
+- The validator reports overlaps from the index
+- The standalone helpers see in-place edits of a schedule
+"""
+
+from robotaste.config.protocol_schema import (
+    ScheduleIndex,
+    get_schedule_index_for_cycle,
+    get_selection_mode_for_cycle,
+)
+from robotaste.config.protocols import _validate_sample_selection_schedule
+
+
+def _linear_index(schedule, cycle):
+    for idx, entry in enumerate(schedule):
+        cycle_range = entry.get("cycle_range", {})
+        if cycle_range.get("start", 0) <= cycle <= cycle_range.get("end", 0):
+            return idx
+    return -1
+
+
+SCHEDULE = [
+    {"cycle_range": {"start": 5, "end": 8}, "mode": "bo_selected"},
+    {"cycle_range": {"start": 1, "end": 3}, "mode": "predetermined", "predetermined_samples": []},
+    {"cycle_range": {"start": 7, "end": 12}, "mode": "user_selected"},
+    {"cycle_range": {"start": 15, "end": 15}, "mode": "bo_selected"},
+]
+
+
+class TestScheduleIndex:
+    """Building and querying the interval index."""
+
+    def test_matches_linear_scan(self):
+        index = ScheduleIndex(SCHEDULE)
+        for cycle in range(0, 18):
+            assert index.lookup(cycle) == _linear_index(SCHEDULE, cycle)
+
+    def test_overlaps_and_gaps(self):
+        index = ScheduleIndex(SCHEDULE)
+
+        assert index.overlaps == [(2, 7), (2, 8)]
+        assert index.gaps == [(4, 4), (13, 14)]
+
+    def test_helpers_see_in_place_edits(self):
+        schedule = [dict(entry, cycle_range=dict(entry["cycle_range"])) for entry in SCHEDULE]
+        protocol = {"sample_selection_schedule": schedule}
+        assert get_schedule_index_for_cycle(protocol, 10) == 2
+
+        schedule[0]["cycle_range"]["end"] = 10
+        assert get_schedule_index_for_cycle(protocol, 10) == 0
+        assert get_selection_mode_for_cycle(protocol, 4) == "user_selected"
+
+    def test_empty_schedule(self):
+        assert get_selection_mode_for_cycle({}, 1) == "user_selected"
+        assert get_schedule_index_for_cycle({"sample_selection_schedule": []}, 1) == -1
+
+
+class TestValidation:
+    """Overlap reporting in the schedule validator."""
+
+    def test_overlap_reported_per_entry(self):
+        errors = _validate_sample_selection_schedule({"sample_selection_schedule": SCHEDULE})
+
+        overlap_errors = [e for e in errors if "already covered" in e]
+        assert overlap_errors == ["Schedule entry 3: cycles [7, 8] already covered by another entry"]
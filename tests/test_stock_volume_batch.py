@@ -0,0 +1,87 @@
+"""
+Tests for the vectorized stock-volume calculator.
+
+Validates that:
+- Batch volumes match calculate_stock_volumes sample by sample
+- Ingredients missing from a sample get no volume
+- Samples without a usable stock or overflowing the final volume are infeasible
+- Protocol validation reports fixed samples that cannot be dispensed
+"""
+
+import numpy as np
+import pytest
+
+from robotaste.config.protocols import _validate_sample_volumes
+from robotaste.core.calculations import (
+    calculate_stock_volumes,
+    calculate_stock_volumes_batch,
+)
+
+STOCKS = np.array([1000.0, 100.0, 250.0])
+NAMES = ["Sugar", "Salt", "Citric"]
+
+
+class TestCalculateStockVolumesBatch:
+    """Batch calculation."""
+
+    def test_matches_single_sample_calculation(self):
+        rng = np.random.default_rng(0)
+        concentrations = rng.uniform(0, 20, size=(50, 3))
+        configs = [{"name": n, "stock_concentration_mM": s} for n, s in zip(NAMES, STOCKS)]
+
+        result = calculate_stock_volumes_batch(concentrations, STOCKS, 10.0)
+
+        for row in range(len(concentrations)):
+            single = calculate_stock_volumes(dict(zip(NAMES, concentrations[row])), configs, 10.0)
+            assert list(result["stock_volumes"][row]) == pytest.approx(list(single["stock_volumes"].values()))
+            assert result["water_volume"][row] == pytest.approx(single["water_volume"], abs=0.1)
+        assert result["feasible"].all()
+
+    def test_missing_ingredients_get_no_volume(self):
+        result = calculate_stock_volumes_batch(np.array([[12.5, np.nan, np.nan]]), STOCKS)
+
+        assert list(result["stock_volumes"][0]) == [125.0, 0.0, 0.0]
+        assert result["water_volume"][0] == pytest.approx(9875.0)
+
+    def test_feasibility_mask(self):
+        concentrations = np.array([
+            [10.0, 1.0, np.nan],   # fits
+            [np.nan, 150.0, np.nan],  # 15 mL of salt stock in 10 mL
+            [np.nan, np.nan, 5.0],  # no stock for Citric below
+        ])
+
+        result = calculate_stock_volumes_batch(concentrations, np.array([1000.0, 100.0, 0.0]))
+
+        assert list(result["feasible"]) == [True, False, False]
+        assert np.isnan(result["stock_volumes"][2, 2])
+
+
+class TestValidateSampleVolumes:
+    """Protocol validation of fixed samples."""
+
+    def test_reports_infeasible_samples(self):
+        protocol = {
+            "ingredients": [
+                {"name": "Sugar", "stock_concentration_mM": 1000.0},
+                {"name": "Salt"},
+            ],
+            "pump_config": {"enabled": True, "total_volume_ml": 10.0, "pumps": []},
+            "sample_selection_schedule": [
+                {
+                    "mode": "predetermined_absolute",
+                    "predetermined_samples": [
+                        {"cycle": 1, "concentrations": {"Sugar": 100.0}},
+                        {"cycle": 2, "concentrations": {"Sugar": 1500.0}},
+                    ],
+                },
+                {
+                    "mode": "predetermined_randomized",
+                    "sample_bank": {"samples": [{"id": "A", "concentrations": {"Salt": 1.0}}]},
+                },
+            ],
+        }
+
+        assert _validate_sample_volumes(protocol) == [
+            "Schedule entry 1: cycle 2 needs 15000.0 µL of stock, more than total_volume_ml (10.0 mL)",
+            "Schedule entry 2: sample 'A' needs Salt but no stock concentration is configured",
+        ]